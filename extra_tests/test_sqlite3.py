@@ -322,3 +322,64 @@ def test_close_in_del_ordering():
     gc.collect()
     gc.collect()
     assert SQLiteBackend.success
+
+def test_fetch_batches(con):
+    # more rows than fetched by one call to the C helper, and text values
+    # that don't fit in its initial buffer
+    cur = con.cursor()
+    cur.execute("create table test(i, f, t, b, m)")
+    rows = [(i, i * 0.5, u"x%d" % i, buffer("b%d" % i),
+             [None, i, 1.5, u"s", buffer("b")][i % 5]) for i in range(1000)]
+    rows.append((-2**63, float('inf'), u"\xe9" * 100000, buffer("\0" * 70000),
+                 u""))
+    cur.executemany("insert into test values (?, ?, ?, ?, ?)", rows)
+    cur.execute("select * from test")
+    assert cur.fetchone() == rows[0]
+    assert cur.fetchmany(3) == rows[1:4]
+    assert next(cur) == rows[4]
+    assert cur.fetchmany(300) == rows[5:305]
+    assert cur.fetchall() == rows[305:]
+    assert cur.fetchall() == []
+    assert cur.fetchone() is None
+    cur.execute("select * from test")
+    assert cur.fetchmany(-1) == rows
+    cur.execute("select i from test where i < 0")
+    assert cur.fetchall() == [(-2**63,)]
+    assert cur.execute("select * from test where i > 5000").fetchall() == []
+
+def test_fetch_batches_factories(con):
+    con.row_factory = _sqlite3.Row
+    con.text_factory = str
+    cur = con.execute("select 1 as a, 'x' as b union all select 2, 'y'")
+    rows = cur.fetchall()
+    assert [(row['a'], row['b']) for row in rows] == [(1, 'x'), (2, 'y')]
+    assert type(rows[0]['b']) is str
+
+def test_fetch_batches_converters():
+    con = _sqlite3.connect(":memory:",
+                           detect_types=_sqlite3.PARSE_DECLTYPES)
+    _sqlite3.register_converter("twice", lambda s: s * 2)
+    try:
+        con.execute("create table test(a twice, b)")
+        con.executemany("insert into test values (?, ?)",
+                        [(i, i) for i in range(600)] + [(None, None)])
+        rows = con.execute("select * from test").fetchall()
+        assert rows == [(str(i) * 2, i) for i in range(600)] + [(None, None)]
+    finally:
+        del _sqlite3.converters["TWICE"]
+        con.close()
+
+@pypy_only
+def test_fetch_columns(con):
+    cur = con.cursor()
+    cur.execute("create table test(i, f, t)")
+    cur.executemany("insert into test values (?, ?, ?)",
+                    [(i, i * 0.5, None if i % 2 else u"x") for i in range(700)])
+    cur.execute("select * from test")
+    cur.fetchone()
+    assert cur.fetch_columns(2) == [[1, 2], [0.5, 1.0], [None, u"x"]]
+    cols = cur.fetch_columns()
+    assert cols[0] == range(3, 700)
+    assert cols[1] == [i * 0.5 for i in range(3, 700)]
+    assert cols[2] == [None if i % 2 else u"x" for i in range(3, 700)]
+    assert cur.fetch_columns() == [[], [], []]
@@ -36,3 +36,15 @@ def import_module(name, package=None):
         name = _resolve_name(name[level:], package, level)
     __import__(name)
     return sys.modules[name]
+
+
+def invalidate_caches():
+    """Invalidate the caches of the import system.
+
+    Backport from 3.x: on PyPy, this forgets the cached listings of the
+    directories in sys.path.
+
+    """
+    import imp
+    if hasattr(imp, 'invalidate_caches'):
+        imp.invalidate_caches()
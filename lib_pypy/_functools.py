@@ -1,4 +1,8 @@
-""" Supplies the internal functions for functools.py in the standard library """
+""" Supplies the internal functions for functools.py in the standard library
+
+Note that PyPy also contains a built-in module '_functools' which will hide
+this one if compiled in.
+"""
 
 # reduce() has moved to _functools in Python 2.6+.
 reduce = reduce
@@ -50,6 +50,12 @@ else:
 
 from _sqlite3_cffi import ffi as _ffi, lib as _lib
 
+# number of rows, and initial and maximum number of bytes of text and blob
+# values, stepped over at once by fetchmany(), fetchall() and fetch_columns()
+_BATCH_ROWS = 256
+_BATCH_TEXT_SIZE = 64 * 1024
+_BATCH_MAX_TEXT_SIZE = 16 * 1024 * 1024
+
 exported_sqlite_symbols = [
     'SQLITE_ALTER_TABLE',
     'SQLITE_ANALYZE',
@@ -682,9 +688,33 @@ class Connection(object):
                 raise OperationalError("Error enabling load extension")
 
 
+class _RowBatch(object):
+    """Buffers for _lib._pypy_sqlite3_fetch_rows(), which steps over many
+    rows at once and stores their values column by column."""
+
+    def __init__(self, ncols):
+        size = ncols * _BATCH_ROWS
+        self.ncols = ncols
+        self.as_blob = _ffi.new("unsigned char[]", ncols)
+        self.coltypes = _ffi.new("int[]", ncols)
+        self.types = _ffi.new("int[]", size)
+        self.ints = _ffi.new("int64_t[]", size)
+        self.floats = _ffi.new("double[]", size)
+        self.sizes = _ffi.new("int[]", size)
+        self.textbuf_size = _BATCH_TEXT_SIZE
+        self.textbuf = _ffi.new("char[]", self.textbuf_size)
+        self.nrows = _ffi.new("int *")
+
+    def grow_textbuf(self):
+        if self.textbuf_size < _BATCH_MAX_TEXT_SIZE:
+            self.textbuf_size *= 2
+            self.textbuf = _ffi.new("char[]", self.textbuf_size)
+
+
 class Cursor(object):
     __initialized = False
     __statement = None
+    __batch = None
 
     def __init__(self, con):
         if not isinstance(con, Connection):
@@ -771,9 +801,13 @@ class Cursor(object):
     def __fetch_one_row(self):
         num_cols = _lib.sqlite3_data_count(self.__statement._statement)
         row = newlist_hint(num_cols)
+        if self.__connection._detect_types:
+            row_cast_map = self.__row_cast_map
+        else:
+            row_cast_map = None
         for i in xrange(num_cols):
-            if self.__connection._detect_types:
-                converter = self.__row_cast_map[i]
+            if row_cast_map is not None:
+                converter = row_cast_map[i]
             else:
                 converter = None
 
@@ -806,6 +840,126 @@ class Cursor(object):
             row.append(val)
         return tuple(row)
 
+    def __fetch_columns(self, maxrows):
+        # Fetch the next 'maxrows' rows, or all of them if 'maxrows' is
+        # negative, and return them as a list of columns and the number
+        # of rows.  Like __next__(), it leaves the row after them in
+        # self.__next_row.  The rows are stepped over in batches by the
+        # C function _pypy_sqlite3_fetch_rows().
+        self.__check_cursor()
+        self.__check_reset()
+        if not self.__statement:
+            return [], 0
+        statement = self.__statement._statement
+        columns = [[] for i in xrange(_lib.sqlite3_column_count(statement))]
+        nrows = 0
+        while nrows != maxrows:
+            try:
+                row = self.__next_row
+            except AttributeError:
+                break
+            del self.__next_row
+            for i in xrange(len(row)):
+                columns[i].append(row[i])
+            nrows += 1
+
+            want = _BATCH_ROWS
+            if 0 <= maxrows - nrows < want:
+                want = maxrows - nrows
+            batch = self.__get_batch(len(row))
+            ret = _lib._pypy_sqlite3_fetch_rows(
+                statement, batch.ncols, want, batch.as_blob, batch.coltypes,
+                batch.types, batch.ints, batch.floats, batch.sizes,
+                batch.textbuf, batch.textbuf_size, batch.nrows)
+            count = batch.nrows[0]
+            if count > 0:
+                self.__decode_batch(batch, columns, want, count)
+                nrows += count
+            if ret == _lib.SQLITE_ROW:
+                if count < want:
+                    # the values of the next row did not fit
+                    batch.grow_textbuf()
+                self.__next_row = self.__fetch_one_row()
+            else:
+                self.__statement._reset()
+                if ret != _lib.SQLITE_DONE:
+                    raise self.__connection._get_exception(ret)
+        return columns, nrows
+
+    def __get_batch(self, ncols):
+        batch = self.__batch
+        if batch is None or batch.ncols != ncols:
+            batch = self.__batch = _RowBatch(ncols)
+        if self.__connection._detect_types:
+            for i in xrange(ncols):
+                batch.as_blob[i] = self.__row_cast_map[i] is not None
+        else:
+            for i in xrange(ncols):
+                batch.as_blob[i] = False
+        return batch
+
+    def __decode_batch(self, batch, columns, stride, nrows):
+        if self.__connection._detect_types:
+            row_cast_map = self.__row_cast_map
+        else:
+            row_cast_map = None
+        text_factory = self.__connection.text_factory
+        textbuf = _ffi.buffer(batch.textbuf)
+        for i in xrange(batch.ncols):
+            column = columns[i]
+            start = i * stride
+            coltype = batch.coltypes[i]
+            # the columns with a converter are fetched as blobs
+            blob_factory = _BLOB_TYPE
+            if row_cast_map is not None and row_cast_map[i] is not None:
+                blob_factory = row_cast_map[i]
+
+            if coltype == _lib.SQLITE_INTEGER:
+                column.extend(_ffi.unpack(batch.ints + start, nrows))
+            elif coltype == _lib.SQLITE_FLOAT:
+                column.extend(_ffi.unpack(batch.floats + start, nrows))
+            elif coltype == _lib.SQLITE_NULL:
+                column.extend([None] * nrows)
+            elif coltype == _lib.SQLITE_TEXT or coltype == _lib.SQLITE_BLOB:
+                if coltype == _lib.SQLITE_TEXT:
+                    factory = text_factory
+                else:
+                    factory = blob_factory
+                offsets = _ffi.unpack(batch.ints + start, nrows)
+                sizes = _ffi.unpack(batch.sizes + start, nrows)
+                for j in xrange(nrows):
+                    ofs = offsets[j]
+                    column.append(factory(textbuf[ofs:ofs + sizes[j]]))
+            else:
+                # values of different types
+                for k in xrange(start, start + nrows):
+                    typ = batch.types[k]
+                    if typ == _lib.SQLITE_NULL:
+                        val = None
+                    elif typ == _lib.SQLITE_INTEGER:
+                        val = batch.ints[k]
+                    elif typ == _lib.SQLITE_FLOAT:
+                        val = batch.floats[k]
+                    else:
+                        ofs = batch.ints[k]
+                        val = textbuf[ofs:ofs + batch.sizes[k]]
+                        if typ == _lib.SQLITE_TEXT:
+                            val = text_factory(val)
+                        else:
+                            val = blob_factory(val)
+                    column.append(val)
+
+    def __fetch_rows(self, maxrows):
+        columns, nrows = self.__fetch_columns(maxrows)
+        if columns:
+            rows = list(zip(*columns))
+        else:
+            rows = [()] * nrows
+        if self.row_factory is not None:
+            row_factory = self.row_factory
+            rows = [row_factory(self, row) for row in rows]
+        return rows
+
     def __execute(self, multiple, sql, many_params):
         self.__locked = True
         self._reset = False
@@ -977,15 +1131,20 @@ class Cursor(object):
     def fetchmany(self, size=None):
         if size is None:
             size = self.arraysize
-        lst = []
-        for row in self:
-            lst.append(row)
-            if len(lst) == size:
-                break
-        return lst
+        if size <= 0:
+            size = -1    # like CPython, fetch all the rows
+        return self.__fetch_rows(size)
 
     def fetchall(self):
-        return list(self)
+        return self.__fetch_rows(-1)
+
+    def fetch_columns(self, size=-1):
+        """PyPy extension: fetch the next 'size' rows, or all the remaining
+        rows if 'size' is negative, and return them as a list of columns,
+        each of which is a list of values.  The row_factory is not used.
+        The columns of integers or of floats are stored unboxed."""
+        columns, nrows = self.__fetch_columns(size)
+        return columns
 
     def __get_connection(self):
         return self.__connection
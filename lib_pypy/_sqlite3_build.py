@@ -258,7 +258,98 @@ else:
         libraries=['sqlite3']
     )
 
-_ffi.set_source("_sqlite3_cffi", "#include <sqlite3.h>", **extra_args)
+_ffi.cdef("""
+int _pypy_sqlite3_fetch_rows(sqlite3_stmt *stmt, int ncols, int maxrows,
+                             const unsigned char *as_blob, int *coltypes, int *types,
+                             int64_t *ints, double *floats, int *sizes,
+                             char *textbuf, int textbuf_size, int *p_nrows);
+""")
+
+# Used by Cursor.fetchmany(), fetchall() and fetch_columns(): steps over many
+# rows in one call and stores the values column by column, so that the
+# Python side does not have to make several calls per value.  The value of
+# column 'col' in row 'row' is at index 'col * maxrows + row' of 'types'
+# (its SQLITE_xxx type) and of 'ints' or 'floats'.  The text and blob values
+# are copied into 'textbuf'; then 'ints' is the offset and 'sizes' the length.
+# 'coltypes' receives, for each column, the common type of all the values,
+# or -1.  The columns with 'as_blob' set are fetched with
+# sqlite3_column_blob(), and their type is either SQLITE_BLOB or SQLITE_NULL.
+#
+# Returns the result of the last sqlite3_step(), and the number of rows
+# stored in *p_nrows.  If the result is SQLITE_ROW, the current row of the
+# statement is the next one, not stored because there are already 'maxrows'
+# rows or because its values don't fit in 'textbuf'.
+_SOURCE = """
+#include <stdint.h>
+#include <string.h>
+#include <sqlite3.h>
+
+static int _pypy_sqlite3_fetch_rows(sqlite3_stmt *stmt, int ncols,
+                                    int maxrows, const unsigned char *as_blob,
+                                    int *coltypes, int *types,
+                                    int64_t *ints, double *floats,
+                                    int *sizes, char *textbuf,
+                                    int textbuf_size, int *p_nrows)
+{
+    int rc, row = 0, col, used = 0;
+
+    while (1) {
+        rc = sqlite3_step(stmt);
+        if (rc != SQLITE_ROW || row == maxrows)
+            break;
+        for (col = 0; col < ncols; col++) {
+            int k = col * maxrows + row;
+            int type, size;
+            const void *p = NULL;
+
+            if (as_blob[col]) {
+                p = sqlite3_column_blob(stmt, col);
+                type = p ? SQLITE_BLOB : SQLITE_NULL;
+            }
+            else {
+                type = sqlite3_column_type(stmt, col);
+                if (type == SQLITE_TEXT)
+                    p = sqlite3_column_text(stmt, col);
+                else if (type == SQLITE_BLOB)
+                    p = sqlite3_column_blob(stmt, col);
+            }
+            switch (type) {
+            case SQLITE_INTEGER:
+                ints[k] = sqlite3_column_int64(stmt, col);
+                break;
+            case SQLITE_FLOAT:
+                floats[k] = sqlite3_column_double(stmt, col);
+                break;
+            case SQLITE_TEXT:
+            case SQLITE_BLOB:
+                size = sqlite3_column_bytes(stmt, col);
+                if (size > textbuf_size - used)
+                    goto done;    /* leave this row to the caller */
+                if (size > 0)
+                    memcpy(textbuf + used, p, size);
+                ints[k] = used;
+                sizes[k] = size;
+                used += size;
+                break;
+            }
+            types[k] = type;
+        }
+        for (col = 0; col < ncols; col++) {
+            int type = types[col * maxrows + row];
+            if (row == 0)
+                coltypes[col] = type;
+            else if (coltypes[col] != type)
+                coltypes[col] = -1;
+        }
+        row++;
+    }
+ done:
+    *p_nrows = row;
+    return rc;
+}
+"""
+
+_ffi.set_source("_sqlite3_cffi", _SOURCE, **extra_args)
 
 
 if __name__ == "__main__":
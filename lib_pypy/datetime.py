@@ -19,10 +19,12 @@ Thanks to Tim Peters for suggesting using it.
 from __future__ import division
 import time as _timemodule
 import math as _math
-import struct as _struct
 
-# for cpyext, use these as base classes
+# for cpyext, use these as base classes; they also store the fields and
+# implement the most common operations
 from __pypy__._pypydatetime import dateinterop, deltainterop, timeinterop
+from __pypy__._pypydatetime import fromtimestamp as _fromtimestamp
+from __pypy__._pypydatetime import strptime_fields as _strptime_fields
 
 _SENTINEL = object()
 
@@ -184,13 +186,6 @@ def _build_struct_time(y, m, d, hh, mm, ss, dstflag):
     dnum = _days_before_month(y, m) + d
     return _timemodule.struct_time((y, m, d, hh, mm, ss, wday, dnum, dstflag))
 
-def _format_time(hh, mm, ss, us):
-    # Skip trailing microseconds when us==0.
-    result = "%02d:%02d:%02d" % (hh, mm, ss)
-    if us:
-        result += ".%06d" % us
-    return result
-
 # Correctly substitute for %z and %Z escapes in strftime formats.
 def _wrap_strftime(object, format, timetuple):
     year = timetuple[0]
@@ -453,7 +448,10 @@ class timedelta(deltainterop):
     Representation: (days, seconds, microseconds).  Why?  Because I
     felt like it.
     """
-    __slots__ = '_days', '_seconds', '_microseconds', '_hashcode'
+    # _days, _seconds, _microseconds and _hashcode are stored by
+    # deltainterop, which also provides days, seconds, microseconds,
+    # _cmp() and __nonzero__()
+    __slots__ = ()
 
     def __new__(cls, days=_SENTINEL, seconds=_SENTINEL, microseconds=_SENTINEL,
                 milliseconds=_SENTINEL, minutes=_SENTINEL, hours=_SENTINEL, weeks=_SENTINEL):
@@ -532,22 +530,6 @@ class timedelta(deltainterop):
         """Total seconds in the duration."""
         return self._to_microseconds() / 10**6
 
-    # Read-only field accessors
-    @property
-    def days(self):
-        """days"""
-        return self._days
-
-    @property
-    def seconds(self):
-        """seconds"""
-        return self._seconds
-
-    @property
-    def microseconds(self):
-        """microseconds"""
-        return self._microseconds
-
     def __add__(self, other):
         if isinstance(other, timedelta):
             # for CPython compatibility, we cannot use
@@ -644,20 +626,11 @@ class timedelta(deltainterop):
         else:
             _cmperror(self, other)
 
-    def _cmp(self, other):
-        assert isinstance(other, timedelta)
-        return _cmp(self._getstate(), other._getstate())
-
     def __hash__(self):
         if self._hashcode == -1:
             self._hashcode = hash(self._getstate())
         return self._hashcode
 
-    def __nonzero__(self):
-        return (self._days != 0 or
-                self._seconds != 0 or
-                self._microseconds != 0)
-
     # Pickle support.
 
     def _getstate(self):
@@ -698,7 +671,10 @@ class date(dateinterop):
     Properties (readonly):
     year, month, day
     """
-    __slots__ = '_year', '_month', '_day', '_hashcode'
+    # _year, _month, _day and _hashcode are stored by dateinterop, which
+    # also provides year, month, day, toordinal(), weekday(), isoweekday()
+    # and isoformat()
+    __slots__ = ()
 
     def __new__(cls, year, month=None, day=None):
         """Constructor.
@@ -790,34 +766,7 @@ class date(dateinterop):
             return self.strftime(fmt)
         return str(self)
 
-    def isoformat(self):
-        """Return the date formatted according to ISO.
-
-        This is 'YYYY-MM-DD'.
-
-        References:
-        - http://www.w3.org/TR/NOTE-datetime
-        - http://www.cl.cam.ac.uk/~mgk25/iso-time.html
-        """
-        return "%04d-%02d-%02d" % (self._year, self._month, self._day)
-
-    __str__ = isoformat
-
-    # Read-only field accessors
-    @property
-    def year(self):
-        """year (1-9999)"""
-        return self._year
-
-    @property
-    def month(self):
-        """month (1-12)"""
-        return self._month
-
-    @property
-    def day(self):
-        """day (1-31)"""
-        return self._day
+    __str__ = dateinterop.isoformat
 
     # Standard conversions, __cmp__, __hash__ (and helpers)
 
@@ -826,14 +775,6 @@ class date(dateinterop):
         return _build_struct_time(self._year, self._month, self._day,
                                   0, 0, 0, -1)
 
-    def toordinal(self):
-        """Return proleptic Gregorian ordinal for the year, month and day.
-
-        January 1 of year 1 is day 1.  Only the year, month and day values
-        contribute to the result.
-        """
-        return _ymd2ord(self._year, self._month, self._day)
-
     def replace(self, year=None, month=None, day=None):
         """Return a new date with new values for the specified fields."""
         if year is None:
@@ -896,9 +837,7 @@ class date(dateinterop):
 
     def _cmp(self, other):
         assert isinstance(other, date)
-        y, m, d = self._year, self._month, self._day
-        y2, m2, d2 = other._year, other._month, other._day
-        return _cmp((y, m, d), (y2, m2, d2))
+        return self._cmp_date(other)
 
     def __hash__(self):
         "Hash."
@@ -909,11 +848,7 @@ class date(dateinterop):
     # Computations
 
     def _add_timedelta(self, other, factor):
-        y, m, d = _normalize_date(
-            self._year,
-            self._month,
-            self._day + other.days * factor)
-        return date(y, m, d)
+        return self._add_days(date, other.days * factor)
 
     def __add__(self, other):
         "Add a date to a timedelta."
@@ -933,16 +868,7 @@ class date(dateinterop):
             return self._add_timedelta(other, -1)
         return NotImplemented
 
-    def weekday(self):
-        "Return day of the week, where Monday == 0 ... Sunday == 6."
-        return (self.toordinal() + 6) % 7
-
-    # Day-of-the-week and week-of-the-year, according to ISO
-
-    def isoweekday(self):
-        "Return day of the week, where Monday == 1 ... Sunday == 7."
-        # 1-Jan-0001 is a Monday
-        return self.toordinal() % 7 or 7
+    # Week-of-the-year, according to ISO
 
     def isocalendar(self):
         """Return a 3-tuple containing ISO year, week number, and weekday.
@@ -974,13 +900,10 @@ class date(dateinterop):
     # Pickle support.
 
     def _getstate(self):
-        yhi, ylo = divmod(self._year, 256)
-        return (_struct.pack('4B', yhi, ylo, self._month, self._day),)
+        return (self._getstate_date(),)
 
     def __setstate(self, string):
-        yhi, ylo, self._month, self._day = (ord(string[0]), ord(string[1]),
-                                            ord(string[2]), ord(string[3]))
-        self._year = yhi * 256 + ylo
+        self._setstate_bytes(string)
 
     def __reduce__(self):
         return (self.__class__, self._getstate())
@@ -1087,7 +1010,10 @@ class time(timeinterop):
     Properties (readonly):
     hour, minute, second, microsecond, tzinfo
     """
-    __slots__ = '_hour', '_minute', '_second', '_microsecond', '_tzinfo', '_hashcode'
+    # _hour, _minute, _second, _microsecond, _tzinfo and _hashcode are
+    # stored by timeinterop, which also provides hour, minute, second and
+    # microsecond
+    __slots__ = ()
 
     def __new__(cls, hour=0, minute=0, second=0, microsecond=0, tzinfo=None):
         """Constructor.
@@ -1117,26 +1043,6 @@ class time(timeinterop):
         return self
 
     # Read-only field accessors
-    @property
-    def hour(self):
-        """hour (0-23)"""
-        return self._hour
-
-    @property
-    def minute(self):
-        """minute (0-59)"""
-        return self._minute
-
-    @property
-    def second(self):
-        """second (0-59)"""
-        return self._second
-
-    @property
-    def microsecond(self):
-        """microsecond (0-999999)"""
-        return self._microsecond
-
     @property
     def tzinfo(self):
         """timezone info object"""
@@ -1196,10 +1102,7 @@ class time(timeinterop):
             base_compare = myoff == otoff
 
         if base_compare:
-            return _cmp((self._hour, self._minute, self._second,
-                         self._microsecond),
-                        (other._hour, other._minute, other._second,
-                         other._microsecond))
+            return self._cmp_fields(other)
         if myoff is None or otoff is None:
             raise TypeError("can't compare offset-naive and offset-aware times")
         myhhmm = self._hour * 60 + self._minute - myoff
@@ -1259,8 +1162,7 @@ class time(timeinterop):
         This is 'HH:MM:SS.mmmmmm+zz:zz', or 'HH:MM:SS+zz:zz' if
         self.microsecond == 0.
         """
-        s = _format_time(self._hour, self._minute, self._second,
-                         self._microsecond)
+        s = self._format_time()
         tz = self._tzstr()
         if tz:
             s += tz
@@ -1371,10 +1273,7 @@ class time(timeinterop):
     # Pickle support.
 
     def _getstate(self):
-        us2, us3 = divmod(self._microsecond, 256)
-        us1, us2 = divmod(us2, 256)
-        basestate = _struct.pack('6B', self._hour, self._minute, self._second,
-                                       us1, us2, us3)
+        basestate = self._getstate_bytes()
         if self._tzinfo is None:
             return (basestate,)
         else:
@@ -1383,10 +1282,7 @@ class time(timeinterop):
     def __setstate(self, string, tzinfo):
         if tzinfo is not None and not isinstance(tzinfo, _tzinfo_class):
             raise TypeError("bad tzinfo state arg")
-        self._hour, self._minute, self._second, us1, us2, us3 = (
-            ord(string[0]), ord(string[1]), ord(string[2]),
-            ord(string[3]), ord(string[4]), ord(string[5]))
-        self._microsecond = (((us1 << 8) | us2) << 8) | us3
+        self._setstate_bytes(string)
         self._tzinfo = tzinfo
 
     def __reduce__(self):
@@ -1404,7 +1300,8 @@ class datetime(date):
     The year, month and day arguments are required. tzinfo may be None, or an
     instance of a tzinfo subclass. The remaining arguments may be ints or longs.
     """
-    __slots__ = date.__slots__ + time.__slots__
+    # the time fields are stored by dateinterop too
+    __slots__ = ()
 
     def __new__(cls, year, month=None, day=None, hour=0, minute=0, second=0,
                 microsecond=0, tzinfo=None):
@@ -1469,8 +1366,12 @@ class datetime(date):
         A timezone info object may be passed in as well.
         """
         _check_tzinfo_arg(tz)
-        converter = _timemodule.localtime if tz is None else _timemodule.gmtime
-        self = cls._from_timestamp(converter, timestamp, tz)
+        if cls is datetime:
+            self = _fromtimestamp(cls, timestamp, tz is not None, tz)
+        else:
+            converter = (_timemodule.localtime if tz is None
+                         else _timemodule.gmtime)
+            self = cls._from_timestamp(converter, timestamp, tz)
         if tz is not None:
             self = tz.fromutc(self)
         return self
@@ -1478,6 +1379,8 @@ class datetime(date):
     @classmethod
     def utcfromtimestamp(cls, t):
         "Construct a UTC datetime from a POSIX timestamp (like time.time())."
+        if cls is datetime:
+            return _fromtimestamp(cls, t, True, None)
         return cls._from_timestamp(_timemodule.gmtime, t, None)
 
     @classmethod
@@ -1623,9 +1526,7 @@ class datetime(date):
         Optional argument sep specifies the separator between date and
         time, default 'T'.
         """
-        s = ("%04d-%02d-%02d%c" % (self._year, self._month, self._day, sep) +
-             _format_time(self._hour, self._minute, self._second,
-                          self._microsecond))
+        s = self._format_datetime(sep)
         off = self._utcoffset()
         if off is not None:
             if off < 0:
@@ -1660,6 +1561,10 @@ class datetime(date):
     @classmethod
     def strptime(cls, date_string, format):
         'string, format -> new datetime parsed from a string (like time.strptime()).'
+        # the most common formats are parsed without _strptime
+        fields = _strptime_fields(date_string, format)
+        if fields is not None:
+            return cls(*fields)
         from _strptime import _strptime
         # _strptime._strptime returns a two-element tuple.  The first
         # element is a time.struct_time object.  The second is the
@@ -1790,12 +1695,7 @@ class datetime(date):
             base_compare = myoff == otoff
 
         if base_compare:
-            return _cmp((self._year, self._month, self._day,
-                         self._hour, self._minute, self._second,
-                         self._microsecond),
-                        (other._year, other._month, other._day,
-                         other._hour, other._minute, other._second,
-                         other._microsecond))
+            return self._cmp_datetime(other)
         if myoff is None or otoff is None:
             raise TypeError("can't compare offset-naive and offset-aware datetimes")
         # XXX What follows could be done more efficiently...
@@ -1805,15 +1705,7 @@ class datetime(date):
         return diff and 1 or 0
 
     def _add_timedelta(self, other, factor):
-        result = _normalize_datetime(
-            self._year,
-            self._month,
-            self._day + other.days * factor,
-            self._hour,
-            self._minute,
-            self._second + other.seconds * factor,
-            self._microsecond + other.microseconds * factor)
-        return datetime(result, tzinfo=self._tzinfo)
+        return self._add_delta(datetime, other, factor)
 
     def __add__(self, other):
         "Add a datetime and a timedelta."
@@ -1830,12 +1722,7 @@ class datetime(date):
                 return self._add_timedelta(other, -1)
             return NotImplemented
 
-        delta_d = self.toordinal() - other.toordinal()
-        delta_s = (self._hour - other._hour) * 3600 + \
-                  (self._minute - other._minute) * 60 + \
-                  (self._second - other._second)
-        delta_us = self._microsecond - other._microsecond
-        base = timedelta._create(delta_d, delta_s, delta_us, True)
+        base = self._sub_datetime(timedelta, other)
         if self._tzinfo is other._tzinfo:
             return base
         myoff = self._utcoffset()
@@ -1860,12 +1747,7 @@ class datetime(date):
     # Pickle support.
 
     def _getstate(self):
-        yhi, ylo = divmod(self._year, 256)
-        us2, us3 = divmod(self._microsecond, 256)
-        us1, us2 = divmod(us2, 256)
-        basestate = _struct.pack('10B', yhi, ylo, self._month, self._day,
-                                        self._hour, self._minute, self._second,
-                                        us1, us2, us3)
+        basestate = self._getstate_datetime()
         if self._tzinfo is None:
             return (basestate,)
         else:
@@ -1874,13 +1756,7 @@ class datetime(date):
     def __setstate(self, string, tzinfo):
         if tzinfo is not None and not isinstance(tzinfo, _tzinfo_class):
             raise TypeError("bad tzinfo state arg")
-        (yhi, ylo, self._month, self._day, self._hour,
-            self._minute, self._second, us1, us2, us3) = (ord(string[0]),
-                ord(string[1]), ord(string[2]), ord(string[3]),
-                ord(string[4]), ord(string[5]), ord(string[6]),
-                ord(string[7]), ord(string[8]), ord(string[9]))
-        self._year = yhi * 256 + ylo
-        self._microsecond = (((us1 << 8) | us2) << 8) | us3
+        self._setstate_bytes(string)
         self._tzinfo = tzinfo
 
     def __reduce__(self):
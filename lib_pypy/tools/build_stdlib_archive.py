@@ -0,0 +1,96 @@
+"""Write the archive of the compiled modules of the standard library.
+
+    pypy build_stdlib_archive.py <prefix>
+
+It must be run by the pypy that will use the archive: the code objects are
+compiled and marshalled by it.  The format is described next to
+BytecodeArchive in pypy/module/imp/importing.py.
+"""
+from __future__ import print_function
+import sys, os, struct, imp, marshal
+
+ARCHIVE_MAGIC = 'PyPyBCA1'
+ARCHIVE_NAME = os.path.join('lib-python', 'stdlib-bytecode.archive')
+MARSHAL_VERSION_FOR_PYC = 2
+
+SOURCE_DIRS = [os.path.join('lib-python', '2.7'), 'lib_pypy']
+SKIPPED_DIRS = ['test', 'tests', 'idle_test', '__pycache__']
+
+
+def find_sources(prefix):
+    """Returns the sorted list of the .py files below the SOURCE_DIRS of
+    'prefix', as paths relative to 'prefix'."""
+    result = []
+    for sourcedir in SOURCE_DIRS:
+        top = os.path.join(prefix, sourcedir)
+        for dirpath, dirnames, filenames in os.walk(top):
+            dirnames[:] = [name for name in dirnames
+                           if name not in SKIPPED_DIRS]
+            for name in filenames:
+                if name.endswith('.py'):
+                    path = os.path.join(dirpath, name)
+                    result.append(os.path.relpath(path, prefix))
+    result.sort()
+    return result
+
+def compile_entries(prefix, relpaths):
+    """Returns a list of (name, mtime, marshalled code) for the source
+    files that can be compiled."""
+    entries = []
+    for relpath in relpaths:
+        path = os.path.join(prefix, relpath)
+        with open(path, 'U') as f:
+            source = f.read()
+        try:
+            code = compile(source, path, 'exec', 0, True)
+        except SyntaxError:
+            # e.g. the test data of lib2to3; imported from the file
+            # system if ever
+            continue
+        mtime = int(os.stat(path).st_mtime)
+        data = marshal.dumps(code, MARSHAL_VERSION_FOR_PYC)
+        entries.append((relpath.replace(os.sep, '/'), mtime, data))
+    return entries
+
+def _long(x):
+    return struct.pack('<I', x & 0xFFFFFFFF)
+
+def write_archive(filename, entries, pyc_magic):
+    """Write the archive 'filename' for the given list of (name, mtime,
+    marshalled code).  'pyc_magic' is the 4-byte string of imp.get_magic().
+    """
+    index_size = sum([16 + len(name) for name, mtime, data in entries])
+    offset = len(ARCHIVE_MAGIC) + 12 + index_size
+    index = []
+    for name, mtime, data in entries:
+        index.append(_long(len(name)) + name + _long(mtime) +
+                     _long(offset) + _long(len(data)))
+        offset += len(data)
+    tmpname = filename + '.tmp'
+    with open(tmpname, 'wb') as f:
+        f.write(ARCHIVE_MAGIC)
+        f.write(pyc_magic)
+        f.write(_long(len(entries)))
+        f.write(_long(index_size))
+        f.write(''.join(index))
+        for name, mtime, data in entries:
+            f.write(data)
+    if os.path.exists(filename):
+        os.unlink(filename)
+    os.rename(tmpname, filename)
+
+def main(prefix):
+    entries = compile_entries(prefix, find_sources(prefix))
+    filename = os.path.join(prefix, ARCHIVE_NAME)
+    write_archive(filename, entries, imp.get_magic())
+    print('Wrote %d modules to %s' % (len(entries), filename))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print(__doc__, file=sys.stderr)
+        sys.exit(2)
+    if '__pypy__' not in sys.builtin_module_names:
+        print('Call with a pypy interpreter', file=sys.stderr)
+        sys.exit(1)
+    main(sys.argv[1])
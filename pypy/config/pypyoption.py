@@ -32,11 +32,13 @@ working_modules = default_modules.copy()
 working_modules.update([
     "_socket", "unicodedata", "mmap", "fcntl", "_locale", "pwd",
     "select", "zipimport", "_lsprof", "signal", "_rawffi", "termios",
-    "zlib", "bz2", "struct", "_md5", "_sha", "_minimal_curses",
+    "zlib", "bz2", "struct", "_md5", "_sha", "_sha256", "_sha512",
+    "_minimal_curses",
     "cStringIO", "thread", "itertools", "pyexpat", "cpyext", "array",
     "binascii", "_multiprocessing", '_warnings', "_collections",
     "_multibytecodec", "micronumpy", "_continuation", "_cffi_backend",
-    "_csv", "_cppyy", "_pypyjson", "_jitlog",
+    "_csv", "_cppyy", "_pypyjson", "_jitlog", "_bisect", "_heapq",
+    "cPickle", "_elementtree", "_functools",
     # "_hashlib", "crypt"
 ])
 
@@ -97,6 +99,7 @@ module_dependencies = {
     'cpyext': [('objspace.usemodules.array', True)],
     '_cppyy': [('objspace.usemodules.cpyext', True)],
     'faulthandler': [('objspace.usemodules._vmprof', True)],
+    '_elementtree': [('objspace.usemodules.pyexpat', True)],
     }
 module_suggests = {
     # the reason you want _rawffi is for ctypes, which
@@ -144,6 +147,10 @@ pypy_optiondescription = OptionDescription("objspace", "Object Space Options", [
     BoolOption("lonepycfiles", "Import pyc files with no matching py file",
                default=False),
 
+    BoolOption("usebytecodearchive",
+               "Import the stdlib from the archive of its compiled modules",
+               default=True),
+
     StrOption("soabi",
               "Tag to differentiate extension modules built for different Python interpreters",
               cmdline="--soabi",
@@ -190,6 +197,10 @@ pypy_optiondescription = OptionDescription("objspace", "Object Space Options", [
                    "use specialised tuples",
                    default=False),
 
+        BoolOption("withprimitivetuple",
+                   "store the items of tuples of ints and floats unboxed",
+                   default=False),
+
         BoolOption("withliststrategies",
                    "enable optimized ways to store lists of primitives ",
                    default=True),
@@ -235,6 +246,7 @@ def set_pypy_opt_level(config, level):
         config.objspace.std.suggest(optimized_list_getitem=True)
         #config.objspace.std.suggest(newshortcut=True)
         config.objspace.std.suggest(withspecialisedtuple=True)
+        config.objspace.std.suggest(withprimitivetuple=True)
         #if not IS_64_BITS:
         #    config.objspace.std.suggest(withsmalllong=True)
 
@@ -0,0 +1,199 @@
+"""
+Line and arc coverage, recorded by the interpreter itself instead of by a
+sys.settrace() function.  Tracing functions disable the JIT; this doesn't.
+
+The executed lines of a code object are recorded in a bitmap.  In
+JIT-compiled code, the recording is done while tracing: _mark_line() and
+_mark_arc() are elidable and get constant arguments, so they are called
+during tracing and removed from the trace.  This is enough because a trace
+is only entered after the tracer has run through it.  Changing the state
+(starting, stopping or resetting the coverage) invalidates the compiled
+code, so that the code is traced again with the recording enabled.
+
+The arcs are pairs of lines (from, to) like in coverage.py: the entry into
+a code object is recorded as (-co_firstlineno, line) and the exit as
+(line, -co_firstlineno).  Like sys.settrace(), a backward jump into the
+middle of a line counts as executing that line again, which gives the arc
+from the end of a loop back to its header.  For the JIT, the previous line
+is stored on the frame and promoted, which costs a guard at the start of
+the loops.
+"""
+
+from rpython.rlib import jit
+from rpython.rlib.rarithmetic import LONG_BIT, r_uint
+
+MODE_OFF = 0
+MODE_LINES = 1
+MODE_ARCS = 2
+
+
+class CoverageState(object):
+    """ Global coverage state, see space.fromcache(CoverageState). """
+    _immutable_fields_ = ['mode?', 'generation?']
+
+    def __init__(self, space):
+        self.space = space
+        self.mode = MODE_OFF
+        self.generation = 0
+        self.all_data = []
+
+    def start(self, mode):
+        self.mode = mode
+
+    def stop(self):
+        self.mode = MODE_OFF
+
+    def reset(self):
+        # the CodeCoverage objects of an older generation are ignored and
+        # replaced the next time the code runs
+        self.generation += 1
+        self.all_data = []
+
+    @jit.elidable
+    def _get_code_data(self, pycode, generation):
+        data = pycode._coverage_data
+        if data is None or data.generation != generation:
+            data = CodeCoverage(pycode, generation)
+            pycode._coverage_data = data
+            self.all_data.append(data)
+        return data
+
+    @jit.elidable
+    def _mark_line(self, pycode, offset, generation):
+        # returns the line starting at 'offset', or minus the line if
+        # 'offset' is the target of a backward jump, or 0
+        if pycode.hidden_applevel:
+            return 0
+        data = self._get_code_data(pycode, generation)
+        line = data.line_starts[offset]
+        if line > 0:
+            data.mark_line(line)
+        return line
+
+    @jit.elidable
+    def _mark_arc(self, pycode, fromline, toline, generation):
+        data = self._get_code_data(pycode, generation)
+        data.arcs[fromline, toline] = None
+        return 0
+
+    def bytecode_trace(self, frame, offset):
+        pycode = frame.getcode()
+        generation = self.generation
+        line = self._mark_line(pycode, offset, generation)
+        if line != 0 and self.mode == MODE_ARCS:
+            prevline = jit.promote(frame.coverage_prevline)
+            if line < 0:
+                line = -line
+                if line == prevline:
+                    return     # not a jump, or a jump inside the line
+            if prevline == 0:
+                prevline = -pycode.co_firstlineno
+            self._mark_arc(pycode, prevline, line, generation)
+            frame.coverage_prevline = line
+
+    def leave_frame(self, frame):
+        prevline = jit.promote(frame.coverage_prevline)
+        if prevline > 0:
+            pycode = frame.getcode()
+            self._mark_arc(pycode, prevline, -pycode.co_firstlineno,
+                           self.generation)
+
+    def get_lines(self):
+        """ Returns a dict {filename: {line: None}} """
+        result = {}
+        for data in self.all_data:
+            lines = result.setdefault(data.filename, {})
+            data.get_lines(lines)
+        return result
+
+    def get_arcs(self):
+        """ Returns a dict {filename: {(fromline, toline): None}} """
+        result = {}
+        for data in self.all_data:
+            arcs = result.setdefault(data.filename, {})
+            for arc in data.arcs:
+                arcs[arc] = None
+        return result
+
+
+class CodeCoverage(object):
+    """ The lines and arcs executed in one code object. """
+
+    def __init__(self, pycode, generation):
+        self.filename = pycode.co_filename
+        self.firstlineno = pycode.co_firstlineno
+        self.generation = generation
+        self.line_starts = compute_line_starts(pycode)
+        lastline = self.firstlineno
+        for line in self.line_starts:
+            if line > lastline:
+                lastline = line
+        nbits = lastline - self.firstlineno + 1
+        self.lines = [r_uint(0)] * ((nbits + LONG_BIT - 1) // LONG_BIT)
+        self.arcs = {}
+        mark_backward_jump_targets(pycode.co_code, self.line_starts)
+
+    def mark_line(self, line):
+        bit = line - self.firstlineno
+        self.lines[bit // LONG_BIT] |= r_uint(1) << (bit % LONG_BIT)
+
+    def get_lines(self, lines):
+        for i in range(len(self.lines)):
+            word = self.lines[i]
+            bit = 0
+            while word:
+                if word & 1:
+                    lines[self.firstlineno + i * LONG_BIT + bit] = None
+                word >>= 1
+                bit += 1
+
+
+def compute_line_starts(pycode):
+    """ Returns a list that maps each offset in co_code to the line that
+    starts there, or to 0.  Like dis.findlinestarts(). """
+    co_code = pycode.co_code
+    lnotab = pycode.co_lnotab
+    line_starts = [0] * len(co_code)
+    lastline = -1
+    line = pycode.co_firstlineno
+    addr = 0
+    for i in range(0, len(lnotab) - 1, 2):
+        byte_incr = ord(lnotab[i])
+        if byte_incr:
+            if line != lastline and addr < len(co_code):
+                line_starts[addr] = line
+                lastline = line
+            addr += byte_incr
+        line += ord(lnotab[i + 1])
+    if line != lastline and addr < len(co_code):
+        line_starts[addr] = line
+    return line_starts
+
+
+def mark_backward_jump_targets(co_code, line_starts):
+    """ Stores minus the line into 'line_starts' for the targets of
+    backward jumps that are not at the start of a line. """
+    from pypy.tool.stdlib_opcode import opmap, hasjabs, HAVE_ARGUMENT
+    EXTENDED_ARG = opmap['EXTENDED_ARG']
+    line = 0
+    lines = [0] * len(co_code)
+    for i in range(len(co_code)):
+        if line_starts[i] > 0:
+            line = line_starts[i]
+        lines[i] = line
+    i = 0
+    oparg = 0
+    while i < len(co_code):
+        opcode = ord(co_code[i])
+        if opcode < HAVE_ARGUMENT:
+            i += 1
+            continue
+        oparg = oparg | (ord(co_code[i + 1]) | (ord(co_code[i + 2]) << 8))
+        if opcode == EXTENDED_ARG:
+            oparg <<= 16
+        else:
+            if (opcode in hasjabs and 0 <= oparg <= i and
+                    line_starts[oparg] == 0 and lines[oparg] > 0):
+                line_starts[oparg] = -lines[oparg]
+            oparg = 0
+        i += 3
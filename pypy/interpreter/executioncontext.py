@@ -1,4 +1,5 @@
 import sys
+from pypy.interpreter.coverage import CoverageState, MODE_ARCS
 from pypy.interpreter.error import OperationError, get_cleared_operation_error
 from rpython.rlib.unroll import unrolling_iterable
 from rpython.rlib.objectmodel import specialize, not_rpython
@@ -71,6 +72,9 @@ class ExecutionContext(object):
 
     def leave(self, frame, w_exitvalue, got_exception):
         try:
+            coverage = self.space.fromcache(CoverageState)
+            if coverage.mode == MODE_ARCS:
+                coverage.leave_frame(frame)
             if self.profilefunc:
                 self._trace(frame, 'leaveframe', w_exitvalue)
         finally:
@@ -53,9 +53,12 @@ def cpython_code_signature(code):
 class CodeHookCache(object):
     def __init__(self, space):
         self._code_hook = None
+        # set by pypy.module.pypyjit.interp_warmup when hot loops are preloaded
+        self._jit_warmup = None
 
 class PyCode(eval.Code):
     "CPython-style code objects."
+    _coverage_data = None   # see pypy.interpreter.coverage
     _immutable_fields_ = ["_signature", "co_argcount", "co_cellvars[*]",
                           "co_code", "co_consts_w[*]", "co_filename",
                           "co_firstlineno", "co_flags", "co_freevars[*]",
@@ -108,7 +111,10 @@ class PyCode(eval.Code):
         return True
 
     def new_code_hook(self):
-        code_hook = self.space.fromcache(CodeHookCache)._code_hook
+        cache = self.space.fromcache(CodeHookCache)
+        if cache._jit_warmup is not None:
+            cache._jit_warmup.new_code(self)
+        code_hook = cache._code_hook
         if code_hook is not None:
             try:
                 self.space.call_function(code_hook, self)
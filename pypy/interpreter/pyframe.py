@@ -71,6 +71,7 @@ class PyFrame(W_Root):
     
     escaped                  = False  # see mark_as_escaped()
     debugdata                = None
+    coverage_prevline        = 0      # see pypy.interpreter.coverage
 
     pycode = None # code object executed by that frame
     locals_cells_stack_w = None # the list of all locals, cells and the valuestack
@@ -15,6 +15,7 @@ from pypy.interpreter import (
     gateway, function, eval, pyframe, pytraceback, pycode
 )
 from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.coverage import CoverageState, MODE_OFF
 from pypy.interpreter.error import OperationError, oefmt
 from pypy.interpreter.nestedscope import Cell
 from pypy.interpreter.pycode import PyCode, BytecodeCorruption
@@ -153,6 +154,9 @@ class __extend__(pyframe.PyFrame):
             else:
                 ec.bytecode_trace(self)
                 next_instr = r_uint(self.last_instr)
+            coverage = self.space.fromcache(CoverageState)
+            if coverage.mode != MODE_OFF:
+                coverage.bytecode_trace(self, intmask(next_instr))
             opcode = ord(co_code[next_instr])
             next_instr += 1
 
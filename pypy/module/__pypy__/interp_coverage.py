@@ -0,0 +1,52 @@
+from pypy.interpreter.coverage import (
+    CoverageState, MODE_OFF, MODE_LINES, MODE_ARCS)
+from pypy.interpreter.gateway import unwrap_spec
+
+
+@unwrap_spec(arcs=bool)
+def coverage_start(space, arcs=False):
+    """Start recording the lines executed by all threads, and with
+    arcs=True also the arcs between the lines.  Unlike sys.settrace(), this
+    doesn't prevent the JIT from compiling the code."""
+    state = space.fromcache(CoverageState)
+    if arcs:
+        mode = MODE_ARCS
+    else:
+        mode = MODE_LINES
+    if state.mode != mode:
+        state.start(mode)
+
+def coverage_stop(space):
+    """Stop recording.  The data recorded so far is kept."""
+    state = space.fromcache(CoverageState)
+    if state.mode != MODE_OFF:
+        state.stop()
+
+def coverage_reset(space):
+    """Forget the data recorded so far."""
+    space.fromcache(CoverageState).reset()
+
+def coverage_lines(space):
+    """Return the lines executed so far, as a dict {filename: [line, ...]}.
+    This is the format of coverage.CoverageData.add_lines()."""
+    state = space.fromcache(CoverageState)
+    w_result = space.newdict()
+    for filename, lines in state.get_lines().items():
+        lines_w = [space.newint(line) for line in lines]
+        space.setitem(w_result, space.newtext(filename),
+                      space.newlist(lines_w))
+    return w_result
+
+def coverage_arcs(space):
+    """Return the arcs executed so far, as a dict {filename: [(from, to),
+    ...]}.  This is the format of coverage.CoverageData.add_arcs().  The
+    entry into a code object is recorded as (-co_firstlineno, line), and
+    the exit as (line, -co_firstlineno)."""
+    state = space.fromcache(CoverageState)
+    w_result = space.newdict()
+    for filename, arcs in state.get_arcs().items():
+        arcs_w = [space.newtuple([space.newint(arc[0]), space.newint(arc[1])])
+                  for arc in arcs]
+        space.setitem(w_result, space.newtext(filename),
+                      space.newlist(arcs_w))
+    return w_result
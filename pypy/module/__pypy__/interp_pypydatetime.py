@@ -1,24 +1,715 @@
 from pypy.interpreter.baseobjspace import W_Root
-from pypy.interpreter.typedef import TypeDef
-from pypy.interpreter.gateway import interp2app
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.typedef import TypeDef, GetSetProperty
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from rpython.rlib.rarithmetic import ovfcheck_float_to_int
+from rpython.rlib.rstring import StringBuilder
+from rpython.rtyper.lltypesystem import lltype, rffi
 from rpython.tool.sourcetools import func_with_new_name
 
-def create_class(name):
-    class W_Class(W_Root):
-        'builtin base clasee for datetime.%s to allow interop with cpyext' % name
-        def descr_new__(space, w_type):
-            return space.allocate_instance(W_Class, w_type)
+# The storage of lib_pypy/datetime.py: date, datetime, time and timedelta
+# inherit from the classes here, which keep their fields unboxed.  The
+# classes are also used by cpyext, which needs them as the base classes.
+# The hot operations are implemented here too; the rest of the module,
+# notably everything involving tzinfo objects, stays in lib_pypy.
 
-    W_Class.typedef = TypeDef(name,
-        __new__ = interp2app(func_with_new_name(
-                                    W_Class.descr_new__.im_func,
-                                    '%s_new' % (name,))),
-        )
-    W_Class.typedef.acceptable_as_base_class = True
-    return W_Class
+MINYEAR = 1
+MAXYEAR = 9999
+MAX_DELTA_DAYS = 999999999
 
-W_DateTime_Time = create_class('pypydatetime_time')
-W_DateTime_Date = create_class('pypydatetime_date')
-W_DateTime_Delta = create_class('pypydatetime_delta')
+_DAYS_IN_MONTH = [-1, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+_DAYS_BEFORE_MONTH = [-1, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304,
+                      334]
 
+def is_leap(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
 
+def days_in_month(year, month):
+    if month == 2 and is_leap(year):
+        return 29
+    return _DAYS_IN_MONTH[month]
+
+def days_before_year(year):
+    y = year - 1
+    return y * 365 + y // 4 - y // 100 + y // 400
+
+def days_before_month(year, month):
+    result = _DAYS_BEFORE_MONTH[month]
+    if month > 2 and is_leap(year):
+        result += 1
+    return result
+
+def ymd_to_ord(year, month, day):
+    "year, month, day -> ordinal, considering 01-Jan-0001 as day 1."
+    return days_before_year(year) + days_before_month(year, month) + day
+
+_DI400Y = days_before_year(401)
+_DI100Y = days_before_year(101)
+_DI4Y = days_before_year(5)
+
+def ord_to_ymd(n):
+    "ordinal -> (year, month, day), see _ord2ymd() in lib_pypy/datetime.py"
+    n -= 1
+    n400 = n // _DI400Y
+    n = n % _DI400Y
+    year = n400 * 400 + 1
+    n100 = n // _DI100Y
+    n = n % _DI100Y
+    n4 = n // _DI4Y
+    n = n % _DI4Y
+    n1 = n // 365
+    n = n % 365
+    year += n100 * 100 + n4 * 4 + n1
+    if n1 == 4 or n100 == 4:
+        return year - 1, 12, 31
+    leapyear = n1 == 3 and (n4 != 24 or n100 == 3)
+    month = (n + 50) >> 5
+    preceding = _DAYS_BEFORE_MONTH[month]
+    if month > 2 and leapyear:
+        preceding += 1
+    if preceding > n:
+        month -= 1
+        preceding -= _DAYS_IN_MONTH[month]
+        if month == 2 and leapyear:
+            preceding -= 1
+    return year, month, n - preceding + 1
+
+def normalize_date(space, year, month, day):
+    """Normalize 'day', which may be out of range for the (valid) year and
+    month.  Raises OverflowError if the resulting year is out of range."""
+    dim = days_in_month(year, month)
+    if not 1 <= day <= dim:
+        if day == 0:
+            month -= 1
+            if month > 0:
+                day = days_in_month(year, month)
+            else:
+                year, month, day = year - 1, 12, 31
+        elif day == dim + 1:
+            month += 1
+            day = 1
+            if month > 12:
+                month = 1
+                year += 1
+        else:
+            if not -MAX_DELTA_DAYS * 2 <= day <= MAX_DELTA_DAYS * 2:
+                raise oefmt(space.w_OverflowError, "date value out of range")
+            year, month, day = ord_to_ymd(ymd_to_ord(year, month, 1) +
+                                          (day - 1))
+    if not MINYEAR <= year <= MAXYEAR:
+        raise oefmt(space.w_OverflowError, "date value out of range")
+    return year, month, day
+
+def cmp_int(x, y):
+    if x < y:
+        return -1
+    if x > y:
+        return 1
+    return 0
+
+def append_digits(builder, value, width):
+    "Append the non-negative 'value' with at least 'width' digits."
+    s = str(value)
+    for i in range(width - len(s)):
+        builder.append('0')
+    builder.append(s)
+
+def _int_field(W_Class, name):
+    # the storage as seen by lib_pypy, which replaces the __slots__
+    def fget(space, self):
+        return space.newint(getattr(self, name))
+    def fset(space, self, w_value):
+        setattr(self, name, space.int_w(w_value))
+    fget = func_with_new_name(fget, 'fget_%s_%s' % (W_Class.__name__, name))
+    fset = func_with_new_name(fset, 'fset_%s_%s' % (W_Class.__name__, name))
+    return GetSetProperty(fget, fset, cls=W_Class)
+
+def _readonly_field(W_Class, name):
+    # the public read-only attributes, like 'year' or 'days'; writing them
+    # raises AttributeError, as on CPython
+    def fget(space, self):
+        return space.newint(getattr(self, name))
+    def fset(space, self, w_value):
+        raise oefmt(space.w_AttributeError,
+                    "attribute '%s' of '%T' objects is not writable",
+                    name, self)
+    def fdel(space, self):
+        raise oefmt(space.w_AttributeError,
+                    "attribute '%s' of '%T' objects is not writable",
+                    name, self)
+    fget = func_with_new_name(fget, 'ro_fget_%s_%s' % (W_Class.__name__,
+                                                          name))
+    fset = func_with_new_name(fset, 'ro_fset_%s_%s' % (W_Class.__name__,
+                                                          name))
+    fdel = func_with_new_name(fdel, 'ro_fdel_%s_%s' % (W_Class.__name__,
+                                                          name))
+    return GetSetProperty(fget, fset, fdel, cls=W_Class)
+
+def _tzinfo_field(W_Class):
+    def fget(space, self):
+        if self.w_tzinfo is None:     # not initialized by __new__
+            return space.w_None
+        return self.w_tzinfo
+    def fset(space, self, w_value):
+        self.w_tzinfo = w_value
+    fget = func_with_new_name(fget, 'fget_%s_tzinfo' % W_Class.__name__)
+    fset = func_with_new_name(fset, 'fset_%s_tzinfo' % W_Class.__name__)
+    return GetSetProperty(fget, fset, cls=W_Class)
+
+
+class W_DateTime_Delta(W_Root):
+    'builtin base class for datetime.timedelta, also used by cpyext'
+
+    def __init__(self, space, days=0, seconds=0, microseconds=0):
+        self.days = days
+        self.seconds = seconds
+        self.microseconds = microseconds
+        self.hashcode = -1
+
+    def descr_new__(space, w_type):
+        w_result = space.allocate_instance(W_DateTime_Delta, w_type)
+        W_DateTime_Delta.__init__(w_result, space)
+        return w_result
+
+    def descr_nonzero(self, space):
+        return space.newbool(self.days != 0 or self.seconds != 0 or
+                             self.microseconds != 0)
+
+    def descr_cmp(self, space, w_other):
+        other = space.interp_w(W_DateTime_Delta, w_other)
+        result = cmp_int(self.days, other.days)
+        if result == 0:
+            result = cmp_int(self.seconds, other.seconds)
+            if result == 0:
+                result = cmp_int(self.microseconds, other.microseconds)
+        return space.newint(result)
+
+def new_delta(space, w_cls, days, seconds, microseconds):
+    """Make a timedelta from values that may not be normalized, but that
+    are small enough for the computations not to overflow."""
+    seconds += microseconds // 1000000
+    microseconds = microseconds % 1000000
+    days += seconds // 86400
+    seconds = seconds % 86400
+    if not -MAX_DELTA_DAYS <= days <= MAX_DELTA_DAYS:
+        raise oefmt(space.w_OverflowError,
+                    "days=%d; must have magnitude <= %d", days, MAX_DELTA_DAYS)
+    w_result = space.allocate_instance(W_DateTime_Delta, w_cls)
+    W_DateTime_Delta.__init__(w_result, space, days, seconds, microseconds)
+    return w_result
+
+W_DateTime_Delta.typedef = TypeDef('pypydatetime_delta',
+    __new__ = interp2app(func_with_new_name(
+                                W_DateTime_Delta.descr_new__.im_func,
+                                'pypydatetime_delta_new')),
+    __nonzero__ = interp2app(W_DateTime_Delta.descr_nonzero),
+    _cmp = interp2app(W_DateTime_Delta.descr_cmp),
+    _days = _int_field(W_DateTime_Delta, 'days'),
+    _seconds = _int_field(W_DateTime_Delta, 'seconds'),
+    _microseconds = _int_field(W_DateTime_Delta, 'microseconds'),
+    _hashcode = _int_field(W_DateTime_Delta, 'hashcode'),
+    days = _readonly_field(W_DateTime_Delta, 'days'),
+    seconds = _readonly_field(W_DateTime_Delta, 'seconds'),
+    microseconds = _readonly_field(W_DateTime_Delta, 'microseconds'),
+    )
+W_DateTime_Delta.typedef.acceptable_as_base_class = True
+
+
+class W_DateTime_Time(W_Root):
+    'builtin base class for datetime.time, also used by cpyext'
+
+    def __init__(self, space, hour=0, minute=0, second=0, microsecond=0,
+                 w_tzinfo=None):
+        self.hour = hour
+        self.minute = minute
+        self.second = second
+        self.microsecond = microsecond
+        if w_tzinfo is None:
+            w_tzinfo = space.w_None
+        self.w_tzinfo = w_tzinfo
+        self.hashcode = -1
+
+    def descr_new__(space, w_type):
+        w_result = space.allocate_instance(W_DateTime_Time, w_type)
+        W_DateTime_Time.__init__(w_result, space)
+        return w_result
+
+    def descr_format_time(self, space):
+        "HH:MM:SS or HH:MM:SS.mmmmmm, without the UTC offset"
+        builder = StringBuilder(15)
+        format_time(builder, self.hour, self.minute, self.second,
+                    self.microsecond)
+        return space.newtext(builder.build())
+
+    def descr_cmp_fields(self, space, w_other):
+        other = space.interp_w(W_DateTime_Time, w_other)
+        return space.newint(cmp_time(self.hour, self.minute, self.second,
+                                     self.microsecond, other.hour,
+                                     other.minute, other.second,
+                                     other.microsecond))
+
+    def descr_getstate_bytes(self, space):
+        builder = StringBuilder(6)
+        append_time_state(builder, self.hour, self.minute, self.second,
+                          self.microsecond)
+        return space.newbytes(builder.build())
+
+    def descr_setstate_bytes(self, space, w_string):
+        s = space.bytes_w(w_string)
+        if len(s) != 6:
+            raise oefmt(space.w_TypeError, "bad time state")
+        self.hour = ord(s[0])
+        self.minute = ord(s[1])
+        self.second = ord(s[2])
+        self.microsecond = decode_microsecond(s, 3)
+
+def format_time(builder, hour, minute, second, microsecond):
+    append_digits(builder, hour, 2)
+    builder.append(':')
+    append_digits(builder, minute, 2)
+    builder.append(':')
+    append_digits(builder, second, 2)
+    if microsecond:
+        builder.append('.')
+        append_digits(builder, microsecond, 6)
+
+def cmp_time(hour1, minute1, second1, us1, hour2, minute2, second2, us2):
+    result = cmp_int(hour1, hour2)
+    if result == 0:
+        result = cmp_int(minute1, minute2)
+        if result == 0:
+            result = cmp_int(second1, second2)
+            if result == 0:
+                result = cmp_int(us1, us2)
+    return result
+
+def append_time_state(builder, hour, minute, second, microsecond):
+    builder.append(chr(hour))
+    builder.append(chr(minute))
+    builder.append(chr(second))
+    builder.append(chr((microsecond >> 16) & 0xff))
+    builder.append(chr((microsecond >> 8) & 0xff))
+    builder.append(chr(microsecond & 0xff))
+
+def decode_microsecond(s, start):
+    return (ord(s[start]) << 16) | (ord(s[start + 1]) << 8) | ord(s[start + 2])
+
+W_DateTime_Time.typedef = TypeDef('pypydatetime_time',
+    __new__ = interp2app(func_with_new_name(
+                                W_DateTime_Time.descr_new__.im_func,
+                                'pypydatetime_time_new')),
+    _format_time = interp2app(W_DateTime_Time.descr_format_time),
+    _cmp_fields = interp2app(W_DateTime_Time.descr_cmp_fields),
+    _getstate_bytes = interp2app(W_DateTime_Time.descr_getstate_bytes),
+    _setstate_bytes = interp2app(W_DateTime_Time.descr_setstate_bytes),
+    _hour = _int_field(W_DateTime_Time, 'hour'),
+    _minute = _int_field(W_DateTime_Time, 'minute'),
+    _second = _int_field(W_DateTime_Time, 'second'),
+    _microsecond = _int_field(W_DateTime_Time, 'microsecond'),
+    _tzinfo = _tzinfo_field(W_DateTime_Time),
+    _hashcode = _int_field(W_DateTime_Time, 'hashcode'),
+    hour = _readonly_field(W_DateTime_Time, 'hour'),
+    minute = _readonly_field(W_DateTime_Time, 'minute'),
+    second = _readonly_field(W_DateTime_Time, 'second'),
+    microsecond = _readonly_field(W_DateTime_Time, 'microsecond'),
+    )
+W_DateTime_Time.typedef.acceptable_as_base_class = True
+
+
+class W_DateTime_Date(W_Root):
+    """builtin base class for datetime.date and datetime.datetime, also
+    used by cpyext.  The time fields stay zero for dates."""
+
+    def __init__(self, space, year=1, month=1, day=1, hour=0, minute=0,
+                 second=0, microsecond=0, w_tzinfo=None):
+        self.year = year
+        self.month = month
+        self.day = day
+        self.hour = hour
+        self.minute = minute
+        self.second = second
+        self.microsecond = microsecond
+        if w_tzinfo is None:
+            w_tzinfo = space.w_None
+        self.w_tzinfo = w_tzinfo
+        self.hashcode = -1
+
+    def descr_new__(space, w_type):
+        w_result = space.allocate_instance(W_DateTime_Date, w_type)
+        W_DateTime_Date.__init__(w_result, space)
+        return w_result
+
+    def toordinal(self):
+        return ymd_to_ord(self.year, self.month, self.day)
+
+    def descr_toordinal(self, space):
+        """Return proleptic Gregorian ordinal for the year, month and day.
+
+        January 1 of year 1 is day 1.  Only the year, month and day values
+        contribute to the result.
+        """
+        return space.newint(self.toordinal())
+
+    def descr_weekday(self, space):
+        "Return day of the week, where Monday == 0 ... Sunday == 6."
+        return space.newint((self.toordinal() + 6) % 7)
+
+    def descr_isoweekday(self, space):
+        "Return day of the week, where Monday == 1 ... Sunday == 7."
+        return space.newint((self.toordinal() + 6) % 7 + 1)
+
+    def descr_isoformat(self, space):
+        """Return the date formatted according to ISO.
+
+        This is 'YYYY-MM-DD'.
+        """
+        builder = StringBuilder(10)
+        self.format_date(builder)
+        return space.newtext(builder.build())
+
+    def format_date(self, builder):
+        append_digits(builder, self.year, 4)
+        builder.append('-')
+        append_digits(builder, self.month, 2)
+        builder.append('-')
+        append_digits(builder, self.day, 2)
+
+    def descr_format_datetime(self, space, w_sep):
+        """'YYYY-MM-DD<sep>HH:MM:SS[.mmmmmm]', without the UTC offset"""
+        if not space.isinstance_w(w_sep, space.w_bytes):
+            raise oefmt(space.w_TypeError,
+                        "isoformat() argument 1 must be char, not %T", w_sep)
+        sep = space.bytes_w(w_sep)
+        if len(sep) != 1:
+            raise oefmt(space.w_TypeError,
+                        "isoformat() argument 1 must be char, not str")
+        builder = StringBuilder(26)
+        self.format_date(builder)
+        builder.append(sep)
+        format_time(builder, self.hour, self.minute, self.second,
+                    self.microsecond)
+        return space.newtext(builder.build())
+
+    def descr_cmp_date(self, space, w_other):
+        other = space.interp_w(W_DateTime_Date, w_other)
+        return space.newint(self.cmp_date(other))
+
+    def cmp_date(self, other):
+        result = cmp_int(self.year, other.year)
+        if result == 0:
+            result = cmp_int(self.month, other.month)
+            if result == 0:
+                result = cmp_int(self.day, other.day)
+        return result
+
+    def descr_cmp_datetime(self, space, w_other):
+        other = space.interp_w(W_DateTime_Date, w_other)
+        result = self.cmp_date(other)
+        if result == 0:
+            result = cmp_time(self.hour, self.minute, self.second,
+                              self.microsecond, other.hour, other.minute,
+                              other.second, other.microsecond)
+        return space.newint(result)
+
+    @unwrap_spec(days=int)
+    def descr_add_days(self, space, w_cls, days):
+        """Return a new date of class 'w_cls', 'days' after this one."""
+        year, month, day = normalize_date(space, self.year, self.month,
+                                          self.day + days)
+        w_result = space.allocate_instance(W_DateTime_Date, w_cls)
+        W_DateTime_Date.__init__(w_result, space, year, month, day)
+        return w_result
+
+    @unwrap_spec(factor=int)
+    def descr_add_delta(self, space, w_cls, w_delta, factor):
+        """Return a new datetime of class 'w_cls', with the same tzinfo,
+        for self + delta * factor (factor is 1 or -1)."""
+        delta = space.interp_w(W_DateTime_Delta, w_delta)
+        microsecond = self.microsecond + delta.microseconds * factor
+        second = self.second + delta.seconds * factor
+        second += microsecond // 1000000
+        microsecond = microsecond % 1000000
+        minute = self.minute + second // 60
+        second = second % 60
+        hour = self.hour + minute // 60
+        minute = minute % 60
+        day = self.day + delta.days * factor + hour // 24
+        hour = hour % 24
+        year, month, day = normalize_date(space, self.year, self.month, day)
+        w_result = space.allocate_instance(W_DateTime_Date, w_cls)
+        W_DateTime_Date.__init__(w_result, space, year, month, day, hour,
+                                 minute, second, microsecond, self.w_tzinfo)
+        return w_result
+
+    def descr_sub_datetime(self, space, w_cls, w_other):
+        """Return the difference between two datetimes as a timedelta of
+        class 'w_cls', ignoring their tzinfo."""
+        other = space.interp_w(W_DateTime_Date, w_other)
+        days = self.toordinal() - other.toordinal()
+        seconds = ((self.hour - other.hour) * 3600 +
+                   (self.minute - other.minute) * 60 +
+                   (self.second - other.second))
+        microseconds = self.microsecond - other.microsecond
+        return new_delta(space, w_cls, days, seconds, microseconds)
+
+    def descr_getstate_date(self, space):
+        builder = StringBuilder(4)
+        self.append_date_state(builder)
+        return space.newbytes(builder.build())
+
+    def descr_getstate_datetime(self, space):
+        builder = StringBuilder(10)
+        self.append_date_state(builder)
+        append_time_state(builder, self.hour, self.minute, self.second,
+                          self.microsecond)
+        return space.newbytes(builder.build())
+
+    def append_date_state(self, builder):
+        builder.append(chr(self.year >> 8))
+        builder.append(chr(self.year & 0xff))
+        builder.append(chr(self.month))
+        builder.append(chr(self.day))
+
+    def descr_setstate_bytes(self, space, w_string):
+        s = space.bytes_w(w_string)
+        if len(s) != 4 and len(s) != 10:
+            raise oefmt(space.w_TypeError, "bad date state")
+        self.year = (ord(s[0]) << 8) | ord(s[1])
+        self.month = ord(s[2])
+        self.day = ord(s[3])
+        if len(s) == 10:
+            self.hour = ord(s[4])
+            self.minute = ord(s[5])
+            self.second = ord(s[6])
+            self.microsecond = decode_microsecond(s, 7)
+
+W_DateTime_Date.typedef = TypeDef('pypydatetime_date',
+    __new__ = interp2app(func_with_new_name(
+                                W_DateTime_Date.descr_new__.im_func,
+                                'pypydatetime_date_new')),
+    toordinal = interp2app(W_DateTime_Date.descr_toordinal),
+    weekday = interp2app(W_DateTime_Date.descr_weekday),
+    isoweekday = interp2app(W_DateTime_Date.descr_isoweekday),
+    isoformat = interp2app(W_DateTime_Date.descr_isoformat),
+    _format_datetime = interp2app(W_DateTime_Date.descr_format_datetime),
+    _cmp_date = interp2app(W_DateTime_Date.descr_cmp_date),
+    _cmp_datetime = interp2app(W_DateTime_Date.descr_cmp_datetime),
+    _add_days = interp2app(W_DateTime_Date.descr_add_days),
+    _add_delta = interp2app(W_DateTime_Date.descr_add_delta),
+    _sub_datetime = interp2app(W_DateTime_Date.descr_sub_datetime),
+    _getstate_date = interp2app(W_DateTime_Date.descr_getstate_date),
+    _getstate_datetime = interp2app(W_DateTime_Date.descr_getstate_datetime),
+    _setstate_bytes = interp2app(W_DateTime_Date.descr_setstate_bytes),
+    _year = _int_field(W_DateTime_Date, 'year'),
+    _month = _int_field(W_DateTime_Date, 'month'),
+    _day = _int_field(W_DateTime_Date, 'day'),
+    _hour = _int_field(W_DateTime_Date, 'hour'),
+    _minute = _int_field(W_DateTime_Date, 'minute'),
+    _second = _int_field(W_DateTime_Date, 'second'),
+    _microsecond = _int_field(W_DateTime_Date, 'microsecond'),
+    _tzinfo = _tzinfo_field(W_DateTime_Date),
+    _hashcode = _int_field(W_DateTime_Date, 'hashcode'),
+    year = _readonly_field(W_DateTime_Date, 'year'),
+    month = _readonly_field(W_DateTime_Date, 'month'),
+    day = _readonly_field(W_DateTime_Date, 'day'),
+    )
+W_DateTime_Date.typedef.acceptable_as_base_class = True
+
+# ____________________________________________________________
+
+@unwrap_spec(timestamp=float, utc=bool)
+def fromtimestamp(space, w_cls, timestamp, utc, w_tzinfo):
+    """Make a datetime of class 'w_cls' from a POSIX timestamp, in UTC or
+    in local time, like the pure Python datetime._from_timestamp()."""
+    from pypy.module.time.interp_time import (c_gmtime, c_localtime,
+        _get_error_msg)
+    try:
+        seconds = ovfcheck_float_to_int(timestamp)
+    except OverflowError:      # including NaN and infinities
+        raise oefmt(space.w_ValueError,
+                    "timestamp out of range for platform time_t")
+    if seconds > timestamp:
+        seconds -= 1      # floor() for negative timestamps
+    frac = (timestamp - seconds) * 1e6
+    # round half away from zero, like _round() in lib_pypy; frac >= 0
+    microsecond = int(frac + 0.5)
+    if microsecond == 1000000:
+        seconds += 1
+        microsecond = 0
+    t_ref = lltype.malloc(rffi.TIME_TP.TO, 1, flavor='raw')
+    try:
+        t_ref[0] = rffi.cast(rffi.TIME_T, seconds)
+        if rffi.cast(lltype.Signed, t_ref[0]) != seconds:
+            raise oefmt(space.w_ValueError,
+                        "timestamp out of range for platform time_t")
+        if utc:
+            p = c_gmtime(t_ref)
+        else:
+            p = c_localtime(t_ref)
+        if not p:
+            raise OperationError(space.w_ValueError,
+                                 space.newtext(_get_error_msg()))
+        year = rffi.getintfield(p, 'c_tm_year') + 1900
+        month = rffi.getintfield(p, 'c_tm_mon') + 1
+        day = rffi.getintfield(p, 'c_tm_mday')
+        hour = rffi.getintfield(p, 'c_tm_hour')
+        minute = rffi.getintfield(p, 'c_tm_min')
+        second = min(rffi.getintfield(p, 'c_tm_sec'), 59)
+    finally:
+        lltype.free(t_ref, flavor='raw')
+    if not MINYEAR <= year <= MAXYEAR:
+        raise oefmt(space.w_ValueError, "year is out of range")
+    w_result = space.allocate_instance(W_DateTime_Date, w_cls)
+    W_DateTime_Date.__init__(w_result, space, year, month, day, hour,
+                             minute, second, microsecond, w_tzinfo)
+    return w_result
+
+# ____________________________________________________________
+# A parser for the most common strptime() formats.  It only knows the
+# directives below, which do not depend on the locale, and gives up by
+# returning None as soon as something is unusual; then the caller uses
+# the general _strptime module.  When it succeeds, it gives the same
+# result as _strptime, whose regular expressions are matched the same
+# way: the alternatives with two digits come first.
+
+class ParseFailed(Exception):
+    pass
+
+def _isspace(c):
+    return c == ' ' or c == '\t' or c == '\n' or c == '\r' or \
+           c == '\x0b' or c == '\x0c'
+
+def _isdigit(c):
+    return '0' <= c <= '9'
+
+def _lower(c):
+    if 'A' <= c <= 'Z':
+        return chr(ord(c) + 32)
+    return c
+
+class StrptimeParser(object):
+
+    def __init__(self, string):
+        self.string = string
+        self.pos = 0
+
+    def parse_number(self, mindigits, maxdigits, maxvalue):
+        """Parse between 'mindigits' and 'maxdigits' digits, the longest
+        run giving a value <= maxvalue."""
+        s = self.string
+        start = self.pos
+        stop = start
+        while (stop < len(s) and stop - start < maxdigits and
+               _isdigit(s[stop])):
+            stop += 1
+        while stop - start >= mindigits:
+            value = 0
+            for i in range(start, stop):
+                value = value * 10 + (ord(s[i]) - ord('0'))
+            if value <= maxvalue:
+                self.pos = stop
+                return value
+            stop -= 1
+        raise ParseFailed
+
+    def parse_microsecond(self):
+        # %f: 1 to 6 digits, padded on the right
+        s = self.string
+        start = self.pos
+        value = self.parse_number(1, 6, 999999)
+        for i in range(6 - (self.pos - start)):
+            value *= 10
+        return value
+
+    def parse(self, format):
+        s = self.string
+        year = 1900
+        month = 1
+        day = 1
+        hour = 0
+        minute = 0
+        second = 0
+        microsecond = 0
+        seen = []
+        i = 0
+        while i < len(format):
+            c = format[i]
+            i += 1
+            if c == '%':
+                if i == len(format):
+                    raise ParseFailed
+                c = format[i]
+                i += 1
+                if c != '%':
+                    # _strptime refuses to use a directive twice
+                    if c in seen:
+                        raise ParseFailed
+                    seen.append(c)
+                if c == 'Y':
+                    year = self.parse_number(4, 4, 9999)
+                    if year == 0:
+                        raise ParseFailed
+                elif c == 'm':
+                    if self.pos < len(s) and s[self.pos] == '0':
+                        month = self.parse_number(2, 2, 9)
+                    else:
+                        month = self.parse_number(1, 2, 12)
+                    if month == 0:
+                        raise ParseFailed
+                elif c == 'd':
+                    if self.pos < len(s) and s[self.pos] == '0':
+                        day = self.parse_number(2, 2, 9)
+                    else:
+                        day = self.parse_number(1, 2, 31)
+                    if day == 0:
+                        raise ParseFailed
+                elif c == 'H':
+                    hour = self.parse_number(1, 2, 23)
+                elif c == 'M':
+                    minute = self.parse_number(1, 2, 59)
+                elif c == 'S':
+                    # 60 and 61 are accepted by _strptime but not by
+                    # datetime, which gives an error message of its own
+                    second = self.parse_number(1, 2, 61)
+                    if second > 59:
+                        raise ParseFailed
+                elif c == 'f':
+                    microsecond = self.parse_microsecond()
+                elif c == '%':
+                    if self.pos == len(s) or s[self.pos] != '%':
+                        raise ParseFailed
+                    self.pos += 1
+                else:
+                    raise ParseFailed
+            elif _isspace(c):
+                # any run of whitespace matches one or more whitespaces
+                while i < len(format) and _isspace(format[i]):
+                    i += 1
+                if self.pos == len(s) or not _isspace(s[self.pos]):
+                    raise ParseFailed
+                while self.pos < len(s) and _isspace(s[self.pos]):
+                    self.pos += 1
+            else:
+                # the regular expression is case-insensitive
+                if self.pos == len(s) or _lower(s[self.pos]) != _lower(c):
+                    raise ParseFailed
+                self.pos += 1
+        if self.pos != len(s):
+            raise ParseFailed
+        if day > days_in_month(year, month):
+            raise ParseFailed
+        return [year, month, day, hour, minute, second, microsecond]
+
+def strptime_fields(space, w_string, w_format):
+    """Parse 'string' with the strptime() 'format' and return the list
+    [year, month, day, hour, minute, second, microsecond], or None if this
+    needs the general _strptime module."""
+    if not (space.is_w(space.type(w_string), space.w_bytes) and
+            space.is_w(space.type(w_format), space.w_bytes)):
+        return space.w_None
+    parser = StrptimeParser(space.bytes_w(w_string))
+    try:
+        fields = parser.parse(space.bytes_w(w_format))
+    except ParseFailed:
+        return space.w_None
+    return space.newlist([space.newint(x) for x in fields])
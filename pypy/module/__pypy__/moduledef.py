@@ -65,6 +65,8 @@ class PyPyDateTime(MixedModule):
         'dateinterop'  : 'interp_pypydatetime.W_DateTime_Date',
         'timeinterop'  : 'interp_pypydatetime.W_DateTime_Time',
         'deltainterop' : 'interp_pypydatetime.W_DateTime_Delta',
+        'fromtimestamp': 'interp_pypydatetime.fromtimestamp',
+        'strptime_fields': 'interp_pypydatetime.strptime_fields',
     }
 
 class PyPyBufferable(MixedModule):
@@ -119,6 +121,11 @@ class Module(MixedModule):
         'pyos_inputhook'            : 'interp_magic.pyos_inputhook',
         'newmemoryview'             : 'interp_buffer.newmemoryview',
         'utf8content'               : 'interp_magic.utf8content',
+        'coverage_start'            : 'interp_coverage.coverage_start',
+        'coverage_stop'             : 'interp_coverage.coverage_stop',
+        'coverage_reset'            : 'interp_coverage.coverage_reset',
+        'coverage_lines'            : 'interp_coverage.coverage_lines',
+        'coverage_arcs'             : 'interp_coverage.coverage_arcs',
     }
     if sys.platform == 'win32':
         interpleveldefs['get_console_cp'] = 'interp_magic.get_console_cp'
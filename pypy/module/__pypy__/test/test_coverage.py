@@ -0,0 +1,114 @@
+from pypy.interpreter.coverage import compute_line_starts
+
+
+def test_compute_line_starts():
+    import dis
+    def f(x):
+        y = x + 1
+
+        if y:
+            return y
+        return 0
+    class FakeCode(object):
+        co_code = f.func_code.co_code
+        co_lnotab = f.func_code.co_lnotab
+        co_firstlineno = f.func_code.co_firstlineno
+    starts = compute_line_starts(FakeCode)
+    assert len(starts) == len(FakeCode.co_code)
+    expected = dict(dis.findlinestarts(f.func_code))
+    assert [(i, line) for i, line in enumerate(starts) if line != 0] == (
+        sorted(expected.items()))
+
+
+class AppTestCoverage(object):
+
+    def teardown_method(self, meth):
+        self.space.appexec([], """():
+            import __pypy__
+            __pypy__.coverage_stop()
+            __pypy__.coverage_reset()
+        """)
+
+    def test_lines(self):
+        import __pypy__
+        def f(x):
+            if x:
+                y = 1
+            else:
+                y = 2
+            return y
+        first = f.func_code.co_firstlineno
+        filename = f.func_code.co_filename
+        f(1)
+        assert __pypy__.coverage_lines() == {}
+        __pypy__.coverage_start()
+        f(1)
+        f(1)
+        __pypy__.coverage_stop()
+        f(0)
+        lines = __pypy__.coverage_lines()
+        assert lines.keys() == [filename]
+        lines = lines[filename]
+        for line in [first + 1, first + 2, first + 5]:
+            assert line in lines
+        assert first + 3 not in lines     # 'else:' isn't a line start
+        assert first + 4 not in lines
+        assert first not in lines
+        assert __pypy__.coverage_arcs() == {filename: []}
+        __pypy__.coverage_reset()
+        assert __pypy__.coverage_lines() == {}
+
+    def test_arcs(self):
+        import __pypy__
+        def f(n):
+            total = 0
+            for i in range(n):
+                total += i
+            return total
+        first = f.func_code.co_firstlineno
+        filename = f.func_code.co_filename
+        __pypy__.coverage_start(arcs=True)
+        f(3)
+        __pypy__.coverage_stop()
+        arcs = __pypy__.coverage_arcs()[filename]
+        for arc in [(-first, first + 1), (first + 1, first + 2),
+                    (first + 2, first + 3), (first + 3, first + 2),
+                    (first + 2, first + 4), (first + 4, -first)]:
+            assert arc in arcs
+        lines = __pypy__.coverage_lines()[filename]
+        for line in range(first + 1, first + 5):
+            assert line in lines
+
+    def test_generator_and_exception(self):
+        import __pypy__
+        def gen():
+            yield 1
+            yield 2
+        def fails():
+            raise ValueError
+        first = gen.func_code.co_firstlineno
+        filename = gen.func_code.co_filename
+        __pypy__.coverage_start(arcs=True)
+        assert list(gen()) == [1, 2]
+        try:
+            fails()
+        except ValueError:
+            pass
+        __pypy__.coverage_stop()
+        arcs = __pypy__.coverage_arcs()[filename]
+        for arc in [(-first, first + 1), (first + 1, -first),
+                    (first + 1, first + 2), (first + 2, -first),
+                    (-(first + 3), first + 4), (first + 4, -(first + 3))]:
+            assert arc in arcs
+
+    def test_multiple_code_objects_same_file(self):
+        import __pypy__
+        src = "def f():\n    return 1\n\ndef g():\n    return 2\n"
+        d = {}
+        exec compile(src, "fake_file.py", "exec") in d
+        exec compile(src, "fake_file.py", "exec") in d
+        __pypy__.coverage_start()
+        d['f']()
+        d['g']()
+        __pypy__.coverage_stop()
+        assert sorted(__pypy__.coverage_lines()["fake_file.py"]) == [2, 5]
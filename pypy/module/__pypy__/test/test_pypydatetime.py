@@ -0,0 +1,154 @@
+class AppTestPyPyDateTime(object):
+    spaceconfig = dict(usemodules=['time', 'struct', 'binascii'])
+
+    def test_storage(self):
+        import datetime
+        from __pypy__._pypydatetime import dateinterop, timeinterop
+        dt = datetime.datetime(2019, 5, 17, 13, 45, 10, 123)
+        assert isinstance(dt, dateinterop)
+        assert isinstance(datetime.time(), timeinterop)
+        assert (dt.year, dt.month, dt.day) == (2019, 5, 17)
+        assert (dt.hour, dt.minute, dt.second, dt.microsecond) == (
+            13, 45, 10, 123)
+        assert dt.tzinfo is None
+        d = datetime.timedelta(3, 4, 5)
+        assert (d.days, d.seconds, d.microseconds) == (3, 4, 5)
+        for obj in [dt, dt.date(), dt.time(), d]:
+            raises(AttributeError, setattr, obj, 'abc', 1)
+            assert not hasattr(obj, '__dict__')
+        raises(AttributeError, setattr, dt, 'year', 2000)
+        raises(AttributeError, setattr, d, 'days', 1)
+        raises(AttributeError, delattr, dt.time(), 'hour')
+
+    def test_ordinals(self):
+        import datetime
+        for d in [datetime.date(1, 1, 1), datetime.date(2000, 2, 29),
+                  datetime.date(1900, 3, 1), datetime.date(9999, 12, 31),
+                  datetime.date(2024, 12, 31)]:
+            n = d.toordinal()
+            assert datetime.date.fromordinal(n) == d
+            assert d.weekday() == (n + 6) % 7
+            assert d.isoweekday() == d.weekday() + 1
+        assert datetime.date(1, 1, 1).toordinal() == 1
+        assert datetime.datetime(2019, 5, 17, 23).weekday() == 4
+
+    def test_arithmetic(self):
+        import datetime
+        td = datetime.timedelta
+        dt = datetime.datetime(2019, 12, 31, 23, 59, 59, 999999)
+        assert dt + td(microseconds=1) == datetime.datetime(2020, 1, 1)
+        assert dt - td(days=366) == datetime.datetime(2018, 12, 30, 23, 59,
+                                                      59, 999999)
+        assert td(hours=-1) + dt == datetime.datetime(2019, 12, 31, 22, 59,
+                                                      59, 999999)
+        assert dt - datetime.datetime(2019, 1, 1) == td(364, 86399, 999999)
+        assert datetime.datetime(2019, 1, 1) - dt == td(-365, 0, 1)
+        assert datetime.date(2000, 3, 1) - td(1) == datetime.date(2000, 2, 29)
+        assert datetime.date(2000, 3, 1) + td(-1, 86399) == \
+            datetime.date(2000, 2, 29)
+        raises(OverflowError, "datetime.datetime.max + td(1)")
+        raises(OverflowError, "datetime.date.min - td(1)")
+        raises(OverflowError, "datetime.date.min + td.max")
+        class sub(datetime.datetime):
+            pass
+        res = sub(2000, 1, 1) + td(1)
+        assert type(res) is datetime.datetime
+        res = sub(2000, 1, 1) - sub(1999, 1, 1)
+        assert type(res) is datetime.timedelta
+        assert res == td(365)
+
+    def test_compare_and_hash(self):
+        import datetime
+        a = datetime.datetime(2019, 5, 17, 13, 45)
+        b = datetime.datetime(2019, 5, 17, 13, 45, 0, 1)
+        assert a < b and b > a and a != b and a == a.replace()
+        assert hash(a) == hash(a.replace())
+        assert datetime.date(2019, 5, 17) < datetime.date(2019, 5, 18)
+        assert datetime.time(1, 2, 3) < datetime.time(1, 2, 3, 4)
+        assert datetime.timedelta(-1) < datetime.timedelta(0, 1)
+        assert not datetime.timedelta(0)
+        assert datetime.timedelta(0, 0, 1)
+
+    def test_isoformat(self):
+        import datetime
+        dt = datetime.datetime(33, 5, 7, 3, 4, 5)
+        assert dt.isoformat() == '0033-05-07T03:04:05'
+        assert str(dt) == '0033-05-07 03:04:05'
+        assert dt.replace(microsecond=42).isoformat('_') == \
+            '0033-05-07_03:04:05.000042'
+        assert str(dt.date()) == dt.date().isoformat() == '0033-05-07'
+        assert str(dt.time()) == '03:04:05'
+        assert datetime.time(23, 59, 59, 999999).isoformat() == \
+            '23:59:59.999999'
+        raises(TypeError, dt.isoformat, 'ab')
+        raises(TypeError, dt.isoformat, u'T')
+        class UTC(datetime.tzinfo):
+            def utcoffset(self, dt):
+                return datetime.timedelta(hours=-2)
+        assert dt.replace(tzinfo=UTC()).isoformat() == \
+            '0033-05-07T03:04:05-02:00'
+
+    def test_fromtimestamp(self):
+        import datetime, time
+        dt = datetime.datetime.utcfromtimestamp(1558100710.5)
+        assert dt == datetime.datetime(2019, 5, 17, 13, 45, 10, 500000)
+        dt = datetime.datetime.utcfromtimestamp(-1.25)
+        assert dt == datetime.datetime(1969, 12, 31, 23, 59, 58, 750000)
+        dt = datetime.datetime.utcfromtimestamp(0.9999999)
+        assert dt == datetime.datetime(1970, 1, 1, 0, 0, 1)
+        t = 1558100710
+        lt = time.localtime(t)
+        assert datetime.datetime.fromtimestamp(t) == datetime.datetime(
+            *lt[:6])
+        raises(ValueError, datetime.datetime.utcfromtimestamp, 1e200)
+        raises(ValueError, datetime.datetime.utcfromtimestamp, float('nan'))
+        class sub(datetime.datetime):
+            pass
+        assert type(sub.utcfromtimestamp(0)) is sub
+
+    def test_strptime(self):
+        import datetime
+        from __pypy__._pypydatetime import strptime_fields
+        from _strptime import _strptime
+        for s, fmt in [('2019-05-17 13:45:10', '%Y-%m-%d %H:%M:%S'),
+                       ('2019-05-17T13:45:10.25', '%Y-%m-%dT%H:%M:%S.%f'),
+                       ('2019-05-17t13:45:10.25', '%Y-%m-%dT%H:%M:%S.%f'),
+                       ('1/2/2019  7:5:3', '%m/%d/%Y %H:%M:%S'),
+                       ('12312019', '%m%d%Y'), ('10%', '%H%%'),
+                       ('2000-02-29', '%Y-%m-%d')]:
+            fields = strptime_fields(s, fmt)
+            struct, micros = _strptime(s, fmt)
+            assert fields == list(struct[0:6]) + [micros]
+            assert datetime.datetime.strptime(s, fmt) == \
+                datetime.datetime(*fields)
+        # the cases left to _strptime
+        for s, fmt in [('2019-05-17', '%Y-%m-%d %H'),
+                       ('2019-05-17x', '%Y-%m-%d'),
+                       ('1999-02-29', '%Y-%m-%d'), ('60', '%S'),
+                       ('May 2019', '%b %Y'), ('1 1', '%d %d'),
+                       ('0000', '%Y'), (u'2019', '%Y')]:
+            assert strptime_fields(s, fmt) is None
+        assert datetime.datetime.strptime('May 2019', '%b %Y') == \
+            datetime.datetime(2019, 5, 1)
+        raises(ValueError, datetime.datetime.strptime, '1999-02-29',
+               '%Y-%m-%d')
+
+    def test_pickle(self):
+        import datetime, pickle
+        for obj in [datetime.date(2019, 5, 17),
+                    datetime.datetime(2019, 5, 17, 13, 45, 10, 123456),
+                    datetime.time(13, 45, 10, 123456),
+                    datetime.timedelta(-3, 4, 5)]:
+            for proto in range(3):
+                res = pickle.loads(pickle.dumps(obj, proto))
+                assert res == obj and type(res) is type(obj)
+        # the states are the same as on CPython
+        assert datetime.date(2019, 5, 17).__reduce__()[1] == (
+            '\x07\xe3\x05\x11',)
+        assert datetime.datetime(2019, 5, 17, 13, 45, 10,
+                                 123456).__reduce__()[1] == (
+            '\x07\xe3\x05\x11\x0d\x2d\x0a\x01\xe2\x40',)
+        assert datetime.time(13, 45, 10, 123456).__reduce__()[1] == (
+            '\x0d\x2d\x0a\x01\xe2\x40',)
+        assert datetime.datetime('\x07\xe3\x05\x11\x0d\x2d\x0a\x01\xe2\x40') \
+            == datetime.datetime(2019, 5, 17, 13, 45, 10, 123456)
@@ -0,0 +1,136 @@
+from pypy.interpreter.error import oefmt
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.objspace.std.floatobject import W_FloatObject
+from pypy.objspace.std.intobject import W_IntObject
+from pypy.objspace.std.listobject import (
+    W_ListObject, IntegerListStrategy, FloatListStrategy)
+from rpython.rlib.objectmodel import specialize
+
+
+def _get_bounds(space, w_a, lo, w_hi):
+    if lo < 0:
+        raise oefmt(space.w_ValueError, "lo must be non-negative")
+    if space.is_none(w_hi):
+        hi = space.len_w(w_a)
+    else:
+        hi = space.getindex_w(w_hi, None)
+    return lo, hi
+
+@specialize.call_location()
+def _bisect_right_unwrapped(items, x, lo, hi):
+    while lo < hi:
+        mid = lo + (hi - lo) // 2
+        if x < items[mid]:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+@specialize.call_location()
+def _bisect_left_unwrapped(items, x, lo, hi):
+    while lo < hi:
+        mid = lo + (hi - lo) // 2
+        if items[mid] < x:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+@specialize.arg(5)
+def _bisect(space, w_a, w_x, lo, hi, right):
+    # fast paths: a list of ints or floats, searched for an int or a float
+    # respectively, within the bounds of the list
+    if type(w_a) is W_ListObject and hi <= w_a.length():
+        if (type(w_x) is W_IntObject and
+                w_a.strategy is space.fromcache(IntegerListStrategy)):
+            items = w_a.getitems_int()
+            x = space.int_w(w_x)
+            if right:
+                return _bisect_right_unwrapped(items, x, lo, hi)
+            return _bisect_left_unwrapped(items, x, lo, hi)
+        if (type(w_x) is W_FloatObject and
+                w_a.strategy is space.fromcache(FloatListStrategy)):
+            items = w_a.getitems_float()
+            x = space.float_w(w_x)
+            if right:
+                return _bisect_right_unwrapped(items, x, lo, hi)
+            return _bisect_left_unwrapped(items, x, lo, hi)
+    while lo < hi:
+        mid = lo + (hi - lo) // 2
+        w_litem = space.getitem(w_a, space.newint(mid))
+        if right:
+            if space.is_true(space.lt(w_x, w_litem)):
+                hi = mid
+            else:
+                lo = mid + 1
+        else:
+            if space.is_true(space.lt(w_litem, w_x)):
+                lo = mid + 1
+            else:
+                hi = mid
+    return lo
+
+def _insert(space, w_a, index, w_x):
+    if type(w_a) is W_ListObject:
+        w_a.descr_insert(space, index, w_x)
+    else:
+        space.call_method(w_a, 'insert', space.newint(index), w_x)
+
+
+@unwrap_spec(lo=int)
+def bisect_right(space, w_a, w_x, lo=0, w_hi=None):
+    """bisect(a, x[, lo[, hi]]) -> index
+bisect_right(a, x[, lo[, hi]]) -> index
+
+Return the index where to insert item x in list a, assuming a is sorted.
+
+The return value i is such that all e in a[:i] have e <= x, and all e in
+a[i:] have e > x.  So if x already appears in the list, i points just
+beyond the rightmost x already there
+
+Optional args lo (default 0) and hi (default len(a)) bound the
+slice of a to be searched."""
+    lo, hi = _get_bounds(space, w_a, lo, w_hi)
+    return space.newint(_bisect(space, w_a, w_x, lo, hi, True))
+
+@unwrap_spec(lo=int)
+def bisect_left(space, w_a, w_x, lo=0, w_hi=None):
+    """bisect_left(a, x[, lo[, hi]]) -> index
+
+Return the index where to insert item x in list a, assuming a is sorted.
+
+The return value i is such that all e in a[:i] have e < x, and all e in
+a[i:] have e >= x.  So if x already appears in the list, i points just
+before the leftmost x already there.
+
+Optional args lo (default 0) and hi (default len(a)) bound the
+slice of a to be searched."""
+    lo, hi = _get_bounds(space, w_a, lo, w_hi)
+    return space.newint(_bisect(space, w_a, w_x, lo, hi, False))
+
+@unwrap_spec(lo=int)
+def insort_right(space, w_a, w_x, lo=0, w_hi=None):
+    """insort(a, x[, lo[, hi]])
+insort_right(a, x[, lo[, hi]])
+
+Insert item x in list a, and keep it sorted assuming a is sorted.
+
+If x is already in a, insert it to the right of the rightmost x.
+
+Optional args lo (default 0) and hi (default len(a)) bound the
+slice of a to be searched."""
+    lo, hi = _get_bounds(space, w_a, lo, w_hi)
+    _insert(space, w_a, _bisect(space, w_a, w_x, lo, hi, True), w_x)
+
+@unwrap_spec(lo=int)
+def insort_left(space, w_a, w_x, lo=0, w_hi=None):
+    """insort_left(a, x[, lo[, hi]])
+
+Insert item x in list a, and keep it sorted assuming a is sorted.
+
+If x is already in a, insert it to the left of the leftmost x.
+
+Optional args lo (default 0) and hi (default len(a)) bound the
+slice of a to be searched."""
+    lo, hi = _get_bounds(space, w_a, lo, w_hi)
+    _insert(space, w_a, _bisect(space, w_a, w_x, lo, hi, False), w_x)
@@ -0,0 +1,113 @@
+class AppTestBisect(object):
+    spaceconfig = dict(usemodules=['_bisect'])
+
+    def test_bisect_left(self):
+        from _bisect import bisect_left
+        a = [0, 5, 6, 6, 6, 7]
+        assert bisect_left(a, None) in (0, 6)    # CPython: 0
+        assert bisect_left(a, -3) == 0
+        assert bisect_left(a, 0) == 0
+        assert bisect_left(a, 3) == 1
+        assert bisect_left(a, 5) == 1
+        assert bisect_left(a, 5.5) == 2
+        assert bisect_left(a, 6) == 2
+        assert bisect_left(a, 6.0) == 2
+        assert bisect_left(a, 6.1) == 5
+        assert bisect_left(a, 7) == 5
+        assert bisect_left(a, 8) == 6
+        assert bisect_left([], 1) == 0
+        assert bisect_left(a, 6, 3) == 3
+        assert bisect_left(a, 6, 1, 2) == 2
+        assert bisect_left(a, 6, hi=3) == 2
+
+    def test_bisect_right(self):
+        from _bisect import bisect_right, bisect
+        a = [0, 5, 6, 6, 6, 7]
+        assert bisect_right(a, -3) == 0
+        assert bisect_right(a, 0) == 1
+        assert bisect_right(a, 3) == 1
+        assert bisect_right(a, 5) == 2
+        assert bisect_right(a, 5.5) == 2
+        assert bisect_right(a, 6) == 5
+        assert bisect_right(a, 6.0) == 5
+        assert bisect_right(a, 6.1) == 5
+        assert bisect_right(a, 7) == 6
+        assert bisect_right(a, 8) == 6
+        assert bisect_right([], 1) == 0
+        assert bisect_right(a, 6, 1, 3) == 3
+        assert bisect_right(a, 6, hi=3) == 3
+        assert bisect is bisect_right
+
+    def test_floats(self):
+        from _bisect import bisect_left, bisect_right
+        a = [0.5, 1.5, 2.5, 2.5, 3.0]
+        assert bisect_left(a, 2.5) == 2
+        assert bisect_right(a, 2.5) == 4
+        assert bisect_left(a, -1.0) == 0
+        assert bisect_right(a, 10.0) == 5
+        assert bisect_left(a, 2) == 2
+        assert bisect_right(a, 3) == 5
+        assert bisect_right([-0.0, 0.0], 0.0) == 2
+        assert bisect_left([-0.0, 0.0], -0.0) == 0
+
+    def test_objects(self):
+        from _bisect import bisect_left, bisect_right
+        a = ['a', 'b', 'b', 'c']
+        assert bisect_left(a, 'b') == 1
+        assert bisect_right(a, 'b') == 3
+        a = [1, 2.5, 3L, 4]
+        assert bisect_left(a, 3) == 2
+        assert bisect_right(a, 3) == 3
+
+    def test_bounds(self):
+        from _bisect import bisect_left, bisect_right, insort
+        raises(ValueError, bisect_left, [1, 2], 1, -1)
+        raises(ValueError, bisect_right, [1, 2], 1, -1)
+        raises(ValueError, insort, [1, 2], 1, -1)
+        # 'hi' can be larger than the list; the items are then fetched
+        # with __getitem__ and raise IndexError, like in CPython
+        raises(IndexError, bisect_right, [1, 2], 5, 0, 10)
+
+    def test_insort(self):
+        from _bisect import insort_left, insort_right, insort
+        a = []
+        for x in [5, 3, 8, 3, 1]:
+            insort_left(a, x)
+        assert a == [1, 3, 3, 5, 8]
+        a = []
+        for x in [5.5, 3.5, 8.5, 3.5, 1.5]:
+            insort_right(a, x)
+        assert a == [1.5, 3.5, 3.5, 5.5, 8.5]
+        a = [1, 2, 3]
+        insort(a, 2.0)
+        assert a == [1, 2, 2.0, 3]
+        assert type(a[2]) is float
+        a = [1, 2, 3]
+        insort_left(a, 2.0)
+        assert type(a[1]) is float
+
+    def test_insort_calls_insert(self):
+        from _bisect import insort_left, insort_right
+        class List(list):
+            data = []
+            def insert(self, index, item):
+                self.data.insert(index, item)
+        lst = List()
+        insort_left(lst, 10)
+        insort_right(lst, 5)
+        assert lst.data == [5, 10]
+        assert len(lst) == 0
+
+    def test_sequence(self):
+        from _bisect import bisect_left, bisect_right
+        assert bisect_left((1, 2, 3), 2) == 1
+        assert bisect_right((1, 2, 3), 2) == 2
+        assert bisect_right('abc', 'b') == 2
+        raises(TypeError, bisect_left, 10, 1)
+
+    def test_len_only(self):
+        from _bisect import bisect_left
+        class LenOnly:
+            def __len__(self):
+                return 10
+        raises(AttributeError, bisect_left, LenOnly(), 1)
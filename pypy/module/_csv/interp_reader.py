@@ -1,7 +1,12 @@
+import os
+
 from rpython.rlib.rstring import StringBuilder
+from rpython.rlib.rstring import ParseStringError, ParseStringOverflowError
+from rpython.rlib.rarithmetic import string_to_int
+from rpython.rlib.rfloat import string_to_float
 from rpython.rlib import objectmodel
 from pypy.interpreter.baseobjspace import W_Root
-from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.error import OperationError, oefmt, wrap_oserror
 from pypy.interpreter.gateway import unwrap_spec
 from pypy.interpreter.typedef import TypeDef, interp2app
 from pypy.interpreter.typedef import interp_attrproperty_w, interp_attrproperty
@@ -14,13 +19,184 @@ from pypy.objspace.std.util import wrap_parsestringerror
  IN_QUOTED_FIELD, ESCAPE_IN_QUOTED_FIELD, QUOTE_IN_QUOTED_FIELD,
  EAT_CRNL) = range(8)
 
+# the column types that can be given to the readers
+TYPE_STR, TYPE_INT, TYPE_FLOAT, TYPE_OBJECT = range(4)
+
+
+class Column(object):
+    """The values of one column, collected by W_Reader.read_columns().  The
+    ints and floats are kept unboxed."""
+
+    def __init__(self, column_type):
+        self.column_type = column_type
+        self.ints = []
+        self.floats = []
+        self.items_w = []
+
+    def add_int(self, space, field):
+        if self.column_type == TYPE_OBJECT:
+            self.items_w.append(convert_int(space, field))
+            return
+        try:
+            value = string_to_int(field)
+        except ParseStringError as e:
+            raise wrap_parsestringerror(space, e, space.newtext(field))
+        except ParseStringOverflowError:
+            # too large: from now on, the column holds boxed objects
+            self.items_w = [space.newint(x) for x in self.ints]
+            self.ints = []
+            self.column_type = TYPE_OBJECT
+            self.items_w.append(convert_long(space, field))
+            return
+        self.ints.append(value)
+
+    def add_float(self, space, field):
+        self.floats.append(convert_float(space, field))
+
+    def wrap(self, space, arrays):
+        if self.column_type == TYPE_INT:
+            if arrays:
+                return make_array(space, 'l', space.newlist_int(self.ints))
+            return space.newlist_int(self.ints)
+        elif self.column_type == TYPE_FLOAT:
+            if arrays:
+                return make_array(space, 'd',
+                                  space.newlist_float(self.floats))
+            return space.newlist_float(self.floats)
+        return space.newlist(self.items_w)
+
+
+def convert_float(space, field):
+    try:
+        return string_to_float(field)
+    except ParseStringError as e:
+        raise wrap_parsestringerror(space, e, space.newtext(field))
+
+def convert_long(space, field):
+    return space.call_function(space.w_long, space.newtext(field))
+
+def convert_int(space, field):
+    try:
+        return space.newint(string_to_int(field))
+    except ParseStringError as e:
+        raise wrap_parsestringerror(space, e, space.newtext(field))
+    except ParseStringOverflowError:
+        return convert_long(space, field)
+
+
+class ArrayCache:
+    def __init__(self, space):
+        self.w_array = None
+
+def make_array(space, typecode, w_list):
+    cache = space.fromcache(ArrayCache)
+    if cache.w_array is None:
+        cache.w_array = space.appexec([], """():
+            from array import array
+            return array""")
+    return space.call_function(cache.w_array, space.newtext(typecode),
+                               w_list)
+
+
+def parse_column_types(space, w_types):
+    if w_types is None or space.is_w(w_types, space.w_None):
+        return []
+    column_types = []
+    for w_type in space.unpackiterable(w_types):
+        if space.is_w(w_type, space.w_int):
+            column_types.append(TYPE_INT)
+        elif space.is_w(w_type, space.w_float):
+            column_types.append(TYPE_FLOAT)
+        elif space.is_w(w_type, space.w_bytes) or space.is_w(w_type,
+                                                             space.w_None):
+            column_types.append(TYPE_STR)
+        else:
+            raise oefmt(space.w_TypeError,
+                        "column types must be int, float, str or None, "
+                        "not %R", w_type)
+    return column_types
+
+
+class LineSource(object):
+    """Splits the data of a buffer or of a file descriptor into lines.  It
+    is read in big chunks, instead of going through an app-level iterator
+    that would return one string object per line."""
+
+    CHUNK_SIZE = 65536
+
+    def __init__(self):
+        self.data = ''
+        self.pos = 0
+        self.eof = False
+
+    def read_chunk(self, space, size):
+        raise NotImplementedError
+
+    def next_line(self, space):
+        # the pieces of a line that spans several chunks are collected in
+        # 'builder', and only the new chunk is searched after a refill
+        builder = None
+        while True:
+            end = self.data.find('\n', self.pos)
+            if end >= 0:
+                start = self.pos
+                self.pos = end + 1
+                if builder is None:
+                    return self.data[start:end + 1]
+                builder.append_slice(self.data, start, end + 1)
+                return builder.build()
+            if self.pos < len(self.data):
+                if builder is None:
+                    builder = StringBuilder(2 * self.CHUNK_SIZE)
+                builder.append_slice(self.data, self.pos, len(self.data))
+            self.data = ''
+            self.pos = 0
+            if self.eof:
+                if builder is not None:
+                    return builder.build()
+                raise OperationError(space.w_StopIteration, space.w_None)
+            self.data = self.read_chunk(space, self.CHUNK_SIZE)
+            if not self.data:
+                self.eof = True
+
+
+class BufferLineSource(LineSource):
+    def __init__(self, buf):
+        LineSource.__init__(self)
+        self.buf = buf
+        self.offset = 0
+
+    def read_chunk(self, space, size):
+        size = min(size, self.buf.getlength() - self.offset)
+        if size <= 0:
+            return ''
+        chunk = self.buf.getslice(self.offset, 1, size)
+        self.offset += size
+        return chunk
+
+
+class FdLineSource(LineSource):
+    def __init__(self, fd):
+        LineSource.__init__(self)
+        self.fd = fd
+
+    def read_chunk(self, space, size):
+        try:
+            return os.read(self.fd, size)
+        except OSError as e:
+            raise wrap_oserror(space, e)
+
 
 class W_Reader(W_Root):
 
-    def __init__(self, space, dialect, w_iter):
+    def __init__(self, space, dialect, w_iter, source, column_types):
         self.space = space
         self.dialect = dialect
         self.w_iter = w_iter
+        self.source = source
+        self.column_types = column_types
+        self.columns = None     # only during read_columns()
+        self.field_index = 0
         self.line_num = 0
 
     def iter_w(self):
@@ -42,30 +218,94 @@ class W_Reader(W_Root):
     def save_field(self, field_builder):
         space = self.space
         field = field_builder.build()
-        if self.numeric_field:
-            from rpython.rlib.rstring import ParseStringError
-            from rpython.rlib.rfloat import string_to_float
-            self.numeric_field = False
-            try:
-                ff = string_to_float(field)
-            except ParseStringError as e:
-                raise wrap_parsestringerror(space, e, space.newtext(field))
-            w_obj = space.newfloat(ff)
+        numeric_field = self.numeric_field
+        self.numeric_field = False
+        index = self.field_index
+        self.field_index = index + 1
+        column_type = TYPE_STR
+        if index < len(self.column_types):
+            column_type = self.column_types[index]
+        if self.columns is not None:
+            if index >= len(self.columns):
+                raise self.error("expected %d fields" % len(self.columns))
+            column = self.columns[index]
+            if column_type == TYPE_INT:
+                column.add_int(space, field)
+            elif column_type == TYPE_FLOAT:
+                column.add_float(space, field)
+            else:
+                column.items_w.append(space.newtext(field))
+            return
+        if column_type == TYPE_INT:
+            w_obj = convert_int(space, field)
+        elif column_type == TYPE_FLOAT or numeric_field:
+            w_obj = space.newfloat(convert_float(space, field))
         else:
             w_obj = space.newtext(field)
         self.fields_w.append(w_obj)
 
+    def next_line(self):
+        space = self.space
+        if self.source is not None:
+            return self.source.next_line(space)
+        return space.text_w(space.next(self.w_iter))
+
     def next_w(self):
+        self.fields_w = []
+        self.parse_record()
+        w_result = self.space.newlist(self.fields_w)
+        self.fields_w = None
+        return w_result
+
+    @unwrap_spec(maxrows=int, arrays=bool)
+    def read_columns_w(self, maxrows=-1, arrays=False):
+        """read_columns([maxrows, arrays]) -> tuple of columns
+
+Read up to maxrows records, or all of them, and return them as one list
+per column, which requires the column types to be given to the reader.
+The int and float columns are stored without boxing their values, or
+as array.array objects if arrays is true.  Empty lines are skipped.
+An empty tuple is returned at the end of the input."""
+        space = self.space
+        ncolumns = len(self.column_types)
+        if ncolumns == 0:
+            raise oefmt(space.w_TypeError,
+                        "read_columns() requires the column types")
+        columns = [Column(column_type) for column_type in self.column_types]
+        self.columns = columns
+        nrows = 0
+        try:
+            while maxrows < 0 or nrows < maxrows:
+                try:
+                    self.parse_record()
+                except OperationError as e:
+                    if not e.match(space, space.w_StopIteration):
+                        raise
+                    break
+                if self.field_index == 0:
+                    continue    # empty line
+                if self.field_index != ncolumns:
+                    raise self.error("expected %d fields, got %d" % (
+                        ncolumns, self.field_index))
+                nrows += 1
+        finally:
+            self.columns = None
+        if nrows == 0:
+            return space.newtuple([])
+        return space.newtuple([column.wrap(space, arrays)
+                               for column in columns])
+
+    def parse_record(self):
         space = self.space
         dialect = self.dialect
-        self.fields_w = []
+        self.field_index = 0
         self.numeric_field = False
         field_builder = None  # valid iff state not in [START_RECORD, EAT_CRNL]
         state = START_RECORD
         #
         while True:
             try:
-                w_line = space.next(self.w_iter)
+                line = self.next_line()
             except OperationError as e:
                 if e.match(space, space.w_StopIteration):
                     if (field_builder is not None and
@@ -79,7 +319,6 @@ class W_Reader(W_Root):
                             break
                 raise
             self.line_num += 1
-            line = space.text_w(w_line)
             for c in line:
                 if c == '\0':
                     raise self.error("line contains NULL byte")
@@ -208,10 +447,6 @@ class W_Reader(W_Root):
                 break
             else:
                 break
-        #
-        w_result = space.newlist(self.fields_w)
-        self.fields_w = None
-        return w_result
 
 
 def csv_reader(space, w_iterator, w_dialect=None,
@@ -223,6 +458,7 @@ def csv_reader(space, w_iterator, w_dialect=None,
                   w_quoting          = None,
                   w_skipinitialspace = None,
                   w_strict           = None,
+                  w_types            = None,
                   ):
     """
     csv_reader = reader(iterable [, dialect='excel']
@@ -237,12 +473,48 @@ def csv_reader(space, w_iterator, w_dialect=None,
     provided by the dialect.
 
     The returned object is an iterator.  Each iteration returns a row
-    of the CSV file (which can span multiple input lines)"""
+    of the CSV file (which can span multiple input lines).
+
+    The optional \"types\" keyword argument gives the type of the
+    first columns: int, float, or str or None to keep the field as a
+    string.  The fields of these columns are converted as they are
+    parsed, and the reader gets a read_columns() method."""
     w_iter = space.iter(w_iterator)
     dialect = _build_dialect(space, w_dialect, w_delimiter, w_doublequote,
                              w_escapechar, w_lineterminator, w_quotechar,
                              w_quoting, w_skipinitialspace, w_strict)
-    return W_Reader(space, dialect, w_iter)
+    column_types = parse_column_types(space, w_types)
+    return W_Reader(space, dialect, w_iter, None, column_types)
+
+def csv_buffer_reader(space, w_source, w_dialect=None,
+                  w_delimiter        = None,
+                  w_doublequote      = None,
+                  w_escapechar       = None,
+                  w_lineterminator   = None,
+                  w_quotechar        = None,
+                  w_quoting          = None,
+                  w_skipinitialspace = None,
+                  w_strict           = None,
+                  w_types            = None,
+                  ):
+    """
+    csv_reader = buffer_reader(source [, dialect='excel']
+                               [optional keyword args])
+
+    Like reader(), but the "source" argument is either an integer file
+    descriptor or an object with the buffer interface, like a string,
+    a bytearray or an mmap.  The data is read in big chunks and split
+    into lines internally, without going through an app-level iterator.
+    The lines are split at '\\n'."""
+    if space.isinstance_w(w_source, space.w_int):
+        source = FdLineSource(space.c_filedescriptor_w(w_source))
+    else:
+        source = BufferLineSource(space.readbuf_w(w_source))
+    dialect = _build_dialect(space, w_dialect, w_delimiter, w_doublequote,
+                             w_escapechar, w_lineterminator, w_quotechar,
+                             w_quoting, w_skipinitialspace, w_strict)
+    column_types = parse_column_types(space, w_types)
+    return W_Reader(space, dialect, None, source, column_types)
 
 W_Reader.typedef = TypeDef(
         '_csv.reader',
@@ -251,6 +523,7 @@ W_Reader.typedef = TypeDef(
             wrapfn="newint"),
         __iter__ = interp2app(W_Reader.iter_w),
         next = interp2app(W_Reader.next_w),
+        read_columns = interp2app(W_Reader.read_columns_w),
         __doc__ = """CSV reader
 
 Reader objects are responsible for reading and parsing tabular data
@@ -1,3 +1,6 @@
+from rpython.tool.udir import udir
+
+
 class AppTestReader(object):
     spaceconfig = dict(usemodules=['_csv'])
 
@@ -104,3 +107,101 @@ class AppTestReader(object):
         self._read_test(['a,"'], 'Error', strict=True)
         self._read_test(['"a'], 'Error', strict=True)
         self._read_test(['^'], 'Error', escapechar='^', strict=True)
+
+    def test_typed_reader(self):
+        import _csv as csv
+        r = csv.reader(['1,2.5,x,y\n', '-3,1e3,z,w\n'],
+                       types=[int, float, str])
+        assert list(r) == [[1, 2.5, 'x', 'y'], [-3, 1000.0, 'z', 'w']]
+        r = csv.reader(['1,2\n'], types=[None, int])
+        assert list(r) == [['1', 2]]
+        r = csv.reader(['123456789012345678901234567890\n'], types=[int])
+        assert list(r) == [[123456789012345678901234567890]]
+        raises(ValueError, list, csv.reader(['x\n'], types=[int]))
+        raises(ValueError, list, csv.reader(['x\n'], types=[float]))
+        raises(TypeError, csv.reader, [], types=[list])
+        raises(TypeError, csv.reader([]).read_columns)
+
+
+class AppTestTypedReader(object):
+    spaceconfig = dict(usemodules=['_csv', 'array', 'mmap'])
+
+    def setup_class(cls):
+        cls.w_tmpname = cls.space.wrap(str(udir.join('_csv_data.csv')))
+
+    def test_read_columns(self):
+        import _csv as csv
+        lines = ['%d,%s,"n%d"\n' % (i, i / 4.0, i) for i in range(10)]
+        r = csv.reader(lines, types=[int, float, str])
+        res = r.read_columns(4)
+        assert res == ([0, 1, 2, 3], [0.0, 0.25, 0.5, 0.75],
+                       ['n0', 'n1', 'n2', 'n3'])
+        ints, floats, strs = r.read_columns()
+        assert ints == range(4, 10)
+        assert strs[-1] == 'n9'
+        assert r.line_num == 10
+        assert r.read_columns() == ()
+        r = csv.reader(['1,2\n', '\n', '3,4\n'], types=[int, int])
+        assert r.read_columns() == ([1, 3], [2, 4])
+        r = csv.reader(['1,2\n', '3\n'], types=[int, int])
+        raises(csv.Error, r.read_columns)
+        r = csv.reader(['1,2,3\n'], types=[int, int])
+        raises(csv.Error, r.read_columns)
+        r = csv.reader(['1\n', '123456789012345678901234567890\n'],
+                       types=[int])
+        assert r.read_columns() == ([1, 123456789012345678901234567890],)
+        r = csv.reader(['1,a\n', '99999999999999999999999,b\n', '3,c\n'],
+                       types=[int, str])
+        assert r.read_columns() == ([1, 99999999999999999999999, 3],
+                                    ['a', 'b', 'c'])
+
+    def test_read_columns_arrays(self):
+        import _csv as csv
+        from array import array
+        r = csv.reader(['1,2.5,a\n', '2,3.5,b\n'], types=[int, float, str])
+        ints, floats, strs = r.read_columns(arrays=True)
+        assert ints == array('l', [1, 2])
+        assert floats == array('d', [2.5, 3.5])
+        assert strs == ['a', 'b']
+
+    def test_buffer_reader(self):
+        import _csv as csv
+        data = ''.join(['%d,"x,%d"\r\n' % (i, i) for i in range(20000)])
+        rows = list(csv.buffer_reader(data, types=[int]))
+        assert len(rows) == 20000
+        assert rows[12345] == [12345, 'x,12345']
+        r = csv.buffer_reader(bytearray('a,b\nc,d'))
+        assert list(r) == [['a', 'b'], ['c', 'd']]
+        assert r.line_num == 2
+        r = csv.buffer_reader(buffer('1,2\n3,4\n'), types=[int, float])
+        assert r.read_columns() == ([1, 3], [2.0, 4.0])
+        assert list(csv.buffer_reader('')) == []
+        raises(TypeError, csv.buffer_reader, [])
+        # lines longer than the chunks that are read
+        field = 'x' * 60000
+        data = '%s,%s,%s\n1,2\n%s,%s,%s' % ((field,) * 6)
+        rows = list(csv.buffer_reader(data))
+        assert rows == [[field] * 3, ['1', '2'], [field] * 3]
+
+    def test_buffer_reader_file(self):
+        import _csv as csv
+        import mmap, os
+        with open(self.tmpname, 'wb') as f:
+            for i in range(10000):
+                f.write('%d,%d.5\n' % (i, i))
+        with open(self.tmpname, 'rb') as f:
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            r = csv.buffer_reader(m, types=[int, float])
+            ints, floats = r.read_columns()
+            m.close()
+            assert ints == range(10000)
+            assert floats[-1] == 9999.5
+        fd = os.open(self.tmpname, os.O_RDONLY)
+        try:
+            r = csv.buffer_reader(fd, types=[int, float])
+            ints, floats = r.read_columns(5000)
+            assert ints == range(5000)
+            ints, floats = r.read_columns()
+            assert ints == range(5000, 10000)
+        finally:
+            os.close(fd)
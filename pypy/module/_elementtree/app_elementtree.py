@@ -0,0 +1,173 @@
+# NOT_RPYTHON
+"""
+The parts of _elementtree that are written at app-level.  They follow the
+bootstrap code of CPython's _elementtree.c, using the interp-level
+Element, TreeBuilder and XMLParser.
+"""
+
+from xml.etree import ElementTree as ET
+from _elementtree import Element, XMLParser
+
+ParseError = ET.ParseError
+QName = ET.QName
+dump = ET.dump
+iselement = ET.iselement
+register_namespace = ET.register_namespace
+tostring = ET.tostring
+tostringlist = ET.tostringlist
+
+
+# the tags of the comments and processing instructions must be the factory
+# functions of ElementTree.py, for the serializer; the proxies compare equal
+# to them.
+
+class CommentProxy(object):
+
+    def __call__(self, text=None):
+        element = Element(ET.Comment)
+        element.text = text
+        return element
+
+    def __cmp__(self, other):
+        return cmp(ET.Comment, other)
+
+    def __hash__(self):
+        return hash(ET.Comment)
+
+
+class PIProxy(object):
+
+    def __call__(self, target, text=None):
+        element = Element(ET.ProcessingInstruction)
+        element.text = target
+        if text:
+            element.text = element.text + " " + text
+        return element
+
+    def __cmp__(self, other):
+        return cmp(ET.ProcessingInstruction, other)
+
+    def __hash__(self):
+        return hash(ET.ProcessingInstruction)
+
+
+Comment = CommentProxy()
+PI = PIProxy()
+
+
+class ElementTree(ET.ElementTree):
+
+    def parse(self, source, parser=None):
+        close_source = False
+        if not hasattr(source, "read"):
+            source = open(source, "rb")
+            close_source = True
+        try:
+            if parser is not None:
+                while 1:
+                    data = source.read(65536)
+                    if not data:
+                        break
+                    parser.feed(data)
+                self._root = parser.close()
+            else:
+                parser = XMLParser()
+                self._root = parser._parse(source)
+            return self._root
+        finally:
+            if close_source:
+                source.close()
+
+
+def parse(source, parser=None):
+    tree = ElementTree()
+    tree.parse(source, parser)
+    return tree
+
+
+class iterparse(object):
+    """Incrementally parse an XML document, yielding (event, element)
+    pairs.  The source is read in small chunks and the events collected
+    so far are handed out before reading more, so that the elements
+    already processed can be cleared to keep the memory usage bounded."""
+
+    root = None
+
+    def __init__(self, file, events=None, parser=None):
+        self._close_file = not hasattr(file, "read")
+        if self._close_file:
+            file = open(file, "rb")
+        self._file = file
+        self._events = []
+        self._index = 0
+        self._error = None
+        try:
+            if parser is None:
+                parser = XMLParser()
+            self._parser = parser
+            self._parser._setevents(self._events, events)
+        except:
+            if self._close_file:
+                self._file.close()
+            raise
+
+    def next(self):
+        try:
+            while 1:
+                try:
+                    item = self._events[self._index]
+                    self._index += 1
+                    return item
+                except IndexError:
+                    pass
+                if self._error:
+                    e = self._error
+                    self._error = None
+                    raise e
+                if self._parser is None:
+                    break
+                # load the event buffer
+                del self._events[:]
+                self._index = 0
+                data = self._file.read(16384)
+                if data:
+                    try:
+                        self._parser.feed(data)
+                    except SyntaxError as exc:
+                        self._error = exc
+                else:
+                    self.root = self._parser.close()
+                    self._parser = None
+        except:
+            if self._close_file:
+                self._file.close()
+            raise
+        if self._close_file:
+            self._file.close()
+        raise StopIteration
+
+    def __iter__(self):
+        return self
+
+
+def XML(text, parser=None):
+    if parser is None:
+        parser = XMLParser()
+    parser.feed(text)
+    return parser.close()
+
+def fromstringlist(sequence, parser=None):
+    if parser is None:
+        parser = XMLParser()
+    for text in sequence:
+        parser.feed(text)
+    return parser.close()
+
+def XMLID(text, parser=None):
+    tree = XML(text, parser)
+    ids = {}
+    for elem in tree.iter():
+        id = elem.get("id")
+        if id:
+            ids[id] = elem
+    return tree, ids
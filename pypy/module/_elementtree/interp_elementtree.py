@@ -0,0 +1,1146 @@
+"""
+Interp-level Element, TreeBuilder and XMLParser, the accelerators behind
+xml.etree.cElementTree.
+
+An Element keeps its children in an RPython list and only creates its
+attribute dict when somebody asks for it.  The XMLParser installs its own
+expat callbacks: when its target is a plain TreeBuilder, the elements are
+built directly from the callbacks, without going through app-level
+handlers at all.
+"""
+
+import weakref
+
+from rpython.rlib import jit, rutf8
+from rpython.rtyper.lltypesystem import rffi, lltype
+
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.signature import Signature
+from pypy.interpreter.typedef import (
+    TypeDef, GetSetProperty, make_weakref_descr)
+from pypy.module.pyexpat import interp_pyexpat
+from pypy.module.pyexpat.interp_pyexpat import (
+    XML_Parser, XML_ParserCreateNS, XML_ParserFree, XML_SetUserData,
+    XML_Parse, XML_StopParser, XML_FALSE, XML_GetErrorCode, XML_ErrorString,
+    XML_GetCurrentLineNumber, XML_GetCurrentColumnNumber,
+    XML_SetUnknownEncodingHandler, SETTERS, fill_unknown_encoding_map)
+
+
+class State(object):
+    def __init__(self, space):
+        self.w_elementpath = None
+        self.w_deepcopy = None
+        self.w_parseerror = None
+
+def get_elementpath(space):
+    state = space.fromcache(State)
+    if state.w_elementpath is None:
+        state.w_elementpath = space.appexec([], """():
+            from xml.etree import ElementPath
+            return ElementPath""")
+    return state.w_elementpath
+
+def get_deepcopy(space):
+    state = space.fromcache(State)
+    if state.w_deepcopy is None:
+        state.w_deepcopy = space.appexec([], """():
+            from copy import deepcopy
+            return deepcopy""")
+    return state.w_deepcopy
+
+def get_parseerror(space):
+    state = space.fromcache(State)
+    if state.w_parseerror is None:
+        w_module = space.getbuiltinmodule('_elementtree')
+        state.w_parseerror = space.getattr(w_module,
+                                           space.newtext('ParseError'))
+    return state.w_parseerror
+
+
+# ____________________________________________________________
+# Element
+
+element_signature = Signature(['tag', 'attrib'], None, 'extra')
+subelement_signature = Signature(['parent', 'tag', 'attrib'], None, 'extra')
+
+def new_attrib(space, w_attrib, w_extra):
+    """Return a fresh attribute dict built from 'attrib' and the keyword
+    arguments, or None if it would be empty."""
+    w_result = None
+    if w_attrib is not None:
+        if not space.isinstance_w(w_attrib, space.w_dict):
+            raise oefmt(space.w_TypeError,
+                        "attrib must be dict, not %T", w_attrib)
+        if space.len_w(w_attrib) > 0:
+            w_result = space.call_method(w_attrib, 'copy')
+    if w_extra is not None and space.len_w(w_extra) > 0:
+        if w_result is None:
+            w_result = space.newdict()
+        space.call_method(w_result, 'update', w_extra)
+    return w_result
+
+def check_element(space, w_obj):
+    return space.interp_w(W_Element, w_obj)
+
+def is_text_tag(space, w_tag):
+    # itertext() skips comments and processing instructions, whose tag
+    # is a factory function
+    return w_tag is None or space.isinstance_w(w_tag, space.w_basestring)
+
+
+class W_Element(W_Root):
+    w_tag = None
+    w_attrib = None     # created only when needed
+    w_text = None       # None stands for the app-level None
+    w_tail = None
+    children = None     # a list of W_Element, or None if there are none
+
+    def __init__(self, w_tag, w_attrib=None):
+        self.w_tag = w_tag
+        self.w_attrib = w_attrib
+
+    def get_tag(self, space):
+        return self.w_tag or space.w_None
+
+    def get_attrib(self, space):
+        if self.w_attrib is None:
+            self.w_attrib = space.newdict()
+        return self.w_attrib
+
+    def nchildren(self):
+        if self.children is None:
+            return 0
+        return len(self.children)
+
+    def get_children_w(self):
+        # a new list, which can be given to space.newlist() without
+        # generalizing the type of 'self.children'
+        children_w = []
+        if self.children is not None:
+            for child in self.children:
+                children_w.append(child)
+        return children_w
+
+    def append_child(self, child):
+        if self.children is None:
+            self.children = [child]
+        else:
+            self.children.append(child)
+
+    def descr_init(self, space, __args__):
+        w_tag, w_attrib, w_extra = __args__.parse_obj(
+            None, 'Element', element_signature, [None])
+        self.w_tag = w_tag
+        self.w_attrib = new_attrib(space, w_attrib, w_extra)
+
+    def descr_repr(self, space):
+        w_tag = space.repr(self.get_tag(space))
+        return space.newtext("<Element %s at 0x%s>" % (
+            space.text_w(w_tag), self.getaddrstring(space)))
+
+    # ---------- attributes ----------
+
+    def fget_tag(self, space):
+        return self.get_tag(space)
+
+    def fset_tag(self, space, w_value):
+        self.w_tag = w_value
+
+    def fget_text(self, space):
+        return self.w_text or space.w_None
+
+    def fset_text(self, space, w_value):
+        self.w_text = w_value
+
+    def fget_tail(self, space):
+        return self.w_tail or space.w_None
+
+    def fset_tail(self, space, w_value):
+        self.w_tail = w_value
+
+    def fget_attrib(self, space):
+        return self.get_attrib(space)
+
+    def fset_attrib(self, space, w_value):
+        self.w_attrib = w_value
+
+    def fdel_attribute(self, space):
+        raise oefmt(space.w_AttributeError, "can't delete attribute")
+
+    def descr_get(self, space, w_key, w_default=None):
+        if self.w_attrib is None:
+            return w_default or space.w_None
+        return space.call_method(self.w_attrib, 'get', w_key,
+                                 w_default or space.w_None)
+
+    def descr_set(self, space, w_key, w_value):
+        space.setitem(self.get_attrib(space), w_key, w_value)
+
+    def descr_keys(self, space):
+        if self.w_attrib is None:
+            return space.newlist([])
+        return space.call_method(self.w_attrib, 'keys')
+
+    def descr_items(self, space):
+        if self.w_attrib is None:
+            return space.newlist([])
+        return space.call_method(self.w_attrib, 'items')
+
+    # ---------- children ----------
+
+    def descr_len(self, space):
+        return space.newint(self.nchildren())
+
+    def descr_append(self, space, w_element):
+        self.append_child(check_element(space, w_element))
+
+    def descr_extend(self, space, w_elements):
+        new_children = [check_element(space, w_element)
+                        for w_element in space.unpackiterable(w_elements)]
+        if self.children is None:
+            self.children = new_children
+        else:
+            self.children.extend(new_children)
+
+    @unwrap_spec(index=int)
+    def descr_insert(self, space, index, w_element):
+        child = check_element(space, w_element)
+        if self.children is None:
+            self.children = []
+        length = len(self.children)
+        if index < 0:
+            index += length
+            if index < 0:
+                index = 0
+        if index > length:
+            index = length
+        self.children.insert(index, child)
+
+    def descr_remove(self, space, w_element):
+        child = check_element(space, w_element)
+        for i in range(self.nchildren()):
+            w_child = self.children[i]
+            if w_child is child or space.eq_w(w_child, child):
+                del self.children[i]
+                return
+        raise oefmt(space.w_ValueError, "list.remove(x): x not in list")
+
+    def descr_getchildren(self, space):
+        return space.newlist(self.get_children_w())
+
+    def descr_clear(self, space):
+        self.w_attrib = None
+        self.children = None
+        self.w_text = None
+        self.w_tail = None
+
+    def descr_getitem(self, space, w_index):
+        length = self.nchildren()
+        if space.isinstance_w(w_index, space.w_slice):
+            start, stop, step, slicelength = space.decode_index4(w_index,
+                                                                 length)
+            items_w = [None] * slicelength
+            for i in range(slicelength):
+                items_w[i] = self.children[start + i * step]
+            return space.newlist(items_w)
+        index = space.getindex_w(w_index, space.w_IndexError,
+                                 "child index")
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise oefmt(space.w_IndexError, "child index out of range")
+        return self.children[index]
+
+    def descr_setitem(self, space, w_index, w_value):
+        if space.isinstance_w(w_index, space.w_slice):
+            # rare: let the list do the slice logic, then check the result
+            w_list = space.newlist(self.get_children_w())
+            space.setitem(w_list, w_index, w_value)
+            self.children = [check_element(space, w_child)
+                             for w_child in space.listview(w_list)]
+            return
+        length = self.nchildren()
+        index = space.getindex_w(w_index, space.w_IndexError,
+                                 "child index")
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise oefmt(space.w_IndexError,
+                        "child assignment index out of range")
+        self.children[index] = check_element(space, w_value)
+
+    def descr_delitem(self, space, w_index):
+        if space.isinstance_w(w_index, space.w_slice):
+            w_list = space.newlist(self.get_children_w())
+            space.delitem(w_list, w_index)
+            self.children = [check_element(space, w_child)
+                             for w_child in space.listview(w_list)]
+            return
+        length = self.nchildren()
+        index = space.getindex_w(w_index, space.w_IndexError,
+                                 "child index")
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise oefmt(space.w_IndexError,
+                        "child deletion index out of range")
+        del self.children[index]
+
+    # ---------- factories and copies ----------
+
+    def descr_makeelement(self, space, w_tag, w_attrib):
+        return W_Element(w_tag, new_attrib(space, w_attrib, None))
+
+    def descr_copy(self, space):
+        w_attrib = None
+        if self.w_attrib is not None:
+            w_attrib = space.call_method(self.w_attrib, 'copy')
+        result = W_Element(self.w_tag, w_attrib)
+        result.w_text = self.w_text
+        result.w_tail = self.w_tail
+        if self.children is not None:
+            result.children = self.children[:]
+        return result
+
+    def descr_deepcopy(self, space, w_memo):
+        w_deepcopy = get_deepcopy(space)
+        w_tag = space.call_function(w_deepcopy, self.get_tag(space), w_memo)
+        w_attrib = None
+        if self.w_attrib is not None:
+            w_attrib = space.call_function(w_deepcopy, self.w_attrib, w_memo)
+        result = W_Element(w_tag, w_attrib)
+        if self.w_text is not None:
+            result.w_text = space.call_function(w_deepcopy, self.w_text,
+                                                w_memo)
+        if self.w_tail is not None:
+            result.w_tail = space.call_function(w_deepcopy, self.w_tail,
+                                                w_memo)
+        if self.children is not None:
+            result.children = [
+                check_element(space,
+                              space.call_function(w_deepcopy, child, w_memo))
+                for child in self.children]
+        return result
+
+    def descr_reduce(self, space):
+        w_attrib = space.newdict()
+        if self.w_attrib is not None:
+            w_attrib = self.w_attrib
+        w_args = space.newtuple([self.get_tag(space), w_attrib])
+        w_state = space.newtuple([self.fget_text(space),
+                                  self.fget_tail(space),
+                                  space.newlist(self.get_children_w())])
+        return space.newtuple([space.type(self), w_args, w_state])
+
+    def descr_setstate(self, space, w_state):
+        w_text, w_tail, w_children = space.fixedview(w_state, 3)
+        self.w_text = w_text
+        self.w_tail = w_tail
+        children = [check_element(space, w_child)
+                    for w_child in space.listview(w_children)]
+        if children:
+            self.children = children
+        else:
+            self.children = None
+
+    # ---------- searching ----------
+
+    def can_scan_children(self, space, w_path, w_namespaces):
+        # a path without any ElementPath syntax is a plain tag name: then
+        # the matching children can be found directly.  The characters
+        # inside a "{uri}" prefix don't count.
+        if w_namespaces is not None and not space.is_w(w_namespaces,
+                                                       space.w_None):
+            return False
+        if space.isinstance_w(w_path, space.w_bytes):
+            path = space.bytes_w(w_path)
+        elif space.isinstance_w(w_path, space.w_unicode):
+            path = space.utf8_w(w_path)
+        else:
+            return False
+        in_uri = False
+        for c in path:
+            if c == '{':
+                in_uri = True
+            elif c == '}':
+                in_uri = False
+            elif not in_uri and c in '/*.[@':
+                return False
+        return True
+
+    def matching_children(self, space, w_path):
+        result_w = []
+        for i in range(self.nchildren()):
+            child = self.children[i]
+            if space.eq_w(child.get_tag(space), w_path):
+                result_w.append(child)
+        return result_w
+
+    def descr_find(self, space, w_path, w_namespaces=None):
+        if self.can_scan_children(space, w_path, w_namespaces):
+            for i in range(self.nchildren()):
+                child = self.children[i]
+                if space.eq_w(child.get_tag(space), w_path):
+                    return child
+            return space.w_None
+        return space.call_method(get_elementpath(space), 'find', self,
+                                 w_path, w_namespaces or space.w_None)
+
+    def descr_findtext(self, space, w_path, w_default=None,
+                       w_namespaces=None):
+        if self.can_scan_children(space, w_path, w_namespaces):
+            for i in range(self.nchildren()):
+                child = self.children[i]
+                if space.eq_w(child.get_tag(space), w_path):
+                    w_text = child.w_text
+                    if w_text is None or not space.is_true(w_text):
+                        return space.newtext("")
+                    return w_text
+            return w_default or space.w_None
+        return space.call_method(get_elementpath(space), 'findtext', self,
+                                 w_path, w_default or space.w_None,
+                                 w_namespaces or space.w_None)
+
+    def descr_findall(self, space, w_path, w_namespaces=None):
+        if self.can_scan_children(space, w_path, w_namespaces):
+            return space.newlist(self.matching_children(space, w_path))
+        return space.call_method(get_elementpath(space), 'findall', self,
+                                 w_path, w_namespaces or space.w_None)
+
+    def descr_iterfind(self, space, w_path, w_namespaces=None):
+        if self.can_scan_children(space, w_path, w_namespaces):
+            return space.iter(
+                space.newlist(self.matching_children(space, w_path)))
+        return space.call_method(get_elementpath(space), 'iterfind', self,
+                                 w_path, w_namespaces or space.w_None)
+
+    def descr_iter(self, space, w_tag=None):
+        if w_tag is not None and (
+                space.is_w(w_tag, space.w_None) or
+                space.eq_w(w_tag, space.newtext("*"))):
+            w_tag = None
+        return W_ElementIter(self, w_tag)
+
+    def descr_itertext(self, space):
+        return W_TextIter(space, self)
+
+
+def descr_new_element(space, w_subtype, __args__):
+    w_self = space.allocate_instance(W_Element, w_subtype)
+    W_Element.__init__(space.interp_w(W_Element, w_self), None)
+    return w_self
+
+def SubElement(space, __args__):
+    w_parent, w_tag, w_attrib, w_extra = __args__.parse_obj(
+        None, 'SubElement', subelement_signature, [None])
+    parent = check_element(space, w_parent)
+    element = W_Element(w_tag, new_attrib(space, w_attrib, w_extra))
+    parent.append_child(element)
+    return element
+
+
+W_Element.typedef = TypeDef("_elementtree.Element",
+    __new__ = interp2app(descr_new_element),
+    __init__ = interp2app(W_Element.descr_init),
+    __repr__ = interp2app(W_Element.descr_repr),
+    __len__ = interp2app(W_Element.descr_len),
+    __getitem__ = interp2app(W_Element.descr_getitem),
+    __setitem__ = interp2app(W_Element.descr_setitem),
+    __delitem__ = interp2app(W_Element.descr_delitem),
+    __copy__ = interp2app(W_Element.descr_copy),
+    __deepcopy__ = interp2app(W_Element.descr_deepcopy),
+    __reduce__ = interp2app(W_Element.descr_reduce),
+    __setstate__ = interp2app(W_Element.descr_setstate),
+    __weakref__ = make_weakref_descr(W_Element),
+    tag = GetSetProperty(W_Element.fget_tag, W_Element.fset_tag,
+                         W_Element.fdel_attribute, cls=W_Element),
+    text = GetSetProperty(W_Element.fget_text, W_Element.fset_text,
+                          W_Element.fdel_attribute, cls=W_Element),
+    tail = GetSetProperty(W_Element.fget_tail, W_Element.fset_tail,
+                          W_Element.fdel_attribute, cls=W_Element),
+    attrib = GetSetProperty(W_Element.fget_attrib, W_Element.fset_attrib,
+                            W_Element.fdel_attribute, cls=W_Element),
+    get = interp2app(W_Element.descr_get),
+    set = interp2app(W_Element.descr_set),
+    keys = interp2app(W_Element.descr_keys),
+    items = interp2app(W_Element.descr_items),
+    append = interp2app(W_Element.descr_append),
+    extend = interp2app(W_Element.descr_extend),
+    insert = interp2app(W_Element.descr_insert),
+    remove = interp2app(W_Element.descr_remove),
+    getchildren = interp2app(W_Element.descr_getchildren),
+    clear = interp2app(W_Element.descr_clear),
+    makeelement = interp2app(W_Element.descr_makeelement),
+    copy = interp2app(W_Element.descr_copy),
+    find = interp2app(W_Element.descr_find),
+    findtext = interp2app(W_Element.descr_findtext),
+    findall = interp2app(W_Element.descr_findall),
+    iterfind = interp2app(W_Element.descr_iterfind),
+    iter = interp2app(W_Element.descr_iter),
+    getiterator = interp2app(W_Element.descr_iter),
+    itertext = interp2app(W_Element.descr_itertext),
+)
+W_Element.typedef.acceptable_as_base_class = True
+
+
+class W_ElementIter(W_Root):
+    """Pre-order iterator over a tree, optionally filtered by tag.  It
+    keeps its own stack of (element, next child index) instead of
+    nesting generators."""
+
+    def __init__(self, root, w_tag):
+        self.root = root
+        self.w_tag = w_tag
+        self.parents = []
+        self.indices = []
+
+    def matches(self, space, element):
+        return self.w_tag is None or space.eq_w(element.get_tag(space),
+                                                self.w_tag)
+
+    def descr_iter(self, space):
+        return self
+
+    def descr_next(self, space):
+        if self.root is not None:
+            element = self.root
+            self.root = None
+            self.parents.append(element)
+            self.indices.append(0)
+            if self.matches(space, element):
+                return element
+        while self.parents:
+            parent = self.parents[-1]
+            index = self.indices[-1]
+            if index >= parent.nchildren():
+                self.parents.pop()
+                self.indices.pop()
+                continue
+            self.indices[-1] = index + 1
+            child = parent.children[index]
+            self.parents.append(child)
+            self.indices.append(0)
+            if self.matches(space, child):
+                return child
+        raise OperationError(space.w_StopIteration, space.w_None)
+
+W_ElementIter.typedef = TypeDef("_elementtree.ElementIterator",
+    __iter__ = interp2app(W_ElementIter.descr_iter),
+    next = interp2app(W_ElementIter.descr_next),
+)
+W_ElementIter.typedef.acceptable_as_base_class = False
+
+
+class W_TextIter(W_Root):
+    """Iterator over the text and tails of a tree, like the generator
+    Element.itertext() of ElementTree.py.  An index of -1 on the stack
+    means that the text of the element was not produced yet."""
+
+    def __init__(self, space, root):
+        self.parents = []
+        self.indices = []
+        if is_text_tag(space, root.w_tag):
+            self.parents.append(root)
+            self.indices.append(-1)
+
+    def descr_iter(self, space):
+        return self
+
+    def descr_next(self, space):
+        while self.parents:
+            element = self.parents[-1]
+            index = self.indices[-1]
+            self.indices[-1] = index + 1
+            if index < 0:
+                if element.w_text is not None and space.is_true(
+                        element.w_text):
+                    return element.w_text
+            elif index < element.nchildren():
+                child = element.children[index]
+                if is_text_tag(space, child.w_tag):
+                    self.parents.append(child)
+                    self.indices.append(-1)
+                elif child.w_tail is not None and space.is_true(
+                        child.w_tail):
+                    return child.w_tail
+            else:
+                self.parents.pop()
+                self.indices.pop()
+                # the tail of the root is not part of its text
+                if (self.parents and element.w_tail is not None and
+                        space.is_true(element.w_tail)):
+                    return element.w_tail
+        raise OperationError(space.w_StopIteration, space.w_None)
+
+W_TextIter.typedef = TypeDef("_elementtree.TextIterator",
+    __iter__ = interp2app(W_TextIter.descr_iter),
+    next = interp2app(W_TextIter.descr_next),
+)
+W_TextIter.typedef.acceptable_as_base_class = False
+
+
+# ____________________________________________________________
+# TreeBuilder
+
+class W_TreeBuilder(W_Root):
+    def __init__(self, w_element_factory):
+        self.w_element_factory = w_element_factory
+        self.stack_w = []       # the elements that are still open
+        self.w_root = None
+        self.w_last = None      # the last element started or ended
+        self.last_is_tail = False
+        self.data_w = []
+        # the events are only recorded when the parser asks for them
+        self.w_events = None
+        self.w_start_event = None
+        self.w_end_event = None
+        self.w_start_ns_event = None
+        self.w_end_ns_event = None
+
+    def add_event(self, space, w_event, w_value):
+        space.call_method(self.w_events, 'append',
+                          space.newtuple([w_event, w_value]))
+
+    def flush(self, space):
+        if not self.data_w:
+            return
+        if self.w_last is not None:
+            if len(self.data_w) == 1:
+                w_text = self.data_w[0]
+            else:
+                w_text = space.call_method(space.newtext(''), 'join',
+                                           space.newlist(self.data_w))
+            last = self.w_last
+            if isinstance(last, W_Element):
+                if self.last_is_tail:
+                    last.w_tail = w_text
+                else:
+                    last.w_text = w_text
+            else:
+                if self.last_is_tail:
+                    space.setattr(self.w_last, space.newtext('tail'), w_text)
+                else:
+                    space.setattr(self.w_last, space.newtext('text'), w_text)
+        self.data_w = []
+
+    def handle_start(self, space, w_tag, w_attrib):
+        # 'w_attrib' is a new dict owned by the element, or None
+        self.flush(space)
+        if self.w_element_factory is None:
+            w_element = W_Element(w_tag, w_attrib)
+        else:
+            w_element = space.call_function(self.w_element_factory, w_tag,
+                                            w_attrib or space.newdict())
+        if self.stack_w:
+            w_parent = self.stack_w[-1]
+            if (isinstance(w_parent, W_Element) and
+                    isinstance(w_element, W_Element)):
+                w_parent.append_child(w_element)
+            else:
+                space.call_method(w_parent, 'append', w_element)
+        elif self.w_root is None:
+            self.w_root = w_element
+        self.stack_w.append(w_element)
+        self.w_last = w_element
+        self.last_is_tail = False
+        if self.w_start_event is not None:
+            self.add_event(space, self.w_start_event, w_element)
+        return w_element
+
+    def handle_end(self, space):
+        self.flush(space)
+        if not self.stack_w:
+            raise oefmt(space.w_IndexError, "pop from empty stack")
+        self.w_last = self.stack_w.pop()
+        self.last_is_tail = True
+        if self.w_end_event is not None:
+            self.add_event(space, self.w_end_event, self.w_last)
+        return self.w_last
+
+    def handle_data(self, space, w_data):
+        self.data_w.append(w_data)
+
+    def descr_start(self, space, w_tag, w_attrib):
+        return self.handle_start(space, w_tag,
+                                 new_attrib(space, w_attrib, None))
+
+    def descr_end(self, space, w_tag):
+        return self.handle_end(space)
+
+    def descr_data(self, space, w_data):
+        self.handle_data(space, w_data)
+
+    def descr_close(self, space):
+        self.flush(space)
+        return self.w_root or space.w_None
+
+
+def descr_new_treebuilder(space, w_subtype, w_element_factory=None):
+    w_self = space.allocate_instance(W_TreeBuilder, w_subtype)
+    if w_element_factory is not None and space.is_w(w_element_factory,
+                                                    space.w_None):
+        w_element_factory = None
+    W_TreeBuilder.__init__(space.interp_w(W_TreeBuilder, w_self),
+                           w_element_factory)
+    return w_self
+
+W_TreeBuilder.typedef = TypeDef("_elementtree.TreeBuilder",
+    __new__ = interp2app(descr_new_treebuilder),
+    start = interp2app(W_TreeBuilder.descr_start),
+    end = interp2app(W_TreeBuilder.descr_end),
+    data = interp2app(W_TreeBuilder.descr_data),
+    close = interp2app(W_TreeBuilder.descr_close),
+)
+W_TreeBuilder.typedef.acceptable_as_base_class = True
+
+
+# ____________________________________________________________
+# XMLParser
+
+class ParserRegistry(object):
+    """Maps the integer ids given to expat as user data to the parsers."""
+
+    def __init__(self):
+        self.next_id = 0
+        self.parsers = {}
+
+    def add(self, parser):
+        id = self.next_id
+        self.next_id += 1
+        self.parsers[id] = weakref.ref(parser)
+        return id
+
+    def get(self, ll_userdata):
+        id = rffi.cast(lltype.Signed, ll_userdata)
+        ref = self.parsers.get(id, None)
+        if ref is None:
+            return None
+        return ref()
+
+    def remove(self, id):
+        try:
+            del self.parsers[id]
+        except KeyError:
+            pass
+
+registry = ParserRegistry()
+
+
+class W_XMLParser(W_Root):
+    id = -1
+
+    def __init__(self, space, itself, w_target):
+        self.space = space
+        self.itself = itself
+        self.register_finalizer(space)
+        self.id = registry.add(self)
+        XML_SetUserData(self.itself, rffi.cast(rffi.VOIDP, self.id))
+
+        self.w_target = w_target
+        self.w_entity = space.newdict()
+        self.names_w = {}       # cache of the converted tag names
+        self.pending_data = []
+        self.operror = None
+
+        if type(w_target) is W_TreeBuilder:
+            self.builder = w_target
+        else:
+            self.builder = None
+        self.w_start = space.findattr(w_target, space.newtext('start'))
+        self.w_end = space.findattr(w_target, space.newtext('end'))
+        self.w_data = space.findattr(w_target, space.newtext('data'))
+        self.w_comment = space.findattr(w_target, space.newtext('comment'))
+        self.w_pi = space.findattr(w_target, space.newtext('pi'))
+        self.w_close = space.findattr(w_target, space.newtext('close'))
+
+        XML_SetStartElementHandler(self.itself, start_element_callback)
+        XML_SetEndElementHandler(self.itself, end_element_callback)
+        XML_SetCharacterDataHandler(self.itself, character_data_callback)
+        XML_SetDefaultHandlerExpand(self.itself, default_callback)
+        if self.w_comment is not None:
+            XML_SetCommentHandler(self.itself, comment_callback)
+        if self.w_pi is not None:
+            XML_SetProcessingInstructionHandler(self.itself, pi_callback)
+        XML_SetUnknownEncodingHandler(self.itself,
+                                      unknown_encoding_callback,
+                                      rffi.cast(rffi.VOIDP, self.id))
+
+    def _finalize_(self):
+        if XML_ParserFree:  # careful with CPython interpreter shutdown
+            if self.itself:
+                XML_ParserFree(self.itself)
+                self.itself = lltype.nullptr(XML_Parser.TO)
+        if self.id >= 0:
+            registry.remove(self.id)
+            self.id = -1
+
+    def check_parser(self, space):
+        if not self.itself:
+            raise oefmt(space.w_ValueError, "XMLParser is closed")
+
+    # ---------- conversions ----------
+
+    def w_convert(self, space, s):
+        # plain ASCII is returned as a str, the rest as unicode, like
+        # the ElementTree.XMLParser class does
+        try:
+            length = rutf8.check_utf8(s, True)
+        except rutf8.CheckError:
+            raise oefmt(space.w_UnicodeDecodeError,
+                        "expat returned invalid UTF-8")
+        if length == len(s):
+            return space.newtext(s)
+        return space.newutf8(s, length)
+
+    def w_fixname(self, space, ll_name):
+        name = rffi.charp2str(ll_name)
+        try:
+            return self.names_w[name]
+        except KeyError:
+            pass
+        # "uri}local" is how expat reports namespaced names
+        if '}' in name:
+            w_name = self.w_convert(space, '{' + name)
+        else:
+            w_name = self.w_convert(space, name)
+        self.names_w[name] = w_name
+        return w_name
+
+    # ---------- the events ----------
+
+    def flush_data(self, space):
+        if not self.pending_data:
+            return
+        if len(self.pending_data) == 1:
+            data = self.pending_data[0]
+        else:
+            data = ''.join(self.pending_data)
+        self.pending_data = []
+        self.send_data(space, self.w_convert(space, data))
+
+    def send_data(self, space, w_data):
+        if self.builder is not None:
+            self.builder.handle_data(space, w_data)
+        elif self.w_data is not None:
+            space.call_function(self.w_data, w_data)
+
+    def handle_start(self, space, ll_name, ll_attrs):
+        self.flush_data(space)
+        w_tag = self.w_fixname(space, ll_name)
+        w_attrib = None
+        if ll_attrs[0]:
+            w_attrib = space.newdict()
+            i = 0
+            while ll_attrs[i]:
+                w_key = self.w_fixname(space, ll_attrs[i])
+                w_value = self.w_convert(space,
+                                         rffi.charp2str(ll_attrs[i + 1]))
+                space.setitem(w_attrib, w_key, w_value)
+                i += 2
+        if self.builder is not None:
+            self.builder.handle_start(space, w_tag, w_attrib)
+        elif self.w_start is not None:
+            space.call_function(self.w_start, w_tag,
+                                w_attrib or space.newdict())
+
+    def handle_end(self, space, ll_name):
+        self.flush_data(space)
+        if self.builder is not None:
+            self.builder.handle_end(space)
+        elif self.w_end is not None:
+            space.call_function(self.w_end, self.w_fixname(space, ll_name))
+
+    def handle_data(self, space, ll_data, length):
+        self.pending_data.append(rffi.charpsize2str(
+            ll_data, rffi.cast(lltype.Signed, length)))
+
+    def handle_default(self, space, ll_data, length):
+        data = rffi.charpsize2str(ll_data, rffi.cast(lltype.Signed, length))
+        if len(data) < 3 or data[0] != '&':
+            return
+        # an entity that expat does not know
+        self.flush_data(space)
+        stop = len(data) - 1
+        assert stop >= 1
+        w_value = space.finditem(self.w_entity,
+                                 self.w_convert(space, data[1:stop]))
+        if w_value is None:
+            lineno, colno = self.get_position()
+            code = interp_pyexpat.XML_ERROR_UNDEFINED_ENTITY
+            raise self.parse_error(
+                space, "undefined entity %s: line %d, column %d" % (
+                    data, lineno, colno), code, lineno, colno)
+        self.send_data(space, w_value)
+
+    def handle_comment(self, space, ll_data):
+        self.flush_data(space)
+        space.call_function(self.w_comment,
+                            self.w_convert(space, rffi.charp2str(ll_data)))
+
+    def handle_pi(self, space, ll_target, ll_data):
+        self.flush_data(space)
+        space.call_function(self.w_pi,
+                            self.w_convert(space, rffi.charp2str(ll_target)),
+                            self.w_convert(space, rffi.charp2str(ll_data)))
+
+    def handle_start_ns(self, space, ll_prefix, ll_uri):
+        builder = self.builder
+        assert builder is not None
+        if ll_prefix:
+            w_prefix = self.w_convert(space, rffi.charp2str(ll_prefix))
+        else:
+            w_prefix = space.newtext('')
+        if ll_uri:
+            w_uri = self.w_convert(space, rffi.charp2str(ll_uri))
+        else:
+            w_uri = space.newtext('')
+        builder.add_event(space, builder.w_start_ns_event,
+                          space.newtuple([w_prefix, w_uri]))
+
+    def handle_end_ns(self, space, ll_prefix):
+        builder = self.builder
+        assert builder is not None
+        builder.add_event(space, builder.w_end_ns_event, space.w_None)
+
+    def stop(self, operror):
+        # called when a callback raised: remember the exception, and make
+        # expat return as soon as possible
+        if self.operror is None:
+            self.operror = operror
+        XML_StopParser(self.itself, XML_FALSE)
+
+    # ---------- errors ----------
+
+    def get_position(self):
+        lineno = rffi.cast(lltype.Signed,
+                           XML_GetCurrentLineNumber(self.itself))
+        colno = rffi.cast(lltype.Signed,
+                          XML_GetCurrentColumnNumber(self.itself))
+        return lineno, colno
+
+    def parse_error(self, space, msg, code, lineno, colno):
+        w_errorcls = get_parseerror(space)
+        w_error = space.call_function(w_errorcls, space.newtext(msg))
+        space.setattr(w_error, space.newtext('code'), space.newint(code))
+        space.setattr(w_error, space.newtext('position'), space.newtuple(
+            [space.newint(lineno), space.newint(colno)]))
+        return OperationError(w_errorcls, w_error)
+
+    def expat_error(self, space):
+        code = rffi.cast(lltype.Signed, XML_GetErrorCode(self.itself))
+        err = rffi.charp2strn(XML_ErrorString(code), 200)
+        lineno, colno = self.get_position()
+        return self.parse_error(
+            space, "%s: line %d, column %d" % (err, lineno, colno),
+            code, lineno, colno)
+
+    # ---------- the app-level interface ----------
+
+    def parse(self, space, data, final):
+        self.check_parser(space)
+        if len(data) > 0x7fffffff:
+            raise oefmt(space.w_OverflowError, "size does not fit in an int")
+        res = XML_Parse(self.itself, data, len(data), final)
+        if self.operror is not None:
+            operror = self.operror
+            self.operror = None
+            raise operror
+        if rffi.cast(lltype.Signed, res) == 0:
+            raise self.expat_error(space)
+
+    @unwrap_spec(data='text')
+    def descr_feed(self, space, data):
+        self.parse(space, data, False)
+
+    def descr_close(self, space):
+        self.parse(space, "", True)
+        self.flush_data(space)
+        if self.builder is not None:
+            return self.builder.descr_close(space)
+        if self.w_close is not None:
+            return space.call_function(self.w_close)
+        return space.w_None
+
+    def descr__parse(self, space, w_file):
+        while True:
+            w_data = space.call_method(w_file, 'read',
+                                       space.newint(64 * 1024))
+            data = space.text_w(w_data)
+            if not data:
+                break
+            self.parse(space, data, False)
+        return self.descr_close(space)
+
+    def descr__setevents(self, space, w_events, w_event_names=None):
+        builder = self.builder
+        if builder is None:
+            raise oefmt(space.w_TypeError,
+                        "event handling only supported for "
+                        "cElementTree.Treebuilder targets")
+        builder.w_events = w_events
+        builder.w_start_event = None
+        builder.w_end_event = None
+        builder.w_start_ns_event = None
+        builder.w_end_ns_event = None
+        if w_event_names is None or space.is_w(w_event_names, space.w_None):
+            builder.w_end_event = space.newtext('end')
+            return
+        for w_name in space.unpackiterable(w_event_names):
+            name = space.text_w(w_name)
+            if name == 'start':
+                builder.w_start_event = w_name
+            elif name == 'end':
+                builder.w_end_event = w_name
+            elif name == 'start-ns':
+                builder.w_start_ns_event = w_name
+                XML_SetStartNamespaceDeclHandler(self.itself,
+                                                 start_ns_callback)
+            elif name == 'end-ns':
+                builder.w_end_ns_event = w_name
+                XML_SetEndNamespaceDeclHandler(self.itself, end_ns_callback)
+            else:
+                raise oefmt(space.w_ValueError, "unknown event '%s'", name)
+
+    def fget_entity(self, space):
+        return self.w_entity
+
+    def fget_target(self, space):
+        return self.w_target
+
+    def fget_version(self, space):
+        return space.newtext("Expat %d.%d.%d" % (
+            interp_pyexpat.XML_MAJOR_VERSION,
+            interp_pyexpat.XML_MINOR_VERSION,
+            interp_pyexpat.XML_MICRO_VERSION))
+
+
+@unwrap_spec(encoding='text_or_none')
+def descr_new_xmlparser(space, w_subtype, w_html=None, w_target=None,
+                        encoding=None):
+    # 'html' is accepted for compatibility and ignored, like in CPython
+    itself = XML_ParserCreateNS(encoding, '}')
+    if not itself:
+        raise MemoryError
+    if w_target is None or space.is_w(w_target, space.w_None):
+        w_target = W_TreeBuilder(None)
+    w_self = space.allocate_instance(W_XMLParser, w_subtype)
+    W_XMLParser.__init__(space.interp_w(W_XMLParser, w_self), space, itself,
+                         w_target)
+    return w_self
+
+W_XMLParser.typedef = TypeDef("_elementtree.XMLParser",
+    __new__ = interp2app(descr_new_xmlparser),
+    feed = interp2app(W_XMLParser.descr_feed),
+    close = interp2app(W_XMLParser.descr_close),
+    _parse = interp2app(W_XMLParser.descr__parse),
+    _setevents = interp2app(W_XMLParser.descr__setevents),
+    entity = GetSetProperty(W_XMLParser.fget_entity),
+    target = GetSetProperty(W_XMLParser.fget_target),
+    version = GetSetProperty(W_XMLParser.fget_version),
+)
+W_XMLParser.typedef.acceptable_as_base_class = True
+
+
+# ____________________________________________________________
+# expat callbacks
+
+XML_SetStartElementHandler = SETTERS['StartElementHandler'][1]
+XML_SetEndElementHandler = SETTERS['EndElementHandler'][1]
+XML_SetCharacterDataHandler = SETTERS['CharacterDataHandler'][1]
+XML_SetDefaultHandlerExpand = SETTERS['DefaultHandlerExpand'][1]
+XML_SetCommentHandler = SETTERS['CommentHandler'][1]
+XML_SetProcessingInstructionHandler = (
+    SETTERS['ProcessingInstructionHandler'][1])
+XML_SetStartNamespaceDeclHandler = SETTERS['StartNamespaceDeclHandler'][1]
+XML_SetEndNamespaceDeclHandler = SETTERS['EndNamespaceDeclHandler'][1]
+
+@jit.jit_callback('ElementTree:StartElement')
+def start_element_callback(ll_userdata, ll_name, ll_attrs):
+    parser = registry.get(ll_userdata)
+    if parser is None or parser.operror is not None:
+        return
+    try:
+        parser.handle_start(parser.space, ll_name, ll_attrs)
+    except OperationError as e:
+        parser.stop(e)
+
+@jit.jit_callback('ElementTree:EndElement')
+def end_element_callback(ll_userdata, ll_name):
+    parser = registry.get(ll_userdata)
+    if parser is None or parser.operror is not None:
+        return
+    try:
+        parser.handle_end(parser.space, ll_name)
+    except OperationError as e:
+        parser.stop(e)
+
+@jit.jit_callback('ElementTree:CharacterData')
+def character_data_callback(ll_userdata, ll_data, length):
+    parser = registry.get(ll_userdata)
+    if parser is None or parser.operror is not None:
+        return
+    parser.handle_data(parser.space, ll_data, length)
+
+@jit.jit_callback('ElementTree:Default')
+def default_callback(ll_userdata, ll_data, length):
+    parser = registry.get(ll_userdata)
+    if parser is None or parser.operror is not None:
+        return
+    try:
+        parser.handle_default(parser.space, ll_data, length)
+    except OperationError as e:
+        parser.stop(e)
+
+@jit.jit_callback('ElementTree:Comment')
+def comment_callback(ll_userdata, ll_data):
+    parser = registry.get(ll_userdata)
+    if parser is None or parser.operror is not None:
+        return
+    try:
+        parser.handle_comment(parser.space, ll_data)
+    except OperationError as e:
+        parser.stop(e)
+
+@jit.jit_callback('ElementTree:ProcessingInstruction')
+def pi_callback(ll_userdata, ll_target, ll_data):
+    parser = registry.get(ll_userdata)
+    if parser is None or parser.operror is not None:
+        return
+    try:
+        parser.handle_pi(parser.space, ll_target, ll_data)
+    except OperationError as e:
+        parser.stop(e)
+
+@jit.jit_callback('ElementTree:StartNamespaceDecl')
+def start_ns_callback(ll_userdata, ll_prefix, ll_uri):
+    parser = registry.get(ll_userdata)
+    if parser is None or parser.operror is not None:
+        return
+    try:
+        parser.handle_start_ns(parser.space, ll_prefix, ll_uri)
+    except OperationError as e:
+        parser.stop(e)
+
+@jit.jit_callback('ElementTree:EndNamespaceDecl')
+def end_ns_callback(ll_userdata, ll_prefix):
+    parser = registry.get(ll_userdata)
+    if parser is None or parser.operror is not None:
+        return
+    try:
+        parser.handle_end_ns(parser.space, ll_prefix)
+    except OperationError as e:
+        parser.stop(e)
+
+def unknown_encoding_callback(ll_userdata, ll_name, info):
+    parser = registry.get(ll_userdata)
+    if parser is None:
+        return rffi.cast(rffi.INT, 0)
+    try:
+        fill_unknown_encoding_map(parser.space, rffi.charp2str(ll_name),
+                                  info)
+    except OperationError as e:
+        parser.stop(e)
+        return rffi.cast(rffi.INT, 0)
+    return rffi.cast(rffi.INT, 1)
@@ -0,0 +1,43 @@
+"""
+Mixed-module definition for the _elementtree module, the accelerator of
+xml.etree.cElementTree.  Note that there is also a version in
+lib_pypy/_elementtree.py that just re-exports the pure Python
+ElementTree; the present mixed-module version takes precedence if it
+is enabled.
+"""
+
+from pypy.interpreter.mixedmodule import MixedModule
+
+
+class Module(MixedModule):
+    """Fast implementation of the ElementTree API, on top of expat."""
+
+    interpleveldefs = {
+        'Element': 'interp_elementtree.W_Element',
+        'SubElement': 'interp_elementtree.SubElement',
+        'TreeBuilder': 'interp_elementtree.W_TreeBuilder',
+        'XMLParser': 'interp_elementtree.W_XMLParser',
+        'XMLTreeBuilder': 'interp_elementtree.W_XMLParser',
+        'VERSION': 'space.newtext("1.0.6")',
+        '__version__': 'space.newtext("1.0.6")',
+        }
+
+    appleveldefs = {
+        'Comment': 'app_elementtree.Comment',
+        'PI': 'app_elementtree.PI',
+        'ProcessingInstruction': 'app_elementtree.PI',
+        'ElementTree': 'app_elementtree.ElementTree',
+        'parse': 'app_elementtree.parse',
+        'iterparse': 'app_elementtree.iterparse',
+        'XML': 'app_elementtree.XML',
+        'fromstring': 'app_elementtree.XML',
+        'fromstringlist': 'app_elementtree.fromstringlist',
+        'XMLID': 'app_elementtree.XMLID',
+        'ParseError': 'app_elementtree.ParseError',
+        'QName': 'app_elementtree.QName',
+        'dump': 'app_elementtree.dump',
+        'iselement': 'app_elementtree.iselement',
+        'register_namespace': 'app_elementtree.register_namespace',
+        'tostring': 'app_elementtree.tostring',
+        'tostringlist': 'app_elementtree.tostringlist',
+        }
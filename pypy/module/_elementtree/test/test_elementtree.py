@@ -0,0 +1,268 @@
+class AppTestElementTree:
+    spaceconfig = dict(usemodules=['_elementtree', 'pyexpat', 'struct',
+                                   'binascii', 'itertools'])
+
+    def test_is_builtin(self):
+        import _elementtree, sys
+        assert '_elementtree' in sys.builtin_module_names
+        from xml.etree import cElementTree
+        assert cElementTree.Element is _elementtree.Element
+
+    def test_element(self):
+        from _elementtree import Element, SubElement
+        e = Element('root', {'a': '1'}, b='2')
+        assert e.tag == 'root'
+        assert e.attrib == {'a': '1', 'b': '2'}
+        assert e.text is None and e.tail is None
+        assert len(e) == 0
+        assert e.get('a') == '1'
+        assert e.get('x') is None
+        assert e.get('x', 5) == 5
+        e.set('c', '3')
+        assert sorted(e.keys()) == ['a', 'b', 'c']
+        assert Element('x').items() == []
+        assert Element('x').attrib == {}
+        d = {'k': 'v'}
+        e2 = Element('x', d)
+        e2.set('k', 'w')
+        assert d == {'k': 'v'}
+        raises(TypeError, Element, 'x', 42)
+        raises(TypeError, Element)
+        s = SubElement(e, 'child', {'z': '0'})
+        assert e[0] is s and s.attrib == {'z': '0'}
+        raises(TypeError, SubElement, 42, 'child')
+        for name in ['tag', 'text', 'tail', 'attrib']:
+            raises(AttributeError, delattr, e, name)
+        assert repr(e).startswith("<Element 'root' at 0x")
+
+    def test_children(self):
+        from _elementtree import Element
+        root = Element('root')
+        a, b, c, d = [Element(tag) for tag in 'abcd']
+        root.append(b)
+        root.insert(0, a)
+        root.extend([c, d])
+        assert [child.tag for child in root] == ['a', 'b', 'c', 'd']
+        assert root[-1] is d
+        assert [x.tag for x in root[1:3]] == ['b', 'c']
+        assert [x.tag for x in root[::-2]] == ['d', 'b']
+        raises(IndexError, "root[4]")
+        raises(TypeError, root.append, 'x')
+        raises(TypeError, root.extend, [a, 'x'])
+        root[0] = d
+        assert root[0] is d
+        raises(TypeError, "root[0] = 'x'")
+        root[1:3] = [a]
+        assert [x.tag for x in root] == ['d', 'a', 'd']
+        raises(TypeError, "root[1:] = ['x']")
+        assert len(root) == 3
+        del root[0]
+        del root[-1:]
+        assert root.getchildren() == [a]
+        root.remove(a)
+        assert len(root) == 0
+        raises(ValueError, root.remove, a)
+        root.insert(-10, b)
+        root.insert(10, c)
+        assert root.getchildren() == [b, c]
+        root.text = 'x'
+        root.clear()
+        assert len(root) == 0 and root.text is None and root.attrib == {}
+
+    def test_copy_and_pickle(self):
+        import copy, pickle
+        from _elementtree import Element, SubElement
+        root = Element('root', a='1')
+        root.text = 'text'
+        child = SubElement(root, 'child')
+        child.tail = 'tail'
+        c = copy.copy(root)
+        assert c[0] is child and c.attrib == root.attrib
+        assert c.attrib is not root.attrib
+        c = copy.deepcopy(root)
+        assert c[0] is not child and c[0].tail == 'tail'
+        assert c.text == 'text' and c.attrib == {'a': '1'}
+        for proto in range(3):
+            res = pickle.loads(pickle.dumps(root, proto))
+            assert res.tag == 'root' and res.attrib == {'a': '1'}
+            assert res.text == 'text'
+            assert res[0].tag == 'child' and res[0].tail == 'tail'
+        class MyElement(Element):
+            pass
+        m = MyElement('x')
+        m.extra = 42
+        assert isinstance(m, Element) and m.tag == 'x' and m.extra == 42
+
+    def test_find(self):
+        from _elementtree import XML
+        root = XML('<root><a>1</a><b/><a x="y">2</a><c><a>3</a></c>'
+                   '<e></e></root>')
+        assert root.find('a').text == '1'
+        assert root.find('z') is None
+        assert root.findtext('a') == '1'
+        assert root.findtext('e') == ''
+        assert root.findtext('z') is None
+        assert root.findtext('z', 'default') == 'default'
+        assert [e.text for e in root.findall('a')] == ['1', '2']
+        assert [e.text for e in root.iterfind('a')] == ['1', '2']
+        # the ElementPath syntax still works
+        assert [e.text for e in root.findall('.//a')] == ['1', '2', '3']
+        assert root.find('a[@x]').text == '2'
+        assert root.findtext('c/a') == '3'
+        assert len(root.findall('*')) == 5
+
+    def test_iter(self):
+        from _elementtree import XML, Comment
+        root = XML('<root>a<b>b<c>c</c>d</b>e<c/>f</root>')
+        assert [e.tag for e in root.iter()] == ['root', 'b', 'c', 'c']
+        assert [e.tag for e in root.iter('*')] == ['root', 'b', 'c', 'c']
+        assert len(list(root.iter('c'))) == 2
+        assert list(root.getiterator('z')) == []
+        assert ''.join(root.itertext()) == 'abcdef'
+        assert list(root[0].itertext()) == ['b', 'c', 'd']
+        root.insert(0, Comment('comment'))
+        root[0].tail = 'tail'
+        assert ''.join(root.itertext()) == 'atailbcdef'
+
+    def test_parse(self):
+        from _elementtree import XML, ElementTree, parse
+        import StringIO
+        root = XML('<?xml version="1.0"?>\n<root a="1" b="\xc3\xa9">'
+                   'text<child/>tail &amp; more</root>')
+        assert root.tag == 'root'
+        assert root.attrib == {'a': '1', 'b': u'\xe9'}
+        assert type(root.get('a')) is str
+        assert root.text == 'text'
+        assert root[0].tail == 'tail & more'
+        tree = parse(StringIO.StringIO('<a><b>x</b></a>'))
+        assert isinstance(tree, ElementTree)
+        assert tree.getroot().find('b').text == 'x'
+        tree = parse(StringIO.StringIO('<a>' + 'x' * 100000 + '</a>'))
+        assert tree.getroot().text == 'x' * 100000
+
+    def test_namespaces(self):
+        from _elementtree import XML
+        root = XML('<root xmlns="urn:a" xmlns:b="urn:b">'
+                   '<b:child b:attr="1"/></root>')
+        assert root.tag == '{urn:a}root'
+        assert root[0].tag == '{urn:b}child'
+        assert root[0].attrib == {'{urn:b}attr': '1'}
+
+    def test_errors(self):
+        from _elementtree import XML, XMLParser, ParseError
+        from xml.etree import ElementTree
+        assert ParseError is ElementTree.ParseError
+        e = raises(ParseError, XML, '<a><b></a>')
+        assert e.value.position == (1, 8)
+        assert e.value.code == 7
+        assert str(e.value) == 'mismatched tag: line 1, column 8'
+        e = raises(ParseError, XML, '<a>&foo;</a>')
+        assert e.value.code == 11
+        # with an external DTD, the undefined entities are looked up in
+        # parser.entity
+        doc = '<!DOCTYPE a SYSTEM "a.dtd"><a>x&foo;y</a>'
+        e = raises(ParseError, XML, doc)
+        assert e.value.code == 11
+        assert str(e.value).startswith('undefined entity &foo;: line 1')
+        parser = XMLParser()
+        parser.entity['foo'] = 'bar'
+        parser.feed(doc)
+        assert parser.close().text == 'xbary'
+        assert parser.version.startswith('Expat ')
+
+    def test_custom_target(self):
+        from _elementtree import XMLParser
+        class Target(object):
+            def __init__(self):
+                self.events = []
+            def start(self, tag, attrib):
+                self.events.append(('start', tag, attrib))
+            def end(self, tag):
+                self.events.append(('end', tag))
+            def data(self, data):
+                self.events.append(('data', data))
+            def comment(self, data):
+                self.events.append(('comment', data))
+            def pi(self, target, data):
+                self.events.append(('pi', target, data))
+            def close(self):
+                return 'closed'
+        target = Target()
+        parser = XMLParser(target=target)
+        assert parser.target is target
+        parser.feed('<a x="1">t<!--c--><?p d?>')
+        parser.feed('u</a>')
+        assert parser.close() == 'closed'
+        assert target.events == [('start', 'a', {'x': '1'}), ('data', 't'),
+                                 ('comment', 'c'), ('pi', 'p', 'd'),
+                                 ('data', 'u'), ('end', 'a')]
+        class Failing(Target):
+            def start(self, tag, attrib):
+                raise KeyError(tag)
+        parser = XMLParser(target=Failing())
+        raises(KeyError, parser.feed, '<a><b/></a>')
+        raises(TypeError, parser._setevents, [], ['start'])
+
+    def test_treebuilder(self):
+        from _elementtree import TreeBuilder, Element
+        builder = TreeBuilder()
+        builder.start('root', {})
+        builder.data('a')
+        builder.data('b')
+        builder.start('child', {'x': '1'})
+        builder.end('child')
+        builder.data('tail')
+        builder.end('root')
+        root = builder.close()
+        assert root.text == 'ab' and root[0].tail == 'tail'
+        assert root[0].attrib == {'x': '1'}
+        class MyElement(Element):
+            pass
+        builder = TreeBuilder(MyElement)
+        builder.start('root', {})
+        builder.end('root')
+        assert type(builder.close()) is MyElement
+
+    def test_iterparse(self):
+        from _elementtree import iterparse
+        import StringIO
+        xml = '<root xmlns:x="urn:x">%s</root>' % (
+            '<item><x:v>%d</x:v></item>' * 2000 % tuple(range(2000)))
+        it = iterparse(StringIO.StringIO(xml))
+        count = 0
+        for event, elem in it:
+            assert event == 'end'
+            if elem.tag == 'item':
+                assert elem[0].text == str(count)
+                count += 1
+                elem.clear()
+        assert count == 2000
+        assert it.root.tag == 'root'
+        assert len(it.root) == 2000 and len(it.root[0]) == 0
+        events = list(iterparse(
+            StringIO.StringIO('<a xmlns="urn:a"><b/></a>'),
+            ['start', 'end', 'start-ns', 'end-ns']))
+        assert [(e, getattr(x, 'tag', x)) for e, x in events] == [
+            ('start-ns', ('', 'urn:a')), ('start', '{urn:a}a'),
+            ('start', '{urn:a}b'), ('end', '{urn:a}b'),
+            ('end', '{urn:a}a'), ('end-ns', None)]
+        raises(ValueError, iterparse, StringIO.StringIO('<a/>'), ['bogus'])
+        it = iterparse(StringIO.StringIO('<a><b/></c>'))
+        raises(SyntaxError, list, it)
+
+    def test_serialize(self):
+        from _elementtree import XML, Comment, PI, tostring, SubElement
+        root = XML('<root a="1"><b>x</b>y</root>')
+        SubElement(root, 'c').append(Comment('hi'))
+        root.append(PI('target', 'data'))
+        assert tostring(root) == ('<root a="1"><b>x</b>y<c><!--hi--></c>'
+                                  '<?target data?></root>')
+
+    def test_comment_and_pi_tags(self):
+        from _elementtree import Comment, PI
+        from xml.etree import ElementTree
+        c = Comment('text')
+        assert c.tag is ElementTree.Comment
+        assert c.tag == Comment and Comment == c.tag
+        assert PI('target').tag == PI
+        assert PI('target', 'data').text == 'target data'
@@ -0,0 +1,151 @@
+from pypy.interpreter.argument import Arguments
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import oefmt
+from pypy.interpreter.typedef import (
+    TypeDef, GetSetProperty, descr_get_dict, descr_set_dict,
+    make_weakref_descr)
+from pypy.interpreter.gateway import interp2app
+
+
+def _keywords_to_dict(space, __args__):
+    w_keywords = space.newdict(kwargs=True)
+    keywords = __args__.keywords
+    if keywords:
+        w_args, w_kwds = __args__.topacked()
+        space.call_method(w_keywords, "update", w_kwds)
+    return w_keywords
+
+
+class W_Partial(W_Root):
+    """partial(func, *args, **keywords) - new function with partial application
+    of the given arguments and keywords."""
+
+    _immutable_fields_ = ['w_func?', 'w_args?', 'args_w?[*]', 'w_keywords?']
+
+    w_dict = None
+
+    def __init__(self, space, w_func, w_args, w_keywords):
+        self.space = space
+        self.w_func = w_func
+        self.w_args = w_args
+        self.args_w = space.fixedview(w_args)
+        self.w_keywords = w_keywords
+
+    def getdict(self, space):
+        if self.w_dict is None:
+            self.w_dict = space.newdict(instance=True)
+        return self.w_dict
+
+    def setdict(self, space, w_dict):
+        if not space.isinstance_w(w_dict, space.w_dict):
+            raise oefmt(space.w_TypeError,
+                        "setting partial object's dictionary to a non-dict")
+        self.w_dict = w_dict
+
+    def descr_call(self, space, __args__):
+        # the positional arguments of the partial come first, then the
+        # ones of the call.  The keywords of the call override the ones
+        # of the partial, which are only put into a new dict if both are
+        # given.
+        args_w = __args__.arguments_w
+        if self.args_w:
+            args_w = self.args_w + args_w
+        w_keywords = self.w_keywords
+        if space.len_w(w_keywords) == 0:
+            args = Arguments(space, args_w, __args__.keywords,
+                             __args__.keywords_w,
+                             keyword_names_w=__args__.keyword_names_w)
+        elif not __args__.keywords:
+            args = Arguments(space, args_w, w_starstararg=w_keywords)
+        else:
+            w_kwds = space.call_method(w_keywords, "copy")
+            space.call_method(w_kwds, "update",
+                              _keywords_to_dict(space, __args__))
+            args = Arguments(space, args_w, w_starstararg=w_kwds)
+        return space.call_args(self.w_func, args)
+
+    def descr_get_func(self, space):
+        return self.w_func
+
+    def descr_get_args(self, space):
+        return self.w_args
+
+    def descr_get_keywords(self, space):
+        return self.w_keywords
+
+    def descr_del_dict(self, space):
+        raise oefmt(space.w_TypeError,
+                    "a partial object's dictionary may not be deleted")
+
+    def descr_reduce(self, space):
+        w_dict = self.w_dict
+        if w_dict is not None and space.len_w(w_dict) == 0:
+            w_dict = None
+        if w_dict is None:
+            w_dict = space.w_None
+        return space.newtuple([
+            space.type(self),
+            space.newtuple([self.w_func]),
+            space.newtuple([self.w_func, self.w_args, self.w_keywords,
+                            w_dict])])
+
+    def descr_setstate(self, space, w_state):
+        if not space.isinstance_w(w_state, space.w_tuple):
+            raise oefmt(space.w_TypeError, "invalid partial state")
+        state_w = space.fixedview(w_state)
+        if len(state_w) != 4:
+            raise oefmt(space.w_TypeError, "invalid partial state")
+        w_func, w_args, w_keywords, w_dict = state_w
+        if (not space.is_true(space.callable(w_func)) or
+                not space.isinstance_w(w_args, space.w_tuple) or
+                not (space.is_w(w_keywords, space.w_None) or
+                     space.isinstance_w(w_keywords, space.w_dict)) or
+                not (space.is_w(w_dict, space.w_None) or
+                     space.isinstance_w(w_dict, space.w_dict))):
+            raise oefmt(space.w_TypeError, "invalid partial state")
+        if space.is_w(w_keywords, space.w_None):
+            w_keywords = space.newdict(kwargs=True)
+        elif not space.is_w(space.type(w_keywords), space.w_dict):
+            w_keywords = space.call_function(space.w_dict, w_keywords)
+        if not space.is_w(space.type(w_args), space.w_tuple):
+            w_args = space.newtuple(space.fixedview(w_args))
+        self.w_func = w_func
+        self.w_args = w_args
+        self.args_w = space.fixedview(w_args)
+        self.w_keywords = w_keywords
+        if space.is_w(w_dict, space.w_None):
+            self.w_dict = None
+        else:
+            self.w_dict = w_dict
+
+
+def descr_new_partial(space, w_subtype, __args__):
+    if len(__args__.arguments_w) == 0:
+        raise oefmt(space.w_TypeError,
+                    "type 'partial' takes at least one argument")
+    w_func = __args__.arguments_w[0]
+    if not space.is_true(space.callable(w_func)):
+        raise oefmt(space.w_TypeError, "the first argument must be callable")
+    w_args = space.newtuple(__args__.arguments_w[1:])
+    w_keywords = _keywords_to_dict(space, __args__)
+    w_partial = space.allocate_instance(W_Partial, w_subtype)
+    W_Partial.__init__(w_partial, space, w_func, w_args, w_keywords)
+    return w_partial
+
+
+W_Partial.typedef = TypeDef("functools.partial",
+    __doc__ = W_Partial.__doc__,
+    __new__ = interp2app(descr_new_partial),
+    __call__ = interp2app(W_Partial.descr_call),
+    __reduce__ = interp2app(W_Partial.descr_reduce),
+    __setstate__ = interp2app(W_Partial.descr_setstate),
+    func = GetSetProperty(W_Partial.descr_get_func,
+        doc="function object to use in future partial calls"),
+    args = GetSetProperty(W_Partial.descr_get_args,
+        doc="tuple of arguments to future partial calls"),
+    keywords = GetSetProperty(W_Partial.descr_get_keywords,
+        doc="dictionary of keyword arguments to future partial calls"),
+    __dict__ = GetSetProperty(descr_get_dict, descr_set_dict,
+                              W_Partial.descr_del_dict, cls=W_Partial),
+    __weakref__ = make_weakref_descr(W_Partial),
+    )
@@ -0,0 +1,19 @@
+"""
+Mixed-module definition for the _functools module.  Note that there is
+also a pure Python version in lib_pypy/_functools.py; the present
+mixed-module version takes precedence if it is enabled.
+"""
+
+from pypy.interpreter.mixedmodule import MixedModule
+
+
+class Module(MixedModule):
+    """Tools that operate on functions."""
+
+    interpleveldefs = {
+        'partial': 'interp_functools.W_Partial',
+        'reduce': 'space.getattr(space.builtin, space.newtext("reduce"))',
+        }
+
+    appleveldefs = {
+        }
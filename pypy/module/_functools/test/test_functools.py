@@ -0,0 +1,109 @@
+class AppTestPartial:
+    spaceconfig = dict(usemodules=['_functools', 'struct', 'binascii'])
+
+    def test_is_builtin(self):
+        import _functools, functools, sys
+        assert '_functools' in sys.builtin_module_names
+        assert functools.partial is _functools.partial
+        assert _functools.reduce is reduce
+
+    def test_call(self):
+        from _functools import partial
+        def f(*args, **kwds):
+            return args, kwds
+        p = partial(f, 1, 2, a=3)
+        assert p.func is f
+        assert p.args == (1, 2)
+        assert p.keywords == {'a': 3}
+        assert p() == ((1, 2), {'a': 3})
+        assert p(4, b=5) == ((1, 2, 4), {'a': 3, 'b': 5})
+        # the keywords of the call override the ones of the partial
+        assert p(a=6) == ((1, 2), {'a': 6})
+        assert p.keywords == {'a': 3}
+        assert partial(f)(1, x=2) == ((1,), {'x': 2})
+        assert partial(f, 1)(**{u'x': 2}) == ((1,), {'x': 2})
+        assert partial(dict, self=42)(other=43) == {'self': 42, 'other': 43}
+        p = partial(f, a=1)
+        p.keywords['b'] = 2
+        assert p() == ((), {'a': 1, 'b': 2})
+
+    def test_errors(self):
+        from _functools import partial
+        raises(TypeError, partial)
+        raises(TypeError, partial, 42)
+        p = partial(len)
+        raises(TypeError, p, 1, 2)
+        raises(TypeError, setattr, p, 'func', sum)
+        raises(TypeError, setattr, p, 'args', ())
+        e = raises(TypeError, "del p.__dict__")
+        assert str(e.value) == "a partial object's dictionary may not be deleted"
+        raises(AttributeError, "del p.zzz")
+        raises(TypeError, setattr, p, '__dict__', 42)
+
+    def test_not_a_method(self):
+        from _functools import partial
+        class A(object):
+            meth = partial(len)
+        assert A().meth('abc') == 3
+
+    def test_dict_and_weakref(self):
+        import weakref
+        from _functools import partial
+        p = partial(len)
+        p.attr = 42
+        assert p.__dict__ == {'attr': 42}
+        p.__dict__ = {'x': 1}
+        assert p.x == 1
+        assert weakref.ref(p)() is p
+
+    def test_subclass(self):
+        from _functools import partial
+        class MyPartial(partial):
+            def __call__(self, *args):
+                return ('my',) + partial.__call__(self, *args)
+        p = MyPartial(tuple.__new__, tuple)
+        assert isinstance(p, partial)
+        assert p([1]) == ('my', 1)
+        p.attr = 5
+        assert p.__dict__ == {'attr': 5}
+
+    def test_reduce_and_setstate(self):
+        from _functools import partial
+        def f():
+            pass
+        p = partial(f, 1, a=2)
+        assert p.__reduce__() == (partial, (f,), (f, (1,), {'a': 2}, None))
+        p.attr = 3
+        assert p.__reduce__()[2][3] == {'attr': 3}
+        p.__setstate__((len, (), None, None))
+        assert p.func is len and p.args == () and p.keywords == {}
+        assert not hasattr(p, 'attr')
+        assert p('abc') == 3
+        for state in [42, (len, (), None), (42, (), None, None),
+                      (len, [], None, None), (len, (), 42, None),
+                      (len, (), None, 42)]:
+            raises(TypeError, p.__setstate__, state)
+
+    def test_pickle(self):
+        import pickle
+        from _functools import partial
+        p = partial(max, 1, 2, key=abs)
+        p.attr = 'x'
+        for proto in range(3):
+            p2 = pickle.loads(pickle.dumps(p, proto))
+            assert p2.func is max
+            assert p2.args == (1, 2) and p2.keywords == {'key': abs}
+            assert p2.attr == 'x'
+            assert p2(-3) == -3
+
+    def test_copy(self):
+        import copy
+        from _functools import partial
+        p = partial(len, [1])
+        p.attr = []
+        p2 = copy.copy(p)
+        assert p2.args is p.args and p2.keywords is p.keywords
+        assert p2.attr is p.attr
+        p2 = copy.deepcopy(p)
+        assert p2.args == ([1],) and p2.args[0] is not p.args[0]
+        assert p2() == 1
@@ -0,0 +1,394 @@
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.objspace.std.floatobject import W_FloatObject
+from pypy.objspace.std.intobject import W_IntObject
+from pypy.objspace.std.listobject import (
+    W_ListObject, IntegerListStrategy, FloatListStrategy)
+from rpython.rlib.objectmodel import specialize
+
+
+def _cmp_lt(space, w_x, w_y):
+    # like CPython: use __lt__ if there is one, and fall back to __le__
+    if space.findattr(w_x, space.newtext('__lt__')) is not None:
+        return space.is_true(space.lt(w_x, w_y))
+    return not space.is_true(space.le(w_y, w_x))
+
+def _check_heap(space, w_heap):
+    if not isinstance(w_heap, W_ListObject):
+        raise oefmt(space.w_TypeError, "heap argument must be a list")
+    return w_heap
+
+def _raise_changed_size(space):
+    raise oefmt(space.w_RuntimeError, "list changed size during iteration")
+
+def _unwrapped_items(space, w_heap, w_item):
+    """Return the storage of 'w_heap' if it is a list of ints and 'w_item'
+    is an int, or a list of floats and 'w_item' a float; None otherwise."""
+    if type(w_item) is W_IntObject:
+        if w_heap.strategy is space.fromcache(IntegerListStrategy):
+            return w_heap.getitems_int(), None
+    elif type(w_item) is W_FloatObject:
+        if w_heap.strategy is space.fromcache(FloatListStrategy):
+            return None, w_heap.getitems_float()
+    return None, None
+
+# ____________________________________________________________
+# sifting on the unwrapped storage of int and float lists
+
+@specialize.call_location()
+def _siftdown_unwrapped(items, startpos, pos):
+    newitem = items[pos]
+    while pos > startpos:
+        parentpos = (pos - 1) >> 1
+        parent = items[parentpos]
+        if newitem < parent:
+            items[pos] = parent
+            pos = parentpos
+            continue
+        break
+    items[pos] = newitem
+
+@specialize.call_location()
+def _siftup_unwrapped(items, pos):
+    endpos = len(items)
+    startpos = pos
+    newitem = items[pos]
+    childpos = 2 * pos + 1
+    while childpos < endpos:
+        rightpos = childpos + 1
+        if rightpos < endpos and not items[childpos] < items[rightpos]:
+            childpos = rightpos
+        items[pos] = items[childpos]
+        pos = childpos
+        childpos = 2 * pos + 1
+    items[pos] = newitem
+    _siftdown_unwrapped(items, startpos, pos)
+
+@specialize.call_location()
+def _siftdown_max_unwrapped(items, startpos, pos):
+    newitem = items[pos]
+    while pos > startpos:
+        parentpos = (pos - 1) >> 1
+        parent = items[parentpos]
+        if parent < newitem:
+            items[pos] = parent
+            pos = parentpos
+            continue
+        break
+    items[pos] = newitem
+
+@specialize.call_location()
+def _siftup_max_unwrapped(items, pos):
+    endpos = len(items)
+    startpos = pos
+    newitem = items[pos]
+    childpos = 2 * pos + 1
+    while childpos < endpos:
+        rightpos = childpos + 1
+        if rightpos < endpos and not items[rightpos] < items[childpos]:
+            childpos = rightpos
+        items[pos] = items[childpos]
+        pos = childpos
+        childpos = 2 * pos + 1
+    items[pos] = newitem
+    _siftdown_max_unwrapped(items, startpos, pos)
+
+@specialize.call_location()
+def _heapify_unwrapped(items):
+    for i in range(len(items) // 2 - 1, -1, -1):
+        _siftup_unwrapped(items, i)
+
+@specialize.call_location()
+def _nlargest_unwrapped(items, n):
+    result = items[:n]
+    if not result:
+        return result
+    _heapify_unwrapped(result)
+    for i in range(n, len(items)):
+        elem = items[i]
+        if result[0] < elem:
+            result[0] = elem
+            _siftup_unwrapped(result, 0)
+    return result
+
+@specialize.call_location()
+def _nsmallest_unwrapped(items, n):
+    result = items[:n]
+    if not result:
+        return result
+    for i in range(len(result) // 2 - 1, -1, -1):
+        _siftup_max_unwrapped(result, i)
+    for i in range(n, len(items)):
+        elem = items[i]
+        if elem < result[0]:
+            result[0] = elem
+            _siftup_max_unwrapped(result, 0)
+    return result
+
+# ____________________________________________________________
+# sifting on any list, with the same swaps and comparisons as CPython
+
+def _siftdown(space, w_heap, startpos, pos):
+    size = w_heap.length()
+    w_newitem = w_heap.getitem(pos)
+    while pos > startpos:
+        parentpos = (pos - 1) >> 1
+        w_parent = w_heap.getitem(parentpos)
+        cmp = _cmp_lt(space, w_newitem, w_parent)
+        if size != w_heap.length():
+            _raise_changed_size(space)
+        if not cmp:
+            break
+        w_heap.setitem(pos, w_parent)
+        pos = parentpos
+    w_heap.setitem(pos, w_newitem)
+
+def _siftup(space, w_heap, pos):
+    endpos = w_heap.length()
+    startpos = pos
+    w_newitem = w_heap.getitem(pos)
+    childpos = 2 * pos + 1
+    while childpos < endpos:
+        rightpos = childpos + 1
+        if rightpos < endpos:
+            cmp = _cmp_lt(space, w_heap.getitem(childpos),
+                          w_heap.getitem(rightpos))
+            if endpos != w_heap.length():
+                _raise_changed_size(space)
+            if not cmp:
+                childpos = rightpos
+        w_heap.setitem(pos, w_heap.getitem(childpos))
+        pos = childpos
+        childpos = 2 * pos + 1
+    w_heap.setitem(pos, w_newitem)
+    _siftdown(space, w_heap, startpos, pos)
+
+def _siftdown_max(space, w_heap, startpos, pos):
+    size = w_heap.length()
+    w_newitem = w_heap.getitem(pos)
+    while pos > startpos:
+        parentpos = (pos - 1) >> 1
+        w_parent = w_heap.getitem(parentpos)
+        cmp = _cmp_lt(space, w_parent, w_newitem)
+        if size != w_heap.length():
+            _raise_changed_size(space)
+        if not cmp:
+            break
+        w_heap.setitem(pos, w_parent)
+        pos = parentpos
+    w_heap.setitem(pos, w_newitem)
+
+def _siftup_max(space, w_heap, pos):
+    endpos = w_heap.length()
+    startpos = pos
+    w_newitem = w_heap.getitem(pos)
+    childpos = 2 * pos + 1
+    while childpos < endpos:
+        rightpos = childpos + 1
+        if rightpos < endpos:
+            cmp = _cmp_lt(space, w_heap.getitem(rightpos),
+                          w_heap.getitem(childpos))
+            if endpos != w_heap.length():
+                _raise_changed_size(space)
+            if not cmp:
+                childpos = rightpos
+        w_heap.setitem(pos, w_heap.getitem(childpos))
+        pos = childpos
+        childpos = 2 * pos + 1
+    w_heap.setitem(pos, w_newitem)
+    _siftdown_max(space, w_heap, startpos, pos)
+
+def _heapify(space, w_heap):
+    intitems, floatitems = _unwrapped_items(space, w_heap,
+                                            _first_item(w_heap))
+    if intitems is not None:
+        _heapify_unwrapped(intitems)
+    elif floatitems is not None:
+        _heapify_unwrapped(floatitems)
+    else:
+        for i in range(w_heap.length() // 2 - 1, -1, -1):
+            _siftup(space, w_heap, i)
+
+def _first_item(w_heap):
+    if w_heap.length() == 0:
+        return None
+    return w_heap.getitem(0)
+
+# ____________________________________________________________
+
+
+def heappush(space, w_heap, w_item):
+    """heappush(heap, item) -> None. Push item onto heap, maintaining the heap invariant."""
+    w_heap = _check_heap(space, w_heap)
+    w_heap.append(w_item)
+    intitems, floatitems = _unwrapped_items(space, w_heap, w_item)
+    if intitems is not None:
+        _siftdown_unwrapped(intitems, 0, len(intitems) - 1)
+    elif floatitems is not None:
+        _siftdown_unwrapped(floatitems, 0, len(floatitems) - 1)
+    else:
+        _siftdown(space, w_heap, 0, w_heap.length() - 1)
+
+def heappop(space, w_heap):
+    """Pop the smallest item off the heap, maintaining the heap invariant."""
+    w_heap = _check_heap(space, w_heap)
+    if w_heap.length() == 0:
+        raise oefmt(space.w_IndexError, "index out of range")
+    w_lastelt = w_heap.pop_end()
+    if w_heap.length() == 0:
+        return w_lastelt
+    w_returnitem = w_heap.getitem(0)
+    w_heap.setitem(0, w_lastelt)
+    intitems, floatitems = _unwrapped_items(space, w_heap, w_lastelt)
+    if intitems is not None:
+        _siftup_unwrapped(intitems, 0)
+    elif floatitems is not None:
+        _siftup_unwrapped(floatitems, 0)
+    else:
+        _siftup(space, w_heap, 0)
+    return w_returnitem
+
+def _replace_root(space, w_heap, w_item):
+    w_returnitem = w_heap.getitem(0)
+    w_heap.setitem(0, w_item)
+    intitems, floatitems = _unwrapped_items(space, w_heap, w_item)
+    if intitems is not None:
+        _siftup_unwrapped(intitems, 0)
+    elif floatitems is not None:
+        _siftup_unwrapped(floatitems, 0)
+    else:
+        _siftup(space, w_heap, 0)
+    return w_returnitem
+
+def heapreplace(space, w_heap, w_item):
+    """Pop and return the current smallest value, and add the new item.
+
+This is more efficient than heappop() followed by heappush(), and can be
+more appropriate when using a fixed-size heap.  Note that the value
+returned may be larger than item!  That constrains reasonable uses of
+this routine unless written as part of a conditional replacement:
+
+        if item > heap[0]:
+            item = heapreplace(heap, item)
+"""
+    w_heap = _check_heap(space, w_heap)
+    if w_heap.length() == 0:
+        raise oefmt(space.w_IndexError, "index out of range")
+    return _replace_root(space, w_heap, w_item)
+
+def heappushpop(space, w_heap, w_item):
+    """Push item on the heap, then pop and return the smallest item
+from the heap. The combined action runs more efficiently than
+heappush() followed by a separate call to heappop()."""
+    w_heap = _check_heap(space, w_heap)
+    if w_heap.length() == 0:
+        return w_item
+    if not _cmp_lt(space, w_heap.getitem(0), w_item):
+        return w_item
+    if w_heap.length() == 0:
+        raise oefmt(space.w_IndexError, "index out of range")
+    return _replace_root(space, w_heap, w_item)
+
+def heapify(space, w_heap):
+    """Transform list into a heap, in-place, in O(len(heap)) time."""
+    w_heap = _check_heap(space, w_heap)
+    _heapify(space, w_heap)
+
+
+def _next_or_none(space, w_iter):
+    try:
+        return space.next(w_iter)
+    except OperationError as e:
+        if not e.match(space, space.w_StopIteration):
+            raise
+        return None
+
+def _exact_list(space, w_iterable):
+    if type(w_iterable) is W_ListObject:
+        return w_iterable
+    return None
+
+@unwrap_spec(n=int)
+def nlargest(space, n, w_iterable):
+    """Find the n largest elements in a dataset.
+
+Equivalent to:  sorted(iterable, reverse=True)[:n]
+"""
+    if n < 0:
+        n = 0
+    w_list = _exact_list(space, w_iterable)
+    if w_list is not None:
+        if w_list.strategy is space.fromcache(IntegerListStrategy):
+            w_result = space.newlist_int(
+                _nlargest_unwrapped(w_list.getitems_int(), n))
+            w_result.descr_sort(space)
+            w_result.reverse()
+            return w_result
+        if w_list.strategy is space.fromcache(FloatListStrategy):
+            w_result = space.newlist_float(
+                _nlargest_unwrapped(w_list.getitems_float(), n))
+            w_result.descr_sort(space)
+            w_result.reverse()
+            return w_result
+    w_iter = space.iter(w_iterable)
+    w_heap = space.newlist([])
+    for i in range(n):
+        w_elem = _next_or_none(space, w_iter)
+        if w_elem is None:
+            break
+        w_heap.append(w_elem)
+    if w_heap.length() == 0:
+        return w_heap
+    _heapify(space, w_heap)
+    while True:
+        w_elem = _next_or_none(space, w_iter)
+        if w_elem is None:
+            break
+        if _cmp_lt(space, w_heap.getitem(0), w_elem):
+            _replace_root(space, w_heap, w_elem)
+    # like CPython: sort, then reverse (not a reverse sort, which would
+    # keep the equal items in their original order)
+    w_heap.descr_sort(space)
+    w_heap.reverse()
+    return w_heap
+
+@unwrap_spec(n=int)
+def nsmallest(space, n, w_iterable):
+    """Find the n smallest elements in a dataset.
+
+Equivalent to:  sorted(iterable)[:n]
+"""
+    if n < 0:
+        n = 0
+    w_list = _exact_list(space, w_iterable)
+    if w_list is not None:
+        if w_list.strategy is space.fromcache(IntegerListStrategy):
+            w_result = space.newlist_int(
+                _nsmallest_unwrapped(w_list.getitems_int(), n))
+            w_result.descr_sort(space)
+            return w_result
+        if w_list.strategy is space.fromcache(FloatListStrategy):
+            w_result = space.newlist_float(
+                _nsmallest_unwrapped(w_list.getitems_float(), n))
+            w_result.descr_sort(space)
+            return w_result
+    w_iter = space.iter(w_iterable)
+    w_heap = space.newlist([])
+    for i in range(n):
+        w_elem = _next_or_none(space, w_iter)
+        if w_elem is None:
+            break
+        w_heap.append(w_elem)
+    if w_heap.length() == 0:
+        return w_heap
+    for i in range(w_heap.length() // 2 - 1, -1, -1):
+        _siftup_max(space, w_heap, i)
+    while True:
+        w_elem = _next_or_none(space, w_iter)
+        if w_elem is None:
+            break
+        if _cmp_lt(space, w_elem, w_heap.getitem(0)):
+            w_heap.setitem(0, w_elem)
+            _siftup_max(space, w_heap, 0)
+    w_heap.descr_sort(space)
+    return w_heap
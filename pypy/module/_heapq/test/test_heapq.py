@@ -0,0 +1,184 @@
+class AppTestHeapq(object):
+    spaceconfig = dict(usemodules=['_heapq'])
+
+    def setup_class(cls):
+        cls.w_check_invariant = cls.space.appexec([], """():
+            def check_invariant(heap):
+                for pos, item in enumerate(heap):
+                    if pos:
+                        parentpos = (pos - 1) >> 1
+                        assert heap[parentpos] <= item
+            return check_invariant
+        """)
+        cls.w_ints = cls.space.appexec([], """():
+            return [(i * 7919) % 1000 for i in range(200)]
+        """)
+        cls.w_floats = cls.space.appexec([], """():
+            return [((i * 7919) % 1000) / 7.0 for i in range(200)]
+        """)
+
+    def test_push_pop_ints(self):
+        import _heapq
+        data = self.ints
+        heap = []
+        for item in data:
+            _heapq.heappush(heap, item)
+            self.check_invariant(heap)
+        result = []
+        while heap:
+            result.append(_heapq.heappop(heap))
+            self.check_invariant(heap)
+        assert result == sorted(data)
+
+    def test_push_pop_floats(self):
+        import _heapq
+        data = self.floats
+        heap = []
+        for item in data:
+            _heapq.heappush(heap, item)
+        self.check_invariant(heap)
+        result = [_heapq.heappop(heap) for i in range(len(data))]
+        assert result == sorted(data)
+
+    def test_push_pop_objects(self):
+        import _heapq
+        data = [(5, 'e'), (1, 'a'), (3, 'c'), (2, 'b'), (4, 'd'), 2.5, 7L]
+        heap = []
+        for item in data:
+            _heapq.heappush(heap, item)
+            self.check_invariant(heap)
+        result = [_heapq.heappop(heap) for i in range(len(data))]
+        assert result == sorted(data)
+
+    def test_mixed_ints_and_floats(self):
+        import _heapq
+        heap = [1, 3, 5]
+        _heapq.heappush(heap, 2.5)
+        _heapq.heappush(heap, 0)
+        self.check_invariant(heap)
+        assert [_heapq.heappop(heap) for i in range(5)] == [0, 1, 2.5, 3, 5]
+
+    def test_heapify(self):
+        import _heapq
+        for size in range(30):
+            heap = self.floats[:size]
+            _heapq.heapify(heap)
+            self.check_invariant(heap)
+            heap = self.ints[:size]
+            _heapq.heapify(heap)
+            self.check_invariant(heap)
+            heap = [str(x) for x in self.ints[:size]]
+            _heapq.heapify(heap)
+            self.check_invariant(heap)
+
+    def test_heapreplace(self):
+        import _heapq
+        heap = [1, 2, 3]
+        assert _heapq.heapreplace(heap, 10) == 1
+        assert heap == [2, 10, 3]
+        assert _heapq.heapreplace(heap, 0) == 2
+        assert heap[0] == 0
+        raises(IndexError, _heapq.heapreplace, [], None)
+
+    def test_heappushpop(self):
+        import _heapq
+        heap = []
+        assert _heapq.heappushpop(heap, 10) == 10
+        assert heap == []
+        heap = [10.0]
+        assert _heapq.heappushpop(heap, 10.5) == 10.0
+        assert heap == [10.5]
+        assert _heapq.heappushpop(heap, 5.0) == 5.0
+        assert heap == [10.5]
+        heap = ['b']
+        assert _heapq.heappushpop(heap, 'c') == 'b'
+        assert heap == ['c']
+
+    def test_empty_heappop(self):
+        import _heapq
+        raises(IndexError, _heapq.heappop, [])
+
+    def test_non_list(self):
+        import _heapq
+        for f in (_heapq.heapify, _heapq.heappop):
+            raises(TypeError, f, (1, 2))
+            raises(TypeError, f, None)
+        for f in (_heapq.heappush, _heapq.heapreplace, _heapq.heappushpop):
+            raises(TypeError, f, (1, 2), 3)
+            raises(TypeError, f, None, 3)
+
+    def test_list_subclass(self):
+        import _heapq
+        class L(list):
+            pass
+        heap = L([5, 1, 3])
+        _heapq.heapify(heap)
+        assert _heapq.heappop(heap) == 1
+        _heapq.heappush(heap, 0)
+        assert list(heap) == [0, 5, 3]
+
+    def test_lt_and_le(self):
+        import _heapq
+        class LtOnly(object):
+            def __init__(self, x):
+                self.x = x
+            def __lt__(self, other):
+                return self.x < other.x
+        class LeOnly:
+            def __init__(self, x):
+                self.x = x
+            def __le__(self, other):
+                return self.x <= other.x
+        for cls in (LtOnly, LeOnly):
+            data = [cls(x) for x in [4, 1, 3, 2]]
+            _heapq.heapify(data)
+            assert [_heapq.heappop(data).x for i in range(4)] == [1, 2, 3, 4]
+
+    def test_comparison_error(self):
+        import _heapq
+        class E(object):
+            def __lt__(self, other):
+                raise ZeroDivisionError
+        heap = [E(), E(), E()]
+        raises(ZeroDivisionError, _heapq.heapify, heap)
+        raises(ZeroDivisionError, _heapq.heappush, heap, E())
+
+    def test_changed_size(self):
+        import _heapq
+        heap = []
+        class Evil(object):
+            def __lt__(self, other):
+                del heap[:]
+                return True
+        heap.extend([Evil(), Evil(), Evil()])
+        raises(RuntimeError, _heapq.heappush, heap, Evil())
+        heap.extend([Evil(), Evil(), Evil()])
+        raises(RuntimeError, _heapq.heapify, heap)
+
+    def test_nlargest_nsmallest(self):
+        import _heapq
+        for data in (self.ints[:100], self.floats[:100],
+                     [str(x) for x in self.ints[:100]],
+                     [[1, 2.5, 3L][x % 3] for x in self.ints[:100]]):
+            for n in (0, 1, 2, 10, 100, 200):
+                assert _heapq.nsmallest(n, data) == sorted(data)[:n]
+                assert _heapq.nlargest(n, data) == sorted(data,
+                                                          reverse=True)[:n]
+                assert _heapq.nsmallest(n, iter(data)) == sorted(data)[:n]
+                assert _heapq.nlargest(n, iter(data)) == sorted(data,
+                                                        reverse=True)[:n]
+            assert _heapq.nsmallest(-1, data) == []
+            assert _heapq.nlargest(-1, data) == []
+
+    def test_nlargest_does_not_modify(self):
+        import _heapq
+        data = [5, 1, 4, 2, 3]
+        assert _heapq.nlargest(2, data) == [5, 4]
+        assert _heapq.nsmallest(2, data) == [1, 2]
+        assert data == [5, 1, 4, 2, 3]
+
+    def test_heapq_module(self):
+        import heapq, _heapq
+        assert heapq.heappush is _heapq.heappush
+        assert heapq.nlargest(3, [1, 5, 2, 4], key=lambda x: -x) == [1, 2, 4]
+        assert list(heapq.merge([1, 3, 5], [2, 4])) == [1, 2, 3, 4, 5]
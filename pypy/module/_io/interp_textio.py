@@ -6,6 +6,8 @@ from pypy.interpreter.gateway import WrappedDefault, interp2app, unwrap_spec
 from pypy.interpreter.typedef import (
     GetSetProperty, TypeDef, generic_new_descr, interp_attrproperty,
     interp_attrproperty_w)
+from pypy.interpreter.unicodehelper import (
+    str_decode_ascii, str_decode_latin_1, str_decode_utf8)
 from pypy.module._codecs import interp_codecs
 from pypy.module._io.interp_iobase import W_IOBase, convert_size, trap_eintr
 from rpython.rlib.rarithmetic import intmask, r_uint, r_ulonglong
@@ -13,7 +15,7 @@ from rpython.rlib.rbigint import rbigint
 from rpython.rlib.rstring import StringBuilder
 from rpython.rlib.rutf8 import (check_utf8, next_codepoint_pos,
                                 codepoints_in_utf8, codepoints_in_utf8,
-                                Utf8StringBuilder)
+                                Utf8StringBuilder, CheckError)
 
 
 STATE_ZERO, STATE_OK, STATE_DETACHED = range(3)
@@ -25,10 +27,44 @@ SEEN_ALL  = SEEN_CR | SEEN_LF | SEEN_CRLF
 
 _WINDOWS = sys.platform == 'win32'
 
+# the codecs that W_IncrementalNewlineDecoder can decode by itself
+FASTCODEC_NONE, FASTCODEC_UTF8, FASTCODEC_LATIN1, FASTCODEC_ASCII = range(4)
+FASTCODECS = {'utf-8': FASTCODEC_UTF8,
+              'iso8859-1': FASTCODEC_LATIN1,
+              'ascii': FASTCODEC_ASCII}
+
+def _incomplete_utf8_tail(s):
+    """Return the number of bytes at the end of 's' that are the start of
+    a utf-8 sequence, which is completed by the next bytes of input."""
+    end = len(s)
+    i = end - 1
+    while i >= 0 and i >= end - 3:
+        ch = ord(s[i])
+        if ch < 0x80:
+            break
+        if ch >= 0xC0:
+            if ch >= 0xF0:
+                n = 4
+            elif ch >= 0xE0:
+                n = 3
+            else:
+                n = 2
+            if end - i < n:
+                return end - i
+            break
+        i -= 1
+    return 0
+
 class W_IncrementalNewlineDecoder(W_Root):
     seennl = 0
     pendingcr = False
     w_decoder = None
+    # when fastcodec is set, the input is decoded here without calling
+    # w_decoder, and 'pending' holds the bytes of an incomplete utf-8
+    # sequence instead of w_decoder's state.
+    fastcodec = FASTCODEC_NONE
+    pending = ''
+    errors = 'strict'
 
     def __init__(self, space):
         self.w_newlines_dict = {
@@ -61,6 +97,55 @@ class W_IncrementalNewlineDecoder(W_Root):
 
         self.seennl = 0
 
+    def set_fastcodec(self, fastcodec, errors):
+        self.fastcodec = fastcodec
+        self.errors = errors
+        self.pending = ''
+
+    def _fast_decode(self, space, input, final):
+        # returns (utf8, length)
+        state = space.fromcache(interp_codecs.CodecState)
+        if self.fastcodec == FASTCODEC_UTF8:
+            if self.pending:
+                input = self.pending + input
+                self.pending = ''
+            end = len(input)
+            if not final:
+                end -= _incomplete_utf8_tail(input)
+                assert end >= 0
+            head = input
+            if end < len(input):
+                head = input[:end]
+            try:
+                lgt = check_utf8(head, True)
+            except CheckError:
+                pass
+            else:
+                self.pending = input[end:]
+                return head, lgt
+            # invalid bytes: decode all the input with the error handler,
+            # including the incomplete sequence at its end, if any
+            output, consumed, lgt = str_decode_utf8(
+                input, self.errors, final, state.decode_error_handler)
+            if consumed < len(input):
+                assert consumed >= 0
+                self.pending = input[consumed:]
+            return output, lgt
+        elif self.fastcodec == FASTCODEC_LATIN1:
+            output, _, lgt = str_decode_latin_1(
+                input, self.errors, final, state.decode_error_handler)
+            return output, lgt
+        else:
+            output, _, lgt = str_decode_ascii(
+                input, self.errors, final, state.decode_error_handler)
+            return output, lgt
+
+    def decode_bytes(self, space, input, final):
+        """Fast version of decode(), which doesn't call the w_decoder.
+        Only valid if fastcodec is set.  Returns (utf8, length)."""
+        output, output_len = self._fast_decode(space, input, final)
+        return self._translate(output, output_len, final)
+
     def newlines_get_w(self, space):
         return self.w_newlines_dict.get(self.seennl, space.w_None)
 
@@ -70,6 +155,11 @@ class W_IncrementalNewlineDecoder(W_Root):
             raise oefmt(space.w_ValueError,
                         "IncrementalNewlineDecoder.__init__ not called")
 
+        if self.fastcodec != FASTCODEC_NONE:
+            output, lgt = self.decode_bytes(space, space.bytes_w(w_input),
+                                            bool(final))
+            return space.newutf8(output, lgt)
+
         # decode input (with the eventual \r from a previous pass)
         if not space.is_w(self.w_decoder, space.w_None):
             w_output = space.call_method(self.w_decoder, "decode",
@@ -82,15 +172,19 @@ class W_IncrementalNewlineDecoder(W_Root):
                         "decoder should return a string result")
 
         output, output_len = space.utf8_len_w(w_output)
-        output_len = len(output)
-        if self.pendingcr and (final or output_len):
+        output, lgt = self._translate(output, output_len, final)
+        return space.newutf8(output, lgt)
+
+    def _translate(self, output, output_len, final):
+        # returns (utf8, length)
+        if self.pendingcr and (final or len(output) > 0):
             output = '\r' + output
             self.pendingcr = False
             output_len += 1
 
         # retain last \r even when not translating data:
         # then readline() is sure to get \r\n in one pass
-        if not final and output_len > 0:
+        if not final and len(output) > 0:
             last = len(output) - 1
             assert last >= 0
             if output[last] == '\r':
@@ -98,8 +192,8 @@ class W_IncrementalNewlineDecoder(W_Root):
                 self.pendingcr = True
                 output_len -= 1
 
-        if output_len == 0:
-            return space.newutf8("", 0)
+        if len(output) == 0:
+            return "", 0
 
         # Record which newlines are read and do newline translation if
         # desired, all in one pass.
@@ -131,7 +225,7 @@ class W_IncrementalNewlineDecoder(W_Root):
             # Translate!
             builder = StringBuilder(len(output))
             i = 0
-            while i < output_len:
+            while i < len(output):
                 c = output[i]
                 i += 1
                 if c == '\n':
@@ -139,6 +233,7 @@ class W_IncrementalNewlineDecoder(W_Root):
                 elif c == '\r':
                     if i < len(output) and output[i] == '\n':
                         seennl |= SEEN_CRLF
+                        output_len -= 1
                         i += 1
                     else:
                         seennl |= SEEN_CR
@@ -148,16 +243,30 @@ class W_IncrementalNewlineDecoder(W_Root):
             output = builder.build()
 
         self.seennl |= seennl
-        lgt = check_utf8(output, True)
-        return space.newutf8(output, lgt)
+        return output, output_len
 
     def reset_w(self, space):
         self.seennl = 0
         self.pendingcr = False
+        self.pending = ''
+        if self.fastcodec != FASTCODEC_NONE:
+            return
         if self.w_decoder and not space.is_w(self.w_decoder, space.w_None):
             space.call_method(self.w_decoder, "reset")
 
+    def getstate(self):
+        """Fast version of getstate(), only valid if fastcodec is set.
+        Returns (buffer, flag)."""
+        flag = 0
+        if self.pendingcr:
+            flag = 1
+        return self.pending, flag
+
     def getstate_w(self, space):
+        if self.fastcodec != FASTCODEC_NONE:
+            buffer, flag = self.getstate()
+            return space.newtuple([space.newbytes(buffer),
+                                   space.newint(flag)])
         if self.w_decoder and not space.is_w(self.w_decoder, space.w_None):
             w_state = space.call_method(self.w_decoder, "getstate")
             w_buffer, w_flag = space.unpackiterable(w_state, 2)
@@ -176,7 +285,9 @@ class W_IncrementalNewlineDecoder(W_Root):
         self.pendingcr = bool(flag & 1)
         flag >>= 1
 
-        if self.w_decoder and not space.is_w(self.w_decoder, space.w_None):
+        if self.fastcodec != FASTCODEC_NONE:
+            self.pending = space.bytes_w(w_buffer)
+        elif self.w_decoder and not space.is_w(self.w_decoder, space.w_None):
             w_state = space.newtuple([w_buffer, space.newint(flag)])
             space.call_method(self.w_decoder, "setstate", w_state)
 
@@ -309,6 +420,12 @@ class DecodeBuffer(object):
         self.pos = 0
         self.upos = 0
 
+    def set_utf8(self, text, ulen):
+        self.text = text
+        self.ulen = ulen
+        self.pos = 0
+        self.upos = 0
+
     def reset(self):
         self.text = None
         self.pos = 0
@@ -444,9 +561,20 @@ class DecodeBuffer(object):
                 return False
 
         if limit < 0:
-            limit = sys.maxint
-        # XXX it might be better to search for the marker quickly, then compute
-        # the new upos afterwards.
+            # the marker cannot be part of a larger char: search for it
+            # quickly, then count the chars that were skipped
+            start = self.pos
+            assert start >= 0
+            pos = self.text.find(marker, start)
+            if pos >= 0:
+                end = pos + 1
+                found = True
+            else:
+                end = len(self.text)
+                found = False
+            self.upos += codepoints_in_utf8(self.text, start, end)
+            self.pos = end
+            return found
         scanned = 0
         while scanned < limit:
             # don't use next_char here, since that computes a slice etc
@@ -493,6 +621,8 @@ class W_TextIOWrapper(W_TextIOBase):
         self.encoding_start_of_stream = False # Whether or not it's the start
                                               # of the stream
         self.snapshot = None
+        self.fastdecoder = None # the W_IncrementalNewlineDecoder if it
+                                # decodes by itself (see _read_chunk)
 
     @unwrap_spec(encoding="text_or_none", line_buffering=int)
     def descr_init(self, space, w_buffer, encoding=None,
@@ -530,6 +660,7 @@ class W_TextIOWrapper(W_TextIOBase):
             self.writenl = None
 
         # build the decoder object
+        self.fastdecoder = None
         if space.is_true(space.call_method(w_buffer, "readable")):
             w_codec = interp_codecs.lookup_codec(space,
                                                  space.text_w(self.w_encoding))
@@ -539,6 +670,7 @@ class W_TextIOWrapper(W_TextIOBase):
                 self.w_decoder = space.call_function(
                     space.gettypeobject(W_IncrementalNewlineDecoder.typedef),
                     self.w_decoder, space.newbool(self.readtranslate))
+                self._init_fastdecoder(space, w_codec)
 
         # build the encoder object
         if space.is_true(space.call_method(w_buffer, "writable")):
@@ -560,6 +692,21 @@ class W_TextIOWrapper(W_TextIOBase):
 
         self.state = STATE_OK
 
+    def _init_fastdecoder(self, space, w_codec):
+        # utf-8, latin-1 and ascii are decoded directly by the
+        # newline decoder, without calling the codec's incremental decoder
+        w_name = space.findattr(w_codec, space.newtext("name"))
+        if w_name is None or not space.isinstance_w(w_name, space.w_text):
+            return
+        if not space.isinstance_w(self.w_errors, space.w_text):
+            return
+        fastcodec = FASTCODECS.get(space.text_w(w_name), FASTCODEC_NONE)
+        if fastcodec == FASTCODEC_NONE:
+            return
+        decoder = space.interp_w(W_IncrementalNewlineDecoder, self.w_decoder)
+        decoder.set_fastcodec(fastcodec, space.text_w(self.w_errors))
+        self.fastdecoder = decoder
+
     def _check_init(self, space):
         if self.state == STATE_ZERO:
             raise oefmt(space.w_ValueError,
@@ -658,6 +805,9 @@ class W_TextIOWrapper(W_TextIOBase):
         if not self.w_decoder:
             raise oefmt(space.w_IOError, "not readable")
 
+        if self.fastdecoder is not None:
+            return self._read_chunk_fast(space, self.fastdecoder)
+
         if self.telling:
             # To prepare for tell(), we need to snapshot a point in the file
             # where the decoder's input buffer is empty.
@@ -695,6 +845,34 @@ class W_TextIOWrapper(W_TextIOBase):
 
         return not eof
 
+    def _read_chunk_fast(self, space, decoder):
+        # Same as _read_chunk(), but without any app-level call to the
+        # decoder: the bytes read are decoded and checked in one pass.
+        if self.telling:
+            dec_buffer, dec_flags = decoder.getstate()
+        else:
+            dec_buffer = None
+            dec_flags = 0
+
+        w_input = space.call_method(self.w_buffer, "read1",
+                                    space.newint(self.chunk_size))
+        if not space.isinstance_w(w_input, space.w_bytes):
+            msg = "decoder getstate() should have returned a bytes " \
+                  "object not '%T'"
+            raise oefmt(space.w_TypeError, msg, w_input)
+
+        input = space.bytes_w(w_input)
+        eof = len(input) == 0
+        text, ulen = decoder.decode_bytes(space, input, eof)
+        self.decoded.set_utf8(text, ulen)
+        if ulen > 0:
+            eof = False
+
+        if self.telling:
+            self.snapshot = PositionSnapshot(dec_flags, dec_buffer + input)
+
+        return not eof
+
     def _ensure_data(self, space):
         while not self.decoded.has_data():
             try:
@@ -712,6 +890,15 @@ class W_TextIOWrapper(W_TextIOBase):
         self._check_attached(space)
         self.telling = False
         try:
+            if space.type(self) is space.gettypeobject(
+                    W_TextIOWrapper.typedef):
+                # readline() is not overridden, call it directly
+                self._check_closed(space)
+                self._writeflush(space)
+                text, lgt = self._readline(space, -1)
+                if lgt == 0:
+                    raise OperationError(space.w_StopIteration, space.w_None)
+                return space.newutf8(text, lgt)
             return W_TextIOBase.next_w(self, space)
         except OperationError as e:
             if e.match(space, space.w_StopIteration):
@@ -752,15 +939,14 @@ class W_TextIOWrapper(W_TextIOBase):
         return space.newutf8(builder.build(), builder.getlength())
 
     def _scan_line_ending(self, limit):
-        if self.readuniversal:
+        if self.readtranslate:
+            # Newlines are already translated, only search for \n
+            return self.decoded.find_char('\n', limit)
+        elif self.readuniversal:
             return self.decoded.find_newline_universal(limit)
         else:
-            if self.readtranslate:
-                # Newlines are already translated, only search for \n
-                newline = '\n'
-            else:
-                # Non-universal mode.
-                newline = self.readnl
+            # Non-universal mode.
+            newline = self.readnl
             if newline == '\r\n':
                 return self.decoded.find_crlf(limit)
             else:
@@ -816,6 +1002,11 @@ class W_TextIOWrapper(W_TextIOBase):
             found = self._scan_line_ending(remaining)
             end_scan = self.decoded.pos
             uend_scan = self.decoded.upos
+            if found and builder.getlength() == 0:
+                # the whole line is in the decoded chunk: no need to copy
+                # it into the builder first
+                assert end_scan >= 0
+                return (self.decoded.text[start:end_scan], uend_scan - ustart)
             if end_scan > start:
                 builder.append_utf8_slice(self.decoded.text, start, end_scan, uend_scan - ustart)
 
@@ -1020,6 +1211,7 @@ class W_TextIOWrapper(W_TextIOBase):
                             "can't restore logical file position")
             self.decoded.set(space, w_decoded)
             self.decoded.pos = w_decoded._index_to_byte(cookie.chars_to_skip)
+            self.decoded.upos = cookie.chars_to_skip
         else:
             self.snapshot = PositionSnapshot(cookie.dec_flags, "")
 
@@ -369,3 +369,71 @@ def test_newlines2():
     for ch in msg:
         decoded += decoder.decode(ch)
     assert set(decoder.newlines) == {"\r", "\n", "\r\n"}
+
+def test_fast_decoding_lines():
+    lines = [u"h\xe9llo\n", u"€" * 3000 + u"\n", u"\U0001f600 x\r\n",
+             u"a\rb\n", u"last"]
+    text = u"".join(lines)
+    for encoding in ["utf-8", "latin-1", "ascii"]:
+        try:
+            data = text.encode(encoding)
+        except UnicodeEncodeError:
+            data = text.encode(encoding, "replace")
+        expected = data.decode(encoding).replace(u"\r\n", u"\n")
+        expected = expected.replace(u"\r", u"\n")
+        for chunk_size in [1, 2, 3, 5, 8192]:
+            t = _io.TextIOWrapper(_io.BytesIO(data), encoding=encoding)
+            t._CHUNK_SIZE = chunk_size
+            assert u"".join(list(t)) == expected
+            t = _io.TextIOWrapper(_io.BytesIO(data), encoding=encoding,
+                                  newline="")
+            t._CHUNK_SIZE = chunk_size
+            assert u"".join(list(t)) == data.decode(encoding)
+    t = _io.TextIOWrapper(_io.BytesIO(b"a\nb\xff\n"), encoding="ascii")
+    raises(UnicodeDecodeError, t.readline)
+    t = _io.TextIOWrapper(_io.BytesIO(b"a\nb\xff\n"), encoding="utf-8",
+                          errors="replace")
+    assert list(t) == [u"a\n", u"b�\n"]
+    data = b"abc\xff\xe2\x82\xacdef\n"
+    for errors in ["replace", "ignore"]:
+        for chunk_size in [1, 2, 3, 4, 5, 6, 7, 100]:
+            t = _io.TextIOWrapper(_io.BytesIO(data), encoding="utf-8",
+                                  errors=errors)
+            t._CHUNK_SIZE = chunk_size
+            assert u"".join(t) == data.decode("utf-8", errors)
+    t = _io.TextIOWrapper(_io.BytesIO(b"a\xe2\x82"), encoding="utf-8")
+    raises(UnicodeDecodeError, t.read, 3)
+
+def test_fast_decoding_tell_seek():
+    data = u"\xe9t\xe9\n€\n\r\nx\U0001f600\ny".encode("utf-8")
+    for chunk_size in [1, 2, 3, 4, 100]:
+        t = _io.TextIOWrapper(_io.BytesIO(data), encoding="utf-8")
+        t._CHUNK_SIZE = chunk_size
+        positions = []
+        while True:
+            positions.append(t.tell())
+            line = t.readline()
+            if not line:
+                break
+        lines = data.decode("utf-8").replace(u"\r\n", u"\n").splitlines(True)
+        for pos, line in zip(positions, lines):
+            t.seek(pos)
+            assert t.readline() == line
+        t.seek(0)
+        assert t.read(2) == u"\xe9t"
+        pos = t.tell()
+        assert t.read(3) == u"\xe9\n€"
+        t.seek(pos)
+        assert t.read() == data.decode("utf-8")[2:].replace(u"\r\n", u"\n")
+    t.__init__(_io.BytesIO(b"a\r\nb\rc"), encoding="utf-8", newline="\r")
+    assert list(t) == [u"a\r", u"\nb\r", u"c"]
+
+def test_seek_skip_chars_then_read():
+    # the cookie returned by tell() must skip the "\n" which is decoded
+    # together with the "b"
+    t = _io.TextIOWrapper(_io.BytesIO(b"a\rb\xc3\xa9d"), encoding="utf-8")
+    assert t.read(2) == u"a\n"
+    pos = t.tell()
+    t.seek(0)
+    t.seek(pos)
+    assert t.read() == u"b\xe9d"
@@ -2,8 +2,10 @@ import py
 
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.executioncontext import PeriodicAsyncAction
 from pypy.interpreter.function import Method, Function
 from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.pycode import PyCode
 from pypy.interpreter.typedef import (TypeDef, GetSetProperty,
                                       interp_attrproperty)
 from rpython.rlib import jit
@@ -13,6 +15,7 @@ from rpython.rtyper.lltypesystem import rffi, lltype
 from rpython.translator.tool.cbuild import ExternalCompilationInfo
 from rpython.translator import cdir
 from rpython.rlib.rarithmetic import r_longlong
+from rpython.rlib.rvmprof import traceback as rvmprof_traceback
 
 import time, sys
 
@@ -30,6 +33,8 @@ c_teardown_profiling = rffi.llexternal('pypy_teardown_profiling',
                                        [], lltype.Void,
                                        compilation_info = eci)
 
+MAX_SAMPLE_DEPTH = 1000
+
 if _is_64_bit:
     timer_size_int = int
 else:
@@ -121,6 +126,7 @@ class ProfilerSubEntry(object):
         self.callcount = 0
         self.recursivecallcount = 0
         self.recursionLevel = 0
+        self.last_sample = 0
 
     def stats(self, space, parent, factor):
         w_sse = W_StatsSubEntry(space, self.frame,
@@ -141,6 +147,19 @@ class ProfilerSubEntry(object):
         self.ll_it += it
         self.callcount += 1
 
+    def _add_sample(self, sample_number, weight, innermost):
+        # in sampling mode, 'callcount' counts the times the function was
+        # seen on the sampled stacks, and 'recursivecallcount' the times
+        # it was seen again in the same sample
+        self.callcount += 1
+        if self.last_sample != sample_number:
+            self.last_sample = sample_number
+            self.ll_tt += weight
+        else:
+            self.recursivecallcount += 1
+        if innermost:
+            self.ll_it += weight
+
 class ProfilerEntry(ProfilerSubEntry):
     def __init__(self, frame):
         ProfilerSubEntry.__init__(self, frame)
@@ -273,6 +292,43 @@ def prepare_spec(space, w_arg):
     else:
         return (None, space.type(w_arg))
 
+class SamplingAction(PeriodicAsyncAction):
+    """Takes the samples of the Profilers created with a sample_interval.
+    Runs every sys.getcheckinterval() bytecodes.
+    """
+    def __init__(self, space):
+        PeriodicAsyncAction.__init__(self, space)
+        self.profilers = []
+
+    def perform(self, executioncontext, frame):
+        if self.profilers:
+            self._take_samples(executioncontext)
+
+    @jit.dont_look_inside
+    def _take_samples(self, executioncontext):
+        now = time.time()
+        for w_profiler in self.profilers:
+            # a Profiler only looks at the thread that enabled it, like the
+            # non-sampling mode
+            if (executioncontext is w_profiler.ec and
+                    now >= w_profiler.next_sample_time):
+                w_profiler._take_sample(executioncontext, now)
+
+
+class VmprofSample(object):
+    """The entries of one sample, collected by add_vmprof_entry()."""
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.entries = []
+
+def add_vmprof_entry(code, loc, sample):
+    # called by walk_traceback() for every frame, innermost first.  'code'
+    # is None if vmprof doesn't know the code object: the ones created
+    # while vmprof itself is enabled are not in PyCode._vmprof_weak_list
+    if code is not None:
+        sample.entries.append(sample.profiler._get_or_make_entry(code))
+
+
 def lsprof_call(space, w_self, frame, event, w_arg):
     assert isinstance(w_self, W_Profiler)
     if event == 'call':
@@ -293,7 +349,8 @@ def lsprof_call(space, w_self, frame, event, w_arg):
 
 
 class W_Profiler(W_Root):
-    def __init__(self, space, w_callable, time_unit, subcalls, builtins):
+    def __init__(self, space, w_callable, time_unit, subcalls, builtins,
+                 sample_interval=0.0):
         self.subcalls = subcalls
         self.builtins = builtins
         self.current_context = None
@@ -305,6 +362,13 @@ class W_Profiler(W_Root):
         self.is_enabled = False
         self.total_timestamp = r_longlong(0)
         self.total_real_time = 0.0
+        # sampling mode: instead of instrumenting all calls and returns,
+        # look at the stack every 'sample_interval' seconds
+        self.sample_interval = sample_interval
+        self.next_sample_time = 0.0
+        self.ll_last_sample = timer_size_int(0)
+        self.sample_number = 0
+        self.ec = None
 
     def ll_timer(self):
         if self.w_callable:
@@ -334,8 +398,14 @@ class W_Profiler(W_Root):
         self.is_enabled = True
         self.total_real_time -= time.time()
         self.total_timestamp -= read_timestamp()
-        # set profiler hook
         c_setup_profiling()
+        if self.sample_interval > 0.0:
+            self.next_sample_time = time.time() + self.sample_interval
+            self.ll_last_sample = self.ll_timer()
+            self.ec = space.getexecutioncontext()
+            space.fromcache(SamplingAction).profilers.append(self)
+            return
+        # set profiler hook
         space.getexecutioncontext().setllprofile(lsprof_call, self)
 
     @jit.elidable
@@ -416,11 +486,59 @@ class W_Profiler(W_Root):
         self.is_enabled = False
         self.total_timestamp += read_timestamp()
         self.total_real_time += time.time()
+        if self.sample_interval > 0.0:
+            space.fromcache(SamplingAction).profilers.remove(self)
+            self.ec = None
+            c_teardown_profiling()
+            return
         # unset profiler hook
         space.getexecutioncontext().setllprofile(None, None)
         c_teardown_profiling()
         self._flush_unmatched()
 
+    @jit.dont_look_inside
+    def _take_sample(self, ec, now):
+        self.next_sample_time = now + self.sample_interval
+        # the time since the previous sample is attributed to the stack
+        # we see now
+        ll_now = self.ll_timer()
+        weight = ll_now - self.ll_last_sample
+        self.ll_last_sample = ll_now
+        if self.space.config.objspace.usemodules._vmprof:
+            entries = self._get_vmprof_stack()
+        else:
+            entries = self._get_frame_stack(ec)
+        self.sample_number += 1
+        callee = None
+        for entry in entries:
+            entry._add_sample(self.sample_number, weight, callee is None)
+            if callee is not None and self.subcalls:
+                subentry = entry._get_or_make_subentry(callee)
+                subentry._add_sample(self.sample_number, weight,
+                                     callee is entries[0])
+            callee = entry
+
+    def _get_frame_stack(self, ec):
+        # returns the entries of the frames, innermost first
+        entries = []
+        frame = ec.gettopframe_nohidden()
+        while frame is not None:
+            entries.append(self._get_or_make_entry(frame.getcode()))
+            frame = ec.getnextframe_nohidden(frame)
+        return entries
+
+    def _get_vmprof_stack(self):
+        # same as _get_frame_stack(), but reads the stack maintained for
+        # vmprof, which doesn't force the frames of JIT-compiled code
+        sample = VmprofSample(self)
+        array_p, array_length = rvmprof_traceback.traceback(MAX_SAMPLE_DEPTH)
+        if not array_p:
+            return sample.entries
+        rvmprof_traceback.walk_traceback(PyCode, add_vmprof_entry, sample,
+                                         array_p, array_length)
+        lltype.free(array_p, flavor='raw')
+        return sample.entries
+
     def getstats(self, space):
         if self.w_callable is None:
             if self.is_enabled:
@@ -438,11 +556,13 @@ class W_Profiler(W_Root):
         return stats(space, self.data.values() + self.builtin_data.values(),
                      factor)
 
-@unwrap_spec(time_unit=float, subcalls=bool, builtins=bool)
+@unwrap_spec(time_unit=float, subcalls=bool, builtins=bool,
+             sample_interval=float)
 def descr_new_profile(space, w_type, w_callable=None, time_unit=0.0,
-                      subcalls=True, builtins=True):
+                      subcalls=True, builtins=True, sample_interval=0.0):
     p = space.allocate_instance(W_Profiler, w_type)
-    p.__init__(space, w_callable, time_unit, subcalls, builtins)
+    p.__init__(space, w_callable, time_unit, subcalls, builtins,
+               sample_interval)
     return p
 
 W_Profiler.typedef = TypeDef(
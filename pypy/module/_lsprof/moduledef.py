@@ -8,3 +8,13 @@ class Module(MixedModule):
     interpleveldefs = {'Profiler':'interp_lsprof.W_Profiler'}
 
     appleveldefs = {}
+
+    def __init__(self, space, *args):
+        "NOT_RPYTHON"
+        from pypy.module._lsprof import interp_lsprof
+        MixedModule.__init__(self, space, *args)
+        # the samples of the Profilers with a sample_interval are taken
+        # by a periodic action
+        space.actionflag.register_periodic_action(
+            space.fromcache(interp_lsprof.SamplingAction),
+            use_bytecode_counter=True)
@@ -1,6 +1,6 @@
 class AppTestCProfile(object):
     spaceconfig = {
-        "usemodules": ['_lsprof', 'time'],
+        "usemodules": ['_lsprof', 'time', 'thread'],
     }
 
     def setup_class(cls):
@@ -153,6 +153,76 @@ class AppTestCProfile(object):
             assert 0.9 < subentry.totaltime < 2.9
             #assert 0.9 < subentry.inlinetime < 2.9
 
+    def test_sampling(self):
+        import _lsprof, time, sys
+        prof = _lsprof.Profiler(sample_interval=0.01)
+        def foo(n):
+            t = time.time()
+            while abs(t - time.time()) < 0.5:
+                pass      # busy-wait for 0.5 second
+        def bar(n):
+            foo(n)
+        old = sys.getcheckinterval()
+        sys.setcheckinterval(10)
+        try:
+            prof.enable()
+            bar(0)
+            prof.disable()
+        finally:
+            sys.setcheckinterval(old)
+        stats = prof.getstats()
+        entries = {}
+        for entry in stats:
+            entries[entry.code] = entry
+        efoo = entries[foo.__code__]
+        ebar = entries[bar.__code__]
+        # the callcounts are the number of samples
+        assert efoo.callcount > 5
+        assert efoo.reccallcount == 0
+        assert ebar.callcount >= efoo.callcount
+        assert 0.3 < efoo.totaltime < 2.9
+        assert efoo.inlinetime == efoo.totaltime
+        assert ebar.totaltime >= efoo.totaltime
+        assert ebar.inlinetime < efoo.totaltime
+        assert efoo.calls is None
+        subentry, = ebar.calls
+        assert subentry.code is foo.__code__
+        assert subentry.callcount == efoo.callcount
+        assert subentry.totaltime == efoo.totaltime
+        # no more samples after disable()
+        bar(0)
+        assert prof.getstats()[0].callcount == stats[0].callcount
+
+    def test_sampling_other_thread(self):
+        import _lsprof, time, sys, thread
+        prof = _lsprof.Profiler(sample_interval=0.01)
+        def busy(seconds):
+            t = time.time()
+            while abs(t - time.time()) < seconds:
+                pass
+        def other():
+            try:
+                busy(0.5)
+            finally:
+                done.append(1)
+        def foo():
+            while not done:
+                busy(0.05)
+        done = []
+        old = sys.getcheckinterval()
+        sys.setcheckinterval(10)
+        try:
+            prof.enable()
+            thread.start_new_thread(other, ())
+            foo()
+            prof.disable()
+        finally:
+            sys.setcheckinterval(old)
+        codes = [entry.code for entry in prof.getstats()]
+        # only the thread that called enable() is sampled
+        assert foo.__code__ in codes
+        assert other.__code__ not in codes
+
     def test_builtin_exception(self):
         import math
         import _lsprof
@@ -166,3 +236,39 @@ class AppTestCProfile(object):
         prof.disable()
         stats = prof.getstats()
         assert len(stats) == 2
+
+
+class AppTestCProfileVmprof(object):
+    spaceconfig = {
+        "usemodules": ['_lsprof', 'time', '_vmprof'],
+    }
+
+    def test_sampling(self):
+        import _lsprof, time, sys
+        prof = _lsprof.Profiler(sample_interval=0.01)
+        def foo(n):
+            t = time.time()
+            while abs(t - time.time()) < 0.5:
+                pass      # busy-wait for 0.5 second
+        def bar(n):
+            foo(n)
+        old = sys.getcheckinterval()
+        sys.setcheckinterval(10)
+        try:
+            prof.enable()
+            bar(0)
+            prof.disable()
+        finally:
+            sys.setcheckinterval(old)
+        entries = {}
+        for entry in prof.getstats():
+            entries[entry.code] = entry
+        efoo = entries[foo.__code__]
+        ebar = entries[bar.__code__]
+        # untranslated, looking up the code objects of vmprof is slow:
+        # only a few samples are taken
+        assert efoo.callcount > 0
+        assert ebar.callcount >= efoo.callcount
+        assert 0.3 < efoo.totaltime
+        subentry, = ebar.calls
+        assert subentry.code is foo.__code__
@@ -77,15 +77,12 @@ class JSONDecoder(W_Root):
         self.space = space
         self.w_empty_string = space.newutf8("", 0)
 
-        self.s = s
+        # the total size of all the strings decoded so far, used to decide
+        # whether to use the string cache
+        self.input_size = 0
+        self.set_source(s)
 
-        # we put our string in a raw buffer so:
-        # 1) we automatically get the '\0' sentinel at the end of the string,
-        #    which means that we never have to check for the "end of string"
-        # 2) we can pass the buffer directly to strtod
-        self.ll_chars, self.llobj, self.flag = rffi.get_nonmovingbuffer_ll_final_null(self.s)
         self.end_ptr = lltype.malloc(rffi.CCHARPP.TO, 1, flavor='raw')
-        self.pos = 0
         self.intcache = space.fromcache(IntCache)
 
         # two caches, one for keys, one for general strings. they both have the
@@ -113,14 +110,34 @@ class JSONDecoder(W_Root):
         self.scratch = [[None] * self.DEFAULT_SIZE_SCRATCH]
 
 
-    def close(self):
+    def set_source(self, s):
+        """ Start decoding the string s. The caches and maps are kept, which
+        is what the streaming decoder relies on. The previous string must have
+        been released with close_source() before. """
+        self.s = s
+
+        # we put our string in a raw buffer so:
+        # 1) we automatically get the '\0' sentinel at the end of the string,
+        #    which means that we never have to check for the "end of string"
+        # 2) we can pass the buffer directly to strtod
+        self.ll_chars, self.llobj, self.flag = rffi.get_nonmovingbuffer_ll_final_null(self.s)
+        self.pos = 0
+        self.input_size += len(s)
+
+    def close_source(self):
         rffi.free_nonmovingbuffer_ll(self.ll_chars, self.llobj, self.flag)
-        lltype.free(self.end_ptr, flavor='raw')
+        self.ll_chars = lltype.nullptr(rffi.CCHARP.TO)
         # clean up objects that are instances of now blocked maps
         for w_obj in self.unclear_objects:
             jsonmap = self._get_jsonmap_from_dict(w_obj)
             if jsonmap.is_state_blocked():
                 self._devolve_jsonmap_dict(w_obj)
+        self.unclear_objects = []
+
+    def close(self):
+        if self.ll_chars:
+            self.close_source()
+        lltype.free(self.end_ptr, flavor='raw')
 
     def getslice(self, start, end):
         assert start >= 0
@@ -566,7 +583,7 @@ class JSONDecoder(W_Root):
             contextmap.decoded_strings += 1
             if not contextmap.should_cache_strings():
                 cache = False
-        if len(self.s) < self.MIN_SIZE_FOR_STRING_CACHE:
+        if self.input_size < self.MIN_SIZE_FOR_STRING_CACHE:
             cache = False
 
         if not cache:
@@ -994,6 +1011,9 @@ class JSONMap(MapBase):
         self.keys_in_order = None
         self.strategy_instance = None
 
+        # for the encoder
+        self.encoded_keys_in_order = None
+
     def __repr__(self):
         return "<JSONMap key_repr=%s #instantiation=%s #leaves=%s prev=%r>" % (
                 self.key_repr, self.instantiation_count, self.number_of_leaves, self.prev)
@@ -1154,6 +1174,24 @@ class JSONMap(MapBase):
                 keys_in_order[index] = w_key
         return keys_in_order
 
+    def get_encoded_keys_in_order(self):
+        """ Return the keys of the map as ascii-only JSON strings, including
+        the quotes. Computed once per map, so that the encoder does not need
+        to escape the same keys again for every object. """
+        from pypy.module._pypyjson.interp_encoder import escape_ascii_into
+        encoded_keys = self.encoded_keys_in_order
+        if encoded_keys is None:
+            keys_in_order = self.get_keys_in_order()
+            encoded_keys = [None] * len(keys_in_order)
+            for index, w_key in enumerate(keys_in_order):
+                sb = StringBuilder()
+                sb.append('"')
+                escape_ascii_into(sb, self.space.utf8_w(w_key), 0)
+                sb.append('"')
+                encoded_keys[index] = sb.build()
+            self.encoded_keys_in_order = encoded_keys
+        return encoded_keys
+
     # _____________________________________________________
 
     def _get_dot_text(self):
@@ -1192,3 +1230,36 @@ def loads(space, w_s):
     finally:
         decoder.close()
 
+
+@jit.dont_look_inside
+def loads_lines(space, w_s):
+    """ Decode newline-delimited JSON: return a list with the value of every
+    non-empty line. All lines are decoded by the same decoder, so the maps
+    and string caches are shared between them. """
+    if space.isinstance_w(w_s, space.w_unicode):
+        raise oefmt(space.w_TypeError,
+                    "Expected utf8-encoded str, got unicode")
+    s = space.bytes_w(w_s)
+    decoder = JSONDecoder(space, s)
+    values_w = []
+    try:
+        i = 0
+        while True:
+            i = decoder.skip_whitespace(i)
+            if i >= len(s):
+                break
+            values_w.append(decoder.decode_any(i))
+            i = decoder.pos
+            while is_whitespace(decoder.ll_chars[i]):
+                if decoder.ll_chars[i] == '\n':
+                    break
+                i += 1
+            if i >= len(s):
+                break
+            if decoder.ll_chars[i] != '\n':
+                raise oefmt(space.w_ValueError,
+                            "Extra data on line: char %d", i)
+            i += 1
+    finally:
+        decoder.close()
+    return space.newlist(values_w)
@@ -1,6 +1,15 @@
 from rpython.rlib.rstring import StringBuilder
-from rpython.rlib import rutf8
+from rpython.rlib import rutf8, jit
+from rpython.rlib.rfloat import isfinite
+from rpython.rlib.listsort import make_timsort_class
 from pypy.interpreter import unicodehelper
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.objspace.std.dictmultiobject import W_DictObject, UnicodeDictStrategy
+from pypy.objspace.std.floatobject import float2string
+from pypy.objspace.std.intobject import W_IntObject
+from pypy.objspace.std.jsondict import JsonDictStrategy
+from pypy.objspace.std.listobject import W_ListObject
 
 
 HEX = '0123456789abcdef'
@@ -16,35 +25,20 @@ ESCAPE_BEFORE_SPACE = [ESCAPE_DICT.get(chr(_i), '\\u%04x' % _i)
                        for _i in range(32)]
 
 
-def raw_encode_basestring_ascii(space, w_string):
-    if space.isinstance_w(w_string, space.w_bytes):
-        s = space.bytes_w(w_string)
-        for i in range(len(s)):
-            c = s[i]
-            if c >= ' ' and c <= '~' and c != '"' and c != '\\':
-                pass
-            else:
-                first = i
-                break
+def _first_char_to_escape(s):
+    """ Return the index of the first character of the byte string 's' that
+    cannot be copied verbatim into ascii-only JSON output, or -1. """
+    for i in range(len(s)):
+        c = s[i]
+        if c >= ' ' and c <= '~' and c != '"' and c != '\\':
+            pass
         else:
-            # the input is a string with only non-special ascii chars
-            return w_string
-
-        unicodehelper.check_utf8_or_raise(space, s)
-        sb = StringBuilder(len(s))
-        sb.append_slice(s, 0, first)
-    else:
-        # We used to check if 'u' contains only safe characters, and return
-        # 'w_string' directly.  But this requires an extra pass over all
-        # characters, and the expected use case of this function, from
-        # json.encoder, will anyway re-encode a unicode result back to
-        # a string (with the ascii encoding).  This requires two passes
-        # over the characters.  So we may as well directly turn it into a
-        # string here --- only one pass.
-        s = space.utf8_w(w_string)
-        sb = StringBuilder(len(s))
-        first = 0
+            return i
+    return -1
 
+def escape_ascii_into(sb, s, first):
+    """ Append the utf-8 string 's', starting at character 'first', to the
+    StringBuilder 'sb', escaping it to ascii-only JSON. """
     it = rutf8.Utf8StringIterator(s)
     for i in range(first):
         it.next()
@@ -77,5 +71,400 @@ def raw_encode_basestring_ascii(space, w_string):
                 sb.append(HEX[(s2 >> 4) & 0x0f])
                 sb.append(HEX[s2 & 0x0f])
 
+
+def raw_encode_basestring_ascii(space, w_string):
+    if space.isinstance_w(w_string, space.w_bytes):
+        s = space.bytes_w(w_string)
+        first = _first_char_to_escape(s)
+        if first < 0:
+            # the input is a string with only non-special ascii chars
+            return w_string
+
+        unicodehelper.check_utf8_or_raise(space, s)
+        sb = StringBuilder(len(s))
+        sb.append_slice(s, 0, first)
+    else:
+        # We used to check if 'u' contains only safe characters, and return
+        # 'w_string' directly.  But this requires an extra pass over all
+        # characters, and the expected use case of this function, from
+        # json.encoder, will anyway re-encode a unicode result back to
+        # a string (with the ascii encoding).  This requires two passes
+        # over the characters.  So we may as well directly turn it into a
+        # string here --- only one pass.
+        s = space.utf8_w(w_string)
+        sb = StringBuilder(len(s))
+        first = 0
+
+    escape_ascii_into(sb, s, first)
     res = sb.build()
     return space.newtext(res)
+
+
+class KeyValue(object):
+    """ A dict item whose key is already turned into a utf-8 string, used
+    for sort_keys=True """
+
+    def __init__(self, key, w_value):
+        self.key = key
+        self.w_value = w_value
+
+_KeyValueBaseTimSort = make_timsort_class()
+
+class KeyValueSort(_KeyValueBaseTimSort):
+    # comparing utf-8 encoded strings bytewise gives the same order as
+    # comparing the unicode strings by codepoint
+    def lt(self, a, b):
+        return a.key < b.key
+
+
+class JSONEncoder(object):
+    """ Interp-level version of json.JSONEncoder.encode() for the case
+    ensure_ascii=True, encoding='utf-8'. The whole output is written into a
+    single StringBuilder. Lists and dicts with a suitable strategy are
+    encoded directly from their unwrapped storage. """
+
+    def __init__(self, space, w_default, skipkeys, check_circular, allow_nan,
+                 sort_keys, indent, item_separator, key_separator):
+        self.space = space
+        self.w_default = w_default
+        self.skipkeys = skipkeys
+        self.allow_nan = allow_nan
+        self.sort_keys = sort_keys
+        # indent < 0 means no pretty-printing
+        self.indent = indent
+        self.item_separator = item_separator
+        self.key_separator = key_separator
+        self.check_circular = check_circular
+        # the containers that are currently being encoded, by identity
+        self.markers = {}
+        self.builder = StringBuilder()
+
+    def encode(self, w_obj):
+        self.encode_any(w_obj, 0)
+        return self.builder.build()
+
+    # _____________________________________________________
+    # helpers
+
+    def mark(self, w_obj):
+        if self.check_circular:
+            if w_obj in self.markers:
+                raise oefmt(self.space.w_ValueError,
+                            "Circular reference detected")
+            self.markers[w_obj] = None
+
+    def unmark(self, w_obj):
+        if self.check_circular:
+            del self.markers[w_obj]
+
+    def emit_indent(self, level):
+        """ Start a new nesting level. Returns the separator to use between
+        the items of the container. """
+        if self.indent < 0:
+            return self.item_separator
+        newline_indent = '\n' + ' ' * (self.indent * (level + 1))
+        self.builder.append(newline_indent)
+        return self.item_separator + newline_indent
+
+    def emit_unindent(self, level):
+        if self.indent >= 0:
+            self.builder.append('\n')
+            self.builder.append(' ' * (self.indent * level))
+
+    def floatstr(self, floatval):
+        if isfinite(floatval):
+            return float2string(floatval, 'r', 0)
+        if not self.allow_nan:
+            raise oefmt(self.space.w_ValueError,
+                        "Out of range float values are not JSON compliant: "
+                        "%s", float2string(floatval, 'r', 0))
+        if floatval != floatval:
+            return 'NaN'
+        elif floatval > 0.0:
+            return 'Infinity'
+        else:
+            return '-Infinity'
+
+    def intstr(self, w_obj):
+        if type(w_obj) is W_IntObject:
+            return str(w_obj.intval)
+        space = self.space
+        return space.text_w(space.str(w_obj))
+
+    def append_string(self, w_string):
+        space = self.space
+        if space.isinstance_w(w_string, space.w_bytes):
+            self.append_bytes_string(space.bytes_w(w_string))
+        else:
+            self.append_utf8_string(space.utf8_w(w_string))
+
+    def append_bytes_string(self, s):
+        sb = self.builder
+        sb.append('"')
+        first = _first_char_to_escape(s)
+        if first < 0:
+            sb.append(s)
+        else:
+            unicodehelper.check_utf8_or_raise(self.space, s)
+            sb.append_slice(s, 0, first)
+            escape_ascii_into(sb, s, first)
+        sb.append('"')
+
+    def append_utf8_string(self, s):
+        self.builder.append('"')
+        escape_ascii_into(self.builder, s, 0)
+        self.builder.append('"')
+
+    # _____________________________________________________
+    # encoding
+
+    def encode_any(self, w_obj, level):
+        space = self.space
+        if space.isinstance_w(w_obj, space.w_basestring):
+            self.append_string(w_obj)
+        elif space.is_w(w_obj, space.w_None):
+            self.builder.append('null')
+        elif space.is_w(w_obj, space.w_True):
+            self.builder.append('true')
+        elif space.is_w(w_obj, space.w_False):
+            self.builder.append('false')
+        elif (space.isinstance_w(w_obj, space.w_int) or
+              space.isinstance_w(w_obj, space.w_long)):
+            self.builder.append(self.intstr(w_obj))
+        elif space.isinstance_w(w_obj, space.w_float):
+            self.builder.append(self.floatstr(space.float_w(w_obj)))
+        elif (space.isinstance_w(w_obj, space.w_list) or
+              space.isinstance_w(w_obj, space.w_tuple)):
+            self.encode_list(w_obj, level)
+        elif space.isinstance_w(w_obj, space.w_dict):
+            self.encode_dict(w_obj, level)
+        else:
+            self.encode_default(w_obj, level)
+
+    def encode_default(self, w_obj, level):
+        space = self.space
+        if self.w_default is None:
+            raise oefmt(space.w_TypeError, "%R is not JSON serializable",
+                        w_obj)
+        self.mark(w_obj)
+        w_res = space.call_function(self.w_default, w_obj)
+        self.encode_any(w_res, level)
+        self.unmark(w_obj)
+
+    def encode_list(self, w_list, level):
+        space = self.space
+        if type(w_list) is W_ListObject:
+            if w_list.length() == 0:
+                self.builder.append('[]')
+                return
+            self.mark(w_list)
+            self.builder.append('[')
+            separator = self.emit_indent(level)
+            if not self._encode_list_unwrapped(w_list, separator):
+                self._encode_items(w_list.getitems(), separator, level + 1)
+        else:
+            items_w = space.listview(w_list)
+            if not items_w:
+                self.builder.append('[]')
+                return
+            self.mark(w_list)
+            self.builder.append('[')
+            separator = self.emit_indent(level)
+            self._encode_items(items_w, separator, level + 1)
+        self.emit_unindent(level)
+        self.builder.append(']')
+        self.unmark(w_list)
+
+    def _encode_list_unwrapped(self, w_list, separator):
+        """ Fast paths for lists using the int, float, bytes or ascii
+        strategies. Returns False if the strategy of the list is not
+        supported. """
+        sb = self.builder
+        intlist = w_list.getitems_int()
+        if intlist is not None:
+            for i in range(len(intlist)):
+                if i:
+                    sb.append(separator)
+                sb.append(str(intlist[i]))
+            return True
+        floatlist = w_list.getitems_float()
+        if floatlist is not None:
+            for i in range(len(floatlist)):
+                if i:
+                    sb.append(separator)
+                sb.append(self.floatstr(floatlist[i]))
+            return True
+        byteslist = w_list.getitems_bytes()
+        if byteslist is not None:
+            for i in range(len(byteslist)):
+                if i:
+                    sb.append(separator)
+                self.append_bytes_string(byteslist[i])
+            return True
+        asciilist = w_list.getitems_ascii()
+        if asciilist is not None:
+            for i in range(len(asciilist)):
+                if i:
+                    sb.append(separator)
+                self.append_utf8_string(asciilist[i])
+            return True
+        return False
+
+    def _encode_items(self, items_w, separator, level):
+        for i in range(len(items_w)):
+            if i:
+                self.builder.append(separator)
+            self.encode_any(items_w[i], level)
+
+    def encode_dict(self, w_dict, level):
+        space = self.space
+        if space.len_w(w_dict) == 0:
+            self.builder.append('{}')
+            return
+        self.mark(w_dict)
+        self.builder.append('{')
+        separator = self.emit_indent(level)
+        if type(w_dict) is W_DictObject:
+            strategy = w_dict.get_strategy()
+            if isinstance(strategy, JsonDictStrategy):
+                self._encode_dict_json(w_dict, strategy, separator, level + 1)
+            elif isinstance(strategy, UnicodeDictStrategy):
+                self._encode_dict_unicode(w_dict, strategy, separator,
+                                          level + 1)
+            else:
+                self._encode_dict_generic(w_dict, separator, level + 1)
+        else:
+            self._encode_dict_generic(w_dict, separator, level + 1)
+        self.emit_unindent(level)
+        self.builder.append('}')
+        self.unmark(w_dict)
+
+    def _encode_dict_json(self, w_dict, strategy, separator, level):
+        values_w = strategy.unerase(w_dict.dstorage)
+        jsonmap = strategy.jsonmap
+        if self.sort_keys:
+            keys_w = jsonmap.get_keys_in_order()
+            items = [None] * len(values_w)
+            for i in range(len(values_w)):
+                items[i] = KeyValue(self.space.utf8_w(keys_w[i]), values_w[i])
+            self._encode_sorted_items(items, separator, level)
+            return
+        encoded_keys = jsonmap.get_encoded_keys_in_order()
+        for i in range(len(values_w)):
+            if i:
+                self.builder.append(separator)
+            self.builder.append(encoded_keys[i])
+            self.builder.append(self.key_separator)
+            self.encode_any(values_w[i], level)
+
+    def _encode_dict_unicode(self, w_dict, strategy, separator, level):
+        space = self.space
+        d = strategy.unerase(w_dict.dstorage)
+        if self.sort_keys:
+            items = [None] * len(d)
+            i = 0
+            for w_key, w_value in d.iteritems():
+                items[i] = KeyValue(space.utf8_w(w_key), w_value)
+                i += 1
+            self._encode_sorted_items(items, separator, level)
+            return
+        first = True
+        for w_key, w_value in d.iteritems():
+            if first:
+                first = False
+            else:
+                self.builder.append(separator)
+            self.append_utf8_string(space.utf8_w(w_key))
+            self.builder.append(self.key_separator)
+            self.encode_any(w_value, level)
+
+    def _encode_sorted_items(self, items, separator, level):
+        KeyValueSort(items, len(items)).sort()
+        for i in range(len(items)):
+            if i:
+                self.builder.append(separator)
+            item = items[i]
+            self.append_utf8_string(item.key)
+            self.builder.append(self.key_separator)
+            self.encode_any(item.w_value, level)
+
+    def _encode_dict_generic(self, w_dict, separator, level):
+        space = self.space
+        if self.sort_keys:
+            w_items = space.call_method(w_dict, "items")
+            space.call_method(w_items, "sort")
+            first = True
+            for w_item in space.listview(w_items):
+                if self._encode_item(w_item, first, separator, level):
+                    first = False
+            return
+        w_iter = space.iter(space.call_method(w_dict, "iteritems"))
+        first = True
+        while True:
+            try:
+                w_item = space.next(w_iter)
+            except OperationError as e:
+                if not e.match(space, space.w_StopIteration):
+                    raise
+                break
+            if self._encode_item(w_item, first, separator, level):
+                first = False
+
+    def _encode_item(self, w_item, first, separator, level):
+        w_key, w_value = self.space.fixedview(w_item, 2)
+        if not self.append_key(w_key, first, separator):
+            return False
+        self.builder.append(self.key_separator)
+        self.encode_any(w_value, level)
+        return True
+
+    def append_key(self, w_key, first, separator):
+        """ Append the separator (unless 'first') and the key. Returns False
+        if the key was skipped. """
+        space = self.space
+        if space.isinstance_w(w_key, space.w_basestring):
+            key = None
+        elif space.isinstance_w(w_key, space.w_float):
+            key = self.floatstr(space.float_w(w_key))
+        elif space.is_w(w_key, space.w_True):
+            key = 'true'
+        elif space.is_w(w_key, space.w_False):
+            key = 'false'
+        elif space.is_w(w_key, space.w_None):
+            key = 'null'
+        elif (space.isinstance_w(w_key, space.w_int) or
+              space.isinstance_w(w_key, space.w_long)):
+            key = self.intstr(w_key)
+        elif self.skipkeys:
+            return False
+        else:
+            raise oefmt(space.w_TypeError, "key %R is not a string", w_key)
+        if not first:
+            self.builder.append(separator)
+        if key is None:
+            self.append_string(w_key)
+        else:
+            self.builder.append('"')
+            self.builder.append(key)
+            self.builder.append('"')
+        return True
+
+
+@unwrap_spec(skipkeys=bool, check_circular=bool, allow_nan=bool,
+             sort_keys=bool, item_separator='text', key_separator='text')
+@jit.dont_look_inside
+def encode(space, w_obj, w_default=None, skipkeys=False, check_circular=True,
+           allow_nan=True, sort_keys=False, w_indent=None,
+           item_separator=', ', key_separator=': '):
+    """ Encode 'obj' as an ascii-only JSON string, like
+    json.JSONEncoder(ensure_ascii=True).encode(obj) """
+    if w_default is not None and space.is_none(w_default):
+        w_default = None
+    if w_indent is None or space.is_none(w_indent):
+        indent = -1
+    else:
+        indent = max(space.int_w(w_indent), 0)
+    encoder = JSONEncoder(space, w_default, skipkeys, check_circular,
+                          allow_nan, sort_keys, indent, item_separator,
+                          key_separator)
+    return space.newbytes(encoder.encode(w_obj))
@@ -0,0 +1,272 @@
+""" Incremental decoding of a stream of JSON values that arrives in chunks.
+
+The StreamScanner finds out where complete values end, only looking at
+brackets and strings. The complete values are then decoded by a single
+JSONDecoder, so that the maps and string caches are reused across chunks.
+"""
+
+from rpython.rlib import jit
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.typedef import TypeDef
+from pypy.module._pypyjson.interp_decoder import JSONDecoder, is_whitespace
+
+
+# the states of the scanner between two values, in items mode
+(ITEMS_START, ITEMS_FIRST, ITEMS_VALUE, ITEMS_SEPARATOR, ITEMS_END) = range(5)
+
+
+def is_scalar_end(ch):
+    return (is_whitespace(ch) or ch == ',' or ch == ']' or ch == '}' or
+            ch == '[' or ch == '{' or ch == '"')
+
+
+class StreamScanner(object):
+    """ Finds the boundaries of complete JSON values in a stream. The state is
+    kept between chunks, so every character of the stream is looked at only
+    once. Positions are relative to the start of the pending (not yet
+    decoded) data, 'offset' is the position of that start in the stream. """
+
+    def __init__(self, space, items):
+        self.space = space
+        # if items is True, the stream is a single array and its elements
+        # are the values
+        self.items = items
+        self.items_state = ITEMS_START
+        self.offset = 0
+        self.value_start = -1
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.in_scalar = False
+        # flat list of start, stop positions of the complete values
+        self.boundaries = []
+
+    def _raise(self, msg, pos):
+        raise oefmt(self.space.w_ValueError, "%s at char %d", msg,
+                    self.offset + pos)
+
+    def scan(self, chunk, base):
+        """ Scan chunk, which starts at position base of the pending data """
+        for j in range(len(chunk)):
+            ch = chunk[j]
+            pos = base + j
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 0:
+                        self.end_value(pos + 1)
+                continue
+            if self.in_scalar:
+                if not is_scalar_end(ch):
+                    continue
+                self.in_scalar = False
+                self.end_value(pos)
+            if self.depth > 0:
+                if ch == '"':
+                    self.in_string = True
+                elif ch == '[' or ch == '{':
+                    self.depth += 1
+                elif ch == ']' or ch == '}':
+                    self.depth -= 1
+                    if self.depth == 0:
+                        self.end_value(pos + 1)
+                continue
+            if is_whitespace(ch):
+                continue
+            if self.items:
+                state = self.items_state
+                if state == ITEMS_START:
+                    if ch != '[':
+                        self._raise("Expected '['", pos)
+                    self.items_state = ITEMS_FIRST
+                    continue
+                elif state == ITEMS_FIRST:
+                    if ch == ']':
+                        self.items_state = ITEMS_END
+                        continue
+                elif state == ITEMS_SEPARATOR:
+                    if ch == ',':
+                        self.items_state = ITEMS_VALUE
+                    elif ch == ']':
+                        self.items_state = ITEMS_END
+                    else:
+                        self._raise("Expected ',' or ']'", pos)
+                    continue
+                elif state == ITEMS_END:
+                    self._raise("Extra data", pos)
+            self.start_value(ch, pos)
+
+    def start_value(self, ch, pos):
+        if ch == ']' or ch == '}' or ch == ',' or ch == ':':
+            self._raise("No JSON object could be decoded: unexpected '%s'" %
+                        (ch, ), pos)
+        self.value_start = pos
+        if ch == '"':
+            self.in_string = True
+        elif ch == '[' or ch == '{':
+            self.depth = 1
+        else:
+            self.in_scalar = True
+
+    def end_value(self, pos):
+        self.boundaries.append(self.value_start)
+        self.boundaries.append(pos)
+        self.value_start = -1
+        self.items_state = ITEMS_SEPARATOR
+
+    def finish(self, end):
+        """ The stream ended at position end """
+        if self.in_scalar:
+            self.in_scalar = False
+            self.end_value(end)
+        if self.value_start >= 0:
+            self._raise("Unterminated JSON value starting",
+                        self.value_start)
+        if self.items and self.items_state != ITEMS_END:
+            self._raise("Unterminated array", end)
+
+    def consumed(self, length):
+        """ The first length characters of the pending data were decoded """
+        self.offset += length
+        if self.value_start >= 0:
+            self.value_start -= length
+
+
+class W_JSONStreamDecoder(W_Root):
+    def __init__(self, space, items):
+        self.space = space
+        self.scanner = StreamScanner(space, items)
+        self.pending = []
+        self.pending_size = 0
+        self.decoder = None
+        self.closed = False
+        self.register_finalizer(space)
+
+    def _finalize_(self):
+        self.close_decoder()
+
+    def close_decoder(self):
+        decoder = self.decoder
+        if decoder is not None:
+            self.decoder = None
+            decoder.close()
+
+    def _check_closed(self):
+        if self.closed:
+            raise oefmt(self.space.w_ValueError, "stream decoder is closed")
+
+    def decode_boundaries(self, s):
+        """ Decode the values that the scanner found in s, which is a prefix
+        of the pending data. """
+        space = self.space
+        scanner = self.scanner
+        boundaries = scanner.boundaries
+        scanner.boundaries = []
+        decoder = self.decoder
+        if decoder is None:
+            decoder = self.decoder = JSONDecoder(space, s)
+        else:
+            decoder.set_source(s)
+        values_w = [None] * (len(boundaries) // 2)
+        try:
+            for i in range(len(values_w)):
+                start = boundaries[2 * i]
+                stop = boundaries[2 * i + 1]
+                values_w[i] = decoder.decode_any(start)
+                if decoder.pos != stop:
+                    raise oefmt(space.w_ValueError,
+                                "Extra data: char %d - %d",
+                                scanner.offset + decoder.pos,
+                                scanner.offset + stop - 1)
+        finally:
+            decoder.close_source()
+        return values_w
+
+    @jit.dont_look_inside
+    def descr_feed(self, space, w_data):
+        """feed(data) -> list
+
+Add a chunk of the stream. Returns the values that are complete now."""
+        self._check_closed()
+        if space.isinstance_w(w_data, space.w_unicode):
+            raise oefmt(space.w_TypeError,
+                        "Expected utf8-encoded str, got unicode")
+        chunk = space.bytes_w(w_data)
+        try:
+            return self._feed(chunk)
+        except OperationError:
+            # the state of the scanner is not usable any more
+            self.closed = True
+            self.close_decoder()
+            raise
+
+    def _feed(self, chunk):
+        space = self.space
+        scanner = self.scanner
+        base = self.pending_size
+        scanner.scan(chunk, base)
+        if not scanner.boundaries:
+            if chunk:
+                self.pending.append(chunk)
+                self.pending_size += len(chunk)
+            return space.newlist([])
+        # everything up to the end of the last complete value is decoded,
+        # the rest stays pending
+        stop = scanner.boundaries[-1]
+        split = stop - base
+        assert split >= 0
+        self.pending.append(chunk[:split])
+        s = "".join(self.pending)
+        rest = chunk[split:]
+        if rest:
+            self.pending = [rest]
+        else:
+            self.pending = []
+        self.pending_size = len(rest)
+        values_w = self.decode_boundaries(s)
+        scanner.consumed(stop)
+        return space.newlist(values_w)
+
+    @jit.dont_look_inside
+    def descr_close(self, space):
+        """close() -> list
+
+Signal the end of the stream. Returns the values that were still pending,
+and raises ValueError if the stream ends in the middle of a value."""
+        self._check_closed()
+        self.closed = True
+        try:
+            scanner = self.scanner
+            scanner.finish(self.pending_size)
+            if not scanner.boundaries:
+                return space.newlist([])
+            values_w = self.decode_boundaries("".join(self.pending))
+            self.pending = []
+            self.pending_size = 0
+            return space.newlist(values_w)
+        finally:
+            self.close_decoder()
+
+    @staticmethod
+    @unwrap_spec(items=bool)
+    def descr_new(space, w_subtype, items=False):
+        return W_JSONStreamDecoder(space, items)
+
+
+W_JSONStreamDecoder.typedef = TypeDef(
+    '_pypyjson.JSONStreamDecoder',
+    __new__ = interp2app(W_JSONStreamDecoder.descr_new),
+    feed = interp2app(W_JSONStreamDecoder.descr_feed),
+    close = interp2app(W_JSONStreamDecoder.descr_close),
+    __doc__ = """JSONStreamDecoder(items=False)
+
+Incremental decoder for a stream of whitespace-separated JSON values. If
+items is true, the stream must contain a single array, and its elements are
+returned one by one as they become complete.""")
+W_JSONStreamDecoder.typedef.acceptable_as_base_class = False
@@ -14,6 +14,20 @@ class TestJson(object):
         assert dec.skip_whitespace(8) == len(s)
         dec.close()
 
+    def test_set_source_keeps_caches(self):
+        space = self.space
+        dec = JSONDecoder(space, '{"abc": 1}')
+        w_res = dec.decode_any(0)
+        w_key, = space.unpackiterable(w_res)
+        dec.close_source()
+        dec.set_source('  {"abc": 2}')
+        assert dec.pos == 0
+        assert dec.input_size == 22
+        w_res = dec.decode_any(0)
+        w_key2, = space.unpackiterable(w_res)
+        assert w_key2 is w_key
+        dec.close()
+
     def test_json_map(self):
         m = Terminator(self.space)
         w_a = self.space.newutf8("a", 1)
@@ -538,3 +552,172 @@ class AppTest(object):
         a = '{"abc": "4", "k": 1, "k": 1.5, "c": null, "k": 2}'
         d = _pypyjson.loads(a)
         assert d == {u"abc": u"4", u"c": None, u"k": 2}
+
+    def test_loads_lines(self):
+        import _pypyjson
+        s = '{"a": 1}\n\n[1, 2]  \r\n"x"\n  null'
+        assert _pypyjson.loads_lines(s) == [{u"a": 1}, [1, 2], u"x", None]
+        assert _pypyjson.loads_lines('') == []
+        assert _pypyjson.loads_lines('1\n') == [1]
+        raises(ValueError, _pypyjson.loads_lines, '1 2\n')
+        raises(TypeError, _pypyjson.loads_lines, u'1')
+
+    def test_stream_decoder(self):
+        import _pypyjson
+        dec = _pypyjson.JSONStreamDecoder()
+        assert dec.feed('{"a": [1, "]"') == []
+        assert dec.feed('], "b": "\\\\"}  12') == [{u"a": [1, u"]"], u"b": u"\\"}]
+        assert dec.feed('3 "x') == [123]
+        assert dec.feed('y" true') == [u"xy"]
+        assert dec.close() == [True]
+        raises(ValueError, dec.feed, '1')
+
+    def test_stream_decoder_byte_by_byte(self):
+        import _pypyjson
+        s = '[{"a": "\\"", "b": -1.5e3}, null] {"c": {}} "" 7'
+        dec = _pypyjson.JSONStreamDecoder()
+        res = []
+        for c in s:
+            res.extend(dec.feed(c))
+        res.extend(dec.close())
+        assert res == [[{u"a": u'"', u"b": -1500.0}, None], {u"c": {}}, u"", 7]
+
+    def test_stream_decoder_items(self):
+        import _pypyjson
+        dec = _pypyjson.JSONStreamDecoder(items=True)
+        assert dec.feed(' [ 1, {"a"') == [1]
+        assert dec.feed(': 2}, "x", 3') == [{u"a": 2}, u"x"]
+        assert dec.feed(']') == [3]
+        assert dec.close() == []
+        dec = _pypyjson.JSONStreamDecoder(items=True)
+        assert dec.feed('[]') == []
+        assert dec.close() == []
+        dec = _pypyjson.JSONStreamDecoder(items=True)
+        assert dec.feed('[1, 2') == [1]
+        raises(ValueError, dec.close)
+        dec = _pypyjson.JSONStreamDecoder(items=True)
+        raises(ValueError, dec.feed, '{}')
+        dec = _pypyjson.JSONStreamDecoder(items=True)
+        raises(ValueError, dec.feed, '[1 2]')
+
+    def test_stream_decoder_errors(self):
+        import _pypyjson
+        dec = _pypyjson.JSONStreamDecoder()
+        exc = raises(ValueError, dec.feed, '1 2 12abc ')
+        assert str(exc.value) == "Extra data: char 6 - 8"
+        raises(ValueError, dec.feed, '1')
+        dec = _pypyjson.JSONStreamDecoder()
+        dec.feed('{"a": ')
+        exc = raises(ValueError, dec.close)
+        assert str(exc.value) == "Unterminated JSON value starting at char 0"
+        dec = _pypyjson.JSONStreamDecoder()
+        raises(TypeError, dec.feed, u'1')
+
+    def test_encode_constants(self):
+        import _pypyjson
+        assert _pypyjson.encode(None) == 'null'
+        assert _pypyjson.encode(True) == 'true'
+        assert _pypyjson.encode(False) == 'false'
+        assert _pypyjson.encode(42) == '42'
+        assert _pypyjson.encode(-2**70) == '-1180591620717411303424'
+        assert _pypyjson.encode(1.5) == '1.5'
+        assert _pypyjson.encode(1e16) == '1e+16'
+        assert _pypyjson.encode(float('inf')) == 'Infinity'
+        assert _pypyjson.encode(float('-inf')) == '-Infinity'
+        assert _pypyjson.encode(float('nan')) == 'NaN'
+        raises(ValueError, _pypyjson.encode, float('nan'), allow_nan=False)
+        res = _pypyjson.encode(u"a\xe4\"\n")
+        assert res == '"a\\u00e4\\"\\n"'
+        assert type(res) is str
+        assert _pypyjson.encode("\xc2\x84") == '"\\u0084"'
+        raises(UnicodeDecodeError, _pypyjson.encode, "\xc0")
+
+    def test_encode_list(self):
+        import _pypyjson
+        assert _pypyjson.encode([]) == '[]'
+        assert _pypyjson.encode(()) == '[]'
+        assert _pypyjson.encode([1, 2, 3]) == '[1, 2, 3]'
+        assert _pypyjson.encode([1.5, 2.0]) == '[1.5, 2.0]'
+        assert _pypyjson.encode(["a", "b\n"]) == '["a", "b\\n"]'
+        assert _pypyjson.encode([u"a", u"\""]) == '["a", "\\""]'
+        assert _pypyjson.encode((1, [None, {}])) == '[1, [null, {}]]'
+        assert _pypyjson.encode([1, 2], item_separator=',') == '[1,2]'
+
+    def test_encode_dict(self):
+        import _pypyjson
+        assert _pypyjson.encode({}) == '{}'
+        assert _pypyjson.encode({u"a": 1}) == '{"a": 1}'
+        assert _pypyjson.encode({"a": [1]}) == '{"a": [1]}'
+        d = {u"b": 1, u"a": 2, u"\xe4": 3}
+        assert _pypyjson.encode(d, sort_keys=True) == (
+            '{"a": 2, "b": 1, "\\u00e4": 3}')
+        d = {2: 1, 1.5: 2, None: 3, True: 4}
+        assert _pypyjson.encode(d, sort_keys=True) == (
+            '{"null": 3, "true": 4, "1.5": 2, "2": 1}')
+        raises(TypeError, _pypyjson.encode, {(1, 2): 3})
+        assert _pypyjson.encode({(1, 2): 3, 1: 2}, skipkeys=True) == '{"1": 2}'
+        assert _pypyjson.encode({"a": 1}, key_separator=':') == '{"a":1}'
+
+    def test_encode_decoded_dict(self):
+        import _pypyjson
+        s = '{"a": 1, "\\u00e4": [1.5, "x"], "c": {"d": null}}'
+        for i in range(3):
+            d = _pypyjson.loads(s)
+            assert _pypyjson.encode(d) == s
+        assert _pypyjson.encode(d, sort_keys=True) == (
+            '{"a": 1, "c": {"d": null}, "\\u00e4": [1.5, "x"]}')
+
+    def test_encode_indent(self):
+        import _pypyjson
+        res = _pypyjson.encode({"a": [1, 2], "b": []}, sort_keys=True,
+                               indent=2, item_separator=',')
+        assert res == '{\n  "a": [\n    1,\n    2\n  ],\n  "b": []\n}'
+
+    def test_encode_subclasses(self):
+        import _pypyjson
+        class MyList(list):
+            def __iter__(self):
+                return iter([4, 5])
+        class MyDict(dict):
+            def iteritems(self):
+                return iter([("x", 1)])
+        class MyInt(int):
+            def __str__(self):
+                return "7"
+        assert _pypyjson.encode(MyList([1])) == '[4, 5]'
+        assert _pypyjson.encode(MyDict(a=1)) == '{"x": 1}'
+        assert _pypyjson.encode([MyInt(1)]) == '[7]'
+
+    def test_encode_default(self):
+        import _pypyjson
+        exc = raises(TypeError, _pypyjson.encode, [1j])
+        assert str(exc.value) == "1j is not JSON serializable"
+        res = _pypyjson.encode([1j, 2], lambda c: [c.real, c.imag])
+        assert res == '[[0.0, 1.0], 2]'
+
+    def test_encode_circular(self):
+        import _pypyjson
+        l = []
+        l.append(l)
+        exc = raises(ValueError, _pypyjson.encode, l)
+        assert str(exc.value) == "Circular reference detected"
+        d = {}
+        d["a"] = [d]
+        raises(ValueError, _pypyjson.encode, d)
+        l = [1]
+        assert _pypyjson.encode([l, l]) == '[[1], [1]]'
+
+
+
+class AppTestJsonModule(object):
+    spaceconfig = dict(usemodules=['_pypyjson', 'struct', '__pypy__'])
+
+    def test_json_dumps(self):
+        import json
+        d = {"a": [1, 2.5, u"\xe4"], "b": None}
+        assert json.dumps(d, sort_keys=True) == (
+            '{"a": [1, 2.5, "\\u00e4"], "b": null}')
+        assert json.dumps(d, sort_keys=True, ensure_ascii=False) == (
+            u'{"a": [1, 2.5, "\xe4"], "b": null}')
+        assert json.dumps([1, 2], separators=(',', ':'), indent=1) == (
+            '[\n 1,\n 2\n]')
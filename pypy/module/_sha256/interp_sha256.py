@@ -0,0 +1,86 @@
+from rpython.rlib import rsha256
+from rpython.rlib.objectmodel import import_from_mixin
+from rpython.tool.sourcetools import func_with_new_name
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.typedef import TypeDef
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+
+
+def make_sha_type(RSHA, name):
+    """Build the app-level type of the hash objects implemented by the
+    RPython class RSHA, e.g. rsha256.RSHA256.
+    """
+    class W_SHA(W_Root):
+        import_from_mixin(RSHA)
+
+        def __init__(self, space):
+            self.space = space
+            self._init()
+            # update() runs without the GIL on large inputs: the lock keeps
+            # other threads from using the state in the meantime
+            self.lock = space.allocate_lock()
+
+        @unwrap_spec(string='bufferstr')
+        def update_w(self, string):
+            self.lock.acquire(True)
+            try:
+                self.update(string)
+            finally:
+                self.lock.release()
+
+        def digest_w(self):
+            self.lock.acquire(True)
+            try:
+                digest = self.digest()
+            finally:
+                self.lock.release()
+            return self.space.newbytes(digest)
+
+        def hexdigest_w(self):
+            self.lock.acquire(True)
+            try:
+                hexdigest = self.hexdigest()
+            finally:
+                self.lock.release()
+            return self.space.newtext(hexdigest)
+
+        def copy_w(self):
+            clone = W_SHA(self.space)
+            self.lock.acquire(True)
+            try:
+                clone._copyfrom(self)
+            finally:
+                self.lock.release()
+            return clone
+
+    W_SHA.__name__ = 'W_' + name.upper()
+
+    @unwrap_spec(string='bufferstr')
+    def descr_new(space, w_subtype, string=''):
+        w_sha = space.allocate_instance(W_SHA, w_subtype)
+        sha = space.interp_w(W_SHA, w_sha)
+        W_SHA.__init__(sha, space)
+        sha.update(string)
+        return w_sha
+    descr_new = func_with_new_name(descr_new, 'descr_new_' + name)
+
+    W_SHA.typedef = TypeDef(
+        name,
+        __new__   = interp2app(descr_new),
+        update    = interp2app(W_SHA.update_w),
+        digest    = interp2app(W_SHA.digest_w),
+        hexdigest = interp2app(W_SHA.hexdigest_w),
+        copy      = interp2app(W_SHA.copy_w),
+        digest_size = RSHA.digest_size,
+        digestsize = RSHA.digest_size,
+        block_size = RSHA.block_size,
+        name      = name.upper(),
+        __doc__   = """%s([string]) -> return a new %s hash object.
+
+If string is present, the method call update(string) is made.""" % (
+            name, name.upper()))
+    return W_SHA
+
+
+W_SHA256 = make_sha_type(rsha256.RSHA256, 'sha256')
+W_SHA224 = make_sha_type(rsha256.RSHA224, 'sha224')
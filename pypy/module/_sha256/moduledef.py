@@ -0,0 +1,20 @@
+"""
+Mixed-module definition for the _sha256 module.
+Note that there is also a pure Python implementation in lib_pypy/_sha256.py;
+the present mixed-module version takes precedence if it is enabled.
+"""
+
+from pypy.interpreter.mixedmodule import MixedModule
+
+
+class Module(MixedModule):
+    """SHA-224 and SHA-256 hash algorithms, used by hashlib when it
+cannot use OpenSSL."""
+
+    interpleveldefs = {
+        'sha256': 'interp_sha256.W_SHA256',
+        'sha224': 'interp_sha256.W_SHA224',
+        }
+
+    appleveldefs = {
+        }
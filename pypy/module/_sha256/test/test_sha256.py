@@ -0,0 +1,88 @@
+"""
+Tests for the _sha256 module implemented at interp-level in
+pypy/module/_sha256.
+"""
+
+
+class AppTestSHA256(object):
+    spaceconfig = {
+        'usemodules': ['_sha256', 'binascii', 'time', 'struct', 'thread'],
+    }
+
+    def test_attributes(self):
+        import _sha256
+        d = _sha256.sha256()
+        assert d.digest_size == d.digestsize == 32
+        assert d.block_size == 64
+        assert d.name == 'SHA256'
+        d = _sha256.sha224()
+        assert d.digest_size == d.digestsize == 28
+        assert d.block_size == 64
+        assert d.name == 'SHA224'
+        assert isinstance(d, _sha256.sha224)
+
+    def test_shaobject(self):
+        import _sha256
+        cases = (
+          ("",
+           "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855",
+           "d14a028c2a3a2bc9476102bb288234c415a2b01f828ea62ac5b3e42f"),
+          ("abc",
+           "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad",
+           "23097d223405d8228642a477bda255b32aadbce4bda0b3f7e36c9da7"),
+          ("abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq",
+           "248d6a61d20638b8e5c026930c3e6039a33ce45964ff2167f6ecedd419db06c1",
+           "75388b16512776cc5dba5da1fd890150b0c6455cb4f58b1952522525"),
+          ("1234567890" * 999,
+           "f430aad990ea7d74601636c2a6623b7bdcf1b2fcc342c1e74662599bf00ef107",
+           "4ee3424064647b4e95d53407db905a6853c64afab644f5c21faacc84"),
+        )
+        for input, expected256, expected224 in cases:
+            d = _sha256.sha256(input)
+            assert d.hexdigest() == expected256
+            assert d.digest() == expected256.decode('hex')
+            assert _sha256.sha224(input).hexdigest() == expected224
+
+    def test_copy(self):
+        import _sha256
+        d1 = _sha256.sha256()
+        d1.update("abcde")
+        d2 = d1.copy()
+        d2.update("fgh")
+        d1.update("jkl")
+        assert d1.hexdigest() == _sha256.sha256("abcdejkl").hexdigest()
+        assert d2.hexdigest() == _sha256.sha256("abcdefgh").hexdigest()
+        d3 = _sha256.sha224("abc").copy()
+        assert type(d3) is _sha256.sha224
+        assert d3.digest() == _sha256.sha224("abc").digest()
+
+    def test_threads(self):
+        import _sha256, thread, time
+        # large updates run without the GIL: concurrent updates of the
+        # same object must not lose any block
+        data = "abcdefgh" * 1024
+        d = _sha256.sha256()
+        done = []
+        def f():
+            for i in range(5):
+                d.update(data)
+            done.append(1)
+        for i in range(4):
+            thread.start_new_thread(f, ())
+        while len(done) < 4:
+            time.sleep(0.01)
+        assert d.hexdigest() == _sha256.sha256(data * 20).hexdigest()
+
+    def test_buffer_and_unicode(self):
+        import _sha256
+        d1 = _sha256.sha256(buffer("abcde"))
+        d1.update(u"jkl")
+        assert d1.hexdigest() == _sha256.sha256("abcdejkl").hexdigest()
+        raises(UnicodeEncodeError, d1.update, u'\xe9')
+
+    def test_hashlib(self):
+        import hashlib, _sha256
+        assert hashlib.sha256("abc").hexdigest() == \
+            _sha256.sha256("abc").hexdigest()
+        assert hashlib.sha224("abc").hexdigest() == \
+            _sha256.sha224("abc").hexdigest()
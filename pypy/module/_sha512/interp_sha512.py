@@ -0,0 +1,6 @@
+from rpython.rlib import rsha512
+from pypy.module._sha256.interp_sha256 import make_sha_type
+
+
+W_SHA512 = make_sha_type(rsha512.RSHA512, 'sha512')
+W_SHA384 = make_sha_type(rsha512.RSHA384, 'sha384')
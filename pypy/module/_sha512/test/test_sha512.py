@@ -0,0 +1,79 @@
+"""
+Tests for the _sha512 module implemented at interp-level in
+pypy/module/_sha512.
+"""
+
+
+class AppTestSHA512(object):
+    spaceconfig = {
+        'usemodules': ['_sha512', 'binascii', 'time', 'struct'],
+    }
+
+    def test_attributes(self):
+        import _sha512
+        d = _sha512.sha512()
+        assert d.digest_size == d.digestsize == 64
+        assert d.block_size == 128
+        assert d.name == 'SHA512'
+        d = _sha512.sha384()
+        assert d.digest_size == d.digestsize == 48
+        assert d.block_size == 128
+        assert d.name == 'SHA384'
+        assert isinstance(d, _sha512.sha384)
+
+    def test_shaobject(self):
+        import _sha512
+        cases = (
+          ("",
+           "cf83e1357eefb8bdf1542850d66d8007d620e4050b5715dc83f4a921d36ce9ce"
+           "47d0d13c5d85f2b0ff8318d2877eec2f63b931bd47417a81a538327af927da3e",
+           "38b060a751ac96384cd9327eb1b1e36a21fdb71114be0743"
+           "4c0cc7bf63f6e1da274edebfe76f65fbd51ad2f14898b95b"),
+          ("abc",
+           "ddaf35a193617abacc417349ae20413112e6fa4e89a97ea20a9eeee64b55d39a"
+           "2192992a274fc1a836ba3c23a3feebbd454d4423643ce80e2a9ac94fa54ca49f",
+           "cb00753f45a35e8bb5a03d699ac65007272c32ab0eded163"
+           "1a8b605a43ff5bed8086072ba1e7cc2358baeca134c825a7"),
+          ("abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq",
+           "204a8fc6dda82f0a0ced7beb8e08a41657c16ef468b228a8279be331a703c335"
+           "96fd15c13b1b07f9aa1d3bea57789ca031ad85c7a71dd70354ec631238ca3445",
+           "3391fdddfc8dc7393707a65b1b4709397cf8b1d162af05ab"
+           "fe8f450de5f36bc6b0455a8520bc4e6f5fe95b1fe3c8452b"),
+          ("1234567890" * 999,
+           "924396e643f55cbf207e6b9a50a3eb3c29d9f4086e3828a0860d6663ddf5c1ba"
+           "6dca448473b0b93c386c7448b87cffbb6d6bc736d45bfa699c30607afcd09901",
+           "a57d05151253edf120749159d6908c7d59f50d52d95fc9da"
+           "2214aa61d458b17510c409f2f2976cfaf6f5c25de11c2394"),
+        )
+        for input, expected512, expected384 in cases:
+            d = _sha512.sha512(input)
+            assert d.hexdigest() == expected512
+            assert d.digest() == expected512.decode('hex')
+            assert _sha512.sha384(input).hexdigest() == expected384
+
+    def test_copy(self):
+        import _sha512
+        d1 = _sha512.sha512()
+        d1.update("abcde")
+        d2 = d1.copy()
+        d2.update("fgh")
+        d1.update("jkl")
+        assert d1.hexdigest() == _sha512.sha512("abcdejkl").hexdigest()
+        assert d2.hexdigest() == _sha512.sha512("abcdefgh").hexdigest()
+        d3 = _sha512.sha384("abc").copy()
+        assert type(d3) is _sha512.sha384
+        assert d3.digest() == _sha512.sha384("abc").digest()
+
+    def test_buffer_and_unicode(self):
+        import _sha512
+        d1 = _sha512.sha512(buffer("abcde"))
+        d1.update(u"jkl")
+        assert d1.hexdigest() == _sha512.sha512("abcdejkl").hexdigest()
+        raises(UnicodeEncodeError, d1.update, u'\xe9')
+
+    def test_hashlib(self):
+        import hashlib, _sha512
+        assert hashlib.sha512("abc").hexdigest() == \
+            _sha512.sha512("abc").hexdigest()
+        assert hashlib.sha384("abc").hexdigest() == \
+            _sha512.sha384("abc").hexdigest()
@@ -0,0 +1,12 @@
+# PickleError, PicklingError, UnpicklingError and UnpickleableError are
+# the exceptions of pickle.py: see Module.startup().
+
+BadPickleGet = KeyError
+
+format_version = "2.0"                  # File format version we write
+compatible_formats = ["1.0",            # Original protocol 0
+                      "1.1",            # Protocol 0 with INST added
+                      "1.2",            # Original protocol 1
+                      "1.3",            # Protocol 1 with BINFLOAT added
+                      "2.0",            # Protocol 2
+                      ]                 # Old format versions we can read
@@ -0,0 +1,141 @@
+from pypy.interpreter.error import OperationError, oefmt
+from rpython.rlib import objectmodel
+
+HIGHEST_PROTOCOL = 2
+BATCHSIZE = 1000
+
+# the opcodes, see lib-python/2.7/pickletools.py for the details
+MARK            = '('
+STOP            = '.'
+POP             = '0'
+POP_MARK        = '1'
+DUP             = '2'
+FLOAT           = 'F'
+INT             = 'I'
+BININT          = 'J'
+BININT1         = 'K'
+LONG            = 'L'
+BININT2         = 'M'
+NONE            = 'N'
+PERSID          = 'P'
+BINPERSID       = 'Q'
+REDUCE          = 'R'
+STRING          = 'S'
+BINSTRING       = 'T'
+SHORT_BINSTRING = 'U'
+UNICODE         = 'V'
+BINUNICODE      = 'X'
+APPEND          = 'a'
+BUILD           = 'b'
+GLOBAL          = 'c'
+DICT            = 'd'
+EMPTY_DICT      = '}'
+APPENDS         = 'e'
+GET             = 'g'
+BINGET          = 'h'
+INST            = 'i'
+LONG_BINGET     = 'j'
+LIST            = 'l'
+EMPTY_LIST      = ']'
+OBJ             = 'o'
+PUT             = 'p'
+BINPUT          = 'q'
+LONG_BINPUT     = 'r'
+SETITEM         = 's'
+TUPLE           = 't'
+EMPTY_TUPLE     = ')'
+SETITEMS        = 'u'
+BINFLOAT        = 'G'
+
+# protocol 2
+PROTO           = '\x80'
+NEWOBJ          = '\x81'
+EXT1            = '\x82'
+EXT2            = '\x83'
+EXT4            = '\x84'
+TUPLE1          = '\x85'
+TUPLE2          = '\x86'
+TUPLE3          = '\x87'
+NEWTRUE         = '\x88'
+NEWFALSE        = '\x89'
+LONG1           = '\x8a'
+LONG4           = '\x8b'
+
+TUPLESIZE2CODE = [EMPTY_TUPLE, TUPLE1, TUPLE2, TUPLE3]
+
+
+def get_protocol(space, w_protocol):
+    if space.is_none(w_protocol):
+        return 0
+    protocol = space.int_w(w_protocol)
+    if protocol < 0:
+        return HIGHEST_PROTOCOL
+    if protocol > HIGHEST_PROTOCOL:
+        raise oefmt(space.w_ValueError,
+                    "pickle protocol %d asked for; the highest available "
+                    "protocol is %d", protocol, HIGHEST_PROTOCOL)
+    return protocol
+
+@objectmodel.dont_inline
+def get_error(space, name):
+    w_module = space.getbuiltinmodule('cPickle')
+    return space.getattr(w_module, space.newtext(name))
+
+def import_module(space, w_modname):
+    """Import the module 'w_modname' and return it from sys.modules, like
+    pickle.py: __import__() returns the top-level package."""
+    w_builtins = space.getbuiltinmodule('__builtin__')
+    space.call_method(w_builtins, '__import__', w_modname)
+    w_modules = space.sys.get('modules')
+    return space.getitem(w_modules, w_modname)
+
+
+class State(object):
+    """The registries of copy_reg, imported the first time they are
+    needed."""
+
+    def __init__(self, space):
+        self.w_dispatch_table = None
+        self.w_extension_registry = None
+        self.w_inverted_registry = None
+        self.w_extension_cache = None
+
+    def _import_copy_reg(self, space):
+        w_copy_reg = import_module(space, space.newtext('copy_reg'))
+        self.w_dispatch_table = space.getattr(
+            w_copy_reg, space.newtext('dispatch_table'))
+        self.w_extension_registry = space.getattr(
+            w_copy_reg, space.newtext('_extension_registry'))
+        self.w_inverted_registry = space.getattr(
+            w_copy_reg, space.newtext('_inverted_registry'))
+        self.w_extension_cache = space.getattr(
+            w_copy_reg, space.newtext('_extension_cache'))
+
+    def get_dispatch_table(self, space):
+        if self.w_dispatch_table is None:
+            self._import_copy_reg(space)
+        return self.w_dispatch_table
+
+    def get_extension_registry(self, space):
+        if self.w_extension_registry is None:
+            self._import_copy_reg(space)
+        return self.w_extension_registry
+
+    def get_inverted_registry(self, space):
+        if self.w_inverted_registry is None:
+            self._import_copy_reg(space)
+        return self.w_inverted_registry
+
+    def get_extension_cache(self, space):
+        if self.w_extension_cache is None:
+            self._import_copy_reg(space)
+        return self.w_extension_cache
+
+
+def find_global_default(space, w_modname, w_name):
+    w_module = import_module(space, w_modname)
+    return space.getattr(w_module, w_name)
+
+def raise_unpickling_error(space, msg):
+    raise OperationError(get_error(space, 'UnpicklingError'),
+                         space.newtext(msg))
@@ -0,0 +1,856 @@
+from rpython.rlib.rarithmetic import intmask, longlongmask
+from rpython.rlib.objectmodel import specialize
+from rpython.rlib.rstring import StringBuilder
+from rpython.rlib.rstruct import ieee
+from pypy.interpreter import gateway
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.function import Function, BuiltinFunction
+from pypy.interpreter.gateway import interp2app
+from pypy.interpreter.typedef import TypeDef, GetSetProperty
+from pypy.module.__builtin__.interp_classobj import (
+    W_ClassObject, W_InstanceObject)
+from pypy.module.cPickle.interp_cpickle import *
+from pypy.objspace.std.dictmultiobject import W_DictMultiObject
+from pypy.objspace.std.floatobject import W_FloatObject
+from pypy.objspace.std.intobject import W_IntObject
+from pypy.objspace.std.listobject import (
+    W_ListObject, IntegerListStrategy, FloatListStrategy, BytesListStrategy)
+
+
+app = gateway.applevel(r'''
+def whichmodule(func, funcname):
+    import pickle
+    return pickle.whichmodule(func, funcname)
+''', filename=__file__)
+
+whichmodule = app.interphook('whichmodule')
+
+
+def _write_int32(builder, x):
+    builder.append(chr(x & 0xff))
+    builder.append(chr((x >> 8) & 0xff))
+    builder.append(chr((x >> 16) & 0xff))
+    builder.append(chr((x >> 24) & 0xff))
+
+def _write_float64(builder, x):
+    # big-endian, like struct.pack('>d')
+    value = longlongmask(ieee.float_pack(x, 8))
+    for i in range(7, -1, -1):
+        builder.append(chr(intmask(value >> (i * 8)) & 0xff))
+
+def encode_long(bigint):
+    """Encode a long to a two's complement little-endian binary string,
+    using the smallest number of bytes.  0 is encoded as ''."""
+    if bigint.sign == 0:
+        return ''
+    if bigint.sign < 0:
+        nbits = bigint.invert().bit_length()
+    else:
+        nbits = bigint.bit_length()
+    return bigint.tobytes((nbits >> 3) + 1, 'little', signed=True)
+
+
+class W_Pickler(W_Root):
+
+    def __init__(self, space, w_file, proto):
+        self.space = space
+        self.w_file = w_file    # None: the output is kept, see getvalue()
+        self.proto = proto
+        self.bin = proto >= 1
+        self.fast = 0
+        # the memo is keyed by identity, like IdentityDictStrategy: it maps
+        # the objects to their index; cPickle's indices start at 1.  Once
+        # the 'memo' attribute is used, it is replaced with 'w_memo', an
+        # app-level dict {id(obj): (index, obj)} like CPython's
+        self.memo = {}
+        self.w_memo = None
+        self.keepalive_w = []
+        self.w_persistent_id = None
+        self.w_inst_persistent_id = None
+        self.output = []
+        self.builder = None
+        self.w_pers_func = None
+        self.w_inst_pers_func = None
+
+    def write(self, s):
+        self.builder.append(s)
+
+    def _get_func(self, name):
+        # a subclass can also define these as methods
+        space = self.space
+        w_func = space.findattr(self, space.newtext(name))
+        if w_func is not None and space.is_w(w_func, space.w_None):
+            w_func = None
+        return w_func
+
+    def dump(self, w_obj):
+        """Write a pickled representation of obj to the open file."""
+        space = self.space
+        self.builder = StringBuilder()
+        self.w_pers_func = self._get_func('persistent_id')
+        self.w_inst_pers_func = self._get_func('inst_persistent_id')
+        try:
+            if self.proto >= 2:
+                self.write(PROTO)
+                self.write(chr(self.proto))
+            self.save(w_obj)
+            self.write(STOP)
+            data = self.builder.build()
+        finally:
+            self.builder = None
+            self.w_pers_func = None
+            self.w_inst_pers_func = None
+        if self.w_file is None:
+            self.output.append(data)
+        else:
+            space.call_method(self.w_file, 'write', space.newbytes(data))
+
+    def clear_memo(self):
+        """Clear the picklers's memo."""
+        if self.w_memo is not None:
+            self.space.call_method(self.w_memo, 'clear')
+        self.memo.clear()
+        self.keepalive_w = []
+
+    def getvalue(self):
+        """Return the pickles written so far, for a Pickler created without
+        a file."""
+        if self.w_file is not None:
+            return self.space.w_None
+        return self.space.newbytes(''.join(self.output))
+
+    # ____________________________________________________________
+
+    def memo_get(self, w_obj):
+        if self.w_memo is not None:
+            return self._memo_get_w(w_obj)
+        return self.memo.get(w_obj, 0)
+
+    def _memo_get_w(self, w_obj):
+        space = self.space
+        w_value = space.finditem(self.w_memo, space.id(w_obj))
+        if w_value is None:
+            return 0
+        return space.int_w(space.getitem(w_value, space.newint(0)))
+
+    def memoize(self, w_obj):
+        if self.fast:
+            return
+        if self.w_memo is not None:
+            space = self.space
+            index = space.len_w(self.w_memo) + 1
+            self.put(index)
+            space.setitem(self.w_memo, space.id(w_obj),
+                          space.newtuple([space.newint(index), w_obj]))
+            return
+        index = len(self.memo) + 1
+        self.put(index)
+        self.memo[w_obj] = index
+
+    def put(self, index):
+        if self.bin:
+            if index < 256:
+                self.write(BINPUT)
+                self.write(chr(index))
+            else:
+                self.write(LONG_BINPUT)
+                _write_int32(self.builder, index)
+        else:
+            self.write(PUT)
+            self.write(str(index))
+            self.write('\n')
+
+    def get(self, index):
+        if self.bin:
+            if index < 256:
+                self.write(BINGET)
+                self.write(chr(index))
+            else:
+                self.write(LONG_BINGET)
+                _write_int32(self.builder, index)
+        else:
+            self.write(GET)
+            self.write(str(index))
+            self.write('\n')
+
+    def save(self, w_obj):
+        space = self.space
+        if self.w_pers_func is not None:
+            w_pid = space.call_function(self.w_pers_func, w_obj)
+            if not space.is_w(w_pid, space.w_None):
+                self.save_pers(w_pid)
+                return
+        # fast paths for the exact builtin types that are never memoized
+        if type(w_obj) is W_IntObject:
+            self.save_int(space.int_w(w_obj))
+            return
+        if type(w_obj) is W_FloatObject:
+            self.save_float(space.float_w(w_obj))
+            return
+        if space.is_w(w_obj, space.w_None):
+            self.write(NONE)
+            return
+        w_type = space.type(w_obj)
+        if space.is_w(w_type, space.w_bool):
+            self.save_bool(space.is_true(w_obj))
+            return
+        index = self.memo_get(w_obj)
+        if index > 0:
+            self.get(index)
+            return
+        if space.is_w(w_type, space.w_bytes):
+            self.save_bytes(w_obj)
+        elif space.is_w(w_type, space.w_tuple):
+            self.save_tuple(w_obj)
+        elif space.is_w(w_type, space.w_list) and type(w_obj) is W_ListObject:
+            self.save_list(w_obj)
+        elif (space.is_w(w_type, space.w_dict) and
+                isinstance(w_obj, W_DictMultiObject)):
+            self.save_dict(w_obj)
+        elif space.is_w(w_type, space.w_int):
+            self.save_int_object(w_obj)
+        elif space.is_w(w_type, space.w_long):
+            self.save_long(w_obj)
+        elif space.is_w(w_type, space.w_float):
+            self.save_float(space.float_w(w_obj))
+        elif space.is_w(w_type, space.w_unicode):
+            self.save_unicode(w_obj)
+        else:
+            self.save_other(w_obj, w_type)
+
+    def save_pers(self, w_pid):
+        space = self.space
+        if self.bin:
+            self.save(w_pid)
+            self.write(BINPERSID)
+        else:
+            self.write(PERSID)
+            self.write(space.text_w(space.str(w_pid)))
+            self.write('\n')
+
+    def save_bool(self, value):
+        if self.proto >= 2:
+            self.write(NEWTRUE if value else NEWFALSE)
+        else:
+            self.write('I01\n' if value else 'I00\n')
+
+    def save_int(self, value):
+        if self.bin:
+            if value >= 0:
+                if value <= 0xff:
+                    self.write(BININT1)
+                    self.write(chr(value))
+                    return
+                if value <= 0xffff:
+                    self.write(BININT2)
+                    self.write(chr(value & 0xff))
+                    self.write(chr(value >> 8))
+                    return
+            high_bits = value >> 31
+            if high_bits == 0 or high_bits == -1:
+                self.write(BININT)
+                _write_int32(self.builder, value)
+                return
+        self.write(INT)
+        self.write(str(value))
+        self.write('\n')
+
+    def save_int_object(self, w_obj):
+        # an int which is not a W_IntObject, e.g. a W_SmallLongObject
+        space = self.space
+        try:
+            value = space.int_w(w_obj)
+        except OperationError as e:
+            if not e.match(space, space.w_OverflowError):
+                raise
+            self.write(INT)
+            self.write(space.text_w(space.repr(w_obj)))
+            self.write('\n')
+        else:
+            self.save_int(value)
+
+    def save_long(self, w_obj):
+        space = self.space
+        if self.proto >= 2:
+            data = encode_long(space.bigint_w(w_obj))
+            n = len(data)
+            if n < 256:
+                self.write(LONG1)
+                self.write(chr(n))
+            else:
+                self.write(LONG4)
+                _write_int32(self.builder, n)
+            self.write(data)
+            return
+        self.write(LONG)
+        self.write(space.text_w(space.repr(w_obj)))
+        self.write('\n')
+
+    def save_float(self, value):
+        if self.bin:
+            self.write(BINFLOAT)
+            _write_float64(self.builder, value)
+        else:
+            self.write(FLOAT)
+            self.write(self.space.text_w(
+                self.space.repr(self.space.newfloat(value))))
+            self.write('\n')
+
+    def write_bytes(self, s):
+        if self.bin:
+            n = len(s)
+            if n < 256:
+                self.write(SHORT_BINSTRING)
+                self.write(chr(n))
+            else:
+                self.write(BINSTRING)
+                _write_int32(self.builder, n)
+            self.write(s)
+        else:
+            self.write(STRING)
+            self.write(self.space.text_w(
+                self.space.repr(self.space.newbytes(s))))
+            self.write('\n')
+
+    def save_bytes(self, w_obj):
+        self.write_bytes(self.space.bytes_w(w_obj))
+        self.memoize(w_obj)
+
+    def save_unicode(self, w_obj):
+        space = self.space
+        if self.bin:
+            utf8 = space.utf8_w(w_obj)
+            self.write(BINUNICODE)
+            _write_int32(self.builder, len(utf8))
+            self.write(utf8)
+        else:
+            w_s = space.call_method(w_obj, 'replace', space.newtext('\\'),
+                                    space.newtext('\\u005c'))
+            w_s = space.call_method(w_s, 'replace', space.newtext('\n'),
+                                    space.newtext('\\u000a'))
+            w_s = space.call_method(w_s, 'encode',
+                                    space.newtext('raw-unicode-escape'))
+            self.write(UNICODE)
+            self.write(space.bytes_w(w_s))
+            self.write('\n')
+        self.memoize(w_obj)
+
+    def save_tuple(self, w_obj):
+        space = self.space
+        items_w = space.fixedview(w_obj)
+        n = len(items_w)
+        if n == 0:
+            if self.bin:
+                self.write(EMPTY_TUPLE)
+            else:
+                self.write(MARK)
+                self.write(TUPLE)
+            return
+        if n <= 3 and self.proto >= 2:
+            for w_item in items_w:
+                self.save(w_item)
+            # subtle: the tuple may have been memoized while saving a
+            # recursive reference to it
+            index = self.memo_get(w_obj)
+            if index > 0:
+                for i in range(n):
+                    self.write(POP)
+                self.get(index)
+            else:
+                self.write(TUPLESIZE2CODE[n])
+                self.memoize(w_obj)
+            return
+        self.write(MARK)
+        for w_item in items_w:
+            self.save(w_item)
+        index = self.memo_get(w_obj)
+        if index > 0:
+            if self.bin:
+                self.write(POP_MARK)
+            else:
+                for i in range(n + 1):
+                    self.write(POP)
+            self.get(index)
+            return
+        self.write(TUPLE)
+        self.memoize(w_obj)
+
+    def save_list(self, w_list):
+        space = self.space
+        if self.bin:
+            self.write(EMPTY_LIST)
+        else:
+            self.write(MARK)
+            self.write(LIST)
+        self.memoize(w_list)
+        # fast paths: the items are read from the storage of the list,
+        # without wrapping them
+        if w_list.strategy is space.fromcache(IntegerListStrategy):
+            self._batch_appends_storage(w_list.getitems_int())
+        elif w_list.strategy is space.fromcache(FloatListStrategy):
+            self._batch_appends_storage(w_list.getitems_float())
+        elif w_list.strategy is space.fromcache(BytesListStrategy):
+            # the items of such a list have no identity to preserve
+            self._batch_appends_storage(w_list.getitems_bytes())
+        else:
+            self._batch_appends_list(w_list)
+
+    @specialize.argtype(1)
+    def _save_unwrapped(self, item):
+        if isinstance(item, int):
+            self.save_int(item)
+        elif isinstance(item, float):
+            self.save_float(item)
+        else:
+            self.write_bytes(item)
+
+    @specialize.call_location()
+    def _batch_appends_storage(self, items):
+        n = len(items)
+        if not self.bin:
+            for i in range(n):
+                self._save_unwrapped(items[i])
+                self.write(APPEND)
+            return
+        start = 0
+        while start < n:
+            stop = min(start + BATCHSIZE, n)
+            if stop - start > 1:
+                self.write(MARK)
+            for i in range(start, stop):
+                self._save_unwrapped(items[i])
+            self.write(APPENDS if stop - start > 1 else APPEND)
+            start = stop
+
+    def _batch_appends_list(self, w_list):
+        # the list may be modified while its items are saved: like the
+        # list iterator used by pickle.py, read the length at each step
+        if not self.bin:
+            i = 0
+            while i < w_list.length():
+                self.save(w_list.getitem(i))
+                self.write(APPEND)
+                i += 1
+            return
+        i = 0
+        while True:
+            items_w = []
+            while len(items_w) < BATCHSIZE and i < w_list.length():
+                items_w.append(w_list.getitem(i))
+                i += 1
+            self._write_appends(items_w)
+            if len(items_w) < BATCHSIZE:
+                return
+
+    def _write_appends(self, items_w):
+        n = len(items_w)
+        if n > 1:
+            self.write(MARK)
+            for w_item in items_w:
+                self.save(w_item)
+            self.write(APPENDS)
+        elif n == 1:
+            self.save(items_w[0])
+            self.write(APPEND)
+
+    def _batch_appends_iter(self, w_iter):
+        space = self.space
+        if not self.bin:
+            while True:
+                w_item = _next_or_none(space, w_iter)
+                if w_item is None:
+                    break
+                self.save(w_item)
+                self.write(APPEND)
+            return
+        while True:
+            items_w = _next_batch(space, w_iter)
+            self._write_appends(items_w)
+            if len(items_w) < BATCHSIZE:
+                return
+
+    def save_dict(self, w_dict):
+        if self.bin:
+            self.write(EMPTY_DICT)
+        else:
+            self.write(MARK)
+            self.write(DICT)
+        self.memoize(w_dict)
+        # iterate the strategy directly, without building item tuples
+        iterator = w_dict.iteritems()
+        if not self.bin:
+            while True:
+                w_key, w_value = iterator.next_item()
+                if w_key is None:
+                    break
+                self.save(w_key)
+                self.save(w_value)
+                self.write(SETITEM)
+            return
+        while True:
+            keys_w = []
+            values_w = []
+            while len(keys_w) < BATCHSIZE:
+                w_key, w_value = iterator.next_item()
+                if w_key is None:
+                    break
+                keys_w.append(w_key)
+                values_w.append(w_value)
+            self._write_setitems(keys_w, values_w)
+            if len(keys_w) < BATCHSIZE:
+                return
+
+    def _write_setitems(self, keys_w, values_w):
+        n = len(keys_w)
+        if n > 1:
+            self.write(MARK)
+        for i in range(n):
+            self.save(keys_w[i])
+            self.save(values_w[i])
+        if n > 1:
+            self.write(SETITEMS)
+        elif n == 1:
+            self.write(SETITEM)
+
+    def _batch_setitems_iter(self, w_iter):
+        space = self.space
+        if not self.bin:
+            while True:
+                w_item = _next_or_none(space, w_iter)
+                if w_item is None:
+                    break
+                w_key, w_value = space.fixedview(w_item, 2)
+                self.save(w_key)
+                self.save(w_value)
+                self.write(SETITEM)
+            return
+        while True:
+            items_w = _next_batch(space, w_iter)
+            keys_w = []
+            values_w = []
+            for w_item in items_w:
+                w_key, w_value = space.fixedview(w_item, 2)
+                keys_w.append(w_key)
+                values_w.append(w_value)
+            self._write_setitems(keys_w, values_w)
+            if len(items_w) < BATCHSIZE:
+                return
+
+    # ____________________________________________________________
+    # everything else: instances, globals and the reduce protocol
+
+    def save_other(self, w_obj, w_type):
+        space = self.space
+        if self.w_inst_pers_func is not None:
+            w_pid = space.call_function(self.w_inst_pers_func, w_obj)
+            if not space.is_w(w_pid, space.w_None):
+                self.save_pers(w_pid)
+                return
+        if space.is_w(w_type, space.gettypeobject(W_InstanceObject.typedef)):
+            self.save_inst(w_obj)
+            return
+        if (space.is_w(w_type, space.gettypeobject(W_ClassObject.typedef)) or
+            space.is_w(w_type, space.gettypeobject(Function.typedef)) or
+            space.is_w(w_type, space.gettypeobject(BuiltinFunction.typedef))
+            or space.is_w(w_type, space.w_type)):
+            self.save_global(w_obj, None)
+            return
+        w_dispatch_table = space.fromcache(State).get_dispatch_table(space)
+        w_reduce = space.finditem(w_dispatch_table, w_type)
+        if w_reduce is not None:
+            w_rv = space.call_function(w_reduce, w_obj)
+        else:
+            # a class with a custom metaclass is saved like a class
+            if space.issubtype_w(w_type, space.w_type):
+                self.save_global(w_obj, None)
+                return
+            w_reduce = space.findattr(w_obj, space.newtext('__reduce_ex__'))
+            if w_reduce is not None:
+                w_rv = space.call_function(w_reduce, space.newint(self.proto))
+            else:
+                w_reduce = space.findattr(w_obj, space.newtext('__reduce__'))
+                if w_reduce is None:
+                    raise oefmt(get_error(space, 'PicklingError'),
+                                "Can't pickle %N object: %R", w_type, w_obj)
+                w_rv = space.call_function(w_reduce)
+        if space.is_w(space.type(w_rv), space.w_bytes):
+            self.save_global(w_obj, w_rv)
+            return
+        if not space.is_w(space.type(w_rv), space.w_tuple):
+            raise oefmt(get_error(space, 'PicklingError'),
+                        "%R must return string or tuple", w_reduce)
+        rv_w = space.unpackiterable(w_rv)
+        if not 2 <= len(rv_w) <= 5:
+            raise oefmt(get_error(space, 'PicklingError'),
+                        "Tuple returned by %R must have two to five elements",
+                        w_reduce)
+        while len(rv_w) < 5:
+            rv_w.append(space.w_None)
+        self.save_reduce(rv_w[0], rv_w[1], rv_w[2], rv_w[3], rv_w[4], w_obj)
+
+    def save_reduce(self, w_func, w_args, w_state, w_listitems, w_dictitems,
+                    w_obj):
+        space = self.space
+        if not space.is_true(space.callable(w_func)):
+            raise oefmt(get_error(space, 'PicklingError'),
+                        "%R must be callable", w_func)
+        if not space.isinstance_w(w_args, space.w_tuple):
+            raise oefmt(get_error(space, 'PicklingError'),
+                        "args from reduce() should be a tuple")
+        w_name = space.findattr(w_func, space.newtext('__name__'))
+        if (self.proto >= 2 and w_name is not None and
+                space.eq_w(w_name, space.newtext('__newobj__'))):
+            args_w = space.fixedview(w_args)
+            if len(args_w) == 0:
+                raise oefmt(get_error(space, 'PicklingError'),
+                            "__newobj__ arglist is empty")
+            w_cls = args_w[0]
+            if space.findattr(w_cls, space.newtext('__new__')) is None:
+                raise oefmt(get_error(space, 'PicklingError'),
+                            "args[0] from __newobj__ args has no __new__")
+            w_class = space.findattr(w_obj, space.newtext('__class__'))
+            if not space.is_w(w_cls, w_class):
+                raise oefmt(get_error(space, 'PicklingError'),
+                            "args[0] from __newobj__ args has the wrong "
+                            "class")
+            self.save(w_cls)
+            self.save(space.newtuple(args_w[1:]))
+            self.write(NEWOBJ)
+        else:
+            self.save(w_func)
+            self.save(w_args)
+            self.write(REDUCE)
+        self.memoize(w_obj)
+        if not space.is_w(w_listitems, space.w_None):
+            self._batch_appends_iter(w_listitems)
+        if not space.is_w(w_dictitems, space.w_None):
+            self._batch_setitems_iter(w_dictitems)
+        if not space.is_w(w_state, space.w_None):
+            self.save(w_state)
+            self.write(BUILD)
+
+    def save_inst(self, w_obj):
+        space = self.space
+        w_cls = space.getattr(w_obj, space.newtext('__class__'))
+        w_getinitargs = space.findattr(w_obj,
+                                       space.newtext('__getinitargs__'))
+        if w_getinitargs is not None:
+            w_args = space.call_function(w_getinitargs)
+            self.keepalive_w.append(w_args)
+            args_w = space.fixedview(w_args)
+        else:
+            args_w = []
+        self.write(MARK)
+        if self.bin:
+            self.save(w_cls)
+            for w_arg in args_w:
+                self.save(w_arg)
+            self.write(OBJ)
+        else:
+            for w_arg in args_w:
+                self.save(w_arg)
+            self.write(INST)
+            self.write(space.text_w(space.getattr(
+                w_cls, space.newtext('__module__'))))
+            self.write('\n')
+            self.write(space.text_w(space.getattr(
+                w_cls, space.newtext('__name__'))))
+            self.write('\n')
+        self.memoize(w_obj)
+        w_getstate = space.findattr(w_obj, space.newtext('__getstate__'))
+        if w_getstate is not None:
+            w_state = space.call_function(w_getstate)
+            self.keepalive_w.append(w_state)
+        else:
+            w_state = space.getattr(w_obj, space.newtext('__dict__'))
+        self.save(w_state)
+        self.write(BUILD)
+
+    def save_global(self, w_obj, w_name):
+        space = self.space
+        if w_name is None:
+            w_name = space.getattr(w_obj, space.newtext('__name__'))
+        w_module = space.findattr(w_obj, space.newtext('__module__'))
+        if w_module is None or space.is_w(w_module, space.w_None):
+            w_module = whichmodule(space, w_obj, w_name)
+        try:
+            w_mod = import_module(space, w_module)
+            w_klass = space.getattr(w_mod, w_name)
+        except OperationError as e:
+            if not (e.match(space, space.w_ImportError) or
+                    e.match(space, space.w_KeyError) or
+                    e.match(space, space.w_AttributeError)):
+                raise
+            raise oefmt(get_error(space, 'PicklingError'),
+                        "Can't pickle %R: it's not found as %s.%s",
+                        w_obj, space.text_w(space.str(w_module)),
+                        space.text_w(space.str(w_name)))
+        if not space.is_w(w_klass, w_obj):
+            raise oefmt(get_error(space, 'PicklingError'),
+                        "Can't pickle %R: it's not the same object as %s.%s",
+                        w_obj, space.text_w(space.str(w_module)),
+                        space.text_w(space.str(w_name)))
+        if self.proto >= 2:
+            w_registry = space.fromcache(State).get_extension_registry(space)
+            w_code = space.finditem(w_registry,
+                                    space.newtuple([w_module, w_name]))
+            if w_code is not None:
+                code = space.int_w(w_code)
+                if code <= 0xff:
+                    self.write(EXT1)
+                    self.write(chr(code))
+                elif code <= 0xffff:
+                    self.write(EXT2)
+                    self.write(chr(code & 0xff))
+                    self.write(chr(code >> 8))
+                else:
+                    self.write(EXT4)
+                    _write_int32(self.builder, code)
+                return
+        self.write(GLOBAL)
+        self.write(space.text_w(w_module))
+        self.write('\n')
+        self.write(space.text_w(w_name))
+        self.write('\n')
+        self.memoize(w_obj)
+
+    # ____________________________________________________________
+
+    def get_persistent_id(self, space):
+        if self.w_persistent_id is None:
+            raise oefmt(space.w_AttributeError, "persistent_id")
+        return self.w_persistent_id
+
+    def set_persistent_id(self, space, w_value):
+        self.w_persistent_id = w_value
+
+    def get_inst_persistent_id(self, space):
+        if self.w_inst_persistent_id is None:
+            raise oefmt(space.w_AttributeError, "inst_persistent_id")
+        return self.w_inst_persistent_id
+
+    def set_inst_persistent_id(self, space, w_value):
+        self.w_inst_persistent_id = w_value
+
+    def get_memo(self, space):
+        if self.w_memo is None:
+            w_memo = space.newdict()
+            for w_obj, index in self.memo.items():
+                space.setitem(w_memo, space.id(w_obj),
+                              space.newtuple([space.newint(index), w_obj]))
+            self.w_memo = w_memo
+            self.memo.clear()
+        return self.w_memo
+
+    def set_memo(self, space, w_value):
+        if not space.isinstance_w(w_value, space.w_dict):
+            raise oefmt(space.w_TypeError, "memo must be a dictionary")
+        self.w_memo = w_value
+        self.memo.clear()
+
+    def get_fast(self, space):
+        return space.newint(self.fast)
+
+    def set_fast(self, space, w_value):
+        self.fast = int(space.is_true(w_value))
+
+    def get_binary(self, space):
+        return space.newbool(self.bin)
+
+    def get_proto(self, space):
+        return space.newint(self.proto)
+
+
+def _next_or_none(space, w_iter):
+    try:
+        return space.next(w_iter)
+    except OperationError as e:
+        if not e.match(space, space.w_StopIteration):
+            raise
+        return None
+
+def _next_batch(space, w_iter):
+    items_w = []
+    while len(items_w) < BATCHSIZE:
+        w_item = _next_or_none(space, w_iter)
+        if w_item is None:
+            break
+        items_w.append(w_item)
+    return items_w
+
+
+def descr_new_pickler(space, w_subtype, w_file=None, w_protocol=None):
+    if w_file is not None and space.isinstance_w(w_file, space.w_int):
+        # Pickler(protocol): the output is kept, see getvalue()
+        w_protocol = w_file
+        w_file = None
+    elif space.is_none(w_file):
+        w_file = None
+    protocol = get_protocol(space, w_protocol)
+    if (w_file is not None and
+            space.findattr(w_file, space.newtext('write')) is None):
+        raise oefmt(space.w_TypeError, "argument must have 'write' attribute")
+    w_self = space.allocate_instance(W_Pickler, w_subtype)
+    W_Pickler.__init__(space.interp_w(W_Pickler, w_self), space, w_file,
+                       protocol)
+    return w_self
+
+W_Pickler.typedef = TypeDef(
+    'cPickle.Pickler',
+    __new__ = interp2app(descr_new_pickler),
+    __doc__ = """Pickler(file, protocol=0) -- Create a pickler.
+
+This takes a file-like object for writing a pickle data stream.
+The optional proto argument tells the pickler to use the given
+protocol; supported protocols are 0, 1, 2.  The default
+protocol is 0, to be backwards compatible.  (Protocol 0 is the
+only protocol that can be written to a file opened in text
+mode and read back successfully.  When using a protocol higher
+than 0, make sure the file is opened in binary mode, both when
+pickling and unpickling.)
+
+Protocol 1 is more efficient than protocol 0; protocol 2 is
+more efficient than protocol 1.
+
+Specifying a negative protocol version selects the highest
+protocol version supported.  The higher the protocol used, the
+more recent the version of Python needed to read the pickle
+produced.
+
+The file parameter must have a write() method that accepts a single
+string argument.  It can thus be an open file object, a StringIO
+object, or any other custom object that meets this interface.
+""",
+    dump = interp2app(W_Pickler.dump),
+    clear_memo = interp2app(W_Pickler.clear_memo),
+    getvalue = interp2app(W_Pickler.getvalue),
+    persistent_id = GetSetProperty(W_Pickler.get_persistent_id,
+                                   W_Pickler.set_persistent_id),
+    inst_persistent_id = GetSetProperty(W_Pickler.get_inst_persistent_id,
+                                        W_Pickler.set_inst_persistent_id),
+    memo = GetSetProperty(W_Pickler.get_memo, W_Pickler.set_memo),
+    fast = GetSetProperty(W_Pickler.get_fast, W_Pickler.set_fast),
+    binary = GetSetProperty(W_Pickler.get_binary),
+    proto = GetSetProperty(W_Pickler.get_proto),
+)
+
+# ____________________________________________________________
+
+
+def dump(space, w_obj, w_file, w_protocol=None):
+    """dump(obj, file, protocol=0) -- Write an object in pickle format to the given file.
+
+See the Pickler docstring for the meaning of optional argument proto."""
+    protocol = get_protocol(space, w_protocol)
+    pickler = W_Pickler(space, w_file, protocol)
+    pickler.dump(w_obj)
+
+def dumps(space, w_obj, w_protocol=None):
+    """dumps(obj, protocol=0) -- Return a string containing an object in pickle format.
+
+See the Pickler docstring for the meaning of optional argument proto."""
+    protocol = get_protocol(space, w_protocol)
+    pickler = W_Pickler(space, None, protocol)
+    pickler.dump(w_obj)
+    return space.newbytes(pickler.output[0])
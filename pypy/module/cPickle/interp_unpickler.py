@@ -0,0 +1,529 @@
+from rpython.rlib.rbigint import rbigint
+from rpython.rlib.rstruct import ieee
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import interp2app
+from pypy.interpreter.typedef import TypeDef, GetSetProperty
+from pypy.interpreter.unicodehelper import (
+    check_utf8_or_raise, decode_raw_unicode_escape)
+from pypy.module.__builtin__.interp_classobj import W_ClassObject
+from pypy.module.cPickle.interp_cpickle import *
+from pypy.objspace.std.listobject import W_ListObject
+
+
+def _decode_int32(s):
+    # little-endian and signed, like marshal.loads('i' + s)
+    high = ord(s[3])
+    if high >= 0x80:
+        high -= 0x100
+    return (ord(s[0]) | (ord(s[1]) << 8) | (ord(s[2]) << 16) |
+            (high << 24))
+
+
+class W_Unpickler(W_Root):
+
+    def __init__(self, space, w_file, data):
+        self.space = space
+        # the pickle is read either from 'data' (for loads()), or from
+        # 'w_file' with its read() and readline() methods
+        self.w_file = w_file
+        self.data = data
+        self.pos = 0
+        # maps the indices to the objects; once the 'memo' attribute is
+        # used, it is replaced with 'w_memo', the same as an app-level dict
+        self.memo = {}
+        self.w_memo = None
+        self.stack_w = []
+        self.marks = []
+        self.w_persistent_load = None
+        self.w_find_global = None
+        self.w_pers_func = None
+        self.w_find_func = None
+
+    def read(self, n):
+        if self.w_file is None:
+            start = self.pos
+            stop = start + n
+            if stop > len(self.data):
+                raise OperationError(self.space.w_EOFError,
+                                     self.space.w_None)
+            self.pos = stop
+            return self.data[start:stop]
+        space = self.space
+        w_s = space.call_method(self.w_file, 'read', space.newint(n))
+        s = space.bytes_w(w_s)
+        if len(s) < n:
+            raise OperationError(space.w_EOFError, space.w_None)
+        return s
+
+    def readline(self):
+        """Read a line and return it without the final newline."""
+        if self.w_file is None:
+            start = self.pos
+            stop = self.data.find('\n', start)
+            if stop < 0:
+                raise OperationError(self.space.w_EOFError,
+                                     self.space.w_None)
+            self.pos = stop + 1
+            return self.data[start:stop]
+        space = self.space
+        s = space.bytes_w(space.call_method(self.w_file, 'readline'))
+        if not s.endswith('\n'):
+            raise OperationError(space.w_EOFError, space.w_None)
+        end = len(s) - 1
+        assert end >= 0
+        return s[:end]
+
+    def read_byte(self):
+        if self.w_file is None:
+            pos = self.pos
+            if pos >= len(self.data):
+                raise OperationError(self.space.w_EOFError,
+                                     self.space.w_None)
+            self.pos = pos + 1
+            return self.data[pos]
+        return self.read(1)[0]
+
+    # ____________________________________________________________
+    # the stack, with the positions of the marks kept in 'marks'
+
+    def push(self, w_obj):
+        self.stack_w.append(w_obj)
+
+    def _check_stack(self):
+        limit = 0
+        if self.marks:
+            limit = self.marks[-1]
+        if len(self.stack_w) <= limit:
+            raise_unpickling_error(self.space, "unpickling stack underflow")
+
+    def pop(self):
+        self._check_stack()
+        return self.stack_w.pop()
+
+    def top(self):
+        self._check_stack()
+        return self.stack_w[-1]
+
+    def pop_mark(self):
+        """Remove the topmost mark and return the items above it."""
+        if not self.marks:
+            raise_unpickling_error(self.space, "could not find MARK")
+        k = self.marks.pop()
+        assert k >= 0
+        items_w = self.stack_w[k:]
+        del self.stack_w[k:]
+        return items_w
+
+    # ____________________________________________________________
+
+    def load(self):
+        """Read a pickle from the file given to the constructor, and
+return the reconstituted object hierarchy."""
+        space = self.space
+        self.stack_w = []
+        self.marks = []
+        w_pers_func = space.findattr(self, space.newtext('persistent_load'))
+        if w_pers_func is not None and space.is_w(w_pers_func, space.w_None):
+            w_pers_func = None
+        self.w_pers_func = w_pers_func
+        # None: the default find_global; w_None: globals are not allowed
+        self.w_find_func = space.findattr(self, space.newtext('find_global'))
+        try:
+            while True:
+                op = self.read_byte()
+                if op == STOP:
+                    break
+                self.dispatch(op)
+            return self.pop()
+        finally:
+            self.stack_w = []
+            self.marks = []
+            self.w_pers_func = None
+            self.w_find_func = None
+
+    def dispatch(self, op):
+        space = self.space
+        if op == BININT1:
+            self.push(space.newint(ord(self.read_byte())))
+        elif op == BININT:
+            self.push(space.newint(_decode_int32(self.read(4))))
+        elif op == BININT2:
+            s = self.read(2)
+            self.push(space.newint(ord(s[0]) | (ord(s[1]) << 8)))
+        elif op == BINFLOAT:
+            self.push(space.newfloat(ieee.unpack_float(self.read(8), True)))
+        elif op == SHORT_BINSTRING:
+            n = ord(self.read_byte())
+            self.push(space.newbytes(self.read(n)))
+        elif op == BINSTRING:
+            n = _decode_int32(self.read(4))
+            if n < 0:
+                raise_unpickling_error(
+                    space, "BINSTRING pickle has negative byte count")
+            self.push(space.newbytes(self.read(n)))
+        elif op == BINUNICODE:
+            n = _decode_int32(self.read(4))
+            if n < 0:
+                raise_unpickling_error(
+                    space, "BINUNICODE pickle has negative byte count")
+            s = self.read(n)
+            length = check_utf8_or_raise(space, s)
+            self.push(space.newutf8(s, length))
+        elif op == MARK:
+            self.marks.append(len(self.stack_w))
+        elif op == BINPUT:
+            self.memo_put(ord(self.read_byte()))
+        elif op == LONG_BINPUT:
+            self.memo_put(_decode_int32(self.read(4)))
+        elif op == BINGET:
+            self.load_get(ord(self.read_byte()))
+        elif op == LONG_BINGET:
+            self.load_get(_decode_int32(self.read(4)))
+        elif op == EMPTY_LIST:
+            self.push(space.newlist([]))
+        elif op == EMPTY_DICT:
+            self.push(space.newdict())
+        elif op == EMPTY_TUPLE:
+            self.push(space.newtuple([]))
+        elif op == TUPLE1:
+            w_item = self.pop()
+            self.push(space.newtuple([w_item]))
+        elif op == TUPLE2:
+            w_item2 = self.pop()
+            w_item1 = self.pop()
+            self.push(space.newtuple([w_item1, w_item2]))
+        elif op == TUPLE3:
+            w_item3 = self.pop()
+            w_item2 = self.pop()
+            w_item1 = self.pop()
+            self.push(space.newtuple([w_item1, w_item2, w_item3]))
+        elif op == TUPLE:
+            self.push(space.newtuple(self.pop_mark()[:]))
+        elif op == LIST:
+            # the list gets the int, float or bytes strategy if it can
+            self.push(space.newlist(self.pop_mark()))
+        elif op == DICT:
+            items_w = self.pop_mark()
+            w_dict = space.newdict()
+            self.set_items(w_dict, items_w)
+            self.push(w_dict)
+        elif op == APPEND:
+            w_value = self.pop()
+            w_list = self.top()
+            if type(w_list) is W_ListObject:
+                w_list.append(w_value)
+            else:
+                space.call_method(w_list, 'append', w_value)
+        elif op == APPENDS:
+            items_w = self.pop_mark()
+            w_list = self.top()
+            if type(w_list) is W_ListObject:
+                w_list.extend(space.newlist(items_w))
+            else:
+                for w_item in items_w:
+                    space.call_method(w_list, 'append', w_item)
+        elif op == SETITEM:
+            w_value = self.pop()
+            w_key = self.pop()
+            space.setitem(self.top(), w_key, w_value)
+        elif op == SETITEMS:
+            items_w = self.pop_mark()
+            self.set_items(self.top(), items_w)
+        elif op == NONE:
+            self.push(space.w_None)
+        elif op == NEWTRUE:
+            self.push(space.w_True)
+        elif op == NEWFALSE:
+            self.push(space.w_False)
+        elif op == LONG1:
+            n = ord(self.read_byte())
+            self.push(self.decode_long(self.read(n)))
+        elif op == LONG4:
+            n = _decode_int32(self.read(4))
+            if n < 0:
+                raise_unpickling_error(
+                    space, "LONG pickle has negative byte count")
+            self.push(self.decode_long(self.read(n)))
+        elif op == PROTO:
+            proto = ord(self.read_byte())
+            if proto > HIGHEST_PROTOCOL:
+                raise oefmt(space.w_ValueError,
+                            "unsupported pickle protocol: %d", proto)
+        elif op == GLOBAL:
+            modname = self.readline()
+            name = self.readline()
+            self.push(self.find_class(space.newtext(modname),
+                                      space.newtext(name)))
+        elif op == REDUCE:
+            w_args = self.pop()
+            w_func = self.pop()
+            self.push(space.call(w_func, w_args))
+        elif op == NEWOBJ:
+            w_args = self.pop()
+            w_cls = self.pop()
+            w_new = space.getattr(w_cls, space.newtext('__new__'))
+            args_w = [w_cls] + space.fixedview(w_args)
+            self.push(space.call(w_new, space.newtuple(args_w)))
+        elif op == BUILD:
+            self.load_build()
+        elif op == OBJ:
+            args_w = self.pop_mark()
+            if not args_w:
+                raise_unpickling_error(space, "unpickling stack underflow")
+            self.instantiate(args_w[0], args_w[1:])
+        elif op == INST:
+            modname = self.readline()
+            name = self.readline()
+            w_klass = self.find_class(space.newtext(modname),
+                                      space.newtext(name))
+            self.instantiate(w_klass, self.pop_mark())
+        elif op == EXT1:
+            self.get_extension(ord(self.read_byte()))
+        elif op == EXT2:
+            s = self.read(2)
+            self.get_extension(ord(s[0]) | (ord(s[1]) << 8))
+        elif op == EXT4:
+            self.get_extension(_decode_int32(self.read(4)))
+        elif op == POP:
+            if self.marks and self.marks[-1] == len(self.stack_w):
+                self.marks.pop()
+            else:
+                self.pop()
+        elif op == POP_MARK:
+            self.pop_mark()
+        elif op == DUP:
+            self.push(self.top())
+        elif op == BINPERSID:
+            self.push(self.persistent_load(self.pop()))
+        # the text opcodes of protocol 0
+        elif op == INT:
+            line = self.readline()
+            if line == '01':
+                self.push(space.w_True)
+            elif line == '00':
+                self.push(space.w_False)
+            else:
+                self.push(space.call_function(space.w_int,
+                                              space.newbytes(line)))
+        elif op == LONG:
+            self.push(space.call_function(space.w_long,
+                                          space.newbytes(self.readline()),
+                                          space.newint(0)))
+        elif op == FLOAT:
+            self.push(space.call_function(space.w_float,
+                                          space.newbytes(self.readline())))
+        elif op == STRING:
+            self.load_string(self.readline())
+        elif op == UNICODE:
+            utf8, length = decode_raw_unicode_escape(space, self.readline())
+            self.push(space.newutf8(utf8, length))
+        elif op == PUT:
+            self.memo_put(self.read_index())
+        elif op == GET:
+            self.load_get(self.read_index())
+        elif op == PERSID:
+            self.push(self.persistent_load(space.newbytes(self.readline())))
+        else:
+            raise_unpickling_error(space, "invalid load key, '%s'." % (op,))
+
+    def read_index(self):
+        space = self.space
+        return space.int_w(space.call_function(space.w_int,
+                                               space.newbytes(self.readline())))
+
+    def memo_put(self, index):
+        if self.w_memo is not None:
+            space = self.space
+            space.setitem(self.w_memo, space.newint(index), self.top())
+            return
+        self.memo[index] = self.top()
+
+    def load_get(self, index):
+        if self.w_memo is not None:
+            space = self.space
+            w_obj = space.finditem(self.w_memo, space.newint(index))
+        else:
+            w_obj = self.memo.get(index, None)
+        if w_obj is None:
+            # BadPickleGet is KeyError
+            raise OperationError(self.space.w_KeyError,
+                                 self.space.newint(index))
+        self.push(w_obj)
+
+    def load_string(self, rep):
+        space = self.space
+        n = len(rep)
+        if n < 2 or rep[0] != rep[n - 1] or rep[0] not in '"\'':
+            raise oefmt(space.w_ValueError, "insecure string pickle")
+        end = n - 1
+        assert end >= 1
+        w_rep = space.newbytes(rep[1:end])
+        self.push(space.call_method(w_rep, 'decode',
+                                    space.newtext('string-escape')))
+
+    def decode_long(self, s):
+        return self.space.newlong_from_rbigint(
+            rbigint.frombytes(s, 'little', signed=True))
+
+    def set_items(self, w_dict, items_w):
+        space = self.space
+        if len(items_w) & 1:
+            raise_unpickling_error(space, "odd number of items for DICT")
+        for i in range(0, len(items_w), 2):
+            space.setitem(w_dict, items_w[i], items_w[i + 1])
+
+    def persistent_load(self, w_pid):
+        space = self.space
+        if self.w_pers_func is None:
+            raise_unpickling_error(space,
+                "A load persistent id instruction was encountered,\n"
+                "but no persistent_load function was specified.")
+        return space.call_function(self.w_pers_func, w_pid)
+
+    def find_class(self, w_modname, w_name):
+        space = self.space
+        if self.w_find_func is None:
+            return find_global_default(space, w_modname, w_name)
+        if space.is_w(self.w_find_func, space.w_None):
+            raise_unpickling_error(space,
+                "Global and instance pickles are not supported.")
+        return space.call_function(self.w_find_func, w_modname, w_name)
+
+    def get_extension(self, code):
+        space = self.space
+        state = space.fromcache(State)
+        w_code = space.newint(code)
+        w_cache = state.get_extension_cache(space)
+        w_obj = space.finditem(w_cache, w_code)
+        if w_obj is None:
+            w_key = space.finditem(state.get_inverted_registry(space),
+                                   w_code)
+            if w_key is None:
+                raise oefmt(space.w_ValueError,
+                            "unregistered extension code %d", code)
+            w_modname, w_name = space.fixedview(w_key, 2)
+            w_obj = self.find_class(w_modname, w_name)
+            space.setitem(w_cache, w_code, w_obj)
+        self.push(w_obj)
+
+    def instantiate(self, w_klass, args_w):
+        space = self.space
+        if (not args_w and isinstance(w_klass, W_ClassObject) and
+                space.findattr(w_klass,
+                               space.newtext('__getinitargs__')) is None):
+            self.push(w_klass.instantiate(space))
+            return
+        try:
+            w_value = space.call(w_klass, space.newtuple(args_w[:]))
+        except OperationError as e:
+            if not e.match(space, space.w_TypeError):
+                raise
+            w_name = space.getattr(w_klass, space.newtext('__name__'))
+            raise oefmt(space.w_TypeError, "in constructor for %s: %s",
+                        space.text_w(space.str(w_name)),
+                        space.text_w(space.str(e.get_w_value(space))))
+        self.push(w_value)
+
+    def load_build(self):
+        space = self.space
+        w_state = self.pop()
+        w_inst = self.top()
+        w_setstate = space.findattr(w_inst, space.newtext('__setstate__'))
+        if w_setstate is not None:
+            space.call_function(w_setstate, w_state)
+            return
+        w_slotstate = None
+        if (space.isinstance_w(w_state, space.w_tuple) and
+                space.len_w(w_state) == 2):
+            w_state, w_slotstate = space.fixedview(w_state, 2)
+        if space.is_true(w_state):
+            w_dict = space.getattr(w_inst, space.newtext('__dict__'))
+            space.call_method(w_dict, 'update', w_state)
+        if w_slotstate is not None and space.is_true(w_slotstate):
+            w_items = space.call_method(w_slotstate, 'items')
+            for w_item in space.listview(w_items):
+                w_key, w_value = space.fixedview(w_item, 2)
+                space.setattr(w_inst, w_key, w_value)
+
+    # ____________________________________________________________
+
+    def get_persistent_load(self, space):
+        if self.w_persistent_load is None:
+            raise oefmt(space.w_AttributeError, "persistent_load")
+        return self.w_persistent_load
+
+    def set_persistent_load(self, space, w_value):
+        self.w_persistent_load = w_value
+
+    def get_memo(self, space):
+        if self.w_memo is None:
+            w_memo = space.newdict()
+            for index, w_obj in self.memo.items():
+                space.setitem(w_memo, space.newint(index), w_obj)
+            self.w_memo = w_memo
+            self.memo.clear()
+        return self.w_memo
+
+    def set_memo(self, space, w_value):
+        if not space.isinstance_w(w_value, space.w_dict):
+            raise oefmt(space.w_TypeError, "memo must be a dictionary")
+        self.w_memo = w_value
+        self.memo.clear()
+
+    def get_find_global(self, space):
+        if self.w_find_global is None:
+            raise oefmt(space.w_AttributeError, "find_global")
+        return self.w_find_global
+
+    def set_find_global(self, space, w_value):
+        self.w_find_global = w_value
+
+
+def descr_new_unpickler(space, w_subtype, w_file):
+    if (space.findattr(w_file, space.newtext('read')) is None or
+            space.findattr(w_file, space.newtext('readline')) is None):
+        raise oefmt(space.w_TypeError,
+                    "argument must have 'read' and 'readline' attributes")
+    w_self = space.allocate_instance(W_Unpickler, w_subtype)
+    W_Unpickler.__init__(space.interp_w(W_Unpickler, w_self), space, w_file,
+                         '')
+    return w_self
+
+W_Unpickler.typedef = TypeDef(
+    'cPickle.Unpickler',
+    __new__ = interp2app(descr_new_unpickler),
+    __doc__ = """Unpickler(file) -- Create an unpickler.
+
+This takes a file-like object for reading a pickle data stream.
+
+The protocol version of the pickle is detected automatically, so no
+proto argument is needed.
+
+The file-like object must have two methods, a read() method that
+takes an integer argument, and a readline() method that requires no
+arguments.  Both methods should return a string.  Thus file-like
+object can be a file object opened for reading, a StringIO object,
+or any other custom object that meets this interface.
+""",
+    load = interp2app(W_Unpickler.load),
+    persistent_load = GetSetProperty(W_Unpickler.get_persistent_load,
+                                     W_Unpickler.set_persistent_load),
+    find_global = GetSetProperty(W_Unpickler.get_find_global,
+                                 W_Unpickler.set_find_global),
+    memo = GetSetProperty(W_Unpickler.get_memo, W_Unpickler.set_memo),
+)
+
+# ____________________________________________________________
+
+
+def load(space, w_file):
+    """load(file) -- Load a pickle from the given file"""
+    w_unpickler = descr_new_unpickler(
+        space, space.gettypeobject(W_Unpickler.typedef), w_file)
+    return space.interp_w(W_Unpickler, w_unpickler).load()
+
+def loads(space, w_data):
+    """loads(string) -- Load a pickle from the given string"""
+    unpickler = W_Unpickler(space, None, space.bytes_w(w_data))
+    return unpickler.load()
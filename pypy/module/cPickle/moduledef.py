@@ -0,0 +1,35 @@
+from pypy.interpreter.mixedmodule import MixedModule
+
+
+class Module(MixedModule):
+    """C implementation and optimization of the Python pickle module."""
+
+    appleveldefs = {
+        'BadPickleGet':      'app_cpickle.BadPickleGet',
+        'format_version':    'app_cpickle.format_version',
+        'compatible_formats': 'app_cpickle.compatible_formats',
+        }
+
+    interpleveldefs = {
+        '__version__':        'space.newtext("1.71")',
+        'HIGHEST_PROTOCOL':   'space.newint(interp_cpickle.HIGHEST_PROTOCOL)',
+
+        'Pickler':            'interp_pickler.W_Pickler',
+        'dump':               'interp_pickler.dump',
+        'dumps':              'interp_pickler.dumps',
+        'Unpickler':          'interp_unpickler.W_Unpickler',
+        'load':               'interp_unpickler.load',
+        'loads':              'interp_unpickler.loads',
+        }
+
+    def startup(self, space):
+        # the exceptions are the ones of pickle.py, so that code catching
+        # pickle.PicklingError also works with cPickle.  pickle.py can
+        # only be imported at runtime, not when the module is translated.
+        from pypy.module.cPickle.interp_cpickle import import_module
+        w_pickle = import_module(space, space.newtext('pickle'))
+        for name in ['PickleError', 'PicklingError', 'UnpicklingError']:
+            w_name = space.newtext(name)
+            space.setattr(self, w_name, space.getattr(w_pickle, w_name))
+        space.setattr(self, space.newtext('UnpickleableError'),
+                      space.getattr(w_pickle, space.newtext('PicklingError')))
@@ -0,0 +1,315 @@
+class AppTestCPickle:
+    spaceconfig = dict(usemodules=['cPickle', 'struct', 'binascii'])
+
+    def setup_class(cls):
+        cls.w_roundtrip = cls.space.appexec([], """():
+            import cPickle
+            def roundtrip(obj):
+                for proto in range(3):
+                    assert cPickle.loads(cPickle.dumps(obj, proto)) == obj
+            return roundtrip
+        """)
+        # classes that can be found by find_global()
+        w_mod = cls.space.appexec([], """():
+            import sys
+            mod = type(sys)('cpickle_test_classes')
+            sys.modules[mod.__name__] = mod
+            class C:
+                pass
+            class myint(int):
+                pass
+            class H(object):
+                pass
+            class Args:
+                def __init__(self, *args):
+                    self.args = args
+                def __getinitargs__(self):
+                    return self.args
+            class State(object):
+                def __getstate__(self):
+                    return {'x': 42}
+                def __setstate__(self, state):
+                    self.got = state
+            for cls in [C, myint, H, Args, State]:
+                cls.__module__ = mod.__name__
+                setattr(mod, cls.__name__, cls)
+            return mod
+        """)
+        for name in ['C', 'myint', 'H', 'Args', 'State']:
+            setattr(cls, 'w_' + name,
+                    cls.space.getattr(w_mod, cls.space.wrap(name)))
+
+    def test_is_builtin(self):
+        import cPickle, sys
+        assert 'cPickle' in sys.builtin_module_names
+        assert cPickle.HIGHEST_PROTOCOL == 2
+        assert cPickle.format_version == "2.0"
+
+    def test_basic_types(self):
+        for obj in [None, True, False, 0, 1, -1, 255, 256, 65535, 65536,
+                    2**31 - 1, -2**31, 2**31, 2**63 - 1, -2**63,
+                    0L, 1L, -1L, 255L, -256L, 2**100, -2**100,
+                    0.0, -0.0, 1.5, 1e300, -1e-300, float('inf'),
+                    '', 'abc', 'a\nb\\c\'"\x00\xff', 'x' * 300,
+                    u'', u'abc', u'\u1234\n\\x', u'\U00012345',
+                    (), (1,), (1, 2), (1, 2, 3), (1, 2, 3, 4),
+                    [], {}, {1: 2}]:
+            self.roundtrip(obj)
+
+    def test_pickle_py_compatible(self):
+        import cPickle, pickle
+        obj = [None, True, 1, -2**31, 2**100, 1.5, 'a\nb', u'\u1234',
+               (1, 2), (1, 2, 3, 4), [1.5, 2.5], {'a': 1}, {1.5: 2}]
+        for proto in range(3):
+            assert pickle.loads(cPickle.dumps(obj, proto)) == obj
+            assert cPickle.loads(pickle.dumps(obj, proto)) == obj
+
+    def test_exact_output(self):
+        import cPickle
+        assert cPickle.dumps(1, 2) == '\x80\x02K\x01.'
+        assert cPickle.dumps([1, 2], 1) == ']q\x01(K\x01K\x02e.'
+        assert cPickle.dumps('a', 0) == "S'a'\np1\n."
+        assert cPickle.dumps(True, 1) == 'I01\n.'
+        assert cPickle.dumps(True, 2) == '\x80\x02\x88.'
+        assert cPickle.dumps(1.5, 2) == '\x80\x02G?\xf8\x00\x00\x00\x00\x00\x00.'
+        assert cPickle.dumps(2**70, 2) == '\x80\x02\x8a\x09' + '\x00' * 8 + '@.'
+        assert cPickle.dumps(-2**70, 2) == '\x80\x02\x8a\x09' + '\x00' * 8 + '\xc0.'
+
+    def test_list_strategies(self):
+        # more than 1000 items, so that they are written in batches
+        for lst in [range(1001), [i * 0.5 for i in range(1001)],
+                    [str(i) for i in range(1001)], [1, 'a', 2.5, None],
+                    [[1, 2], [3.5], ['x']], [1], [1.5], ['a'],
+                    [-1, 2**40], [-0.0, float('inf')]]:
+            self.roundtrip(lst)
+
+    def test_dict_strategies(self):
+        for d in [dict.fromkeys(range(1001), 1.5),
+                  dict((str(i), i) for i in range(1001)),
+                  dict((i * 0.5, str(i)) for i in range(10)),
+                  {1: 'a', 'b': 2.5, None: (1, 2), (3, 4): [5]}]:
+            self.roundtrip(d)
+
+    def test_shared_and_recursive(self):
+        import cPickle
+        a = [1, 2]
+        obj = [a, a, (a, a)]
+        for proto in range(3):
+            res = cPickle.loads(cPickle.dumps(obj, proto))
+            assert res == obj
+            assert res[0] is res[1] is res[2][0] is res[2][1]
+        lst = []
+        lst.append(lst)
+        d = {}
+        d['self'] = d
+        t = ([],)
+        t[0].append(t)
+        for proto in range(3):
+            res = cPickle.loads(cPickle.dumps(lst, proto))
+            assert res[0] is res
+            res = cPickle.loads(cPickle.dumps(d, proto))
+            assert res['self'] is res
+            res = cPickle.loads(cPickle.dumps(t, proto))
+            assert res[0][0] is res
+
+    def test_instances(self):
+        import cPickle
+        C, myint, H = self.C, self.myint, self.H
+        c = C()
+        c.foo = 1
+        c.bar = [1, 2]
+        for proto in range(3):
+            res = cPickle.loads(cPickle.dumps(c, proto))
+            assert res.__class__ is C
+            assert res.__dict__ == c.__dict__
+            res = cPickle.loads(cPickle.dumps(myint(4), proto))
+            assert res == 4 and type(res) is myint
+            res = cPickle.loads(cPickle.dumps(H(), proto))
+            assert type(res) is H
+            res = cPickle.loads(cPickle.dumps(self.Args(1, 2), proto))
+            assert res.args == (1, 2)
+
+    def test_globals_and_reduce(self):
+        import cPickle, collections, os
+        for proto in range(3):
+            assert cPickle.loads(cPickle.dumps(len, proto)) is len
+            assert cPickle.loads(cPickle.dumps(os.path.join, proto)) is \
+                os.path.join
+            assert cPickle.loads(cPickle.dumps(int, proto)) is int
+            d = collections.OrderedDict([(1, 2), (3, 4)])
+            assert cPickle.loads(cPickle.dumps(d, proto)) == d
+            dd = collections.defaultdict(list, {1: [2]})
+            res = cPickle.loads(cPickle.dumps(dd, proto))
+            assert res == dd and res.default_factory is list
+            assert cPickle.loads(cPickle.dumps(set([1, 2]), proto)) == \
+                set([1, 2])
+
+    def test_getstate_setstate(self):
+        import cPickle
+        for proto in range(3):
+            res = cPickle.loads(cPickle.dumps(self.State(), proto))
+            assert res.got == {'x': 42}
+
+    def test_pickling_errors(self):
+        import cPickle, pickle
+        assert cPickle.PicklingError is pickle.PicklingError
+        raises(cPickle.PicklingError, cPickle.dumps, lambda: 1)
+        raises(cPickle.PicklingError, cPickle.dumps, lambda: 1, 2)
+        class Slots(object):
+            __slots__ = ['a']
+        raises(TypeError, cPickle.dumps, Slots(), 0)
+        raises(ValueError, cPickle.dumps, 1, 3)
+        assert cPickle.dumps(1, -1) == cPickle.dumps(1, 2)
+
+    def test_unpickling_errors(self):
+        import cPickle
+        raises(EOFError, cPickle.loads, '')
+        raises(EOFError, cPickle.loads, 'K')
+        raises(EOFError, cPickle.loads, '(lp1\nI1\na')
+        raises(cPickle.UnpicklingError, cPickle.loads, 'Z.')
+        raises(cPickle.UnpicklingError, cPickle.loads, '.')
+        raises(cPickle.UnpicklingError, cPickle.loads, 't.')
+        raises(cPickle.BadPickleGet, cPickle.loads, 'h\x05.')
+        raises(ValueError, cPickle.loads, '\x80\x03N.')
+        raises(ValueError, cPickle.loads, "S'abc\n.")
+
+    def test_file_api(self):
+        import cPickle, StringIO
+        f = StringIO.StringIO()
+        cPickle.dump([1, 2], f, 2)
+        cPickle.dump('abc', f)
+        p = cPickle.Pickler(f, 1)
+        p.dump({'x': 1.5})
+        f.seek(0)
+        assert cPickle.load(f) == [1, 2]
+        u = cPickle.Unpickler(f)
+        assert u.load() == 'abc'
+        assert u.load() == {'x': 1.5}
+        raises(EOFError, u.load)
+        raises(TypeError, cPickle.Pickler, 42.5)
+        raises(TypeError, cPickle.Unpickler, 42)
+
+    def test_pickler_without_file(self):
+        import cPickle
+        p = cPickle.Pickler(2)
+        p.dump(1)
+        p.dump([2])
+        s = p.getvalue()
+        assert s.startswith(cPickle.dumps(1, 2))
+        u = cPickle.Unpickler(__import__('StringIO').StringIO(s))
+        assert u.load() == 1
+        assert u.load() == [2]
+
+    def test_memo_and_fast(self):
+        import cPickle, StringIO
+        f = StringIO.StringIO()
+        p = cPickle.Pickler(f, 2)
+        lst = [1]
+        p.dump(lst)
+        p.dump(lst)
+        p.clear_memo()
+        p.dump(lst)
+        f.seek(0)
+        u = cPickle.Unpickler(f)
+        a = u.load()
+        assert u.load() is a
+        assert u.load() is not a
+        f = StringIO.StringIO()
+        p = cPickle.Pickler(f, 2)
+        p.fast = 1
+        p.dump([lst, lst])
+        assert 'q' not in f.getvalue()
+
+    def test_memo_attribute(self):
+        import cPickle, StringIO
+        lst = [1]
+        f = StringIO.StringIO()
+        p = cPickle.Pickler(f, 2)
+        p.dump(lst)
+        assert p.memo == {id(lst): (1, lst)}
+        p.memo.clear()
+        p.dump(lst)
+        # a second pickler sharing the memo refers to 'lst' by its index
+        f2 = StringIO.StringIO()
+        p2 = cPickle.Pickler(f2, 2)
+        p2.memo = p.memo
+        p2.dump(lst)
+        assert f2.getvalue() == '\x80\x02h\x01.'
+        p2.dump([2])
+        assert len(p.memo) == 2
+        raises(TypeError, "p.memo = []")
+        #
+        f.seek(0)
+        u = cPickle.Unpickler(f)
+        a = u.load()
+        b = u.load()
+        assert b == a and b is not a
+        assert u.memo == {1: b}
+        u2 = cPickle.Unpickler(StringIO.StringIO(f2.getvalue()))
+        u2.memo = u.memo
+        assert u2.load() is b
+        assert u2.load() == [2]
+        assert u.memo == {1: b, 2: [2]}
+        u.memo.clear()
+        u2 = cPickle.Unpickler(StringIO.StringIO(f2.getvalue()))
+        u2.memo = u.memo
+        raises(KeyError, u2.load)
+
+    def test_persistent_id(self):
+        import cPickle, StringIO
+        for proto in range(3):
+            f = StringIO.StringIO()
+            p = cPickle.Pickler(f, proto)
+            p.persistent_id = lambda obj: ('ID%d' % obj
+                                           if isinstance(obj, int) else None)
+            p.dump([1, 'a', 2])
+            f.seek(0)
+            u = cPickle.Unpickler(f)
+            raises(AttributeError, "u.persistent_load")
+            u.persistent_load = lambda pid: 'loaded ' + pid
+            assert u.load() == ['loaded ID1', 'a', 'loaded ID2']
+
+    def test_subclass_methods(self):
+        import cPickle, StringIO
+        class P(cPickle.Pickler):
+            def persistent_id(self, obj):
+                if obj == 'secret':
+                    return 'S'
+        class U(cPickle.Unpickler):
+            def persistent_load(self, pid):
+                return 'secret ' + pid
+        f = StringIO.StringIO()
+        P(f, 2).dump(['secret', 1])
+        f.seek(0)
+        assert U(f).load() == ['secret S', 1]
+
+    def test_find_global(self):
+        import cPickle, StringIO
+        s = cPickle.dumps(len)
+        u = cPickle.Unpickler(StringIO.StringIO(s))
+        u.find_global = lambda mod, name: (mod, name)
+        assert u.load() == ('__builtin__', 'len')
+        u = cPickle.Unpickler(StringIO.StringIO(s))
+        u.find_global = None
+        raises(cPickle.UnpicklingError, u.load)
+
+    def test_extension_registry(self):
+        import cPickle, copy_reg, collections
+        copy_reg.add_extension('collections', 'OrderedDict', 0xfff0)
+        try:
+            s = cPickle.dumps(collections.OrderedDict, 2)
+            assert s == '\x80\x02\x83\xf0\xff.'
+            assert cPickle.loads(s) is collections.OrderedDict
+        finally:
+            copy_reg.remove_extension('collections', 'OrderedDict', 0xfff0)
+
+    def test_list_modified_while_pickled(self):
+        import cPickle
+        class Shrink(object):
+            def __reduce__(self):
+                del lst[:]
+                return (int, (5,))
+        lst = [Shrink(), 1, 2, 3]
+        res = cPickle.loads(cPickle.dumps(lst, 2))
+        # like pickle.py, the items are saved in batches read in advance
+        assert res == [5, 1, 2, 3]
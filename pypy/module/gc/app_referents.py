@@ -65,6 +65,8 @@ class GcStats(object):
         self.memory_allocated_sum = self._format(self._s.total_allocated_memory + self._s.total_memory_pressure +
                                             self._s.jit_backend_allocated)
         self.total_gc_time = self._s.total_gc_time
+        self.arenas_count = self._s.arenas_count
+        self.sparse_arena_pages = self._s.sparse_arena_pages
 
     def _format(self, v):
         if v < 1000000:
@@ -95,6 +97,8 @@ class GcStats(object):
     -----------------------------
     Total:                   %s
 
+    Arenas:                  %d (%d sparse pages)
+
     Total time spent in GC:  %s
     """ % (self.total_gc_memory, self.peak_memory,
               self.total_arena_memory,
@@ -111,6 +115,7 @@ class GcStats(object):
            self.jit_backend_allocated,
            extra,
            self.memory_allocated_sum,
+           self.arenas_count, self.sparse_arena_pages,
            self.total_gc_time / 1000.0)
 
 
@@ -192,6 +192,8 @@ class W_GcStats(W_Root):
         self.peak_rawmalloced_memory = rgc.get_stats(rgc.PEAK_RAWMALLOCED_MEMORY)
         self.nursery_size = rgc.get_stats(rgc.NURSERY_SIZE)
         self.total_gc_time = rgc.get_stats(rgc.TOTAL_GC_TIME)
+        self.arenas_count = rgc.get_stats(rgc.ARENAS_COUNT)
+        self.sparse_arena_pages = rgc.get_stats(rgc.SPARSE_ARENA_PAGES)
 
 W_GcStats.typedef = TypeDef("GcStats",
     total_memory_pressure=interp_attrproperty("total_memory_pressure",
@@ -220,6 +222,10 @@ W_GcStats.typedef = TypeDef("GcStats",
         cls=W_GcStats, wrapfn="newint"),
     total_gc_time=interp_attrproperty("total_gc_time",
         cls=W_GcStats, wrapfn="newint"),
+    arenas_count=interp_attrproperty("arenas_count",
+        cls=W_GcStats, wrapfn="newint"),
+    sparse_arena_pages=interp_attrproperty("sparse_arena_pages",
+        cls=W_GcStats, wrapfn="newint"),
 )
 
 @unwrap_spec(memory_pressure=bool)
@@ -12,9 +12,11 @@ class AppTestGcHooks(object):
         space = cls.space
         gchooks = space.fromcache(LowLevelGcHooks)
 
-        @unwrap_spec(ObjSpace, int, r_uint, int)
-        def fire_gc_minor(space, duration, total_memory_used, pinned_objects):
-            gchooks.fire_gc_minor(duration, total_memory_used, pinned_objects)
+        @unwrap_spec(ObjSpace, int, r_uint, int, int, int)
+        def fire_gc_minor(space, duration, total_memory_used, pinned_objects,
+                          nursery_size=0, nursery_surviving_size=0):
+            gchooks.fire_gc_minor(duration, total_memory_used, pinned_objects,
+                                  nursery_size, nursery_surviving_size)
 
         @unwrap_spec(ObjSpace, int, int, int)
         def fire_gc_collect_step(space, duration, oldstate, newstate):
@@ -26,8 +28,8 @@ class AppTestGcHooks(object):
 
         @unwrap_spec(ObjSpace)
         def fire_many(space):
-            gchooks.fire_gc_minor(5.0, 0, 0)
-            gchooks.fire_gc_minor(7.0, 0, 0)
+            gchooks.fire_gc_minor(5.0, 0, 0, 0, 0)
+            gchooks.fire_gc_minor(7.0, 0, 0, 0, 0)
             gchooks.fire_gc_collect_step(5.0, 0, 0)
             gchooks.fire_gc_collect_step(15.0, 0, 0)
             gchooks.fire_gc_collect_step(22.0, 0, 0)
@@ -67,6 +69,17 @@ class AppTestGcHooks(object):
             (1, 40, 50, 60),
             ]
 
+    def test_on_gc_minor_nursery_size(self):
+        import gc
+        lst = []
+        def on_gc_minor(stats):
+            lst.append((stats.nursery_size, stats.nursery_surviving_size))
+        gc.hooks.on_gc_minor = on_gc_minor
+        self.fire_gc_minor(10, 20, 30, 4096, 512)
+        self.fire_gc_minor(40, 50, 60, 8192, 256)
+        gc.hooks.on_gc_minor = None
+        assert lst == [(4096, 512), (8192, 256)]
+
     def test_on_gc_collect_step(self):
         import gc
         SCANNING = 0
@@ -2,7 +2,7 @@
 Implementation of the interpreter-level default import logic.
 """
 
-import sys, os, stat
+import sys, os, stat, time
 
 from pypy.interpreter.module import Module
 from pypy.interpreter.gateway import interp2app, unwrap_spec
@@ -81,20 +81,28 @@ def has_init_module(space, filepart):
         return True
     return False
 
-def find_modtype(space, filepart):
+def file_exists_in(filepart, suffix, partname, names):
+    """Like file_exists(filepart + suffix).  If 'names' is not None, it is
+    the listing of the directory, as returned by DirectoryCache.listdir(),
+    and the file is only looked for if 'partname + suffix' is in it.
+    """
+    if names is None:
+        return file_exists(filepart + suffix)
+    # the names in the listing have the correct case already
+    return partname + suffix in names and os.path.isfile(filepart + suffix)
+
+def find_modtype(space, filepart, partname=None, names=None):
     """Check which kind of module to import for the given filepart,
     which is a path without extension.  Returns PY_SOURCE, PY_COMPILED or
-    SEARCH_ERROR.
+    SEARCH_ERROR.  See file_exists_in() for 'partname' and 'names'.
     """
     # check the .py file
-    pyfile = filepart + ".py"
-    if file_exists(pyfile):
+    if file_exists_in(filepart, ".py", partname, names):
         return PY_SOURCE, ".py", "U"
 
     # on Windows, also check for a .pyw file
     if _WIN32:
-        pyfile = filepart + ".pyw"
-        if file_exists(pyfile):
+        if file_exists_in(filepart, ".pyw", partname, names):
             return PY_SOURCE, ".pyw", "U"
 
     # The .py file does not exist.  By default on PyPy, lonepycfiles
@@ -104,15 +112,13 @@ def find_modtype(space, filepart):
     # lone .pyc files.
     # check the .pyc file
     if space.config.objspace.lonepycfiles:
-        pycfile = filepart + ".pyc"
-        if file_exists(pycfile):
+        if file_exists_in(filepart, ".pyc", partname, names):
             # existing .pyc file
             return PY_COMPILED, ".pyc", "rb"
 
     if has_so_extension(space):
         so_extension = get_so_extension(space)
-        pydfile = filepart + so_extension
-        if file_exists(pydfile):
+        if file_exists_in(filepart, so_extension, partname, names):
             return C_EXTENSION, so_extension, "rb"
 
     return SEARCH_ERROR, None, None
@@ -137,6 +143,74 @@ else:
         except OSError:
             return False
 
+class DirectoryListing(object):
+    def __init__(self, mtime, names):
+        self.mtime = mtime
+        self.names = names
+
+# the resolution of the modification times on FAT filesystems; most other
+# filesystems have a resolution of one second or better
+MTIME_GRANULARITY = 2.0
+
+class DirectoryCache(object):
+    """The listings of the directories where modules are looked for.  With
+    them, find_module() doesn't need to stat() every candidate file in
+    every directory of sys.path: one stat() of the directory is enough to
+    know that the listing is still valid, like with the FileFinder of
+    Python 3.  A directory whose modification time didn't change is not
+    listed again; imp.invalidate_caches() forgets all the listings.
+
+    Python 2 code never calls invalidate_caches(), and a directory can
+    change again without a new modification time if the timestamps of
+    the filesystem are coarse.  So a listing is only kept if the
+    directory was last modified more than MTIME_GRANULARITY seconds ago.
+    """
+
+    def __init__(self, space):
+        self.listings = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def invalidate(self):
+        self.listings = {}
+        self.invalidations += 1
+
+    def listdir(self, path):
+        """Returns the names in the directory 'path' as a dict
+        {name: None}, or None if they are unknown because the directory
+        cannot be listed.
+        """
+        if not os.path.isabs(path):
+            # e.g. '' in sys.path: the current directory can change
+            try:
+                path = os.path.join(os.getcwd(), path)
+            except OSError:
+                return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return {}
+        if not stat.S_ISDIR(st.st_mode):
+            return {}
+        mtime = st.st_mtime
+        listing = self.listings.get(path, None)
+        if listing is not None and listing.mtime == mtime:
+            self.hits += 1
+            return listing.names
+        self.misses += 1
+        try:
+            names_list = os.listdir(path)
+        except OSError:
+            return None
+        names = {}
+        for name in names_list:
+            names[name] = None
+        if time.time() - mtime > MTIME_GRANULARITY:
+            self.listings[path] = DirectoryListing(mtime, names)
+        return names
+
+
 def try_getattr(space, w_obj, w_name):
     try:
         return space.getattr(w_obj, w_name)
@@ -578,14 +652,17 @@ def find_module(space, modulename, w_modulename, partname, w_path,
             path = space.fsencode_w(w_pathitem)
             filepart = os.path.join(path, partname)
             log_pyverbose(space, 2, "# trying %s\n" % (filepart,))
-            if os.path.isdir(filepart) and case_ok(filepart):
+            names = space.fromcache(DirectoryCache).listdir(path)
+            if ((names is None or partname in names) and
+                    os.path.isdir(filepart) and case_ok(filepart)):
                 if has_init_module(space, filepart):
                     return FindInfo(PKG_DIRECTORY, filepart, None)
                 else:
                     msg = ("Not importing directory '%s' missing __init__.py" %
                            (filepart,))
                     space.warn(space.newtext(msg), space.w_ImportWarning)
-            modtype, suffix, filemode = find_modtype(space, filepart)
+            modtype, suffix, filemode = find_modtype(space, filepart,
+                                                     partname, names)
             try:
                 if modtype in (PY_SOURCE, PY_COMPILED, C_EXTENSION):
                     assert suffix is not None
@@ -931,9 +1008,14 @@ def load_source_module(space, w_modulename, w_mod, pathname, source, fd,
     cpathname = pathname + 'c'
     mtime = int(src_stat[stat.ST_MTIME])
     mode = src_stat[stat.ST_MODE]
-    stream = check_compiled_module(space, cpathname, mtime)
+    code_w = space.fromcache(BytecodeArchive).load(pathname, mtime)
+    stream = None
+    if code_w is None:
+        stream = check_compiled_module(space, cpathname, mtime)
 
-    if stream:
+    if code_w is not None:
+        pass    # up-to-date entry in the archive of the stdlib
+    elif stream:
         # existing and up-to-date .pyc file
         try:
             code_w = read_compiled_module(space, cpathname,
@@ -1065,6 +1147,125 @@ def read_compiled_module(space, cpathname, strbuf):
         raise oefmt(space.w_ImportError, "Non-code object in %s", cpathname)
     return w_code
 
+# The compiled modules of the standard library can be stored in a single
+# file, written when packaging by lib_pypy/tools/build_stdlib_archive.py.
+# Its format is, with the numbers in 4 bytes like in the pyc files:
+#
+#     ARCHIVE_MAGIC, the pyc magic, the number of entries, the size of
+#     the index, the index, the marshalled code objects
+#
+# and each entry of the index is: the length of the name, the name (the
+# path of the source file relative to sys.prefix, with '/'), the mtime of
+# the source file, the offset and the length of the marshalled code.
+
+ARCHIVE_MAGIC = 'PyPyBCA1'
+ARCHIVE_NAME = os.path.join('lib-python', 'stdlib-bytecode.archive')
+ARCHIVE_HEADER_SIZE = len(ARCHIVE_MAGIC) + 12
+
+class ArchiveEntry(object):
+    def __init__(self, mtime, offset, length):
+        self.mtime = mtime
+        self.offset = offset
+        self.length = length
+
+class BytecodeArchive(object):
+    """The archive of the compiled modules of the standard library.  It is
+    memory-mapped at startup, and a module is unmarshalled from it only
+    when it is imported.  This avoids looking for, opening and reading a
+    pyc file for each module.  An entry is only used if the mtime of the
+    source file didn't change; otherwise the module is imported from the
+    file system as usual.
+    """
+
+    def __init__(self, space):
+        self.space = space
+        self.root = None
+        self.entries = {}
+        self.mmap = None
+
+    def open(self, prefix):
+        """Use the archive found in 'prefix', if there is a valid one."""
+        from rpython.rlib import rmmap
+        if not self.space.config.objspace.usebytecodearchive:
+            return
+        filename = os.path.join(prefix, ARCHIVE_NAME)
+        try:
+            fd = os.open(filename, os.O_RDONLY, 0)
+        except OSError:
+            return
+        try:
+            try:
+                size = os.fstat(fd)[stat.ST_SIZE]
+                if size < ARCHIVE_HEADER_SIZE:
+                    return
+                m = rmmap.mmap(fd, size, access=rmmap.ACCESS_READ)
+            except (OSError, rmmap.RMMapError):
+                return
+        finally:
+            os.close(fd)
+        entries = self._read_index(m, size)
+        if entries is None:
+            m.close()
+            return
+        self.close()
+        self.root = os.path.join(prefix, '')
+        self.entries = entries
+        self.mmap = m
+
+    def close(self):
+        if self.mmap is not None:
+            self.mmap.close()
+        self.root = None
+        self.entries = {}
+        self.mmap = None
+
+    def _read_index(self, m, size):
+        header = m.getslice(0, ARCHIVE_HEADER_SIZE)
+        pos = len(ARCHIVE_MAGIC)
+        if header[:pos] != ARCHIVE_MAGIC:
+            return None
+        if _get_long(header[pos:pos+4]) != get_pyc_magic(self.space):
+            return None
+        count = _get_long(header[pos+4:pos+8])
+        index_size = _get_long(header[pos+8:pos+12])
+        if count < 0 or not 0 <= index_size <= size - ARCHIVE_HEADER_SIZE:
+            return None
+        index = m.getslice(ARCHIVE_HEADER_SIZE, index_size)
+        entries = {}
+        pos = 0
+        for i in range(count):
+            if pos + 4 > index_size:
+                return None
+            namelen = _get_long(index[pos:pos+4])
+            pos += 4
+            if namelen < 0 or pos + namelen + 12 > index_size:
+                return None
+            name = index[pos:pos+namelen]
+            pos += namelen
+            mtime = _get_long(index[pos:pos+4])
+            offset = _get_long(index[pos+4:pos+8])
+            length = _get_long(index[pos+8:pos+12])
+            pos += 12
+            if offset < 0 or length < 0 or offset > size - length:
+                return None
+            entries[name] = ArchiveEntry(mtime, offset, length)
+        return entries
+
+    def load(self, pathname, mtime):
+        """Returns the code object of the source file 'pathname' from the
+        archive, or None if it is not there or if its mtime changed."""
+        root = self.root
+        if root is None or not pathname.startswith(root):
+            return None
+        name = pathname[len(root):]
+        if os.sep != '/':
+            name = name.replace(os.sep, '/')
+        entry = self.entries.get(name, None)
+        if entry is None or entry.mtime != mtime:
+            return None
+        data = self.mmap.getslice(entry.offset, entry.length)
+        return read_compiled_module(self.space, pathname, data)
+
 @jit.dont_look_inside
 def load_compiled_module(space, w_modulename, w_mod, cpathname, magic,
                          timestamp, source, check_afterwards=True):
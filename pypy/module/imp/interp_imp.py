@@ -186,3 +186,26 @@ def release_lock(space):
 def reinit_lock(space):
     if space.config.objspace.usemodules.thread:
         importing.getimportlock(space).reinit_lock()
+
+#__________________________________________________________________
+
+def invalidate_caches(space):
+    """Forget the directory listings used to find the modules.  Only
+    needed if a module is added without changing the modification time of
+    its directory."""
+    space.fromcache(importing.DirectoryCache).invalidate()
+
+def _dircache_stats(space):
+    """Return a dict with the number of 'hits' (a cached listing was
+    used), 'misses' (a directory was listed) and 'invalidations' of the
+    cache of the directory listings, and the number of 'directories' in
+    it."""
+    cache = space.fromcache(importing.DirectoryCache)
+    w_result = space.newdict()
+    space.setitem_str(w_result, 'hits', space.newint(cache.hits))
+    space.setitem_str(w_result, 'misses', space.newint(cache.misses))
+    space.setitem_str(w_result, 'invalidations',
+                      space.newint(cache.invalidations))
+    space.setitem_str(w_result, 'directories',
+                      space.newint(len(cache.listings)))
+    return w_result
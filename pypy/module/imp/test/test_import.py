@@ -9,7 +9,7 @@ from pypy.tool.option import make_config
 from pypy.tool.pytest.objspace import maketestobjspace
 import pytest
 import sys, os
-import tempfile, marshal
+import tempfile, marshal, time
 
 from pypy.module.imp import importing
 
@@ -852,6 +852,29 @@ class AppTestImport:
     def test_dev_null_init_file(self):
         import devnullpkg
 
+    def test_dircache(self):
+        import imp, importlib, sys, os
+        dn = sys.path[0]
+        # the listing of a directory modified in the last seconds is not
+        # kept: it could change again without a new modification time
+        os.utime(dn, (1000000, 1000000))
+        stats0 = imp._dircache_stats()
+        raises(ImportError, "import dircache_missing")
+        raises(ImportError, "import dircache_missing")
+        stats1 = imp._dircache_stats()
+        assert stats1['hits'] > stats0['hits']
+        assert stats1['directories'] > 0
+        # adding a module changes the modification time of the directory
+        with open(os.path.join(dn, 'dircache_new.py'), 'w') as f:
+            f.write('x = 42\n')
+        import dircache_new
+        assert dircache_new.x == 42
+        assert imp._dircache_stats()['misses'] > stats1['misses']
+        importlib.invalidate_caches()
+        stats2 = imp._dircache_stats()
+        assert stats2['invalidations'] == stats1['invalidations'] + 1
+        assert stats2['directories'] == 0
+
 
 class TestAbi:
     def test_abi_tag(self):
@@ -864,6 +887,162 @@ class TestAbi:
             assert importing.get_so_extension(space1) == '.TESTi.so'
             assert importing.get_so_extension(space2) == '.so'
 
+class TestDirectoryCache:
+    def test_listdir(self, space):
+        cache = importing.DirectoryCache(space)
+        d = udir.ensure('dircache', dir=1)
+        d.join('x.py').write('')
+        d.setmtime(1000000)
+        names = cache.listdir(str(d))
+        assert names == {'x.py': None}
+        assert (cache.hits, cache.misses) == (0, 1)
+        assert cache.listdir(str(d)) is names
+        assert (cache.hits, cache.misses) == (1, 1)
+        d.join('y.py').write('')
+        d.setmtime(1000001)
+        assert cache.listdir(str(d)) == {'x.py': None, 'y.py': None}
+        assert (cache.hits, cache.misses) == (1, 2)
+        # nothing can be found in a file or a missing directory
+        assert cache.listdir(str(d.join('x.py'))) == {}
+        assert cache.listdir(str(d.join('missing'))) == {}
+        assert (cache.hits, cache.misses) == (1, 2)
+        cache.invalidate()
+        assert cache.listings == {}
+        assert cache.invalidations == 1
+
+    def test_listdir_recent(self, space):
+        cache = importing.DirectoryCache(space)
+        d = udir.ensure('dircache_recent', dir=1)
+        d.join('x.py').write('')
+        d.setmtime(time.time())
+        assert cache.listdir(str(d)) == {'x.py': None}
+        # the directory may change again within the same mtime tick
+        assert cache.listings == {}
+        d.join('y.py').write('')
+        d.setmtime(d.mtime())
+        assert cache.listdir(str(d)) == {'x.py': None, 'y.py': None}
+        assert (cache.hits, cache.misses) == (0, 2)
+
+    def test_find_modtype_uses_listing(self, space):
+        d = udir.ensure('dircache2', dir=1)
+        d.join('x.py').write('')
+        filepart = str(d.join('x'))
+        assert importing.find_modtype(space, filepart)[0] == (
+            importing.PY_SOURCE)
+        assert importing.find_modtype(space, filepart, 'x',
+                                      {'x.py': None})[0] == (
+            importing.PY_SOURCE)
+        # the listing is trusted: no stat() of the candidate files
+        assert importing.find_modtype(space, filepart, 'x', {})[0] == (
+            importing.SEARCH_ERROR)
+
+class TestBytecodeArchive:
+    def make_archive(self, space, prefix, entries, magic=None):
+        import struct
+        from lib_pypy.tools import build_stdlib_archive
+        w_marshal = space.getbuiltinmodule('marshal')
+        if magic is None:
+            magic = struct.pack('<i', importing.get_pyc_magic(space))
+        archive_entries = []
+        for name, mtime, source in entries:
+            code_w = importing.parse_source_module(space, name, source)
+            w_data = space.call_method(w_marshal, 'dumps', code_w,
+                                       space.wrap(2))
+            archive_entries.append((name, mtime, space.bytes_w(w_data)))
+        prefix.ensure('lib-python', dir=1)
+        filename = str(prefix.join(importing.ARCHIVE_NAME))
+        build_stdlib_archive.write_archive(filename, archive_entries, magic)
+        return filename
+
+    def test_same_format_as_the_build_script(self):
+        from lib_pypy.tools import build_stdlib_archive
+        assert build_stdlib_archive.ARCHIVE_MAGIC == importing.ARCHIVE_MAGIC
+        assert build_stdlib_archive.ARCHIVE_NAME == importing.ARCHIVE_NAME
+        assert build_stdlib_archive.MARSHAL_VERSION_FOR_PYC == (
+            importing.MARSHAL_VERSION_FOR_PYC)
+
+    def test_find_sources(self):
+        from lib_pypy.tools import build_stdlib_archive
+        prefix = udir.ensure('archive_sources', dir=1)
+        stdlib = prefix.ensure('lib-python', '2.7', dir=1)
+        stdlib.join('os.py').write('')
+        stdlib.ensure('json', '__init__.py')
+        stdlib.ensure('json', 'tests', 'test_x.py')
+        stdlib.ensure('test', 'test_os.py')
+        prefix.ensure('lib_pypy', '_structseq.py')
+        prefix.ensure('lib_pypy', 'README')
+        assert build_stdlib_archive.find_sources(str(prefix)) == [
+            os.path.join('lib-python', '2.7', 'json', '__init__.py'),
+            os.path.join('lib-python', '2.7', 'os.py'),
+            os.path.join('lib_pypy', '_structseq.py')]
+
+    def test_load_source_module(self, space):
+        prefix = udir.ensure('archive_load', dir=1)
+        src = prefix.ensure('lib-python', '2.7', 'archived.py')
+        src.write('x = 1\n')
+        src.setmtime(1000000)
+        # the archive contains another source, to see where the code
+        # comes from
+        self.make_archive(space, prefix, [
+            ('lib-python/2.7/archived.py', 1000000, 'x = 2\n')])
+        archive = space.fromcache(importing.BytecodeArchive)
+        archive.open(str(prefix))
+        try:
+            assert archive.root == str(prefix) + os.sep
+            assert archive.entries.keys() == ['lib-python/2.7/archived.py']
+            def load():
+                w_modulename = space.wrap('archived')
+                w_mod = space.wrap(Module(space, w_modulename))
+                fd = os.open(str(src), os.O_RDONLY)
+                try:
+                    _load_source_module(space, w_modulename, w_mod,
+                                        str(src), src.read(), fd,
+                                        write_pyc=True)
+                finally:
+                    os.close(fd)
+                w_code = space.getattr(w_mod, space.wrap('x'))
+                return space.int_w(w_code)
+            assert load() == 2
+            # no pyc file is written for the modules from the archive
+            assert not src.new(ext='.pyc').check()
+            # the source was modified: it is used instead of the archive
+            src.setmtime(1000001)
+            assert load() == 1
+            assert src.new(ext='.pyc').check()
+            # the entry has the wrong mtime now, not just the pyc file
+            src.setmtime(1000000)
+            src.new(ext='.pyc').remove()
+            assert load() == 2
+        finally:
+            archive.close()
+        assert archive.load(str(src), 1000000) is None
+
+    def test_invalid_archives(self, space):
+        prefix = udir.ensure('archive_invalid', dir=1)
+        archive = importing.BytecodeArchive(space)
+        # no archive
+        archive.open(str(prefix))
+        assert archive.root is None
+        # not the magic of the pyc files of this interpreter
+        self.make_archive(space, prefix, [], magic='\x00\x00\x0d\x0a')
+        archive.open(str(prefix))
+        assert archive.root is None
+        # truncated file
+        filename = self.make_archive(space, prefix,
+                                     [('lib-python/x.py', 0, 'x = 1')])
+        with open(filename, 'rb') as f:
+            data = f.read()
+        for size in [0, 10, len(importing.ARCHIVE_MAGIC) + 16, len(data) - 1]:
+            with open(filename, 'wb') as f:
+                f.write(data[:size])
+            archive.open(str(prefix))
+            assert archive.root is None
+        with open(filename, 'wb') as f:
+            f.write(data)
+        archive.open(str(prefix))
+        assert archive.root is not None
+        archive.close()
+
 def _getlong(data):
     x = marshal.dumps(data)
     return x[-4:]
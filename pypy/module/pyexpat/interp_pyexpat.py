@@ -405,6 +405,32 @@ def get_expat_version_info(space):
         space.newint(XML_MINOR_VERSION),
         space.newint(XML_MICRO_VERSION)])
 
+all_chars = ''.join(chr(i) for i in range(256))
+
+def fill_unknown_encoding_map(space, name, info):
+    # Yes, supports only 8bit encodings
+    translationmap, lgt = space.utf8_len_w(
+        space.call_method(
+            space.newbytes(all_chars), "decode",
+            space.newtext(name), space.newtext("replace")))
+
+    if lgt != 256:
+        raise oefmt(space.w_ValueError,
+                    "multi-byte encodings are not supported")
+
+    i = 0
+    for c in rutf8.Utf8StringIterator(translationmap):
+        if c == 0xfffd:
+            info.c_map[i] = rffi.cast(rffi.INT, -1)
+        else:
+            info.c_map[i] = rffi.cast(rffi.INT, c)
+        i += 1
+    info.c_data = lltype.nullptr(rffi.VOIDP.TO)
+    info.c_convert = lltype.nullptr(rffi.VOIDP.TO)
+    info.c_release = lltype.nullptr(rffi.VOIDP.TO)
+    return True
+
+
 class Cache:
     def __init__(self, space):
         self.w_error = space.new_exception_class("pyexpat.ExpatError")
@@ -583,30 +609,8 @@ getting the advantage of providing document type information to the parser.
         self.handlers[index] = w_handler
         setter(self.itself, handler)
 
-    all_chars = ''.join(chr(i) for i in range(256))
-
     def UnknownEncodingHandler(self, space, name, info):
-        # Yes, supports only 8bit encodings
-        translationmap, lgt = space.utf8_len_w(
-            space.call_method(
-                space.newbytes(self.all_chars), "decode",
-                space.newtext(name), space.newtext("replace")))
-
-        if lgt != 256:
-            raise oefmt(space.w_ValueError,
-                        "multi-byte encodings are not supported")
-
-        i = 0
-        for c in rutf8.Utf8StringIterator(translationmap):
-            if c == 0xfffd:
-                info.c_map[i] = rffi.cast(rffi.INT, -1)
-            else:
-                info.c_map[i] = rffi.cast(rffi.INT, c)
-            i += 1
-        info.c_data = lltype.nullptr(rffi.VOIDP.TO)
-        info.c_convert = lltype.nullptr(rffi.VOIDP.TO)
-        info.c_release = lltype.nullptr(rffi.VOIDP.TO)
-        return True
+        return fill_unknown_encoding_map(space, name, info)
 
 
     @staticmethod
@@ -0,0 +1,46 @@
+
+def save_warmup(filename):
+    """save_warmup(filename)
+
+Write the hot loops recorded so far (see warmup_record()) to a file, one
+loop per line.  Loops that were already in the file are kept."""
+    import pypyjit
+    keys = set(pypyjit.warmup_keys())
+    try:
+        keys.update(_read_warmup(filename))
+    except IOError:
+        pass
+    with open(filename, 'w') as f:
+        for co_filename, firstlineno, name, position in sorted(keys):
+            if ('\t' in co_filename or '\n' in co_filename or
+                    '\t' in name or '\n' in name):
+                continue
+            f.write('%s\t%d\t%s\t%d\n' % (co_filename, firstlineno, name,
+                                           position))
+
+def load_warmup(filename):
+    """load_warmup(filename)
+
+Read a file written by save_warmup() and preload its loops, so that the
+JIT traces them as soon as they are reached.  Call this early, before the
+hot code is imported.  A missing file is ignored."""
+    import pypyjit
+    try:
+        keys = _read_warmup(filename)
+    except IOError:
+        return
+    pypyjit.warmup_preload(keys)
+
+def _read_warmup(filename):
+    keys = []
+    with open(filename) as f:
+        for line in f:
+            parts = line.rstrip('\n').split('\t')
+            if len(parts) != 4:
+                continue
+            try:
+                keys.append((parts[0], int(parts[1]), parts[2],
+                             int(parts[3])))
+            except ValueError:
+                continue
+    return keys
@@ -238,6 +238,14 @@ def trace_next_iteration_hash(space, hash):
     jit_hooks.trace_next_iteration_hash('pypyjit', hash)
     return space.w_None
 
+@dont_look_inside
+def compile_pending(space):
+    """compile_pending() -> int
+
+Compile now the loops that were traced but queued because of the
+'defer_compile' JIT parameter.  Returns the number of loops compiled."""
+    return space.newint(jit_hooks.compile_deferred_loops(None))
+
 # class Cache(object):
 #     in_recursion = False
 
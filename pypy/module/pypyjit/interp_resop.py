@@ -397,6 +397,14 @@ def get_stats_asmmemmgr(space):
     m2 = jit_hooks.stats_asmmemmgr_used(None)
     return space.newtuple([space.newint(m1), space.newint(m2)])
 
+def get_stats_memmgr(space):
+    """Returns the number of loops that were freed because their machine
+    code went over the 'max_code_memory' limit, and the size of their code,
+    as a pair (evicted_loops, evicted_bytes)."""
+    n = jit_hooks.stats_memmgr_evicted_loops(None)
+    size = jit_hooks.stats_memmgr_evicted_bytes(None)
+    return space.newtuple([space.newint(n), space.newint(size)])
+
 def enable_debug(space):
     """ Set the jit debugging - completely necessary for some stats to work,
     most notably assembler counters.
@@ -0,0 +1,123 @@
+""" Saving and preloading the set of hot loops, to shorten the warm-up of
+new processes.
+
+The JIT counters are indexed by a hash of the greenkey, which contains the
+identity of the code object, so they cannot be stored as they are.  Instead
+we record the greenkeys of the loops that are compiled as (co_filename,
+co_firstlineno, co_name, next_instr).  When a list of such keys is
+preloaded, the code objects created afterwards are looked up in it, and the
+counters of their matching positions are set so that the JIT starts tracing
+the next time they are reached.
+"""
+
+from rpython.rlib import jit_hooks
+from rpython.rlib.jit import dont_look_inside
+from rpython.rlib.rarithmetic import r_uint
+from rpython.rtyper.annlowlevel import (cast_instance_to_gcref,
+    cast_base_ptr_to_instance)
+from rpython.rtyper.lltypesystem import lltype
+from rpython.rtyper.rclass import OBJECT
+from pypy.interpreter.error import oefmt
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.interpreter.pycode import PyCode, CodeHookCache
+
+
+class JitWarmup(object):
+    def __init__(self, space):
+        self.space = space
+        self.recording = False
+        # (co_filename, co_firstlineno, co_name, next_instr) -> None
+        self.hot_keys = {}
+        # (co_filename, co_firstlineno, co_name) -> [next_instr, ...]
+        self.pending = {}
+
+    def record(self, pycode, next_instr):
+        key = (pycode.co_filename, pycode.co_firstlineno, pycode.co_name,
+               next_instr)
+        self.hot_keys[key] = None
+
+    def preload(self, filename, firstlineno, name, next_instr):
+        key = (filename, firstlineno, name)
+        positions = self.pending.get(key, None)
+        if positions is None:
+            positions = []
+            self.pending[key] = positions
+        if next_instr not in positions:
+            positions.append(next_instr)
+        self.space.fromcache(CodeHookCache)._jit_warmup = self
+
+    @dont_look_inside
+    def new_code(self, pycode):
+        if not self.pending:
+            return
+        key = (pycode.co_filename, pycode.co_firstlineno, pycode.co_name)
+        positions = self.pending.get(key, None)
+        if positions is None:
+            return
+        del self.pending[key]
+        for next_instr in positions:
+            if 0 <= next_instr < len(pycode.co_code):
+                self.trace_next_iteration(pycode, next_instr)
+                if self.recording:
+                    # keep the preloaded loops in the next save_warmup(),
+                    # even if their tracing is aborted this time
+                    self.record(pycode, next_instr)
+
+    def trace_next_iteration(self, pycode, next_instr):
+        jit_hooks.trace_next_iteration('pypyjit', r_uint(next_instr), 0,
+                                       cast_instance_to_gcref(pycode))
+
+
+def record_greenkey(warmup, jitdriver, greenkey):
+    # called from the JIT hooks, which are annotated too late to add
+    # a method to JitWarmup
+    if jitdriver.name != 'pypyjit' or greenkey is None:
+        return
+    next_instr = greenkey[0].getint()
+    ll_code = lltype.cast_opaque_ptr(lltype.Ptr(OBJECT),
+                                     greenkey[2].getref_base())
+    pycode = cast_base_ptr_to_instance(PyCode, ll_code)
+    assert pycode is not None
+    assert next_instr >= 0
+    warmup.record(pycode, next_instr)
+
+
+@unwrap_spec(enable=bool)
+def warmup_record(space, enable=True):
+    """warmup_record(enable=True)
+
+Start (or stop) recording the loops that the JIT compiles.  The recorded
+loops are returned by warmup_keys()."""
+    space.fromcache(JitWarmup).recording = enable
+
+def warmup_keys(space):
+    """warmup_keys() -> list
+
+Return the recorded hot loops, as a list of tuples (co_filename,
+co_firstlineno, co_name, bytecode_position)."""
+    warmup = space.fromcache(JitWarmup)
+    keys_w = []
+    for key in warmup.hot_keys:
+        filename, firstlineno, name, next_instr = key
+        keys_w.append(space.newtuple([space.newtext(filename),
+                                      space.newint(firstlineno),
+                                      space.newtext(name),
+                                      space.newint(next_instr)]))
+    return space.newlist(keys_w)
+
+def warmup_preload(space, w_keys):
+    """warmup_preload(keys)
+
+Take a list of tuples like the ones returned by warmup_keys().  The JIT
+starts tracing these loops as soon as they are reached, instead of waiting
+for their counters to reach the threshold.  Only code objects created
+after this call are affected."""
+    warmup = space.fromcache(JitWarmup)
+    for w_key in space.listview(w_keys):
+        items_w = space.fixedview(w_key)
+        if len(items_w) != 4:
+            raise oefmt(space.w_ValueError,
+                        "expected tuples (co_filename, co_firstlineno, "
+                        "co_name, bytecode_position)")
+        warmup.preload(space.text_w(items_w[0]), space.int_w(items_w[1]),
+                       space.text_w(items_w[2]), space.int_w(items_w[3]))
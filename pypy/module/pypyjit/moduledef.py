@@ -2,6 +2,8 @@ from pypy.interpreter.mixedmodule import MixedModule
 
 class Module(MixedModule):
     appleveldefs = {
+        'save_warmup': 'app_warmup.save_warmup',
+        'load_warmup': 'app_warmup.load_warmup',
     }
 
     interpleveldefs = {
@@ -12,11 +14,16 @@ class Module(MixedModule):
         'dont_trace_here': 'interp_jit.dont_trace_here',
         'trace_next_iteration': 'interp_jit.trace_next_iteration',
         'trace_next_iteration_hash': 'interp_jit.trace_next_iteration_hash',
+        'compile_pending': 'interp_jit.compile_pending',
         'set_compile_hook': 'interp_resop.set_compile_hook',
         'set_abort_hook': 'interp_resop.set_abort_hook',
         'set_trace_too_long_hook': 'interp_resop.set_trace_too_long_hook',
         'get_stats_snapshot': 'interp_resop.get_stats_snapshot',
         'get_stats_asmmemmgr': 'interp_resop.get_stats_asmmemmgr',
+        'get_stats_memmgr': 'interp_resop.get_stats_memmgr',
+        'warmup_record': 'interp_warmup.warmup_record',
+        'warmup_keys': 'interp_warmup.warmup_keys',
+        'warmup_preload': 'interp_warmup.warmup_preload',
         # those things are disabled because they have bugs, but if
         # they're found to be useful, fix test_ztranslation_jit_stats
         # in the backend first. get_stats_snapshot still produces
@@ -0,0 +1,142 @@
+import py
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.pycode import PyCode
+from rpython.jit.metainterp.history import (JitCellToken, ConstInt, ConstPtr,
+     BasicFailDescr)
+from rpython.rtyper.annlowlevel import (cast_instance_to_base_ptr,
+    cast_gcref_to_instance)
+from rpython.rtyper.lltypesystem import lltype, llmemory
+from rpython.rlib import jit_hooks
+from rpython.rlib.jit import JitDebugInfo
+from pypy.module.pypyjit.interp_jit import pypyjitdriver
+from pypy.module.pypyjit.hooks import pypy_hooks
+
+
+class MockJitDriverSD(object):
+    jitdriver = pypyjitdriver
+
+
+class AppTestJitWarmup(object):
+    spaceconfig = dict(usemodules=('pypyjit',))
+
+    def setup_class(cls):
+        if cls.runappdirect:
+            py.test.skip("Can't run this test with -A")
+        space = cls.space
+        traced = []
+
+        def trace_next_iteration(name, next_instr, is_being_profiled,
+                                 code_gcref):
+            assert name == 'pypyjit'
+            pycode = cast_gcref_to_instance(PyCode, code_gcref)
+            traced.append((pycode.co_name, next_instr))
+        cls.orig_trace_next_iteration = jit_hooks.trace_next_iteration
+        jit_hooks.trace_next_iteration = trace_next_iteration
+
+        @unwrap_spec(w_code=PyCode, next_instr=int, is_bridge=bool)
+        def interp_on_compile(w_code, next_instr, is_bridge=False):
+            ll_code = cast_instance_to_base_ptr(w_code)
+            code_gcref = lltype.cast_opaque_ptr(llmemory.GCREF, ll_code)
+            greenkey = [ConstInt(next_instr), ConstInt(0),
+                        ConstPtr(code_gcref)]
+            if is_bridge:
+                di = JitDebugInfo(MockJitDriverSD, None, JitCellToken(), [],
+                                  'bridge', fail_descr=BasicFailDescr())
+                if pypy_hooks.are_hooks_enabled():
+                    pypy_hooks.after_compile_bridge(di)
+            else:
+                di = JitDebugInfo(MockJitDriverSD, None, JitCellToken(), [],
+                                  'loop', greenkey)
+                if pypy_hooks.are_hooks_enabled():
+                    pypy_hooks.after_compile(di)
+
+        def interp_get_traced():
+            result = space.newlist([space.newtuple([space.newtext(name),
+                                                    space.newint(pos)])
+                                    for name, pos in traced])
+            del traced[:]
+            return result
+
+        cls.w_on_compile = space.wrap(interp2app(interp_on_compile))
+        cls.w_get_traced = space.wrap(interp2app(interp_get_traced))
+        cls.w_tmpfile = space.newtext(str(py.test.ensuretemp(
+            'jit_warmup').join('warmup.txt')))
+
+    def teardown_class(cls):
+        if not cls.runappdirect:
+            jit_hooks.trace_next_iteration = cls.orig_trace_next_iteration
+
+    def test_record(self):
+        import pypyjit
+        def f():
+            pass
+        self.on_compile(f.__code__, 3)
+        assert pypyjit.warmup_keys() == []
+        pypyjit.warmup_record()
+        try:
+            self.on_compile(f.__code__, 3)
+            self.on_compile(f.__code__, 3)
+            self.on_compile(f.__code__, 7, True)
+            keys = pypyjit.warmup_keys()
+            assert keys == [(f.__code__.co_filename,
+                             f.__code__.co_firstlineno, 'f', 3)]
+        finally:
+            pypyjit.warmup_record(False)
+
+    def test_preload(self):
+        import pypyjit
+        src = "def g():\n    for i in range(10):\n        pass\n"
+        pypyjit.warmup_preload([('<warmup>', 1, 'g', 3),
+                                ('<warmup>', 1, 'g', 1000),
+                                ('<other>', 1, 'g', 5)])
+        assert self.get_traced() == []
+        d = {}
+        exec compile(src, '<warmup>', 'exec') in d
+        assert self.get_traced() == [('g', 3)]
+        # only the first code object with that key is affected
+        exec compile(src, '<warmup>', 'exec') in d
+        assert self.get_traced() == []
+
+    def test_preload_recorded(self):
+        import pypyjit
+        pypyjit.warmup_preload([('<recorded>', 1, 'g', 3)])
+        pypyjit.warmup_record()
+        try:
+            d = {}
+            exec compile("def g():\n    pass\n", '<recorded>', 'exec') in d
+        finally:
+            pypyjit.warmup_record(False)
+        assert self.get_traced() == [('g', 3)]
+        assert ('<recorded>', 1, 'g', 3) in pypyjit.warmup_keys()
+
+    def test_preload_bad_key(self):
+        import pypyjit
+        raises(ValueError, pypyjit.warmup_preload, [('<warmup>', 1, 'g')])
+        raises(TypeError, pypyjit.warmup_preload, [('<warmup>', 'x', 'g', 3)])
+
+    def test_save_load(self):
+        import pypyjit
+        def h():
+            pass
+        pypyjit.warmup_record()
+        try:
+            self.on_compile(h.__code__, 5)
+        finally:
+            pypyjit.warmup_record(False)
+        pypyjit.save_warmup(self.tmpfile)
+        with open(self.tmpfile) as f:
+            lines = f.readlines()
+        expected = '%s\t%d\th\t5\n' % (h.__code__.co_filename,
+                                        h.__code__.co_firstlineno)
+        assert expected in lines
+        # saving again keeps the loops already in the file
+        pypyjit.save_warmup(self.tmpfile)
+        with open(self.tmpfile) as f:
+            assert f.readlines() == lines
+        with open(self.tmpfile, 'a') as f:
+            f.write('<saved>\t1\tk\t2\nnot a valid line\n')
+        pypyjit.load_warmup(self.tmpfile)
+        pypyjit.load_warmup(self.tmpfile + '.missing')
+        d = {}
+        exec compile("def k():\n    pass\n", '<saved>', 'exec') in d
+        assert self.get_traced() == [('k', 2)]
@@ -360,6 +360,26 @@ class TestCall(BaseTestPyPyC):
             setarrayitem_gc(p17, i13, i12, descr=<ArrayS .>)
         """)
 
+    def test_call_partial(self):
+        def main(n):
+            from functools import partial
+            def f(a, b):
+                return a + b
+            p = partial(f, 1)
+            i = 0
+            while i < n:
+                i = p(i)    # ID: call
+            return i
+        #
+        log = self.run(main, [1000])
+        assert log.result == 1000
+        loop, = log.loops_by_id('call')
+        # the partial and its arguments are seen through, and the call to
+        # f() is inlined
+        ops = log.opnames(loop.ops_by_id('call'))
+        assert [op for op in ops if op.startswith('call')] == []
+        assert 'new_with_vtable' not in ops
+
     def test_blockstack_virtualizable(self):
         def main(n):
             from pypyjit import residual_call
@@ -54,6 +54,28 @@ class TestInstance(BaseTestPyPyC):
             jump(..., descr=...)
         """)
 
+    def test_unboxed_attributes(self):
+        def main(n):
+            class Point(object):
+                def __init__(self, x, y):
+                    self.x = x
+                    self.y = y
+            p = Point(0.0, 0.5)
+            i = 0
+            while i < n:
+                p.x = p.x + p.y    # ID: update
+                i += 1
+            return p.x
+        #
+        log = self.run(main, [1000])
+        assert log.result == 500.0
+        loop, = log.loops_by_id('update')
+        # the float attributes are read and written in place, without
+        # allocating a W_FloatObject
+        ops = log.opnames(loop.ops_by_id('update'))
+        assert 'new_with_vtable' not in ops
+        assert 'float_add' in ops
+
     def test_getattr_with_dynamic_attribute(self):
         src = """
         class A(object):
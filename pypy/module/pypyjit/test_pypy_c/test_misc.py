@@ -420,3 +420,21 @@ class TestMisc(BaseTestPyPyC):
         # the following assertion fails if the loop was cancelled due
         # to "abort: vable escape"
         assert len(loops) == 1
+
+    def test_coverage(self):
+        def main(n):
+            import __pypy__
+            __pypy__.coverage_start()
+            i = 0
+            while i < n:
+                i += 1    # ID: increment
+            __pypy__.coverage_stop()
+            return i
+
+        log = self.run(main, [1000])
+        assert log.result == 1000
+        loop, = log.loops_by_id("increment")
+        assert loop.match_by_id("increment", """
+            i1 = int_add_ovf(i0, 1)
+            guard_no_overflow(descr=...)
+        """)
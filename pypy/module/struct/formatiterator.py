@@ -202,3 +202,118 @@ class UnpackFormatIterator(FormatIterator):
 
     def skip(self, size):
         self.read(size) # XXX, could avoid taking the slice
+
+
+class PackManyFormatIterator(PackFormatIterator):
+    """Pack many records, each one being a list of values, into slots of
+    'recordsize' bytes.  The format is interpreted only once: each format
+    unit is packed for all the records in turn."""
+
+    def __init__(self, space, wbuf, recordsize, records_w):
+        PackFormatIterator.__init__(self, space, wbuf, [])
+        self.recordsize = recordsize
+        self.records_w = records_w
+        self.offset = 0     # offset of the current unit inside a record
+
+    @jit.unroll_safe
+    @specialize.arg(1)
+    def operate(self, fmtdesc, repetitions):
+        if fmtdesc.needcount:
+            self.pack_column(fmtdesc, repetitions)
+        else:
+            for i in range(repetitions):
+                self.pack_column(fmtdesc, 1)
+    _operate_is_specialized_ = True
+
+    @specialize.arg(1)
+    def pack_column(self, fmtdesc, repetitions):
+        args_index = self.args_index
+        for i in range(len(self.records_w)):
+            self.pos = i * self.recordsize + self.offset
+            self.args_w = self.records_w[i]
+            self.args_index = args_index
+            if fmtdesc.needcount:
+                fmtdesc.pack(self, repetitions)
+            else:
+                fmtdesc.pack(self)
+        self.offset += fmtdesc.size * repetitions
+
+    def align(self, mask):
+        pad = (-self.offset) & mask
+        for i in range(len(self.records_w)):
+            self.wbuf.setzeros(i * self.recordsize + self.offset, pad)
+        self.offset += pad
+
+    def finished(self):
+        for args_w in self.records_w:
+            if len(args_w) > self.args_index:
+                raise StructError("too many arguments for struct format")
+
+
+class UnpackManyFormatIterator(UnpackFormatIterator):
+    """Unpack 'count' records of 'recordsize' bytes.  The format is
+    interpreted only once: each format unit is unpacked from all the
+    records in turn, which gives one column of values per unit.  The
+    columns of ints and floats are built without boxing the values."""
+
+    def __init__(self, space, buf, recordsize, count):
+        UnpackFormatIterator.__init__(self, space, buf)
+        self.recordsize = recordsize
+        self.count = count
+        self.offset = 0     # offset of the current unit inside a record
+        self.columns_w = []
+        self.fmtchars = []  # the format character of each column
+        self.ints = []
+        self.floats = []
+
+    @jit.unroll_safe
+    @specialize.arg(1)
+    def operate(self, fmtdesc, repetitions):
+        if fmtdesc.fmtchar == 'x':
+            self.offset += repetitions
+        elif fmtdesc.needcount:
+            self.unpack_column(fmtdesc, repetitions)
+        else:
+            for i in range(repetitions):
+                self.unpack_column(fmtdesc, 1)
+    _operate_is_specialized_ = True
+
+    @specialize.arg(1)
+    def unpack_column(self, fmtdesc, repetitions):
+        self.result_w = []
+        self.ints = []
+        self.floats = []
+        for i in range(self.count):
+            self.pos = i * self.recordsize + self.offset
+            if fmtdesc.needcount:
+                fmtdesc.unpack(self, repetitions)
+            else:
+                fmtdesc.unpack(self)
+        self.offset += fmtdesc.size * repetitions
+        space = self.space
+        if self.ints:
+            w_column = space.newlist_int(self.ints)
+        elif self.floats:
+            w_column = space.newlist_float(self.floats)
+        else:
+            w_column = space.newlist(self.result_w)
+        self.columns_w.append(w_column)
+        self.fmtchars.append(fmtdesc.fmtchar)
+
+    def align(self, mask):
+        self.offset = (self.offset + mask) & ~mask
+
+    def finished(self):
+        pass
+
+    @specialize.argtype(1)
+    def appendobj(self, value):
+        if (isinstance(value, r_uint) or isinstance(value, r_ulonglong) or
+                isinstance(value, r_longlong) or isinstance(value, bool)):
+            UnpackFormatIterator.appendobj(self, value)
+        elif isinstance(value, int):
+            self.ints.append(value)
+        elif isinstance(value, float):
+            self.floats.append(value)
+        else:
+            UnpackFormatIterator.appendobj(self, value)
@@ -1,4 +1,5 @@
 from rpython.rlib import jit
+from rpython.rlib.rarithmetic import LONG_BIT
 from rpython.rlib.buffer import SubBuffer
 from rpython.rlib.mutbuffer import MutableStringBuffer
 from rpython.rlib.rstruct.error import StructError, StructOverflowError
@@ -10,7 +11,8 @@ from pypy.interpreter.error import OperationError, oefmt
 from pypy.interpreter.typedef import TypeDef, interp_attrproperty
 from pypy.interpreter.typedef import make_weakref_descr
 from pypy.module.struct.formatiterator import (
-    PackFormatIterator, UnpackFormatIterator
+    PackFormatIterator, UnpackFormatIterator, PackManyFormatIterator,
+    UnpackManyFormatIterator
 )
 
 
@@ -119,6 +121,153 @@ fmt, starting at offset. Requires len(buffer[offset:]) >= calcsize(fmt)."""
     return _unpack(space, format, buf)
 
 
+@unwrap_spec(format='text', offset=int)
+def pack_many(space, format, w_buffer, offset, w_records):
+    """Pack the records, which are sequences of values, according to fmt.
+Write them one after the other into the writable buffer buf starting at
+offset."""
+    size = _calcsize(space, format)
+    records_w = [space.fixedview(w_record)
+                 for w_record in space.unpackiterable(w_records)]
+    buf = space.getarg_w('w*', w_buffer)
+    if offset < 0:
+        offset += buf.getlength()
+    total = size * len(records_w)
+    if offset < 0 or (buf.getlength() - offset) < total:
+        raise oefmt(get_error(space),
+                    "pack_many requires a buffer of at least %d bytes",
+                    total)
+    #
+    wbuf = SubBuffer(buf, offset, total)
+    fmtiter = PackManyFormatIterator(space, wbuf, size, records_w)
+    try:
+        fmtiter.interpret(format)
+    except StructOverflowError as e:
+        raise OperationError(space.w_OverflowError, space.newtext(e.msg))
+    except StructError as e:
+        raise OperationError(get_error(space), space.newtext(e.msg))
+
+
+class ArrayCache:
+    def __init__(self, space):
+        self.w_array = None
+
+def _column_to_array(space, fmtchar, w_column):
+    if fmtchar in 'bBhHiIlLfdc':
+        typecode = fmtchar
+    elif fmtchar == 'q' and LONG_BIT == 64:
+        typecode = 'l'
+    elif fmtchar == 'Q' and LONG_BIT == 64:
+        typecode = 'L'
+    else:
+        return w_column     # array.array cannot hold this column
+    cache = space.fromcache(ArrayCache)
+    if cache.w_array is None:
+        cache.w_array = space.appexec([], """():
+            from array import array
+            return array""")
+    return space.call_function(cache.w_array, space.newtext(typecode),
+                               w_column)
+
+@unwrap_spec(format='text', count=int, offset=int, arrays=bool)
+def unpack_many(space, format, w_buffer, count=-1, offset=0, arrays=False):
+    """Unpack count records from the buffer according to fmt, starting at
+offset, and return them as a tuple of columns: one list per value of the
+format.  By default, all the records in the rest of the buffer are
+unpacked.  If arrays is true, the numeric columns are returned as
+array.array objects instead of lists."""
+    size = _calcsize(space, format)
+    buf = space.getarg_w('s*', w_buffer)
+    length = buf.getlength()
+    if offset < 0:
+        offset += length
+    if offset < 0 or offset > length:
+        raise oefmt(get_error(space), "unpack_many offset out of range")
+    available = length - offset
+    if count < 0:
+        if size == 0:
+            raise oefmt(get_error(space),
+                        "cannot unpack an unknown number of records of "
+                        "length 0")
+        if available % size != 0:
+            raise oefmt(get_error(space),
+                        "unpack_many requires a buffer of a multiple of %d "
+                        "bytes", size)
+        count = available // size
+    elif size != 0 and count > available // size:
+        raise oefmt(get_error(space),
+                    "unpack_many requires a buffer of at least %d records "
+                    "of %d bytes", count, size)
+    buf = SubBuffer(buf, offset, count * size)
+    fmtiter = UnpackManyFormatIterator(space, buf, size, count)
+    try:
+        fmtiter.interpret(format)
+    except StructOverflowError as e:
+        raise OperationError(space.w_OverflowError, space.newtext(e.msg))
+    except StructError as e:
+        raise OperationError(get_error(space), space.newtext(e.msg))
+    columns_w = fmtiter.columns_w
+    result_w = [None] * len(columns_w)
+    for i in range(len(columns_w)):
+        w_column = columns_w[i]
+        if arrays:
+            w_column = _column_to_array(space, fmtiter.fmtchars[i], w_column)
+        result_w[i] = w_column
+    return space.newtuple(result_w)
+
+
+class W_UnpackIter(W_Root):
+    _immutable_fields_ = ["format", "size"]
+
+    def __init__(self, format, size, buf):
+        self.format = format
+        self.size = size
+        self.buf = buf
+        self.index = 0
+
+    def descr_iter(self, space):
+        return self
+
+    def descr_next(self, space):
+        # the buffer of a bytearray can shrink in the meantime
+        if self.index + self.size > self.buf.getlength():
+            raise OperationError(space.w_StopIteration, space.w_None)
+        buf = SubBuffer(self.buf, self.index, self.size)
+        self.index += self.size
+        return _unpack(space, jit.promote_string(self.format), buf)
+
+    def descr_length_hint(self, space):
+        remaining = self.buf.getlength() - self.index
+        return space.newint(max(remaining, 0) // self.size)
+
+W_UnpackIter.typedef = TypeDef("unpack_iterator",
+    __iter__=interp2app(W_UnpackIter.descr_iter),
+    next=interp2app(W_UnpackIter.descr_next),
+    __length_hint__=interp2app(W_UnpackIter.descr_length_hint),
+)
+W_UnpackIter.typedef.acceptable_as_base_class = False
+
+
+def _iter_unpack(space, format, w_buffer):
+    size = _calcsize(space, format)
+    if size == 0:
+        raise oefmt(get_error(space),
+                    "cannot iteratively unpack with a struct of length 0")
+    buf = space.getarg_w('s*', w_buffer)
+    if buf.getlength() % size != 0:
+        raise oefmt(get_error(space),
+                    "iterative unpacking requires a buffer of a multiple "
+                    "of %d bytes", size)
+    return W_UnpackIter(format, size, buf)
+
+@unwrap_spec(format='text')
+def iter_unpack(space, format, w_buffer):
+    """Return an iterator yielding tuples unpacked from the buffer according
+to fmt, one record of calcsize(fmt) bytes at a time.  The buffer is not
+copied."""
+    return _iter_unpack(space, format, w_buffer)
+
+
 class W_Struct(W_Root):
     _immutable_fields_ = ["format", "size"]
 
@@ -147,6 +296,20 @@ class W_Struct(W_Root):
     def descr_unpack_from(self, space, w_buffer, offset=0):
         return unpack_from(space, jit.promote_string(self.format), w_buffer, offset)
 
+    def descr_iter_unpack(self, space, w_buffer):
+        return _iter_unpack(space, self.format, w_buffer)
+
+    @unwrap_spec(offset=int)
+    def descr_pack_many(self, space, w_buffer, offset, w_records):
+        return pack_many(space, jit.promote_string(self.format), w_buffer,
+                         offset, w_records)
+
+    @unwrap_spec(count=int, offset=int, arrays=bool)
+    def descr_unpack_many(self, space, w_buffer, count=-1, offset=0,
+                          arrays=False):
+        return unpack_many(space, jit.promote_string(self.format), w_buffer,
+                           count, offset, arrays)
+
 W_Struct.typedef = TypeDef("Struct",
     __new__=interp2app(W_Struct.descr__new__.im_func),
     __init__=interp2app(W_Struct.descr__init__),
@@ -157,6 +320,9 @@ W_Struct.typedef = TypeDef("Struct",
     unpack=interp2app(W_Struct.descr_unpack),
     pack_into=interp2app(W_Struct.descr_pack_into),
     unpack_from=interp2app(W_Struct.descr_unpack_from),
+    iter_unpack=interp2app(W_Struct.descr_iter_unpack),
+    pack_many=interp2app(W_Struct.descr_pack_many),
+    unpack_many=interp2app(W_Struct.descr_unpack_many),
     __weakref__=make_weakref_descr(W_Struct),
 )
 
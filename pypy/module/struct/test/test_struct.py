@@ -462,6 +462,81 @@ class AppTestStruct(object):
         assert val == sys.maxint+1
         assert type(val) is long
 
+    def test_iter_unpack(self):
+        s = self.struct.Struct('<hc')
+        data = s.pack(1, 'a') + s.pack(-2, 'b') + s.pack(3, 'c')
+        it = self.struct.iter_unpack('<hc', data)
+        assert it.__length_hint__() == 3
+        assert next(it) == (1, 'a')
+        assert it.__length_hint__() == 2
+        assert list(it) == [(-2, 'b'), (3, 'c')]
+        assert list(s.iter_unpack(bytearray(data))) == [
+            (1, 'a'), (-2, 'b'), (3, 'c')]
+        assert list(s.iter_unpack(memoryview(data))) == [
+            (1, 'a'), (-2, 'b'), (3, 'c')]
+        assert list(s.iter_unpack('')) == []
+        raises(self.struct.error, s.iter_unpack, data[:-1])
+        raises(self.struct.error, self.struct.iter_unpack, '', 'abc')
+        raises(self.struct.error, self.struct.iter_unpack, '0i', '')
+
+    def test_unpack_many(self):
+        import sys
+        s = self.struct.Struct('<ixhd2sQ?')
+        records = [(i, -i, i * 0.5, 'ab', sys.maxint + i, i % 2 == 0)
+                   for i in range(5)]
+        data = ''.join([s.pack(*record) for record in records])
+        columns = s.unpack_many(data)
+        assert columns == tuple([list(column) for column in zip(*records)])
+        assert self.struct.unpack_many('<ixhd2sQ?', data) == columns
+        assert s.unpack_many(data, 2, s.size) == tuple(
+            [list(column) for column in zip(*records[1:3])])
+        assert s.unpack_many(bytearray(data), offset=-s.size) == tuple(
+            [[value] for value in records[-1]])
+        assert s.unpack_many('') == ([], [], [], [], [], [])
+        assert s.unpack_many(data, 0) == ([], [], [], [], [], [])
+        # native alignment inside the records
+        s = self.struct.Struct('bi')
+        data = s.pack(1, 2) + s.pack(3, 4)
+        assert s.unpack_many(data) == ([1, 3], [2, 4])
+        assert self.struct.unpack_many('3h', '\x01\x00' * 6) == (
+            [1, 1], [1, 1], [1, 1])
+        raises(self.struct.error, s.unpack_many, data + 'x')
+        raises(self.struct.error, s.unpack_many, data, 3)
+        raises(self.struct.error, s.unpack_many, data, offset=100)
+        raises(self.struct.error, self.struct.unpack_many, '', 'abc')
+
+    def test_unpack_many_arrays(self):
+        import array
+        data = self.struct.pack('<ihd', 1, 2, 3.5) * 3
+        ints, shorts, doubles = self.struct.unpack_many('<ihd', data,
+                                                        arrays=True)
+        assert ints == array.array('i', [1, 1, 1])
+        assert shorts == array.array('h', [2, 2, 2])
+        assert doubles == array.array('d', [3.5, 3.5, 3.5])
+        s, = self.struct.unpack_many('2s', 'abcd', arrays=True)
+        assert s == ['ab', 'cd']
+
+    def test_pack_many(self):
+        s = self.struct.Struct('<hxi2s')
+        records = [(1, 2, 'ab'), (-3, 4, 'c'), (5, -6, 'ef')]
+        buf = bytearray('-' * (2 + 3 * s.size))
+        s.pack_many(buf, 2, records)
+        assert buf == '--' + ''.join([s.pack(*r) for r in records])
+        buf = bytearray(3 * s.size)
+        self.struct.pack_many('<hxi2s', buf, 0, iter(records))
+        assert s.unpack_many(buf) == ([1, -3, 5], [2, 4, -6],
+                                      ['ab', 'c\x00', 'ef'])
+        s = self.struct.Struct('bi')
+        buf = bytearray('-' * (2 * s.size))
+        s.pack_many(buf, 0, [(1, 2), (3, 4)])
+        assert buf == s.pack(1, 2) + s.pack(3, 4)
+        s.pack_many(buf, 0, [])
+        raises(self.struct.error, s.pack_many, buf, 1, [(1, 2), (3, 4)])
+        raises(self.struct.error, s.pack_many, buf, 0, [(1, 2), (3,)])
+        raises(self.struct.error, s.pack_many, buf, 0, [(1, 2, 3)])
+        raises(TypeError, s.pack_many, buf, 0, [1])
+        raises(TypeError, s.pack_many, 'immutable', 0, [(1, 2)])
+
 class AppTestStructBuffer(object):
     spaceconfig = dict(usemodules=['struct', '__pypy__'])
 
@@ -554,3 +629,10 @@ class AppTestFastPath(object):
         self.struct.pack_into("i", buf, 0, 42)
         buf = buf[:len(expected)]
         assert buf == expected
+
+    def test_unpack_many_and_pack_many_bytearray(self):
+        buf = bytearray(4 * self.struct.calcsize("ii"))
+        self.struct.pack_many("ii", buf, 0, [(i, -i) for i in range(4)])
+        assert self.struct.unpack_many("ii", buf) == ([0, 1, 2, 3],
+                                                      [0, -1, -2, -3])
+        assert list(self.struct.iter_unpack("ii", buf))[1] == (1, -1)
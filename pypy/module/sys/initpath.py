@@ -174,6 +174,8 @@ def pypy_find_stdlib(space, executable):
     w_prefix = space.newtext(prefix)
     space.setitem(space.sys.w_dict, space.newtext('prefix'), w_prefix)
     space.setitem(space.sys.w_dict, space.newtext('exec_prefix'), w_prefix)
+    from pypy.module.imp.importing import BytecodeArchive
+    space.fromcache(BytecodeArchive).open(prefix)
     return space.newlist([space.newtext(p) for p in path])
 
 
@@ -12,6 +12,8 @@ from pypy.interpreter.gateway import (
 from pypy.interpreter.mixedmodule import MixedModule
 from pypy.interpreter.signature import Signature
 from pypy.interpreter.typedef import TypeDef
+from pypy.objspace.std.floatobject import (
+    float_key_eq, float_key_hash, int_is_exact_float)
 from pypy.objspace.std.util import negate
 
 
@@ -412,6 +414,7 @@ def _add_indirections():
                     length w_keys values items \
                     iterkeys itervalues iteritems \
                     listview_bytes listview_ascii listview_int \
+                    listview_float \
                     view_as_kwargs".split()
 
     def make_method(method):
@@ -587,6 +590,9 @@ class DictStrategy(object):
     def listview_int(self, w_dict):
         return None
 
+    def listview_float(self, w_dict):
+        return None
+
     def view_as_kwargs(self, w_dict):
         return (None, None)
 
@@ -675,6 +681,8 @@ class EmptyDictStrategy(DictStrategy):
         w_type = self.space.type(w_key)
         if self.space.is_w(w_type, self.space.w_int):
             self.switch_to_int_strategy(w_dict)
+        elif self.space.is_w(w_type, self.space.w_float):
+            self.switch_to_float_strategy(w_dict)
         elif w_type.compares_by_identity():
             self.switch_to_identity_strategy(w_dict)
         else:
@@ -698,6 +706,12 @@ class EmptyDictStrategy(DictStrategy):
         w_dict.set_strategy(strategy)
         w_dict.dstorage = storage
 
+    def switch_to_float_strategy(self, w_dict):
+        strategy = self.space.fromcache(FloatDictStrategy)
+        storage = strategy.get_empty_storage()
+        w_dict.set_strategy(strategy)
+        w_dict.dstorage = storage
+
     def switch_to_identity_strategy(self, w_dict):
         from pypy.objspace.std.identitydict import IdentityDictStrategy
         strategy = self.space.fromcache(IdentityDictStrategy)
@@ -1334,6 +1348,63 @@ class IntDictStrategy(AbstractTypedStrategy, DictStrategy):
 create_iterator_classes(IntDictStrategy)
 
 
+def create_empty_float_key_dict():
+    return r_dict(float_key_eq, float_key_hash, simple_hash_eq=True)
+
+class FloatDictStrategy(AbstractTypedStrategy, DictStrategy):
+    erase, unerase = rerased.new_erasing_pair("float")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def wrap(self, unwrapped):
+        return self.space.newfloat(unwrapped)
+
+    def unwrap(self, wrapped):
+        return self.space.float_w(wrapped)
+
+    def get_empty_storage(self):
+        return self.erase(create_empty_float_key_dict())
+
+    def is_correct_type(self, w_obj):
+        space = self.space
+        return space.is_w(space.type(w_obj), space.w_float)
+
+    def _never_equal_to(self, w_lookup_type):
+        space = self.space
+        # XXX there are many more types
+        return (space.is_w(w_lookup_type, space.w_NoneType) or
+                space.is_w(w_lookup_type, space.w_bytes) or
+                space.is_w(w_lookup_type, space.w_unicode)
+                )
+
+    def getitem(self, w_dict, w_key):
+        space = self.space
+        d = self.unerase(w_dict.dstorage)
+        if self.is_correct_type(w_key):
+            return d.get(self.unwrap(w_key), None)
+        # an int key is equal to the float of the same value: look it up
+        # without switching to the object strategy
+        if space.is_w(space.type(w_key), space.w_int):
+            intval = space.int_w(w_key)
+            if int_is_exact_float(intval):
+                return d.get(float(intval), None)
+        if self._never_equal_to(space.type(w_key)):
+            return None
+        self.switch_to_object_strategy(w_dict)
+        return w_dict.getitem(w_key)
+
+    def listview_float(self, w_dict):
+        return self.unerase(w_dict.dstorage).keys()
+
+    def wrapkey(space, key):
+        return space.newfloat(key)
+
+    def w_keys(self, w_dict):
+        return self.space.newlist_float(self.listview_float(w_dict))
+
+create_iterator_classes(FloatDictStrategy)
+
+
 def update1(space, w_dict, w_data):
     if isinstance(w_data, W_DictMultiObject):    # optimization case only
         update1_dict_dict(space, w_dict, w_data)
@@ -5,6 +5,8 @@ import sys
 from rpython.rlib import rarithmetic, rfloat
 from rpython.rlib.rarithmetic import LONG_BIT, intmask, ovfcheck_float_to_int
 from rpython.rlib.rarithmetic import int_between
+from rpython.rlib.longlong2float import float2longlong
+from rpython.rlib.objectmodel import compute_hash
 from rpython.rlib.rbigint import rbigint
 from rpython.rlib.rfloat import (
     DTSF_ADD_DOT_0, DTSF_STR_PRECISION, INFINITY, NAN,
@@ -752,6 +754,25 @@ def _hash_float(space, v):
     return x
 
 
+# Keys of the dict and set strategies that store unwrapped floats.  Two
+# keys are the same if they are equal or if they are identical in the sense
+# of W_FloatObject.is_w(): this keeps the NaNs findable, like with the
+# object strategies.  0.0 and -0.0 are equal and hash to the same value.
+
+def float_key_eq(f1, f2):
+    return f1 == f2 or float2longlong(f1) == float2longlong(f2)
+
+def float_key_hash(f):
+    return compute_hash(f)
+
+def int_is_exact_float(intval):
+    """Check if an int can be compared with a float key by converting it,
+    i.e. if it fits into the mantissa of a float."""
+    if LONG_BIT <= 53:
+        return True
+    return -(1 << 53) <= intval <= (1 << 53)
+
+
 def _divmod_w(space, w_float1, w_float2):
     x = w_float1.floatval
     y = w_float2.floatval
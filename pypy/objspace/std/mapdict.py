@@ -1,7 +1,8 @@
 import weakref, sys
 
 from rpython.rlib import jit, objectmodel, debug, rerased
-from rpython.rlib.rarithmetic import intmask, r_uint
+from rpython.rlib.longlong2float import float2longlong, longlong2float
+from rpython.rlib.rarithmetic import intmask, r_uint, r_int64
 
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.objspace.std.dictmultiobject import (
@@ -9,6 +10,8 @@ from pypy.objspace.std.dictmultiobject import (
     BaseValueIterator, BaseItemIterator, _never_equal_to_string,
     W_DictObject, BytesDictStrategy, UnicodeDictStrategy
 )
+from pypy.objspace.std.floatobject import W_FloatObject
+from pypy.objspace.std.intobject import W_IntObject
 from pypy.objspace.std.typeobject import MutableCell
 
 
@@ -29,6 +32,19 @@ NUM_DIGITS_POW2 = 1 << NUM_DIGITS
 # dict)
 LIMIT_MAP_ATTRIBUTES = 80
 
+# the kinds of values an attribute has seen so far: exact ints and exact
+# floats are stored unboxed, see UnboxedPlainAttribute
+TYPE_OBJECT = 0
+TYPE_INT = 1
+TYPE_FLOAT = 2
+
+def _value_type(w_value):
+    if type(w_value) is W_IntObject:
+        return TYPE_INT
+    if type(w_value) is W_FloatObject:
+        return TYPE_FLOAT
+    return TYPE_OBJECT
+
 
 class AbstractAttribute(object):
     _immutable_fields_ = ['terminator']
@@ -49,21 +65,27 @@ class AbstractAttribute(object):
             jit.isconstant(obj) and
             not attr.ever_mutated
         ):
+            if isinstance(attr, UnboxedPlainAttribute):
+                return attr._box(self._pure_unboxed_read(obj, attr))
             return self._pure_mapdict_read_storage(obj, attr.storageindex)
         else:
-            return obj._mapdict_read_storage(attr.storageindex)
+            return attr._direct_read(obj)
 
     @jit.elidable
     def _pure_mapdict_read_storage(self, obj, storageindex):
         return obj._mapdict_read_storage(storageindex)
 
+    @jit.elidable
+    def _pure_unboxed_read(self, obj, attr):
+        return attr._read_unboxed(obj)
+
     def write(self, obj, name, index, w_value):
         attr = self.find_map_attr(name, index)
         if attr is None:
             return self.terminator._write_terminator(obj, name, index, w_value)
         if not attr.ever_mutated:
             attr.ever_mutated = True
-        obj._mapdict_write_storage(attr.storageindex, w_value)
+        attr._direct_write(obj, w_value)
         return True
 
     def delete(self, obj, name, index):
@@ -120,6 +142,9 @@ class AbstractAttribute(object):
     def length(self):
         raise NotImplementedError("abstract base class")
 
+    def storage_needed(self):
+        raise NotImplementedError("abstract base class")
+
     def get_terminator(self):
         return self.terminator
 
@@ -134,14 +159,19 @@ class AbstractAttribute(object):
         return None
 
     @jit.elidable
-    def _get_new_attr(self, name, index):
+    def _get_new_attr(self, name, index, typ):
         cache = self.cache_attrs
         if cache is None:
             cache = self.cache_attrs = {}
         attr = cache.get((name, index), None)
         if attr is None:
-            attr = PlainAttribute(name, index, self)
+            if typ == TYPE_OBJECT:
+                attr = PlainAttribute(name, index, self)
+            else:
+                attr = UnboxedPlainAttribute(name, index, self, typ)
             cache[name, index] = attr
+        # the result never changes afterwards, even if an unboxed attribute
+        # is replaced: see _attr_for_type()
         return attr
 
     def add_attr(self, obj, name, index, w_value):
@@ -151,17 +181,19 @@ class AbstractAttribute(object):
             attr = obj._get_mapdict_map()
             size_est = (oldattr._size_estimate + attr.size_estimate()
                                                - oldattr.size_estimate())
-            assert size_est >= (oldattr.length() * NUM_DIGITS_POW2)
+            assert size_est >= (oldattr.storage_needed() * NUM_DIGITS_POW2)
             oldattr._size_estimate = size_est
 
     def _add_attr_without_reordering(self, obj, name, index, w_value):
-        attr = self._get_new_attr(name, index)
+        typ = _value_type(w_value)
+        attr = self._get_new_attr(name, index, typ)._attr_for_type(typ)
         attr._switch_map_and_write_storage(obj, w_value)
 
     @jit.unroll_safe
     def _switch_map_and_write_storage(self, obj, w_value):
-        if self.length() > obj._mapdict_storage_length():
-            # note that self.size_estimate() is always at least self.length()
+        if self.storage_needed() > obj._mapdict_storage_length():
+            # note that self.size_estimate() is always at least
+            # self.storage_needed()
             new_storage = [None] * self.size_estimate()
             for i in range(obj._mapdict_storage_length()):
                 new_storage[i] = obj._mapdict_read_storage(i)
@@ -170,11 +202,11 @@ class AbstractAttribute(object):
         # the order is important here: first change the map, then the storage,
         # for the benefit of the special subclasses
         obj._set_mapdict_map(self)
-        obj._mapdict_write_storage(self.storageindex, w_value)
+        self._write_new_storage(obj, w_value)
 
 
     @jit.elidable
-    def _find_branch_to_move_into(self, name, index):
+    def _find_branch_to_move_into(self, name, index, typ):
         # walk up the map chain to find an ancestor with lower order that
         # already has the current name as a child inserted
         current_order = sys.maxint
@@ -189,7 +221,7 @@ class AbstractAttribute(object):
                 # we reached the top, so we didn't find it anywhere,
                 # just add it to the top attribute
                 if not isinstance(current, PlainAttribute):
-                    return 0, self._get_new_attr(name, index)
+                    return 0, self._get_new_attr(name, index, typ)
 
             else:
                 return number_to_readd, attr
@@ -226,7 +258,10 @@ class AbstractAttribute(object):
         stack_index = 0
         while True:
             current = self
-            number_to_readd, attr = self._find_branch_to_move_into(name, index)
+            typ = _value_type(w_value)
+            number_to_readd, attr = self._find_branch_to_move_into(
+                    name, index, typ)
+            attr = attr._attr_for_type(typ)
             # we found the attributes further up, need to save the
             # previous values of the attributes we passed
             if number_to_readd:
@@ -235,8 +270,7 @@ class AbstractAttribute(object):
                 current = self
                 for i in range(number_to_readd):
                     assert isinstance(current, PlainAttribute)
-                    w_self_value = obj._mapdict_read_storage(
-                            current.storageindex)
+                    w_self_value = current._direct_read(obj)
                     stack[stack_index] = erase_map(current)
                     stack[stack_index + 1] = erase_item(w_self_value)
                     stack_index += 2
@@ -297,6 +331,9 @@ class Terminator(AbstractAttribute):
     def length(self):
         return 0
 
+    def storage_needed(self):
+        return 0
+
     def set_terminator(self, obj, terminator):
         result = Object()
         result.space = self.space
@@ -374,17 +411,37 @@ class DevolvedDictTerminator(Terminator):
         return Terminator.set_terminator(self, obj, terminator)
 
 class PlainAttribute(AbstractAttribute):
-    _immutable_fields_ = ['name', 'index', 'storageindex', 'back', 'ever_mutated?', 'order']
+    _immutable_fields_ = ['name', 'index', 'storageindex', 'back', 'ever_mutated?', 'order',
+                          '_length', '_storage_needed']
 
-    def __init__(self, name, index, back):
+    def __init__(self, name, index, back, order=-1):
         AbstractAttribute.__init__(self, back.space, back.terminator)
         self.name = name
         self.index = index
-        self.storageindex = back.length()
         self.back = back
-        self._size_estimate = self.length() * NUM_DIGITS_POW2
+        self._length = back.length() + 1
+        self._init_storageindex()
+        self._size_estimate = self.storage_needed() * NUM_DIGITS_POW2
         self.ever_mutated = False
-        self.order = len(back.cache_attrs) if back.cache_attrs else 0
+        if order < 0:
+            order = len(back.cache_attrs) if back.cache_attrs else 0
+        self.order = order
+
+    def _init_storageindex(self):
+        self.storageindex = self.back.storage_needed()
+        self._storage_needed = self.storageindex + 1
+
+    def _attr_for_type(self, typ):
+        return self
+
+    def _direct_read(self, obj):
+        return obj._mapdict_read_storage(self.storageindex)
+
+    def _direct_write(self, obj, w_value):
+        obj._mapdict_write_storage(self.storageindex, w_value)
+
+    def _write_new_storage(self, obj, w_value):
+        obj._mapdict_write_storage(self.storageindex, w_value)
 
     def _copy_attr(self, obj, new_obj):
         w_value = self.read(obj, self.name, self.index)
@@ -407,7 +464,10 @@ class PlainAttribute(AbstractAttribute):
         return new_obj
 
     def length(self):
-        return self.storageindex + 1
+        return self._length
+
+    def storage_needed(self):
+        return self._storage_needed
 
     def set_terminator(self, obj, terminator):
         new_obj = self.back.set_terminator(obj, terminator)
@@ -423,7 +483,7 @@ class PlainAttribute(AbstractAttribute):
         new_obj = self.back.materialize_r_dict(space, obj, dict_w)
         if self.index == DICT:
             w_attr = space.newtext(self.name)
-            dict_w[w_attr] = obj._mapdict_read_storage(self.storageindex)
+            dict_w[w_attr] = self._direct_read(obj)
         else:
             self._copy_attr(obj, new_obj)
         return new_obj
@@ -431,7 +491,7 @@ class PlainAttribute(AbstractAttribute):
     def materialize_str_dict(self, space, obj, str_dict):
         new_obj = self.back.materialize_str_dict(space, obj, str_dict)
         if self.index == DICT:
-            str_dict[self.name] = obj._mapdict_read_storage(self.storageindex)
+            str_dict[self.name] = self._direct_read(obj)
         else:
             self._copy_attr(obj, new_obj)
         return new_obj
@@ -445,6 +505,134 @@ class PlainAttribute(AbstractAttribute):
     def __repr__(self):
         return "<PlainAttribute %s %s %s %r>" % (self.name, self.index, self.storageindex, self.back)
 
+class UnboxedPlainAttribute(PlainAttribute):
+    """ An attribute that so far only ever contained exact ints, or only
+    exact floats.  The values are stored as raw 64-bit words, in the
+    UnboxedValues object of the instance.  All the unboxed attributes of an
+    instance share that object, which lives in a single storage slot.  The
+    first time another type is written, the instance switches to a map
+    where the attribute is a boxed PlainAttribute again. """
+    _immutable_fields_ = ['typ', 'listindex', 'firstunboxed', 'firstattr',
+                          'replaced_by?']
+    unboxed_size = 0
+
+    def __init__(self, name, index, back, typ):
+        self.typ = typ
+        self.replaced_by = None
+        PlainAttribute.__init__(self, name, index, back)
+
+    def _init_storageindex(self):
+        prev = self.back
+        while isinstance(prev, PlainAttribute):
+            if isinstance(prev, UnboxedPlainAttribute):
+                break
+            prev = prev.back
+        if isinstance(prev, UnboxedPlainAttribute):
+            self.storageindex = prev.storageindex
+            self.listindex = prev.listindex + 1
+            self.firstunboxed = False
+            self.firstattr = prev.firstattr
+            self._storage_needed = self.back.storage_needed()
+        else:
+            PlainAttribute._init_storageindex(self)
+            self.listindex = 0
+            self.firstunboxed = True
+            self.firstattr = self
+        # the first unboxed attribute knows how many unboxed values the
+        # instances with this map prefix end up with, which gives the size
+        # of their UnboxedValues
+        firstattr = self.firstattr
+        if self.listindex >= firstattr.unboxed_size:
+            firstattr.unboxed_size = self.listindex + 1
+
+    def _attr_for_type(self, typ):
+        # the attribute was unboxed so far.  Once it gets a value of another
+        # type, new objects take a boxed attribute instead, and objects that
+        # still use the old map switch over the next time they get a value
+        # of the wrong type.  The elidable _get_new_attr() keeps returning
+        # this attribute; the switch is recorded in the quasi-immutable
+        # 'replaced_by', which invalidates the traces that relied on it
+        replaced_by = self.replaced_by
+        if replaced_by is not None:
+            return replaced_by
+        if typ == self.typ:
+            return self
+        replaced_by = PlainAttribute(self.name, self.index, self.back,
+                                     self.order)
+        self.replaced_by = replaced_by
+        return replaced_by
+
+    def _box(self, value):
+        if self.typ == TYPE_INT:
+            return W_IntObject(intmask(value))
+        return W_FloatObject(longlong2float(value))
+
+    def _unbox(self, w_value):
+        if self.typ == TYPE_INT:
+            assert isinstance(w_value, W_IntObject)
+            return r_int64(w_value.intval)
+        assert isinstance(w_value, W_FloatObject)
+        return float2longlong(w_value.floatval)
+
+    def _get_unboxed_values(self, obj):
+        unboxed = obj._mapdict_read_storage(self.storageindex)
+        assert isinstance(unboxed, UnboxedValues)
+        return unboxed
+
+    def _read_unboxed(self, obj):
+        return self._get_unboxed_values(obj).values[self.listindex]
+
+    def _direct_read(self, obj):
+        return self._box(self._read_unboxed(obj))
+
+    def _direct_write(self, obj, w_value):
+        if _value_type(w_value) != self.typ:
+            self._switch_to_boxed(obj, w_value)
+            return
+        self._get_unboxed_values(obj).values[self.listindex] = (
+                self._unbox(w_value))
+
+    def _write_new_storage(self, obj, w_value):
+        size = self.firstattr.unboxed_size
+        if self.firstunboxed:
+            unboxed = UnboxedValues(size)
+            obj._mapdict_write_storage(self.storageindex, unboxed)
+        else:
+            unboxed = self._get_unboxed_values(obj)
+            unboxed.make_room(size)
+        unboxed.values[self.listindex] = self._unbox(w_value)
+
+    @jit.dont_look_inside
+    def _switch_to_boxed(self, obj, w_value):
+        # remove the attribute and add it again: _find_branch_to_move_into
+        # replaces the unboxed attribute with a boxed one, and the reordering
+        # puts it back at its old position
+        new_obj = obj._get_mapdict_map().delete(obj, self.name, self.index)
+        obj._set_mapdict_storage_and_map(new_obj.storage, new_obj.map)
+        obj._get_mapdict_map().add_attr(obj, self.name, self.index, w_value)
+
+    def __repr__(self):
+        return "<UnboxedPlainAttribute %s %s %s %s %s %r>" % (
+            self.name, self.index, self.typ, self.storageindex,
+            self.listindex, self.back)
+
+class UnboxedValues(W_Root):
+    """ The raw values of the unboxed attributes of one instance.  Not
+    visible at app-level, like WeakrefLifeline it only inherits from W_Root
+    to fit into the storage. """
+    _attrs_ = ['values']
+
+    def __init__(self, size):
+        self.values = [r_int64(0)] * size
+
+    def make_room(self, size):
+        values = self.values
+        if size > len(values):
+            new_values = [r_int64(0)] * size
+            for i in range(len(values)):
+                new_values[i] = values[i]
+            self.values = new_values
+
 class MapAttrCache(object):
     def __init__(self, space):
         SIZE = 1 << space.config.objspace.std.methodcachesizeexp
@@ -674,7 +862,7 @@ def _make_storage_mixin_size_n(n=SUBCLASSES_NUM_FIELDS):
             self.map = map
 
         def _has_storage_list(self):
-            return self.map.length() > n
+            return self.map.storage_needed() > n
 
         def _mapdict_get_storage_list(self):
             erased = getattr(self, valnmin1)
@@ -725,7 +913,7 @@ def _make_storage_mixin_size_n(n=SUBCLASSES_NUM_FIELDS):
                 assert not has_storage_list
                 erased = erase_item(storage[nmin1])
             elif not has_storage_list:
-                # storage is longer than self.map.length() only due to
+                # storage is longer than self.map.storage_needed() only due to
                 # overallocation
                 erased = erase_item(storage[nmin1])
                 # in theory, we should be ultra-paranoid and check all entries,
@@ -970,6 +1158,7 @@ class MapDictIteratorItems(BaseItemIterator):
 class CacheEntry(object):
     version_tag = None
     storageindex = 0
+    unboxed_attr = None
     w_method = None # for callmethod
     success_counter = 0
     failure_counter = 0
@@ -1002,7 +1191,8 @@ def init_mapdict_cache(pycode):
     pycode._mapdict_caches = [INVALID_CACHE_ENTRY] * num_entries
 
 @jit.dont_look_inside
-def _fill_cache(pycode, nameindex, map, version_tag, storageindex, w_method=None):
+def _fill_cache(pycode, nameindex, map, version_tag, storageindex, w_method=None,
+                unboxed_attr=None):
     if not pycode.space._side_effects_ok():
         return
     entry = pycode._mapdict_caches[nameindex]
@@ -1013,6 +1203,7 @@ def _fill_cache(pycode, nameindex, map, version_tag, storageindex, w_method=None
     entry.version_tag = version_tag
     entry.storageindex = storageindex
     entry.w_method = w_method
+    entry.unboxed_attr = unboxed_attr
     if pycode.space.config.objspace.std.withmethodcachecounter:
         entry.failure_counter += 1
 
@@ -1023,7 +1214,10 @@ def LOAD_ATTR_caching(pycode, w_obj, nameindex):
     map = w_obj._get_mapdict_map()
     if entry.is_valid_for_map(map) and entry.w_method is None:
         # everything matches, it's incredibly fast
-        return w_obj._mapdict_read_storage(entry.storageindex)
+        unboxed_attr = entry.unboxed_attr
+        if unboxed_attr is None:
+            return w_obj._mapdict_read_storage(entry.storageindex)
+        return unboxed_attr._direct_read(w_obj)
     return LOAD_ATTR_slowpath(pycode, w_obj, nameindex, map)
 LOAD_ATTR_caching._always_inline_ = True
 
@@ -1069,8 +1263,12 @@ def LOAD_ATTR_slowpath(pycode, w_obj, nameindex, map):
                     # Note that if map.terminator is a DevolvedDictTerminator
                     # or the class provides its own dict, not using mapdict, then:
                     # map.find_map_attr will always return None if index==DICT.
-                    _fill_cache(pycode, nameindex, map, version_tag, attr.storageindex)
-                    return w_obj._mapdict_read_storage(attr.storageindex)
+                    unboxed_attr = None
+                    if isinstance(attr, UnboxedPlainAttribute):
+                        unboxed_attr = attr
+                    _fill_cache(pycode, nameindex, map, version_tag,
+                                attr.storageindex, unboxed_attr=unboxed_attr)
+                    return attr._direct_read(w_obj)
     if space.config.objspace.std.withmethodcachecounter:
         INVALID_CACHE_ENTRY.failure_counter += 1
     return space.getattr(w_obj, w_name)
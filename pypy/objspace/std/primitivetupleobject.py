@@ -0,0 +1,207 @@
+"""Tuples of any length whose items are all ints, all floats, or ints and
+floats.  The items are stored unboxed in a single array, and wrapped again
+when they are read."""
+
+from pypy.interpreter.error import oefmt
+from pypy.objspace.std.floatobject import W_FloatObject, _hash_float
+from pypy.objspace.std.intobject import W_IntObject, _hash_int
+from pypy.objspace.std.tupleobject import W_AbstractTupleObject
+from pypy.objspace.std.util import negate
+from rpython.rlib import jit, longlong2float
+from rpython.rlib.debug import make_sure_not_resized
+from rpython.rlib.rarithmetic import intmask
+
+
+UNROLL_CUTOFF = 10
+
+
+def make_primitive_tuple_class(name, wrap_item, hash_item, eq_item):
+    """Make a tuple class storing its items in the fixed-size list 'items'.
+    wrap_item(space, item) and hash_item(space, item) must give the same
+    object and the same hash as the wrapped item; eq_item(item1, item2)
+    must compare the items like space.eq_w()."""
+
+    def _unroll_condition(self):
+        return jit.loop_unrolling_heuristic(self.items, len(self.items),
+                                            UNROLL_CUTOFF)
+
+    class cls(W_AbstractTupleObject):
+        _immutable_fields_ = ['items[*]']
+
+        def __init__(self, space, items):
+            make_sure_not_resized(items)
+            self.space = space
+            self.items = items
+
+        def length(self):
+            return len(self.items)
+
+        @jit.look_inside_iff(lambda self: _unroll_condition(self))
+        def tolist(self):
+            items = self.items
+            list_w = [None] * len(items)
+            for i in range(len(items)):
+                list_w[i] = wrap_item(self.space, items[i])
+            return list_w
+
+        def getitems_copy(self):
+            return self.tolist()[:]    # returns a resizable list
+
+        def getitem(self, space, index):
+            if index < 0:
+                index += len(self.items)
+            if not 0 <= index < len(self.items):
+                raise oefmt(space.w_IndexError, "tuple index out of range")
+            return wrap_item(space, self.items[index])
+
+        @jit.look_inside_iff(lambda self, space: _unroll_condition(self))
+        def descr_hash(self, space):
+            # the same hash as a W_TupleObject with the same items
+            mult = 1000003
+            x = 0x345678
+            z = len(self.items)
+            for item in self.items:
+                y = hash_item(space, item)
+                x = (x ^ y) * mult
+                z -= 1
+                mult += 82520 + z + z
+            x += 97531
+            return space.newint(intmask(x))
+
+        def descr_eq(self, space, w_other):
+            if not isinstance(w_other, W_AbstractTupleObject):
+                return space.w_NotImplemented
+            if isinstance(w_other, cls):
+                return space.newbool(self._eq_same_class(w_other))
+            return space.newbool(self._eq_wrapped(space, w_other))
+
+        @jit.look_inside_iff(lambda self, w_other: _unroll_condition(self))
+        def _eq_same_class(self, w_other):
+            items1 = self.items
+            items2 = w_other.items
+            if len(items1) != len(items2):
+                return False
+            for i in range(len(items1)):
+                if not eq_item(items1[i], items2[i]):
+                    return False
+            return True
+
+        @jit.look_inside_iff(lambda self, space, w_other:
+                             _unroll_condition(self))
+        def _eq_wrapped(self, space, w_other):
+            items_w = w_other.tolist()
+            if len(self.items) != len(items_w):
+                return False
+            for i in range(len(items_w)):
+                w_item = wrap_item(space, self.items[i])
+                if not space.eq_w(w_item, items_w[i]):
+                    return False
+            return True
+
+        descr_ne = negate(descr_eq)
+
+    cls.__name__ = name
+    return cls
+
+
+def _wrap_int(space, intval):
+    return space.newint(intval)
+
+def _hash_int_item(space, intval):
+    return _hash_int(intval)
+
+def _eq_int(intval1, intval2):
+    return intval1 == intval2
+
+W_IntTupleObject = make_primitive_tuple_class(
+    'W_IntTupleObject', _wrap_int, _hash_int_item, _eq_int)
+
+
+def _wrap_float(space, floatval):
+    return space.newfloat(floatval)
+
+def _eq_float(floatval1, floatval2):
+    # NaNs with the same bits are identical, hence equal here
+    return (floatval1 == floatval2 or
+            longlong2float.float2longlong(floatval1) ==
+            longlong2float.float2longlong(floatval2))
+
+W_FloatTupleObject = make_primitive_tuple_class(
+    'W_FloatTupleObject', _wrap_float, _hash_float, _eq_float)
+
+
+# The items of a W_IntOrFloatTupleObject are encoded like the items of an
+# IntOrFloatListStrategy list: the floats as their bits, and the ints that
+# fit in 32 bits as NaNs that cannot be the result of a computation.
+
+def _wrap_int_or_float(space, llval):
+    if longlong2float.is_int32_from_longlong_nan(llval):
+        intval = longlong2float.decode_int32_from_longlong_nan(llval)
+        return space.newint(intval)
+    else:
+        floatval = longlong2float.longlong2float(llval)
+        return space.newfloat(floatval)
+
+def _hash_int_or_float(space, llval):
+    if longlong2float.is_int32_from_longlong_nan(llval):
+        intval = longlong2float.decode_int32_from_longlong_nan(llval)
+        return _hash_int(intval)
+    return _hash_float(space, longlong2float.longlong2float(llval))
+
+def _decode_as_float(llval):
+    if longlong2float.is_int32_from_longlong_nan(llval):
+        return float(longlong2float.decode_int32_from_longlong_nan(llval))
+    return longlong2float.longlong2float(llval)
+
+def _eq_int_or_float(llval1, llval2):
+    # an int32 converts exactly to a float, so comparing the floats
+    # gives the same result as comparing the wrapped items
+    return (llval1 == llval2 or
+            _decode_as_float(llval1) == _decode_as_float(llval2))
+
+W_IntOrFloatTupleObject = make_primitive_tuple_class(
+    'W_IntOrFloatTupleObject', _wrap_int_or_float, _hash_int_or_float,
+    _eq_int_or_float)
+
+
+@jit.look_inside_iff(lambda space, list_w:
+        jit.loop_unrolling_heuristic(list_w, len(list_w), UNROLL_CUTOFF))
+def makeprimitivetuple(space, list_w):
+    """Return a tuple storing the items of 'list_w' unboxed, or None if
+    they are not all ints and floats."""
+    length = len(list_w)
+    if length == 0:
+        return None
+    has_int = False
+    has_float = False
+    for w_item in list_w:
+        if type(w_item) is W_IntObject:
+            has_int = True
+        elif type(w_item) is W_FloatObject:
+            has_float = True
+        else:
+            return None
+    if not has_float:
+        intitems = [0] * length
+        for i in range(length):
+            intitems[i] = space.int_w(list_w[i])
+        return W_IntTupleObject(space, intitems)
+    if not has_int:
+        floatitems = [0.0] * length
+        for i in range(length):
+            floatitems[i] = space.float_w(list_w[i])
+        return W_FloatTupleObject(space, floatitems)
+    llitems = [longlong2float.float2longlong(0.0)] * length
+    for i in range(length):
+        w_item = list_w[i]
+        if type(w_item) is W_IntObject:
+            intval = space.int_w(w_item)
+            if not longlong2float.can_encode_int32(intval):
+                return None
+            llitems[i] = longlong2float.encode_int32_into_longlong_nan(intval)
+        else:
+            floatval = space.float_w(w_item)
+            if not longlong2float.can_encode_float(floatval):
+                return None
+            llitems[i] = longlong2float.float2longlong(floatval)
+    return W_IntOrFloatTupleObject(space, llitems)
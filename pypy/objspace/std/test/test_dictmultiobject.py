@@ -155,6 +155,12 @@ class TestW_DictObject(object):
         w_d.initialize_content([(w(1), w("a")), (w(2), w("b"))])
         assert self.space.listview_int(w_d) == [1, 2]
 
+    def test_listview_float_dict(self):
+        w = self.space.wrap
+        w_d = self.space.newdict()
+        w_d.initialize_content([(w(1.5), w("a")), (w(-2.0), w("b"))])
+        assert self.space.listview_float(w_d) == [1.5, -2.0]
+
     def test_keys_on_string_unicode_int_dict(self, monkeypatch):
         w = self.space.wrap
         wb = self.space.newbytes
@@ -1170,6 +1176,58 @@ class AppTestStrategies(object):
         assert "IntDictStrategy" in self.get_strategy(d)
         assert d[1L] == "hi"
 
+    def test_empty_to_float(self):
+        d = {}
+        d[1.5] = "hi"
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        assert d[1.5] == "hi"
+        assert d.get(2.5) is None
+        assert d.get("x") is None
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        d[2.0] = "two"
+        assert d[2] == "two"
+        assert 3 not in d
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        assert d.keys() == [1.5, 2.0]
+        assert d.pop(1.5) == "hi"
+        d[3] = "three"
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        assert d == {2.0: "two", 3: "three"}
+        assert d[2L] == "two"
+
+    def test_float_dict_signed_zero(self):
+        d = {0.0: "a"}
+        d[-0.0] = "b"
+        assert d == {0.0: "b"}
+        assert str(d.keys()[0]) == "0.0"
+        assert d[0] == "b"
+        d = {-0.0: "a"}
+        d[0.0] = "b"
+        assert str(d.keys()[0]) == "-0.0"
+        assert "FloatDictStrategy" in self.get_strategy(d)
+
+    def test_float_dict_nan(self):
+        nan = float("nan")
+        d = {nan: 1, 1.5: 2}
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        assert d[nan] == 1
+        d[nan] = 3
+        assert len(d) == 2
+        assert d[nan] == 3
+        # a NaN with different bits is a different key, like in an
+        # object dict
+        other = -nan
+        d[other] = 4
+        assert len(d) == 3
+        assert d[nan] == 3
+        assert d[other] == 4
+
+    def test_float_dict_large_int(self):
+        d = {float(2**60): "x"}
+        assert d[2**60] == "x"
+        assert d.get(2**60 + 1) is None
+        assert "FloatDictStrategy" not in self.get_strategy(d)
+
     def test_iter_dict_length_change(self):
         d = {1: 2, 3: 4, 5: 6}
         it = d.iteritems()
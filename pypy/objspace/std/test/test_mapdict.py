@@ -620,6 +620,120 @@ def test_setdict():
     assert w_d.getitem_str("b") == 6
     assert w_d.getitem_str("c") == 7
 
+def test_unboxed_attributes():
+    from pypy.objspace.std.intobject import W_IntObject
+    from pypy.objspace.std.floatobject import W_FloatObject
+    cls = Class()
+    obj = cls.instantiate()
+    obj.setdictvalue(space, "a", W_IntObject(5))
+    obj.setdictvalue(space, "b", W_FloatObject(1.5))
+    obj.setdictvalue(space, "c", 7)
+    assert isinstance(obj.map.back, UnboxedPlainAttribute)
+    assert obj.map.back.back.typ == TYPE_INT
+    assert obj.map.back.typ == TYPE_FLOAT
+    assert obj.map.length() == 3
+    assert obj.map.storage_needed() == 2
+    unboxed = obj.storage[0]
+    assert isinstance(unboxed, UnboxedValues)
+    assert obj.storage[1] == 7
+    assert obj.getdictvalue(space, "a").intval == 5
+    assert obj.getdictvalue(space, "b").floatval == 1.5
+    # writing a value of the same type doesn't change the map
+    map = obj.map
+    obj.setdictvalue(space, "a", W_IntObject(-sys.maxint - 1))
+    obj.setdictvalue(space, "b", W_FloatObject(-0.0))
+    assert obj.map is map
+    assert obj.storage[0] is unboxed
+    assert obj.getdictvalue(space, "a").intval == -sys.maxint - 1
+    assert str(obj.getdictvalue(space, "b").floatval) == "-0.0"
+
+    obj2 = cls.instantiate()
+    obj2.setdictvalue(space, "a", W_IntObject(6))
+    obj2.setdictvalue(space, "b", W_FloatObject(2.5))
+    obj2.setdictvalue(space, "c", 8)
+    assert obj2.map is obj.map
+    assert obj2.storage[0] is not unboxed
+
+def test_unboxed_attributes_switch_to_boxed():
+    from pypy.objspace.std.intobject import W_IntObject
+    from pypy.objspace.std.floatobject import W_FloatObject
+    cls = Class()
+    obj = cls.instantiate()
+    obj.setdictvalue(space, "a", W_IntObject(5))
+    obj.setdictvalue(space, "b", W_IntObject(6))
+    obj.setdictvalue(space, "c", W_FloatObject(1.5))
+    obj2 = cls.instantiate()
+    obj2.setdictvalue(space, "a", W_IntObject(7))
+    obj2.setdictvalue(space, "b", W_IntObject(8))
+    obj2.setdictvalue(space, "c", W_FloatObject(2.5))
+    oldmap = obj.map
+    unboxed_b = oldmap.back
+    # "b" gets a float: the object moves to a map where "b" is boxed, in the
+    # same position
+    obj.setdictvalue(space, "b", W_FloatObject(3.5))
+    assert obj.map is not oldmap
+    # the elidable _get_new_attr() still gives the same result; the boxed
+    # attribute is found through the quasi-immutable 'replaced_by'
+    assert unboxed_b.back._get_new_attr("b", DICT, TYPE_INT) is unboxed_b
+    assert unboxed_b.replaced_by is obj.map.back
+    assert type(obj.map.back) is PlainAttribute
+    assert obj.map.back.name == "b"
+    assert obj.map.name == "c" and obj.map.typ == TYPE_FLOAT
+    assert obj.map.back.back.typ == TYPE_INT
+    assert obj.getdictvalue(space, "a").intval == 5
+    assert obj.getdictvalue(space, "b").floatval == 3.5
+    assert obj.getdictvalue(space, "c").floatval == 1.5
+    obj.setdictvalue(space, "b", W_IntObject(9))
+    assert obj.getdictvalue(space, "b").intval == 9
+    # the old map still works for the objects that use it
+    assert obj2.map is oldmap
+    assert obj2.getdictvalue(space, "b").intval == 8
+    # but new objects get the boxed attribute right away
+    obj3 = cls.instantiate()
+    obj3.setdictvalue(space, "a", W_IntObject(10))
+    obj3.setdictvalue(space, "b", W_IntObject(11))
+    obj3.setdictvalue(space, "c", W_FloatObject(4.5))
+    assert obj3.map is obj.map
+    obj2.setdictvalue(space, "b", 12)
+    assert obj2.map is obj.map
+    assert obj2.getdictvalue(space, "a").intval == 7
+    assert obj2.getdictvalue(space, "b") == 12
+    assert obj2.getdictvalue(space, "c").floatval == 2.5
+
+def test_unboxed_attributes_delete_and_materialize():
+    from pypy.objspace.std.intobject import W_IntObject
+    from pypy.objspace.std.floatobject import W_FloatObject
+    cls = Class()
+    obj = cls.instantiate()
+    obj.setdictvalue(space, "a", W_IntObject(1))
+    obj.setdictvalue(space, "b", W_FloatObject(2.0))
+    obj.setdictvalue(space, "c", W_IntObject(3))
+    obj.deldictvalue(space, "b")
+    assert obj.getdictvalue(space, "b") is None
+    assert obj.getdictvalue(space, "a").intval == 1
+    assert obj.getdictvalue(space, "c").intval == 3
+    obj.setdictvalue(space, "b", W_FloatObject(4.0))
+    assert obj.getdictvalue(space, "b").floatval == 4.0
+
+    class FakeDict(W_DictObject):
+        def __init__(self, d):
+            self.dstorage = d
+
+        class strategy:
+            def unerase(self, x):
+                return d
+        strategy = strategy()
+
+    d = {}
+    w_d = FakeDict(d)
+    flag = obj.map.write(obj, "dict", SPECIAL, w_d)
+    assert flag
+    materialize_r_dict(space, obj, d)
+    assert sorted(d) == ["a", "b", "c"]
+    assert d["a"].intval == 1
+    assert d["b"].floatval == 4.0
+    assert d["c"].intval == 3
+
 # ___________________________________________________________
 # check specialized classes
 
@@ -897,6 +1011,51 @@ class AppTestWithMapDict(object):
         d = x.__dict__
         assert list(__pypy__.reversed_dict(d)) == d.keys()[::-1]
 
+    def test_unboxed_attributes(self):
+        class A(object):
+            pass
+        a = A()
+        a.x = 1
+        a.y = 2.5
+        a.z = 3
+        assert (a.x, a.y, a.z) == (1, 2.5, 3)
+        assert a.__dict__ == {'x': 1, 'y': 2.5, 'z': 3}
+        for i in range(10):
+            a.x += i
+            a.y *= 2
+        assert (a.x, a.y, a.z) == (46, 2560.0, 3)
+        a.y = 'y'
+        assert (a.x, a.y, a.z) == (46, 'y', 3)
+        a.x = 2 ** 100
+        a.z = True
+        assert (a.x, a.y, a.z) == (2 ** 100, 'y', True)
+        assert type(a.z) is bool
+        b = A()
+        b.x = 1.5
+        b.y = 2
+        b.z = -0.0
+        assert (b.x, b.y, b.z) == (1.5, 2, 0.0)
+        assert str(b.z) == '-0.0'
+        c = A()
+        c.x = float('nan')
+        assert c.x != c.x
+        del b.y
+        assert not hasattr(b, 'y')
+        assert (b.x, b.z) == (1.5, 0.0)
+
+    def test_unboxed_attributes_subclass(self):
+        class myint(int):
+            pass
+        class A(object):
+            pass
+        a = A()
+        a.x = 5
+        a.x = myint(6)
+        assert type(a.x) is myint and a.x == 6
+        b = A()
+        b.x = 7
+        assert type(b.x) is int and b.x == 7
+
     def test_bug_materialize_huge_dict(self):
         import __pypy__
         d = __pypy__.newdict("instance")
@@ -0,0 +1,112 @@
+from pypy.objspace.std.primitivetupleobject import (W_IntTupleObject,
+    W_FloatTupleObject, W_IntOrFloatTupleObject)
+from pypy.objspace.std.test import test_tupleobject
+from pypy.objspace.std.tupleobject import W_TupleObject
+
+
+class TestW_PrimitiveTupleObject(object):
+    spaceconfig = {"objspace.std.withprimitivetuple": True}
+
+    def test_classes(self):
+        w = self.space.wrap
+        def cls(values):
+            return type(self.space.newtuple([w(x) for x in values]))
+        assert cls([1, 2, 3]) is W_IntTupleObject
+        assert cls([1]) is W_IntTupleObject
+        assert cls([1.5, 2.0, -3.0, 4.0]) is W_FloatTupleObject
+        assert cls([1, 2.5, 3]) is W_IntOrFloatTupleObject
+        assert cls([1, "a", 3]) is W_TupleObject
+        assert cls([]) is W_TupleObject
+        assert cls([1 << 40, 2.5]) is W_TupleObject
+
+    def test_items_are_unboxed(self):
+        w_tuple = self.space.newtuple([self.space.wrap(i) for i in range(5)])
+        assert w_tuple.items == [0, 1, 2, 3, 4]
+
+    def hash_test(self, values):
+        N_w_tuple = W_TupleObject([self.space.wrap(x) for x in values])
+        P_w_tuple = self.space.newtuple([self.space.wrap(x) for x in values])
+        assert type(P_w_tuple) is not W_TupleObject
+        assert self.space.eq_w(N_w_tuple, P_w_tuple)
+        assert self.space.eq_w(P_w_tuple, N_w_tuple)
+        assert self.space.eq_w(self.space.hash(N_w_tuple),
+                               self.space.hash(P_w_tuple))
+
+    def test_hash_against_normal_tuple(self):
+        self.hash_test([1, 2, 3])
+        self.hash_test([-1, -2, 1 << 62])
+        self.hash_test([1.5, -2.25, 3.0])
+        self.hash_test([1, 2.5, -3, 4.0])
+        self.hash_test([0.0, -0.0, 7])
+
+
+class AppTestW_PrimitiveTupleObject:
+    spaceconfig = {"objspace.std.withprimitivetuple": True}
+
+    def w_kind(self, obj):
+        import __pypy__
+        r = __pypy__.internal_repr(obj)
+        return r[r.find("W_"):r.find("(")]
+
+    def test_created_by_all_constructors(self):
+        assert self.kind((1, 2, 3)) == "W_IntTupleObject"
+        a, b, c = 1.5, 2.5, 3
+        assert self.kind((a, b, b)) == "W_FloatTupleObject"
+        assert self.kind((a, b, c)) == "W_IntOrFloatTupleObject"
+        assert self.kind(tuple([1, 2, 3, 4])) == "W_IntTupleObject"
+        assert self.kind(tuple(x * 0.5 for x in range(6))) == (
+            "W_FloatTupleObject")
+        rows = zip([1, 2], [3.5, 4.5], [5, 6])
+        assert rows == [(1, 3.5, 5), (2, 4.5, 6)]
+        assert self.kind(rows[0]) == "W_IntOrFloatTupleObject"
+
+    def test_operations(self):
+        t = (1, 2.5, 3, -4)
+        assert len(t) == 4
+        assert t[0] == 1 and type(t[0]) is int
+        assert t[1] == 2.5 and type(t[1]) is float
+        assert t[-1] == -4
+        raises(IndexError, "t[4]")
+        raises(IndexError, "t[-5]")
+        assert t[1:3] == (2.5, 3)
+        assert list(t) == [1, 2.5, 3, -4]
+        assert 3 in t and 3.0 in t and 5 not in t
+        assert t.index(3.0) == 2
+        assert t.count(3) == 1
+        assert t + (5,) == (1, 2.5, 3, -4, 5)
+        x, y, z, w = t
+        assert (x, y, z, w) == t
+
+    def test_eq(self):
+        assert (1, 2, 3) == (1.0, 2.0, 3.0)
+        assert (1, 2.0, 3) == (1.0, 2, 3.0)
+        assert (1, 2, 3) != (1, 2, 4)
+        assert (1, 2, 3) != (1, 2)
+        assert (0.0, 1.0, 2.0) == (-0.0, 1.0, 2.0)
+        nan = float("nan")
+        t = (nan, 1.0, 2.0)
+        assert t == t
+        assert t == (nan, 1.0, 2.0)
+        assert (1, 2, 3) < (1, 2, 4)
+        assert (1, 2.5, 3) > (1, 2, 3)
+
+    def test_hash(self):
+        assert hash((1, 2, 3)) == hash((1.0, 2.0, 3.0))
+        assert hash((1, 2.5, 3)) == hash((1.0, 2.5, 3.0))
+        d = {(1, 2, 3): "a", (1.5, 2, 3): "b"}
+        assert d[(1.0, 2, 3.0)] == "a"
+        assert d[(1.5, 2.0, 3.0)] == "b"
+
+    def test_subclasses(self):
+        class I(int): pass
+        class F(float): pass
+        assert self.kind((I(1), 2, 3)) == "W_TupleObject"
+        assert self.kind((F(1.5), 2.5, 3.5)) == "W_TupleObject"
+        class T(tuple): pass
+        t = T([1, 2, 3])
+        assert type(t) is T
+        assert t == (1, 2, 3)
+
+
+class AppTestAll(test_tupleobject.AppTestW_TupleObject):
+    spaceconfig = {"objspace.std.withprimitivetuple": True}
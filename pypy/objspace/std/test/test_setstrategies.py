@@ -1,6 +1,7 @@
 from pypy.objspace.std.setobject import W_SetObject
 from pypy.objspace.std.setobject import (
     BytesIteratorImplementation, BytesSetStrategy, EmptySetStrategy,
+    FloatIteratorImplementation, FloatSetStrategy,
     IntegerIteratorImplementation, IntegerSetStrategy, ObjectSetStrategy,
     UnicodeIteratorImplementation, AsciiSetStrategy)
 from pypy.objspace.std.listobject import W_ListObject
@@ -29,6 +30,9 @@ class TestW_SetStrategies:
         s = W_SetObject(self.space, self.wrapped([u"a", u"b"]))
         assert s.strategy is self.space.fromcache(AsciiSetStrategy)
 
+        s = W_SetObject(self.space, self.wrapped([1.5, 2.0]))
+        assert s.strategy is self.space.fromcache(FloatSetStrategy)
+
     def test_switch_to_object(self):
         s = W_SetObject(self.space, self.wrapped([1,2,3,4,5]))
         s.add(self.space.wrap("six"))
@@ -39,6 +43,18 @@ class TestW_SetStrategies:
         s1.update(s2)
         assert s1.strategy is self.space.fromcache(ObjectSetStrategy)
 
+    def test_switch_float_to_object(self):
+        s = W_SetObject(self.space, self.wrapped([1.5, 2.5]))
+        s.add(self.space.wrap(3))
+        assert s.strategy is self.space.fromcache(ObjectSetStrategy)
+        assert s.has_key(self.space.wrap(2.5))
+
+    def test_float_has_int(self):
+        s = W_SetObject(self.space, self.wrapped([1.0, 2.5]))
+        assert s.has_key(self.space.wrap(1))
+        assert not s.has_key(self.space.wrap(2))
+        assert s.strategy is self.space.fromcache(FloatSetStrategy)
+
     def test_switch_to_unicode(self):
         s = W_SetObject(self.space, self.wrapped([]))
         s.add(self.space.wrap(u"six"))
@@ -128,6 +144,12 @@ class TestW_SetStrategies:
         assert space.unwrap(it.next()) == "a"
         assert space.unwrap(it.next()) == "b"
         #
+        s = W_SetObject(space, self.wrapped([1.5, 2.5]))
+        it = s.iter()
+        assert isinstance(it, FloatIteratorImplementation)
+        assert space.unwrap(it.next()) == 1.5
+        assert space.unwrap(it.next()) == 2.5
+        #
         #s = W_SetObject(space, self.wrapped([u"a", u"b"]))
         #it = s.iter()
         #assert isinstance(it, UnicodeIteratorImplementation)
@@ -104,6 +104,8 @@ class W_AbstractTupleObject(W_Root):
             return w_sequence
         else:
             tuple_w = space.fixedview(w_sequence)
+        if space.is_w(w_tupletype, space.w_tuple):
+            return space.newtuple(tuple_w)
         w_obj = space.allocate_instance(W_TupleObject, w_tupletype)
         W_TupleObject.__init__(w_obj, tuple_w)
         return w_obj
@@ -239,8 +241,9 @@ class W_AbstractTupleObject(W_Root):
         """
         length = self.length()
         start, stop = unwrap_start_stop(space, length, w_start, w_stop)
+        items = self.tolist()
         for i in range(start, min(stop, length)):
-            w_item = self.tolist()[i]
+            w_item = items[i]
             if space.eq_w(w_item, w_obj):
                 return space.newint(i)
         raise oefmt(space.w_ValueError, "tuple.index(x): x not in tuple")
@@ -369,4 +372,9 @@ def wraptuple(space, list_w):
             return makespecialisedtuple(space, list_w)
         except NotSpecialised:
             pass
+    if space.config.objspace.std.withprimitivetuple:
+        from pypy.objspace.std.primitivetupleobject import makeprimitivetuple
+        w_tuple = makeprimitivetuple(space, list_w)
+        if w_tuple is not None:
+            return w_tuple
     return W_TupleObject(list_w)
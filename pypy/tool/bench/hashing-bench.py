@@ -0,0 +1,46 @@
+"""Benchmark of the built-in hash modules, which hashlib uses when
+_hashlib (OpenSSL) is not available.
+
+    pypy hashing-bench.py [total_megabytes]
+"""
+import sys, time, threading
+import _md5, _sha, _sha256, _sha512
+
+TOTAL = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+TOTAL *= 1024 * 1024
+
+CONSTRUCTORS = [('md5', _md5.new), ('sha1', _sha.new),
+                ('sha224', _sha256.sha224), ('sha256', _sha256.sha256),
+                ('sha384', _sha512.sha384), ('sha512', _sha512.sha512)]
+
+def hash_chunks(new, chunk):
+    h = new()
+    for i in xrange(TOTAL // len(chunk)):
+        h.update(chunk)
+    return h.digest()
+
+def hash_in_threads(new, chunk, nthreads):
+    threads = [threading.Thread(target=hash_chunks, args=(new, chunk))
+               for i in range(nthreads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+for size in [64, 1024, 1024 * 1024]:
+    chunk = 'x' * size
+    for name, new in CONSTRUCTORS:
+        t0 = time.time()
+        hash_chunks(new, chunk)
+        t1 = time.time()
+        print "%-7s %8d-byte updates %8.1f MB/s" % (
+            name, size, TOTAL / (t1 - t0) / 1e6)
+
+# large updates release the GIL, so that several threads hash in parallel
+chunk = 'x' * (1024 * 1024)
+for name, new in CONSTRUCTORS[2:]:
+    t0 = time.time()
+    hash_in_threads(new, chunk, 4)
+    t1 = time.time()
+    print "%-7s 4 threads                %8.1f MB/s" % (
+        name, 4 * TOTAL / (t1 - t0) / 1e6)
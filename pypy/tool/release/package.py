@@ -214,6 +214,13 @@ def create_package(basedir, options, _fake=False):
     for file in ['_testcapimodule.c', '_ctypes_test.c']:
         shutil.copyfile(str(basedir.join('lib_pypy', file)),
                         str(lib_pypy.join(file)))
+    if not _fake:
+        # the compiled modules of the stdlib, memory-mapped at startup.
+        # Must be done after the copytree()s, which keep the mtimes
+        script = basedir.join('lib_pypy', 'tools', 'build_stdlib_archive.py')
+        if subprocess.call([str(pypy_c), str(script), str(pypydir)]) != 0:
+            print('Failed to build the stdlib archive, continuing without',
+                  file=sys.stderr)
     # Use original LICENCE file
     base_file = str(basedir.join('LICENSE'))
     with open(base_file) as fid:
@@ -313,6 +313,15 @@ class CompiledLoopToken(object):
         debug_print("allocating Bridge #", self.bridges_count, "of Loop #", self.number)
         debug_stop("jit-mem-looptoken-alloc")
 
+    def get_code_size(self):
+        """Total size of the machine code and data of the loop and its
+        bridges, in bytes."""
+        size = 0
+        if self.asmmemmgr_blocks is not None:
+            for rawstart, rawstop in self.asmmemmgr_blocks:
+                size += rawstop - rawstart
+        return size
+
     def update_frame_info(self, oldlooptoken, baseofs):
         new_fi = self.frame_info
         new_loop_tokens = []
@@ -527,6 +527,7 @@ def send_loop_to_backend(greenkey, jitdriver_sd, metainterp_sd, loop, type,
     metainterp_sd.profiler.start_backend()
     debug_start("jit-backend")
     log = have_debug_prints() or jl.jitlog_enabled()
+    code_size = original_jitcell_token.get_code_size()
     try:
         loopname = jitdriver_sd.warmstate.get_location_str(greenkey)
         unique_id = jitdriver_sd.warmstate.get_unique_id(greenkey)
@@ -556,7 +557,10 @@ def send_loop_to_backend(greenkey, jitdriver_sd, metainterp_sd, loop, type,
                                       name=loopname)
     #
     if metainterp_sd.warmrunnerdesc is not None:    # for tests
-        metainterp_sd.warmrunnerdesc.memory_manager.keep_loop_alive(original_jitcell_token)
+        memmgr = metainterp_sd.warmrunnerdesc.memory_manager
+        memmgr.keep_loop_alive(original_jitcell_token)
+        memmgr.code_compiled(original_jitcell_token,
+                    original_jitcell_token.get_code_size() - code_size)
 
 def send_bridge_to_backend(jitdriver_sd, metainterp_sd, faildescr, inputargs,
                            operations, original_loop_token, memo):
@@ -581,6 +585,7 @@ def send_bridge_to_backend(jitdriver_sd, metainterp_sd, faildescr, inputargs,
     metainterp_sd.profiler.start_backend()
     debug_start("jit-backend")
     log = have_debug_prints() or jl.jitlog_enabled()
+    code_size = original_loop_token.get_code_size()
     try:
         asminfo = do_compile_bridge(metainterp_sd, faildescr, inputargs,
                                     operations,
@@ -606,6 +611,10 @@ def send_bridge_to_backend(jitdriver_sd, metainterp_sd, faildescr, inputargs,
     #if metainterp_sd.warmrunnerdesc is not None:    # for tests
     #    metainterp_sd.warmrunnerdesc.memory_manager.keep_loop_alive(
     #        original_loop_token)
+    if metainterp_sd.warmrunnerdesc is not None:    # for tests
+        metainterp_sd.warmrunnerdesc.memory_manager.code_compiled(
+            original_loop_token,
+            original_loop_token.get_code_size() - code_size)
     return asminfo
 
 # ____________________________________________________________
@@ -0,0 +1,140 @@
+import time
+from rpython.rlib.debug import debug_start, debug_print, debug_stop
+from rpython.jit.metainterp.history import SwitchToBlackhole
+from rpython.jit.metainterp.warmstate import JC_COMPILE_QUEUED
+
+#
+# Deferred compilation of loops, enabled with the 'defer_compile' parameter.
+#
+# Normally, when the tracer closes a loop, the trace is optimized and sent
+# to the backend immediately, on the same thread and in the middle of the
+# running program.  With 'defer_compile=N', the MetaInterp that recorded the
+# loop is instead kept in the CompileQueue, and execution goes on in the
+# blackhole interpreter and then in the regular interpreter.  The MetaInterp
+# keeps the whole trace, so the tracing is not repeated.
+#
+# Nothing runs in the background: the queued loops are optimized and
+# assembled on the thread running the program, like any other loop.  The
+# only gain is that the program chooses *when* this happens, by calling
+# jit_hooks.compile_deferred_loops() at a point where a pause is harmless
+# (e.g. between two requests of a server).  If it never does, a queued loop
+# is compiled at the next safe point (the next time any JitCounter reaches
+# the threshold) once it has waited N milliseconds; the pause is the same,
+# it just comes later.
+#
+# A queued loop keeps its whole MetaInterp alive, so the queue is bounded:
+# at most MAX_PENDING loops wait, and a loop that is still waiting after
+# MAX_AGE seconds (no safe point was reached, the program moved on) is
+# dropped.  A dropped loop is traced again if it becomes hot again.
+#
+# A real compiler thread is not possible: the GIL, the GC and the global
+# state of the JIT (jitcounter, memmgr, the backend's assembler) are shared
+# with the running program.
+#
+
+MAX_PENDING = 32
+MAX_AGE = 60.0      # seconds
+
+class DeferredLoop(object):
+    def __init__(self, metainterp, original_boxes, live_arg_boxes, start,
+                 use_unroll):
+        self.metainterp = metainterp
+        self.original_boxes = original_boxes
+        self.live_arg_boxes = live_arg_boxes
+        self.start = start
+        self.use_unroll = use_unroll
+        self.cell = None
+        self.queued_at = time.time()
+        self.due = self.queued_at
+
+
+class CompileQueue(object):
+
+    def __init__(self):
+        self.pending = []
+
+    def push(self, cell, deferred, delay):
+        """Queue 'deferred', to be compiled after 'delay' seconds at the
+        latest (if the program does not ask for it before)."""
+        if len(self.pending) >= MAX_PENDING:
+            self.drop(self.pending.pop(0))
+        deferred.cell = cell
+        deferred.due = deferred.queued_at + delay
+        cell.flags |= JC_COMPILE_QUEUED
+        cell.deferred_loop = deferred
+        self.pending.append(deferred)
+
+    def drop(self, deferred):
+        # forget the loop and release its MetaInterp
+        deferred.metainterp = None
+        cell = deferred.cell
+        cell.flags &= ~JC_COMPILE_QUEUED
+        cell.deferred_loop = None
+        debug_start("jit-compile-deferred")
+        debug_print("dropped, queue delay:", time.time() - deferred.queued_at)
+        debug_stop("jit-compile-deferred")
+
+    def safe_point(self):
+        """Called at a safe point.  Compiles the queued loops that have
+        waited long enough, and drops the ones that have waited too long.
+        Returns the number of loops that were compiled successfully."""
+        if not self.pending:
+            return 0
+        now = time.time()
+        pending = self.pending
+        ready = []
+        self.pending = []
+        for deferred in pending:
+            if now - deferred.queued_at > MAX_AGE:
+                self.drop(deferred)
+            elif now >= deferred.due:
+                ready.append(deferred)
+            else:
+                self.pending.append(deferred)
+        count = 0
+        for deferred in ready:
+            if self.compile_loop(deferred):
+                count += 1
+        return count
+
+    def compile_all(self):
+        """Compile all the queued loops.  Returns the number of loops
+        that were compiled successfully."""
+        pending = self.pending
+        self.pending = []
+        count = 0
+        for deferred in pending:
+            if self.compile_loop(deferred):
+                count += 1
+        return count
+
+    def compile_loop(self, deferred):
+        metainterp = deferred.metainterp
+        if metainterp is None:
+            return False     # already done
+        deferred.metainterp = None
+        cell = deferred.cell
+        cell.flags &= ~JC_COMPILE_QUEUED
+        cell.deferred_loop = None
+        delay = time.time() - deferred.queued_at
+        metainterp_sd = metainterp.staticdata
+        debug_start("jit-compile-deferred")
+        debug_print("queue delay:", delay)
+        metainterp_sd.jitlog.compile_deferred(delay)
+        try:
+            try:
+                target_token = metainterp.compile_loop(
+                    deferred.original_boxes, deferred.live_arg_boxes,
+                    deferred.start, use_unroll=deferred.use_unroll)
+                if target_token is None and deferred.use_unroll:
+                    # cancelled: we cannot trace more, so try one last
+                    # time without unrolling
+                    target_token = metainterp.compile_loop(
+                        deferred.original_boxes, deferred.live_arg_boxes,
+                        deferred.start, use_unroll=False)
+            except SwitchToBlackhole:
+                # there is already a compiled loop at this place
+                target_token = None
+        finally:
+            debug_stop("jit-compile-deferred")
+        return target_token is not None
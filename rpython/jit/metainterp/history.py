@@ -426,11 +426,18 @@ class JitCellToken(AbstractDescr):
     # CompiledLoopToken has its __del__ called, which frees the assembler
     # memory and the ResumeGuards.
     compiled_loop_token = None
+    # number of recent entries from the interpreter, see memmgr.py
+    entries = 0
 
     def __init__(self):
         # For memory management of assembled loops
         self._keepalive_jitcell_tokens = {}      # set of other JitCellToken
 
+    def get_code_size(self):
+        if self.compiled_loop_token is None:
+            return 0
+        return self.compiled_loop_token.get_code_size()
+
     def record_jump_to(self, jitcell_token):
         assert isinstance(jitcell_token, JitCellToken)
         self._keepalive_jitcell_tokens[jitcell_token] = None
@@ -2,6 +2,7 @@ import math
 from rpython.rlib.rarithmetic import r_int64
 from rpython.rlib.debug import debug_start, debug_print, debug_stop
 from rpython.rlib.objectmodel import we_are_translated
+from rpython.rlib.listsort import make_timsort_class
 
 #
 # Logic to decide which loops are old and not used any more.
@@ -19,6 +20,29 @@ from rpython.rlib.objectmodel import we_are_translated
 # 'generation' field is much smaller than the current generation, and
 # removed from the set.
 #
+# Additionally, if a maximum size for the machine code is given, the
+# loops are removed when the total size of the code that is kept alive
+# goes above it.  This total is updated after every loop or bridge is
+# compiled, and recomputed when loops are removed.  The code kept alive is
+# the one of the loops in 'alive_loops', and of the loops that they reach
+# through their '_keepalive_jitcell_tokens' (the targets of their jumps and
+# call_assemblers): removing a loop that is still reached this way frees
+# nothing, so it is not counted.  The loops that are removed first are the
+# ones with the fewest entries per byte of code.  The entries are counted
+# by keep_loop_alive(), and a loop is also credited with the entries of the
+# loops that jump to it or call it.  They are halved every time loops are
+# evicted this way, so that only the recent ones matter.
+#
+
+def _evict_before(a, b):
+    # a and b are pairs (score, looptoken); lower scores are evicted first,
+    # and among equal scores the older loops
+    if a[0] != b[0]:
+        return a[0] < b[0]
+    return a[1].generation < b[1].generation
+
+EvictionSort = make_timsort_class(lt=_evict_before)
+
 
 class MemoryManager(object):
 
@@ -38,6 +62,10 @@ class MemoryManager(object):
         self.current_generation = r_int64(1)
         self.next_check = r_int64(-1)
         self.alive_loops = {}
+        self.max_code_size = 0
+        self.code_size = 0
+        self.evicted_loops = 0
+        self.evicted_bytes = 0
 
     def set_max_age(self, max_age, check_frequency=0):
         if max_age <= 0:
@@ -49,13 +77,24 @@ class MemoryManager(object):
             self.check_frequency = check_frequency
             self.next_check = self.current_generation + 1
 
+    def set_max_code_size(self, max_code_size):
+        self.max_code_size = max(max_code_size, 0)
+
     def next_generation(self):
         self.current_generation += 1
         if self.current_generation == self.next_check:
             self._kill_old_loops_now()
             self.next_check = self.current_generation + self.check_frequency
 
+    def code_compiled(self, looptoken, size):
+        """Called after 'size' bytes of machine code were compiled for
+        'looptoken', either a new loop or a bridge."""
+        self.code_size += size
+        if 0 < self.max_code_size < self.code_size:
+            self._evict_loops_now(looptoken)
+
     def keep_loop_alive(self, looptoken):
+        looptoken.entries += 1
         if looptoken.generation != self.current_generation:
             looptoken.generation = self.current_generation
             self.alive_loops[looptoken] = None
@@ -72,6 +111,8 @@ class MemoryManager(object):
                 looptoken.invalidated):
                 del self.alive_loops[looptoken]
         newtotal = len(self.alive_loops)
+        if self.max_code_size > 0 and oldtotal != newtotal:
+            self.code_size = self._total_code_size(self._reachable_loops())
         debug_print("Loop tokens freed: ", oldtotal - newtotal)
         debug_print("Loop tokens left:  ", newtotal)
         #print self.alive_loops.keys()
@@ -81,3 +122,78 @@ class MemoryManager(object):
             # a single one is not enough for all tests :-(
             rgc.collect(); rgc.collect(); rgc.collect()
         debug_stop("jit-mem-collect")
+
+    def _reachable_loops(self):
+        # the loops kept alive: the ones in 'alive_loops' and the ones
+        # they reach through their '_keepalive_jitcell_tokens'
+        reachable = {}
+        pending = self.alive_loops.keys()
+        while pending:
+            looptoken = pending.pop()
+            if looptoken not in reachable:
+                reachable[looptoken] = None
+                pending.extend(looptoken._keepalive_jitcell_tokens.keys())
+        return reachable
+
+    def _total_code_size(self, reachable):
+        total = 0
+        for looptoken in reachable:
+            total += looptoken.get_code_size()
+        return total
+
+    def _evict_loops_now(self, just_compiled):
+        reachable = self._reachable_loops()
+        total = self._total_code_size(reachable)
+        self.code_size = total
+        if total <= self.max_code_size:
+            return
+        debug_start("jit-mem-evict")
+        debug_print("Code size:", total, "limit:", self.max_code_size)
+        # the loops that are jumped to or called from another loop are
+        # used whenever that loop is
+        entries = {}
+        for looptoken in reachable:
+            entries[looptoken] = entries.get(looptoken, 0) + looptoken.entries
+            for target in looptoken._keepalive_jitcell_tokens:
+                if target is not looptoken:
+                    entries[target] = (entries.get(target, 0) +
+                                       looptoken.entries)
+        # free the code down to 3/4 of the limit, to avoid doing this
+        # again after every loop
+        target = self.max_code_size - self.max_code_size // 4
+        candidates = []
+        for looptoken in self.alive_loops.keys():
+            size = looptoken.get_code_size()
+            # don't evict a loop that was compiled or entered just now
+            if (looptoken is just_compiled or looptoken.invalidated or
+                    looptoken.generation >= self.current_generation - 1):
+                continue
+            if size > 0:
+                score = float(entries[looptoken]) / size
+                candidates.append((score, looptoken))
+        for looptoken in reachable:
+            looptoken.entries >>= 1
+        EvictionSort(candidates).sort()
+        evicted = 0
+        for score, looptoken in candidates:
+            if total <= target:
+                break
+            del self.alive_loops[looptoken]
+            new_reachable = self._reachable_loops()
+            freed = 0
+            for other in reachable:
+                if other not in new_reachable:
+                    freed += other.get_code_size()
+                    evicted += 1
+            if freed == 0:
+                # still reached from another loop: removing it frees nothing
+                self.alive_loops[looptoken] = None
+                continue
+            reachable = new_reachable
+            total -= freed
+            self.evicted_bytes += freed
+        self.evicted_loops += evicted
+        self.code_size = total
+        debug_print("Loop tokens evicted:", evicted)
+        debug_print("Code size left:", total)
+        debug_stop("jit-mem-evict")
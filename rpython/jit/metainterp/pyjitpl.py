@@ -2398,6 +2398,9 @@ class MetaInterp(object):
 
     def aborted_tracing(self, reason):
         self.staticdata.profiler.count(reason)
+        if reason == Counters.COMPILE_DEFERRED:
+            debug_print('~~~ LOOP QUEUED FOR COMPILATION')
+            return
         debug_print('~~~ ABORTING TRACING %s' % Counters.counter_names[reason])
         jd_sd = self.jitdriver_sd
         if not self.current_merge_points:
@@ -2622,6 +2625,9 @@ class MetaInterp(object):
                     self.staticdata.log('cancelled too many times!')
                     raise SwitchToBlackhole(Counters.ABORT_BAD_LOOP)
             else:
+                if self.jitdriver_sd.warmstate.defer_compile > 0:
+                    self.defer_compile_loop(original_boxes, live_arg_boxes,
+                                            start, can_use_unroll)
                 target_token = self.compile_loop(
                     original_boxes, live_arg_boxes, start,
                     use_unroll=can_use_unroll)
@@ -2776,6 +2782,25 @@ class MetaInterp(object):
                 target_token.targeting_jitcell_token)
         return target_token
 
+    def defer_compile_loop(self, original_boxes, live_arg_boxes, start,
+                           use_unroll):
+        # put this MetaInterp, with the loop it recorded, in the compile
+        # queue, and continue running in the blackhole interpreter
+        from rpython.jit.metainterp.compilequeue import DeferredLoop
+        num_green_args = self.jitdriver_sd.num_green_args
+        greenkey = original_boxes[:num_green_args]
+        if has_compiled_targets(self.get_procedure_token(greenkey)):
+            self.staticdata.log('cancelled: we already have a token now')
+            raise SwitchToBlackhole(Counters.ABORT_BAD_LOOP)
+        cell = self.jitdriver_sd.warmstate.JitCell.ensure_jit_cell_at_key(
+            greenkey)
+        deferred = DeferredLoop(self, original_boxes, live_arg_boxes, start,
+                                use_unroll)
+        delay = self.jitdriver_sd.warmstate.defer_compile / 1000.0
+        self.staticdata.warmrunnerdesc.compile_queue.push(cell, deferred,
+                                                          delay)
+        raise SwitchToBlackhole(Counters.COMPILE_DEFERRED)
+
     def compile_retrace(self, original_boxes, live_arg_boxes, start):
         num_green_args = self.jitdriver_sd.num_green_args
         greenkey = original_boxes[:num_green_args]
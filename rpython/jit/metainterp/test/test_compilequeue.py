@@ -0,0 +1,169 @@
+import time
+from rpython.rlib.jit import JitDriver, Counters, set_param
+from rpython.rlib import jit_hooks
+from rpython.jit.metainterp.test.support import LLJitMixin
+from rpython.jit.metainterp.jitprof import Profiler
+from rpython.jit.metainterp.warmstate import JC_COMPILE_QUEUED
+from rpython.jit.metainterp import compilequeue
+from rpython.jit.metainterp.compilequeue import CompileQueue, DeferredLoop
+
+
+class FakeCell(object):
+    flags = 0
+    deferred_loop = None
+
+
+def test_queue_is_bounded():
+    queue = CompileQueue()
+    cells = []
+    for i in range(compilequeue.MAX_PENDING + 2):
+        cell = FakeCell()
+        queue.push(cell, DeferredLoop("metainterp", [], [], 0, True), 1000.0)
+        cells.append(cell)
+    assert len(queue.pending) == compilequeue.MAX_PENDING
+    # the two oldest loops were dropped
+    for cell in cells[:2]:
+        assert not cell.flags & JC_COMPILE_QUEUED
+        assert cell.deferred_loop is None
+    for cell in cells[2:]:
+        assert cell.flags & JC_COMPILE_QUEUED
+        assert cell.deferred_loop.metainterp == "metainterp"
+
+def test_safe_point_drops_stale_loops():
+    queue = CompileQueue()
+    cell = FakeCell()
+    deferred = DeferredLoop("metainterp", [], [], 0, True)
+    queue.push(cell, deferred, 0.0)
+    deferred.queued_at -= compilequeue.MAX_AGE + 1.0
+    assert queue.safe_point() == 0
+    assert queue.pending == []
+    assert deferred.metainterp is None
+    assert not cell.flags & JC_COMPILE_QUEUED
+    assert cell.deferred_loop is None
+
+def test_safe_point_waits_for_the_delay():
+    queue = CompileQueue()
+    cell = FakeCell()
+    deferred = DeferredLoop("metainterp", [], [], 0, True)
+    queue.push(cell, deferred, 1000.0)
+    assert queue.safe_point() == 0
+    assert queue.pending == [deferred]
+    assert cell.flags & JC_COMPILE_QUEUED
+
+
+class CompileQueueTests(object):
+
+    def test_compiled_when_reached_again(self):
+        driver = JitDriver(greens = [], reds = ['i', 's'])
+
+        def loop(i):
+            s = 0
+            while i > 0:
+                driver.jit_merge_point(i=i, s=s)
+                s += i
+                i -= 1
+            return s
+
+        def main(n):
+            set_param(driver, 'defer_compile', 1)
+            res = loop(5)
+            time.sleep(0.01)
+            # the delay is over: compiled when the counter reaches the
+            # threshold again
+            res += loop(n)
+            assert jit_hooks.stats_get_counter_value(None,
+                                           Counters.COMPILE_DEFERRED) == 1
+            assert jit_hooks.stats_get_counter_value(None,
+                                           Counters.TOTAL_COMPILED_LOOPS) == 1
+            assert jit_hooks.stats_get_counter_value(None,
+                                           Counters.TRACING) == 1
+            return res
+
+        res = self.meta_interp(main, [30], ProfilerClass=Profiler)
+        assert res == sum(range(6)) + sum(range(31))
+        self.check_trace_count(1)
+        self.check_jitcell_token_count(1)
+
+    def test_compile_pending(self):
+        driver = JitDriver(greens = [], reds = ['i', 's'])
+
+        def loop(i):
+            s = 0
+            while i > 0:
+                driver.jit_merge_point(i=i, s=s)
+                s += i
+                i -= 1
+            return s
+
+        def main(n):
+            set_param(driver, 'defer_compile', 1)
+            res = loop(5)
+            assert jit_hooks.stats_get_counter_value(None,
+                                           Counters.COMPILE_DEFERRED) == 1
+            assert jit_hooks.stats_get_counter_value(None,
+                                           Counters.TOTAL_COMPILED_LOOPS) == 0
+            assert jit_hooks.compile_deferred_loops(None) == 1
+            assert jit_hooks.compile_deferred_loops(None) == 0
+            assert jit_hooks.stats_get_counter_value(None,
+                                           Counters.TOTAL_COMPILED_LOOPS) == 1
+            res += loop(n)
+            # the loop was not traced a second time
+            assert jit_hooks.stats_get_counter_value(None,
+                                           Counters.TRACING) == 1
+            return res
+
+        res = self.meta_interp(main, [30], ProfilerClass=Profiler)
+        assert res == sum(range(6)) + sum(range(31))
+        self.check_jitcell_token_count(1)
+
+    def test_not_compiled_before_the_delay(self):
+        driver = JitDriver(greens = [], reds = ['i', 's'])
+
+        def loop(i):
+            s = 0
+            while i > 0:
+                driver.jit_merge_point(i=i, s=s)
+                s += i
+                i -= 1
+            return s
+
+        def main(n):
+            set_param(driver, 'defer_compile', 1000000)
+            res = loop(n)
+            # reached the threshold again, but still waits in the queue
+            assert jit_hooks.stats_get_counter_value(None,
+                                           Counters.COMPILE_DEFERRED) == 1
+            assert jit_hooks.stats_get_counter_value(None,
+                                           Counters.TOTAL_COMPILED_LOOPS) == 0
+            assert jit_hooks.compile_deferred_loops(None) == 1
+            return res
+
+        res = self.meta_interp(main, [30], ProfilerClass=Profiler)
+        assert res == sum(range(31))
+        self.check_jitcell_token_count(1)
+
+    def test_not_deferred_by_default(self):
+        driver = JitDriver(greens = [], reds = ['i', 's'])
+
+        def loop(i):
+            s = 0
+            while i > 0:
+                driver.jit_merge_point(i=i, s=s)
+                s += i
+                i -= 1
+            return s
+
+        def main(n):
+            res = loop(n)
+            assert jit_hooks.stats_get_counter_value(None,
+                                           Counters.COMPILE_DEFERRED) == 0
+            assert jit_hooks.compile_deferred_loops(None) == 0
+            return res
+
+        res = self.meta_interp(main, [30], ProfilerClass=Profiler)
+        assert res == sum(range(31))
+        self.check_trace_count(1)
+
+
+class TestCompileQueue(CompileQueueTests, LLJitMixin):
+    pass
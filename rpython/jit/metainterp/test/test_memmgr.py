@@ -21,6 +21,14 @@ from rpython.rlib import rgc
 class FakeLoopToken:
     generation = 0
     invalidated = False
+    entries = 0
+    code_size = 0
+
+    def __init__(self):
+        self._keepalive_jitcell_tokens = {}
+
+    def get_code_size(self):
+        return self.code_size
 
 
 class _TestMemoryManager:
@@ -79,6 +87,158 @@ class _TestMemoryManager:
                 assert tokens[i] in memmgr.alive_loops
 
 
+    def compile(self, memmgr, token, size=1000):
+        token.code_size = size
+        memmgr.keep_loop_alive(token)
+        memmgr.code_compiled(token, size)
+        memmgr.next_generation()
+
+    def test_max_code_size_disabled(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_code_size(0)
+        tokens = [FakeLoopToken() for i in range(10)]
+        for token in tokens:
+            self.compile(memmgr, token)
+        assert memmgr.alive_loops == dict.fromkeys(tokens)
+        assert memmgr.code_size == 10000
+        assert memmgr.evicted_loops == 0
+
+    def test_max_code_size(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_code_size(4000)
+        tokens = [FakeLoopToken() for i in range(4)]
+        for token in tokens:
+            self.compile(memmgr, token)
+        assert memmgr.alive_loops == dict.fromkeys(tokens)
+        assert memmgr.code_size == 4000
+        # tokens[1] is used a lot, tokens[2] a bit
+        for i in range(10):
+            memmgr.keep_loop_alive(tokens[1])
+        memmgr.keep_loop_alive(tokens[2])
+        memmgr.next_generation()
+        memmgr.next_generation()
+        # only checked after compiling something
+        assert memmgr.evicted_loops == 0
+        token = FakeLoopToken()
+        self.compile(memmgr, token)
+        # 5000 bytes > 4000: free down to 3000 bytes, starting with the
+        # loops with the fewest entries, the oldest first
+        assert memmgr.alive_loops == dict.fromkeys([tokens[1], tokens[2],
+                                                    token])
+        assert memmgr.evicted_loops == 2
+        assert memmgr.evicted_bytes == 2000
+        assert memmgr.code_size == 3000
+        # the entries are halved
+        assert tokens[1].entries == 5
+
+    def test_max_code_size_counts_bridges(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_code_size(4000)
+        old = FakeLoopToken()
+        self.compile(memmgr, old)
+        token = FakeLoopToken()
+        self.compile(memmgr, token)
+        memmgr.next_generation()
+        # a bridge of 3000 bytes attached to 'token'
+        token.code_size += 3000
+        memmgr.code_compiled(token, 3000)
+        assert memmgr.alive_loops == {token: None}
+        assert memmgr.evicted_bytes == 1000
+        assert memmgr.code_size == 4000
+
+    def test_max_code_size_weighs_size(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_code_size(10000)
+        big = FakeLoopToken()
+        self.compile(memmgr, big, 8000)
+        small = FakeLoopToken()
+        self.compile(memmgr, small, 1000)
+        for i in range(4):
+            memmgr.keep_loop_alive(big)
+            memmgr.keep_loop_alive(small)
+        memmgr.next_generation()
+        memmgr.next_generation()
+        token = FakeLoopToken()
+        self.compile(memmgr, token, 2000)
+        # same number of entries, but 'big' has fewer entries per byte
+        assert memmgr.alive_loops == dict.fromkeys([small, token])
+        assert memmgr.evicted_bytes == 8000
+
+    def test_max_code_size_keeps_recent_loops(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_code_size(1000)
+        token = FakeLoopToken()
+        self.compile(memmgr, token, 5000)
+        assert memmgr.alive_loops == {token: None}
+        memmgr.next_generation()
+        self.compile(memmgr, FakeLoopToken(), 500)
+        assert token not in memmgr.alive_loops
+        assert memmgr.evicted_loops == 1
+
+    def test_max_code_size_credits_jump_targets(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_code_size(4000)
+        caller = FakeLoopToken()
+        self.compile(memmgr, caller)
+        callee = FakeLoopToken()
+        self.compile(memmgr, callee)
+        other = FakeLoopToken()
+        self.compile(memmgr, other)
+        # 'callee' is only entered from the machine code of 'caller'
+        caller._keepalive_jitcell_tokens[callee] = None
+        for i in range(10):
+            memmgr.keep_loop_alive(caller)
+        memmgr.keep_loop_alive(other)
+        memmgr.next_generation()
+        memmgr.next_generation()
+        self.compile(memmgr, FakeLoopToken(), 2000)
+        assert callee in memmgr.alive_loops
+        assert other not in memmgr.alive_loops
+
+    def test_max_code_size_only_counts_freed_code(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_code_size(8000)
+        callee = FakeLoopToken()
+        self.compile(memmgr, callee, 3000)
+        caller = FakeLoopToken()
+        self.compile(memmgr, caller, 1000)
+        caller._keepalive_jitcell_tokens[callee] = None
+        memmgr.next_generation()
+        self.compile(memmgr, FakeLoopToken(), 5000)
+        # 'callee' has the fewest entries per byte, but removing it frees
+        # nothing as long as 'caller' is there
+        assert callee in memmgr.alive_loops
+        assert caller not in memmgr.alive_loops
+        assert memmgr.evicted_loops == 1
+        assert memmgr.evicted_bytes == 1000
+        assert memmgr.code_size == 8000
+
+    def test_max_code_size_frees_reachable_loops(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_code_size(4000)
+        caller = FakeLoopToken()
+        self.compile(memmgr, caller)
+        callee = FakeLoopToken()
+        self.compile(memmgr, callee)
+        caller._keepalive_jitcell_tokens[callee] = None
+        # 'callee' is only kept alive by 'caller'
+        del memmgr.alive_loops[callee]
+        memmgr.next_generation()
+        self.compile(memmgr, FakeLoopToken(), 3000)
+        assert caller not in memmgr.alive_loops
+        assert memmgr.evicted_loops == 2
+        assert memmgr.evicted_bytes == 2000
+        assert memmgr.code_size == 3000
+
+
 class _TestIntegration(LLJitMixin):
     # See comments in TestMemoryManager.  To get temporarily the normal
     # behavior just rename this class to TestIntegration.
@@ -19,6 +19,7 @@ from rpython.translator.backendopt import removenoops
 from rpython.translator.unsimplify import call_final_function
 
 from rpython.jit.metainterp import history, pyjitpl, gc, memmgr, jitexc
+from rpython.jit.metainterp import compilequeue
 from rpython.jit.metainterp.pyjitpl import MetaInterpStaticData
 from rpython.jit.metainterp.jitprof import Profiler, EmptyProfiler
 from rpython.jit.metainterp.jitdriver import JitDriverStaticData
@@ -237,6 +238,7 @@ class WarmRunnerDesc(object):
         pyjitpl._warmrunnerdesc = self   # this is a global for debugging only!
         self.set_translator(translator)
         self.memory_manager = memmgr.MemoryManager()
+        self.compile_queue = compilequeue.CompileQueue()
         self.build_cpu(CPUClass, **kwds)
         self.inline_inlineable_portals()
         self.find_portals()
@@ -850,7 +852,8 @@ class WarmRunnerDesc(object):
         # make sure we make a copy of function so it no longer belongs
         # to extregistry
         func = op.args[1].value
-        if func.__name__.startswith('stats_'):
+        if (func.__name__.startswith('stats_') or
+                func.__name__ == 'compile_deferred_loops'):
             # get special treatment since we rewrite it to a call that accepts
             # jit driver
             assert len(op.args) >= 3, ("%r must have a first argument "
@@ -137,6 +137,7 @@ JC_TRACING         = 0x01
 JC_DONT_TRACE_HERE = 0x02
 JC_TEMPORARY       = 0x04
 JC_TRACING_OCCURRED= 0x08
+JC_COMPILE_QUEUED  = 0x10
 
 class BaseJitCell(object):
     """Subclasses of BaseJitCell are used in tandem with the single
@@ -183,9 +184,13 @@ class BaseJitCell(object):
         this particular function.  (We only set this flag when aborting
         due to a trace too long, so we use the same flag as a hint to
         also mean "please trace from here as soon as possible".)
+
+        JC_COMPILE_QUEUED: a loop was traced from this greenkey, and it
+        waits in the CompileQueue (see compilequeue.py) in 'deferred_loop'.
     """
     flags = 0     # JC_xxx flags
     wref_procedure_token = None
+    deferred_loop = None
     next = None
 
     def get_procedure_token(self):
@@ -212,8 +217,9 @@ class BaseJitCell(object):
     def should_remove_jitcell(self):
         if self.get_procedure_token() is not None:
             return False    # don't remove JitCells with a procedure_token
-        if self.flags & JC_TRACING:
+        if self.flags & (JC_TRACING | JC_COMPILE_QUEUED):
             return False    # don't remove JitCells that are being traced
+                            # or whose loop waits in the compile queue
         if self.flags & JC_DONT_TRACE_HERE:
             # if we have this flag, and we *had* a procedure_token but
             # we no longer have one, then remove me.  this prevents this
@@ -288,6 +294,11 @@ class WarmEnterState(object):
             self.warmrunnerdesc.memory_manager is not None):   # all for tests
             self.warmrunnerdesc.memory_manager.set_max_age(value)
 
+    def set_param_max_code_memory(self, value):
+        if (self.warmrunnerdesc is not None and
+            self.warmrunnerdesc.memory_manager is not None):   # all for tests
+            self.warmrunnerdesc.memory_manager.set_max_code_size(value * 1024)
+
     def set_param_retrace_limit(self, value):
         if self.warmrunnerdesc:
             if self.warmrunnerdesc.memory_manager:
@@ -317,6 +328,9 @@ class WarmEnterState(object):
     def set_param_vec_cost(self, ivalue):
         self.vec_cost = ivalue
 
+    def set_param_defer_compile(self, value):
+        self.defer_compile = value
+
     def disable_noninlinable_function(self, greenkey):
         cell = self.JitCell.ensure_jit_cell_at_key(greenkey)
         cell.flags |= JC_DONT_TRACE_HERE
@@ -414,6 +428,14 @@ class WarmEnterState(object):
         def bound_reached(hash, cell, *args):
             if not confirm_enter_jit(*args):
                 return
+            queued = cell is not None and cell.flags & JC_COMPILE_QUEUED
+            # safe point: compile the queued loops that waited long enough
+            warmrunnerdesc.compile_queue.safe_point()
+            if queued:
+                # the loop was already traced, and was either compiled just
+                # now or still waits in the compile queue: don't trace it
+                # again
+                return
             jitcounter.decay_all_counters()
             if rstack.stack_almost_full():
                 return
@@ -467,6 +489,10 @@ class WarmEnterState(object):
             # machine code was already compiled for these greenargs
             procedure_token = cell.get_procedure_token()
             if procedure_token is None:
+                if cell.flags & JC_COMPILE_QUEUED:
+                    if jitcounter.tick(hash, increment_threshold):
+                        bound_reached(hash, cell, *args)
+                    return
                 if cell.flags & JC_DONT_TRACE_HERE:
                     if not cell.has_seen_a_procedure_token():
                         # A JC_DONT_TRACE_HERE, i.e. a non-inlinable function.
@@ -21,9 +21,11 @@ class GcHooks(object):
     def is_gc_collect_enabled(self):
         return False
 
-    def on_gc_minor(self, duration, total_memory_used, pinned_objects):
+    def on_gc_minor(self, duration, total_memory_used, pinned_objects,
+                    nursery_size, nursery_surviving_size):
         """
-        Called after a minor collection
+        Called after a minor collection.  ``nursery_size`` is the size of
+        the nursery from now on, which can change if the GC adapts it.
         """
 
     def on_gc_collect_step(self, duration, oldstate, newstate):
@@ -49,9 +51,11 @@ class GcHooks(object):
     # overridden
 
     @rgc.no_collect
-    def fire_gc_minor(self, duration, total_memory_used, pinned_objects):
+    def fire_gc_minor(self, duration, total_memory_used, pinned_objects,
+                      nursery_size, nursery_surviving_size):
         if self.is_gc_minor_enabled():
-            self.on_gc_minor(duration, total_memory_used, pinned_objects)
+            self.on_gc_minor(duration, total_memory_used, pinned_objects,
+                             nursery_size, nursery_surviving_size)
 
     @rgc.no_collect
     def fire_gc_collect_step(self, duration, oldstate, newstate):
@@ -6,6 +6,19 @@ Environment variables can be used to fine-tune the following parameters:
                          '4M'.  Small values
                          (like 1 or 1KB) are useful for debugging.
 
+ PYPY_GC_NURSERY_MAX     If set, the size of the nursery is adapted at
+                         runtime, between PYPY_GC_NURSERY_MIN and this
+                         value, depending on how much survives the minor
+                         collections and how long they take.  Off by
+                         default.
+
+ PYPY_GC_NURSERY_MIN     The lower bound of the adaptive nursery size.
+                         Defaults to 1/4 of the initial nursery size.
+
+ PYPY_GC_NURSERY_PAUSE   With an adaptive nursery size, the longest minor
+                         collection, in seconds, that we aim for.  Defaults
+                         to '0.005'.
+
  PYPY_GC_NURSERY_DEBUG   If set to non-zero, will fill nursery with garbage,
                          to help debugging.
 
@@ -290,12 +303,20 @@ class IncrementalMiniMarkGC(MovingGCBase):
                  card_page_indices=0,
                  large_object=8*WORD,
                  ArenaCollectionClass=None,
+                 nursery_size_min=0,
+                 nursery_size_max=0,
+                 nursery_pause_max=0.005,
                  **kwds):
         "NOT_RPYTHON"
         MovingGCBase.__init__(self, config, **kwds)
         assert small_request_threshold % WORD == 0
         self.read_from_env = read_from_env
         self.nursery_size = nursery_size
+        #
+        # See PYPY_GC_NURSERY_MIN/MAX/PAUSE.  Checked in setup().
+        self.nursery_size_min = nursery_size_min
+        self.nursery_size_max = nursery_size_max
+        self.nursery_pause_max = nursery_pause_max
 
         self.small_request_threshold = small_request_threshold
         self.major_collection_threshold = major_collection_threshold
@@ -441,6 +462,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
         # up the env var, which requires the GC; and then really
         # allocate the nursery of the final size.
         if not self.read_from_env:
+            self._setup_nursery_bounds()
             self.allocate_nursery()
             self.gc_increment_step = self.nursery_size * 4
             self.gc_nursery_debug = False
@@ -469,6 +491,16 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 self.debug_tiny_nursery = newsize & ~(WORD-1)
                 newsize = minsize
             #
+            nursery_max = env.read_uint_from_env('PYPY_GC_NURSERY_MAX')
+            if nursery_max > 0:
+                self.nursery_size_max = nursery_max
+                self.nursery_size_min = env.read_uint_from_env(
+                    'PYPY_GC_NURSERY_MIN')
+            #
+            nursery_pause = env.read_float_from_env('PYPY_GC_NURSERY_PAUSE')
+            if nursery_pause > 0.0:
+                self.nursery_pause_max = nursery_pause
+            #
             major_coll = env.read_float_from_env('PYPY_GC_MAJOR_COLLECT')
             if major_coll > 1.0:
                 self.major_collection_threshold = major_coll
@@ -508,6 +540,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
             self._minor_collection()    # to empty the nursery
             llarena.arena_free(self.nursery)
             self.nursery_size = newsize
+            self._setup_nursery_bounds()
             self.allocate_nursery()
         #
         env_max_number_of_pinned_objects = os.environ.get('PYPY_GC_MAX_PINNED')
@@ -533,9 +566,27 @@ class IncrementalMiniMarkGC(MovingGCBase):
     def isenabled(self):
         return self.enabled
 
+    def _setup_nursery_bounds(self):
+        # The nursery is allocated with room for 'nursery_size_max' bytes,
+        # and 'nursery_size' can later vary between the two bounds.  If
+        # no maximum is given, or if we are using a tiny nursery for
+        # debugging, the size of the nursery is fixed.
+        if self.nursery_size_max <= 0 or self.debug_tiny_nursery >= 0:
+            self.nursery_size_min = self.nursery_size
+            self.nursery_size_max = self.nursery_size
+            return
+        minsize = 2 * (self.nonlarge_max + 1)
+        if self.nursery_size_min <= 0:
+            self.nursery_size_min = self.nursery_size // 4
+        self.nursery_size_min = max(self.nursery_size_min & ~(WORD-1),
+                                    minsize)
+        self.nursery_size_min = min(self.nursery_size_min, self.nursery_size)
+        self.nursery_size_max = max(self.nursery_size_max & ~(WORD-1),
+                                    self.nursery_size)
+
     def _nursery_memory_size(self):
         extra = self.nonlarge_max + 1
-        return self.nursery_size + extra
+        return max(self.nursery_size, self.nursery_size_max) + extra
 
     def _alloc_nursery(self):
         # the start of the nursery: we actually allocate a bit more for
@@ -1715,6 +1766,16 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.pinned_objects_in_nursery = 0
         self.any_pinned_object_kept = False
         #
+        # How much was allocated in the nursery, for the adaptive
+        # nursery size.  Not meaningful if there are pinned objects.
+        if any_pinned_object_from_earlier:
+            nursery_used = -1
+        elif not self.nursery_free:
+            # called from collect_and_reserve(): the nursery is full
+            nursery_used = self.nursery_size
+        else:
+            nursery_used = self.nursery_free - self.nursery
+        #
         # Before everything else, remove from 'old_objects_pointing_to_young'
         # the young arrays.
         if self.young_rawmalloced_objects:
@@ -1898,10 +1959,47 @@ class IncrementalMiniMarkGC(MovingGCBase):
         debug_stop("gc-minor")
         duration = time.time() - start
         self.total_gc_time += duration
+        #
+        # The nursery can only be resized when it is completely empty.
+        if (self.nursery_size_min < self.nursery_size_max and
+                nursery_used >= 0 and not self.nursery_barriers.non_empty()):
+            self._adapt_nursery_size(nursery_used, duration)
+        #
         self.hooks.fire_gc_minor(
             duration=duration,
             total_memory_used=total_memory_used,
-            pinned_objects=self.pinned_objects_in_nursery)
+            pinned_objects=self.pinned_objects_in_nursery,
+            nursery_size=self.nursery_size,
+            nursery_surviving_size=self.nursery_surviving_size)
+
+    def _adapt_nursery_size(self, nursery_used, duration):
+        # Only minor collections of a nursery that was at least half full
+        # are considered; the other ones were explicitly requested.
+        if nursery_used < self.nursery_size // 2:
+            return
+        surviving = self.nursery_surviving_size
+        newsize = self.nursery_size
+        if duration > self.nursery_pause_max:
+            # too slow: shrink
+            newsize = newsize // 2
+        elif surviving * 4 > nursery_used:
+            # more than 1/4 survives: grow, to give the objects more
+            # time to die, if the pauses stay short enough
+            if duration * 2 <= self.nursery_pause_max:
+                newsize = newsize * 2
+        elif surviving * 16 < nursery_used:
+            # less than 1/16 survives: a smaller nursery, which fits
+            # better in the cache, is enough
+            newsize = newsize // 2
+        newsize = newsize & ~(WORD-1)
+        newsize = min(newsize, self.nursery_size_max)
+        newsize = max(newsize, self.nursery_size_min)
+        if newsize != self.nursery_size:
+            debug_start("gc-set-nursery-size")
+            debug_print("nursery size:", newsize)
+            debug_stop("gc-set-nursery-size")
+            self.nursery_size = newsize
+            self.nursery_top = self.nursery + newsize
 
     def _reset_flag_old_objects_pointing_to_pinned(self, obj, ignore):
         ll_assert(self.header(obj).tid & GCFLAG_PINNED_OBJECT_PARENT_KNOWN != 0,
@@ -3059,6 +3157,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
             return intmask(self.nursery_size)
         elif stats_no == rgc.TOTAL_GC_TIME:
             return int(self.total_gc_time * 1000)
+        elif stats_no == rgc.ARENAS_COUNT:
+            return self.ac.arenas_count
+        elif stats_no == rgc.SPARSE_ARENA_PAGES:
+            return self.ac.num_sparse_pages
         return 0
 
 
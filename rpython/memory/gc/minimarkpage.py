@@ -63,6 +63,8 @@ PAGE_HEADER = lltype.Struct('PageHeader',
     #    pages, it is a chained list of pages having the same size class,
     #    rooted in 'page_for_size[size_class]'.  For full pages, it is a
     #    different chained list rooted in 'full_page_for_size[size_class]'.
+    #    Pages found to be mostly empty by the last major collection are
+    #    in a third list rooted in 'sparse_page_for_size[size_class]'.
     #    For free pages, it is the list 'freepages' in the arena header.
     ('nextpage', PAGE_PTR),
     # -- The arena this page is part of.
@@ -81,6 +83,16 @@ PAGE_HEADER = lltype.Struct('PageHeader',
 PAGE_PTR.TO.become(PAGE_HEADER)
 PAGE_NULL = lltype.nullptr(PAGE_HEADER)
 
+# A page is 'sparse' if less than 1/SPARSE_PAGE_RATIO of its blocks are
+# still in use after a major collection.  We allocate from sparse pages
+# only when there is no other non-full page of the same size class and
+# no arena has a free page left, i.e. instead of allocating a new arena.
+# This gives the few remaining objects a chance to die, at which point the
+# page is freed, and so is the arena once all its pages are free.  It is
+# the closest we can get to compacting the old generation without moving
+# objects.
+SPARSE_PAGE_RATIO = 8
+
 # ----------
 
 
@@ -104,6 +116,8 @@ class ArenaCollection(object):
         self.full_page_for_size     = self._new_page_ptr_list(length)
         self.old_page_for_size      = self._new_page_ptr_list(length)
         self.old_full_page_for_size = self._new_page_ptr_list(length)
+        self.sparse_page_for_size   = self._new_page_ptr_list(length)
+        self.old_sparse_page_for_size = self._new_page_ptr_list(length)
         self.nblocks_for_size = lltype.malloc(rffi.CArray(lltype.Signed),
                                               length, flavor='raw',
                                               immortal=True)
@@ -137,6 +151,9 @@ class ArenaCollection(object):
         # part of current_arena might still contain uninitialized pages
         self.num_uninitialized_pages = 0
         #
+        # the number of pages in the 'sparse_page_for_size' lists
+        self.num_sparse_pages = 0
+        #
         # the total memory used, counting every block in use, without
         # the additional bookkeeping stuff.
         self.total_memory_used = r_uint(0)
@@ -197,9 +214,21 @@ class ArenaCollection(object):
     def allocate_new_page(self, size_class):
         """Allocate and return a new page for the given size_class."""
         #
-        # Allocate a new arena if needed.
+        # If the current arena is exhausted, move on to the next arena
+        # with free pages.  Only if there is none, reuse a sparse page
+        # instead of allocating a new arena.
         if self.current_arena == ARENA_NULL:
-            self.allocate_new_arena()
+            if not self._pick_arena_with_free_pages():
+                page = self.sparse_page_for_size[size_class]
+                if page != PAGE_NULL:
+                    self.sparse_page_for_size[size_class] = page.nextpage
+                    self.num_sparse_pages -= 1
+                    page.nextpage = PAGE_NULL
+                    ll_assert(self.page_for_size[size_class] == PAGE_NULL,
+                            "sparse page reused but a page is already waiting")
+                    self.page_for_size[size_class] = page
+                    return page
+                self.allocate_new_arena()
         #
         # The result is simply 'current_arena.freepages'.
         arena = self.current_arena
@@ -275,17 +304,21 @@ class ArenaCollection(object):
         return False
 
 
-    def allocate_new_arena(self):
-        """Loads in self.current_arena the arena to allocate from next."""
-        #
+    def _pick_arena_with_free_pages(self):
         if self._pick_next_arena():
-            return
+            return True
         #
         # Maybe we are incrementally collecting, in which case an arena
         # could have more free pages thrown into it than arenas_lists[]
         # accounts for.  Rehash and retry.
         self._rehash_arenas_lists()
-        if self._pick_next_arena():
+        return self._pick_next_arena()
+
+
+    def allocate_new_arena(self):
+        """Loads in self.current_arena the arena to allocate from next."""
+        #
+        if self._pick_arena_with_free_pages():
             return
         #
         # No more arena with any free page.  We must allocate a new arena.
@@ -339,9 +372,13 @@ class ArenaCollection(object):
                             self.page_for_size[size_class])
             self.old_full_page_for_size[size_class] = (
                             self.full_page_for_size[size_class])
+            self.old_sparse_page_for_size[size_class] = (
+                            self.sparse_page_for_size[size_class])
             self.page_for_size[size_class]      = PAGE_NULL
             self.full_page_for_size[size_class] = PAGE_NULL
+            self.sparse_page_for_size[size_class] = PAGE_NULL
             size_class -= 1
+        self.num_sparse_pages = 0
 
 
     def mass_free_incremental(self, ok_to_free_func, max_pages):
@@ -353,12 +390,14 @@ class ArenaCollection(object):
         #
         while size_class >= 1:
             #
-            # Walk the pages in 'page_for_size[size_class]' and
-            # 'full_page_for_size[size_class]' and free some objects.
+            # Walk the pages in 'page_for_size[size_class]',
+            # 'full_page_for_size[size_class]' and
+            # 'sparse_page_for_size[size_class]' and free some objects.
             # Pages completely freed are added to 'page.arena.freepages',
             # and become available for reuse by any size class.  Pages
-            # not completely freed are re-chained either in
-            # 'full_page_for_size[]' or 'page_for_size[]'.
+            # not completely freed are re-chained in one of
+            # 'full_page_for_size[]', 'page_for_size[]' or
+            # 'sparse_page_for_size[]'.
             max_pages = self.mass_free_in_pages(size_class, ok_to_free_func,
                                                 max_pages)
             if max_pages <= 0:
@@ -430,15 +469,19 @@ class ArenaCollection(object):
         block_size = size_class * WORD
         remaining_partial_pages = self.page_for_size[size_class]
         remaining_full_pages = self.full_page_for_size[size_class]
+        remaining_sparse_pages = self.sparse_page_for_size[size_class]
         #
         step = 0
-        while step < 2:
+        while step < 3:
             if step == 0:
                 page = self.old_full_page_for_size[size_class]
                 self.old_full_page_for_size[size_class] = PAGE_NULL
-            else:
+            elif step == 1:
                 page = self.old_page_for_size[size_class]
                 self.old_page_for_size[size_class] = PAGE_NULL
+            else:
+                page = self.old_sparse_page_for_size[size_class]
+                self.old_sparse_page_for_size[size_class] = PAGE_NULL
             #
             while page != PAGE_NULL:
                 #
@@ -455,13 +498,21 @@ class ArenaCollection(object):
                     page.nextpage = remaining_full_pages
                     remaining_full_pages = page
                     #
-                elif surviving > 0:
+                elif surviving * SPARSE_PAGE_RATIO >= nblocks:
                     #
                     # There is at least 1 object surviving.  Re-insert
                     # the page in the 'remaining_partial_pages' chained list.
                     page.nextpage = remaining_partial_pages
                     remaining_partial_pages = page
                     #
+                elif surviving > 0:
+                    #
+                    # Only a few objects survive.  Put the page aside in
+                    # the 'remaining_sparse_pages' chained list.
+                    page.nextpage = remaining_sparse_pages
+                    remaining_sparse_pages = page
+                    self.num_sparse_pages += 1
+                    #
                 else:
                     # No object survives; free the page.
                     self.free_page(page)
@@ -473,8 +524,10 @@ class ArenaCollection(object):
                     # pages into self.old_xxx and return early
                     if step == 0:
                         self.old_full_page_for_size[size_class] = nextpage
-                    else:
+                    elif step == 1:
                         self.old_page_for_size[size_class] = nextpage
+                    else:
+                        self.old_sparse_page_for_size[size_class] = nextpage
                     step = 99     # stop
                     break
 
@@ -485,6 +538,7 @@ class ArenaCollection(object):
         #
         self.page_for_size[size_class] = remaining_partial_pages
         self.full_page_for_size[size_class] = remaining_full_pages
+        self.sparse_page_for_size[size_class] = remaining_sparse_pages
         return max_pages
 
 
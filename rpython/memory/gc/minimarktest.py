@@ -21,6 +21,7 @@ class SimpleArenaCollection(object):
         self.all_objects = []
         self.total_memory_used = 0
         self.arenas_count = 0
+        self.num_sparse_pages = 0
 
     def malloc(self, size):
         nsize = raw_malloc_usage(size)
@@ -695,6 +695,42 @@ class TestIncrementalMiniMarkGCSimple(TestMiniMarkGCSimple):
         assert obj3.x == 456     # it is populated now
 
 
+class TestIncrementalMiniMarkGCAdaptiveNursery(BaseDirectGCTest):
+    from rpython.memory.gc.incminimark import IncrementalMiniMarkGC as GCClass
+    GC_PARAMS = {'nursery_size': 64*WORD,
+                 'nursery_size_min': 16*WORD,
+                 'nursery_size_max': 256*WORD,
+                 'nursery_pause_max': 1000.0}
+
+    def test_nursery_bounds(self):
+        assert self.gc.nursery_size == 64*WORD
+        assert self.gc.nursery_size_min == 16*WORD
+        assert self.gc.nursery_size_max == 256*WORD
+        assert self.gc.nursery_top == self.gc.nursery + 64*WORD
+
+    def test_nursery_grows_when_objects_survive(self):
+        for i in range(50):
+            self.stackroots.append(self.malloc(S))
+        assert self.gc.nursery_size > 64*WORD
+        assert self.gc.nursery_top == self.gc.nursery + self.gc.nursery_size
+
+    def test_nursery_shrinks_when_objects_die(self):
+        for i in range(100):
+            self.malloc(S)
+        assert self.gc.nursery_size == 16*WORD
+        assert self.gc.nursery_top == self.gc.nursery + 16*WORD
+
+    def test_nursery_shrinks_on_long_pauses(self):
+        self.gc.nursery_pause_max = 0.0
+        for i in range(50):
+            self.stackroots.append(self.malloc(S))
+        assert self.gc.nursery_size == 16*WORD
+
+    def test_explicit_minor_collection_does_not_resize(self):
+        self.stackroots.append(self.malloc(S))
+        self.gc._minor_collection()
+        assert self.gc.nursery_size == 64*WORD
+
 class TestIncrementalMiniMarkGCFull(DirectGCTest):
     from rpython.memory.gc.incminimark import IncrementalMiniMarkGC as GCClass
     def test_malloc_fixedsize_no_cleanup(self):
@@ -722,6 +758,22 @@ class TestIncrementalMiniMarkGCFull(DirectGCTest):
         for i in range(100):
             assert p[i] == lltype.nullptr(S)
 
+    def test_get_stats_sparse_arena_pages(self):
+        from rpython.rlib import rgc
+        for i in range(300):
+            self.stackroots.append(self.malloc(S))
+        self.gc.collect()
+        assert self.gc.get_stats(rgc.ARENAS_COUNT) >= 1
+        assert self.gc.get_stats(rgc.SPARSE_ARENA_PAGES) == 0
+        # keep only a few objects in every page
+        self.stackroots[:] = self.stackroots[::32]
+        self.gc.collect()
+        assert self.gc.get_stats(rgc.SPARSE_ARENA_PAGES) >= 1
+        assert (self.gc.get_stats(rgc.SPARSE_ARENA_PAGES) ==
+                self.gc.ac.num_sparse_pages)
+    test_get_stats_sparse_arena_pages.GC_PARAMS = {
+        "page_size": 64*WORD, "arena_size": 1024*WORD}
+
     def test_malloc_varsize_no_cleanup3(self):
         VAR1 = lltype.Array(lltype.Ptr(S))
         p1 = lltype.malloc(VAR1, 10, flavor='raw', track_allocation=False)
@@ -27,11 +27,14 @@ class MyGcHooks(GcHooks):
         self.collects = []
         self.durations = []
 
-    def on_gc_minor(self, duration, total_memory_used, pinned_objects):
+    def on_gc_minor(self, duration, total_memory_used, pinned_objects,
+                    nursery_size, nursery_surviving_size):
         self.durations.append(duration)
         self.minors.append({
             'total_memory_used': total_memory_used,
-            'pinned_objects': pinned_objects})
+            'pinned_objects': pinned_objects,
+            'nursery_size': nursery_size,
+            'nursery_surviving_size': nursery_surviving_size})
 
     def on_gc_collect_step(self, duration, oldstate, newstate):
         self.durations.append(duration)
@@ -68,7 +71,9 @@ class TestIncMiniMarkHooks(BaseDirectGCTest):
         self.malloc(S)
         self.gc._minor_collection()
         assert self.gc.hooks.minors == [
-            {'total_memory_used': 0, 'pinned_objects': 0}
+            {'total_memory_used': 0, 'pinned_objects': 0,
+             'nursery_size': self.gc.nursery_size,
+             'nursery_surviving_size': 0}
             ]
         assert self.gc.hooks.durations[0] > 0.
         self.gc.hooks.reset()
@@ -78,7 +83,9 @@ class TestIncMiniMarkHooks(BaseDirectGCTest):
         self.stackroots.append(self.malloc(S))
         self.gc._minor_collection()
         assert self.gc.hooks.minors == [
-            {'total_memory_used': self.size_of_S*2, 'pinned_objects': 0}
+            {'total_memory_used': self.size_of_S*2, 'pinned_objects': 0,
+             'nursery_size': self.gc.nursery_size,
+             'nursery_surviving_size': self.size_of_S*2}
             ]
 
     def test_on_gc_collect(self):
@@ -400,6 +400,83 @@ def test_mass_free_half_page_becomes_more_free():
     assert freepages(ac) == NULL
     assert ac.full_page_for_size[2] == PAGE_NULL
 
+def test_mass_free_sparse_page():
+    pagesize = hdrsize + 24*WORD
+    ac = arena_collection_for_test(pagesize, "//", fill_with_objects=2)
+    pageaddr = pagenum(ac, 0)
+    ok_to_free = OkToFree(ac, lambda obj: obj != pageaddr + hdrsize)
+    ac.mass_free(ok_to_free)
+    #
+    # only one object out of 12 survives in the first page: it is sparse
+    page = getpage(ac, 0)
+    assert ac.sparse_page_for_size[2] == page
+    assert page.nextpage == PAGE_NULL
+    assert page.nfree == 7
+    assert ac._nuninitialized(page, 2) == 4
+    assert ac.num_sparse_pages == 1
+    assert ac.page_for_size[2] == PAGE_NULL
+    # the second page was freed
+    assert freepages(ac) == pagenum(ac, 1)
+    #
+    # the free page is used before the sparse page
+    for i in range(12):
+        obj = ac.malloc(2*WORD); chkob(ac, 1, i*2*WORD, obj)
+    assert not ac.current_arena
+    assert ac.num_sparse_pages == 1
+    obj = ac.malloc(2*WORD); chkob(ac, 0, 2*WORD, obj)
+    assert ac.page_for_size[2] == page
+    assert ac.sparse_page_for_size[2] == PAGE_NULL
+    assert ac.num_sparse_pages == 0
+
+def test_mass_free_sparse_page_emptied():
+    pagesize = hdrsize + 24*WORD
+    ac = arena_collection_for_test(pagesize, "/", fill_with_objects=2)
+    pageaddr = pagenum(ac, 0)
+    ac.mass_free(OkToFree(ac, lambda obj: obj != pageaddr + hdrsize))
+    assert ac.sparse_page_for_size[2] == getpage(ac, 0)
+    assert ac.num_sparse_pages == 1
+    #
+    # sparse pages are visited by the next major collection too
+    ok_to_free = OkToFree(ac, True)
+    ac.mass_free(ok_to_free)
+    assert ok_to_free.seen == {hdrsize: True}
+    assert ac.sparse_page_for_size[2] == PAGE_NULL
+    assert ac.num_sparse_pages == 0
+    assert freepages(ac) == pageaddr
+
+def test_sparse_page_lets_arena_be_returned():
+    pagesize = hdrsize + 24*WORD
+    ac = ArenaCollection(pagesize * 3 - 1, pagesize, 9*WORD)
+    # two arenas of two pages each, full of objects of size class 2
+    objs = [ac.malloc(2*WORD) for i in range(48)]
+    assert ac.arenas_count == 2
+    assert not ac.current_arena
+    arena_a = objs[0].arena
+    arena_b = objs[24].arena
+    assert arena_b is not arena_a
+    #
+    # one object survives in the first page of the first arena, which
+    # becomes sparse; the second page of the second arena is freed
+    survivors = objs[:1] + objs[12:36]
+    ac.mass_free(OkToFree(ac, lambda obj: obj not in survivors,
+                          multiarenas=True))
+    assert ac.num_sparse_pages == 1
+    assert ac.arenas_count == 2
+    #
+    # new objects go to the free page of the second arena, not to the
+    # sparse page
+    churn = [ac.malloc(2*WORD) for i in range(12)]
+    assert ac.num_sparse_pages == 1
+    for obj in churn:
+        assert obj.arena is arena_b
+    #
+    # so once the objects of the first arena die, it is returned
+    survivors = objs[24:36] + churn
+    ac.mass_free(OkToFree(ac, lambda obj: obj not in survivors,
+                          multiarenas=True))
+    assert ac.num_sparse_pages == 0
+    assert ac.arenas_count == 1
+
 # ____________________________________________________________
 
 def test_random(incremental=False):
@@ -0,0 +1,15 @@
+import py
+from rpython.memory.test import test_incminimark_gc
+from rpython.rlib.rarithmetic import LONG_BIT
+
+WORD = LONG_BIT // 8
+
+class TestIncrementalMiniMarkGCAdaptiveNursery(test_incminimark_gc.TestIncrementalMiniMarkGC):
+    GC_PARAMS = {'nursery_size_min': 16*WORD,
+                 'nursery_size_max': 256*WORD,
+                 'nursery_pause_max': 1000.0}
+
+    def test_bounded_memory_when_allocating_with_finalizers(self):
+        py.test.skip("objects with finalizers all survive the minor "
+                     "collections, so the nursery grows to its maximum and "
+                     "the bound checked by the test scales with it")
@@ -553,6 +553,7 @@ PARAMETER_DOCS = {
     'trace_limit': 'number of recorded operations before we abort tracing with ABORT_TOO_LONG',
     'inlining': 'inline python functions or not (1/0)',
     'loop_longevity': 'a parameter controlling how long loops will be kept before being freed, an estimate',
+    'max_code_memory': 'maximum size in KB of the machine code of the loops kept alive; above it, the least used loops are freed (0=no limit)',
     'retrace_limit': 'how many times we can try retracing before giving up',
     'max_retrace_guards': 'number of extra guards a retrace can cause',
     'max_unroll_loops': 'number of extra unrollings a loop can cause',
@@ -565,6 +566,9 @@ PARAMETER_DOCS = {
     'vec_cost': 'threshold for which traces to bail. Unpacking increases the counter,'\
                 ' vector operation decrease the cost',
     'vec_all': 'try to vectorize trace loops that occur outside of the numpypy library',
+    'defer_compile': 'queue the loops that were traced; they are compiled '
+                     'by compile_pending(), or at the next safe point after '
+                     'N milliseconds (0=off)',
 }
 
 PARAMETERS = {'threshold': 1039, # just above 1024, prime
@@ -574,6 +578,7 @@ PARAMETERS = {'threshold': 1039, # just above 1024, prime
               'trace_limit': 6000,
               'inlining': 1,
               'loop_longevity': 1000,
+              'max_code_memory': 0,
               'retrace_limit': 0,
               'max_retrace_guards': 15,
               'max_unroll_loops': 0,
@@ -583,6 +588,7 @@ PARAMETERS = {'threshold': 1039, # just above 1024, prime
               'vec': 0,
               'vec_all': 0,
               'vec_cost': 0,
+              'defer_compile': 0,
               }
 unroll_parameters = unrolling_iterable(PARAMETERS.items())
 
@@ -1329,6 +1335,7 @@ class Counters(object):
     ABORT_BAD_LOOP
     ABORT_ESCAPE
     ABORT_FORCE_QUASIIMMUT
+    COMPILE_DEFERRED
     NVIRTUALS
     NVHOLES
     NVREUSED
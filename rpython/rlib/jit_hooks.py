@@ -111,6 +111,18 @@ def stats_get_counter_value(warmrunnerdesc, no):
 def stats_get_times_value(warmrunnerdesc, no):
     return warmrunnerdesc.metainterp_sd.profiler.get_times(no)
 
+@register_helper(annmodel.SomeInteger())
+def stats_memmgr_evicted_loops(warmrunnerdesc):
+    return warmrunnerdesc.memory_manager.evicted_loops
+
+@register_helper(annmodel.SomeInteger())
+def stats_memmgr_evicted_bytes(warmrunnerdesc):
+    return warmrunnerdesc.memory_manager.evicted_bytes
+
+@register_helper(annmodel.SomeInteger())
+def compile_deferred_loops(warmrunnerdesc):
+    return warmrunnerdesc.compile_queue.compile_all()
+
 LOOP_RUN_CONTAINER = lltype.GcArray(lltype.Struct('elem',
                                                   ('type', lltype.Char),
                                                   ('number', lltype.Signed),
@@ -214,7 +214,7 @@ def returns(*args):
         return method
     return decor
 
-JITLOG_VERSION = 4
+JITLOG_VERSION = 5
 JITLOG_VERSION_16BIT_LE = struct.pack("<H", JITLOG_VERSION)
 
 marks = [
@@ -248,6 +248,9 @@ marks = [
     ('SOURCE_CODE',),
     ('REDIRECT_ASSEMBLER',),
     ('TMP_CALLBACK',),
+    # the next trace was queued with 'defer_compile', and is compiled
+    # now after waiting in the queue (time in microseconds)
+    ('COMPILE_DEFERRED',),
 ]
 
 start = 0x11
@@ -379,6 +382,12 @@ class JitLogger(object):
             return
         self._write_marked(MARK_ABORT_TRACE, encode_le_addr(self.trace_id))
 
+    def compile_deferred(self, delay):
+        if not jitlog_enabled():
+            return
+        self._write_marked(MARK_COMPILE_DEFERRED,
+                           encode_le_64bit(int(delay * 1000000.0)))
+
     def _write_marked(self, mark, line):
         if not we_are_translated():
             assert jitlog_enabled()
@@ -0,0 +1,260 @@
+"""RPython implementation of SHA-256 and SHA-224 (FIPS PUB 180-4).
+
+The interface follows rsha.py.  Short inputs are compressed in RPython;
+long inputs are passed to the equivalent C function in src/rsha2.c,
+which runs without the GIL so that other threads can proceed while a
+large buffer is being hashed.
+"""
+
+import py
+
+from rpython.rlib.rarithmetic import r_uint, r_ulonglong
+from rpython.rtyper.lltypesystem import lltype, rffi
+from rpython.translator import cdir
+from rpython.translator.tool.cbuild import ExternalCompilationInfo
+
+
+src_dir = py.path.local(__file__).dirpath() / 'src'
+eci = ExternalCompilationInfo(
+    includes = ['rsha2.h'],
+    include_dirs = [str(src_dir), str(cdir)],
+    separate_module_files = [src_dir / 'rsha2.c'],
+)
+
+c_sha256_compress = rffi.llexternal(
+    'pypy_sha256_compress', [rffi.UINTP, rffi.CCHARP, lltype.Signed],
+    lltype.Void, compilation_info=eci, releasegil=True)
+
+# updates with at least this many bytes of complete blocks are done in C,
+# with the GIL released (the same threshold as CPython's hashlib)
+GIL_RELEASE_MINSIZE = 2048
+
+MASK32 = r_uint(0xFFFFFFFF)
+
+K = [r_uint(k) for k in [
+    0x428a2f98L, 0x71374491L, 0xb5c0fbcfL, 0xe9b5dba5L,
+    0x3956c25bL, 0x59f111f1L, 0x923f82a4L, 0xab1c5ed5L,
+    0xd807aa98L, 0x12835b01L, 0x243185beL, 0x550c7dc3L,
+    0x72be5d74L, 0x80deb1feL, 0x9bdc06a7L, 0xc19bf174L,
+    0xe49b69c1L, 0xefbe4786L, 0x0fc19dc6L, 0x240ca1ccL,
+    0x2de92c6fL, 0x4a7484aaL, 0x5cb0a9dcL, 0x76f988daL,
+    0x983e5152L, 0xa831c66dL, 0xb00327c8L, 0xbf597fc7L,
+    0xc6e00bf3L, 0xd5a79147L, 0x06ca6351L, 0x14292967L,
+    0x27b70a85L, 0x2e1b2138L, 0x4d2c6dfcL, 0x53380d13L,
+    0x650a7354L, 0x766a0abbL, 0x81c2c92eL, 0x92722c85L,
+    0xa2bfe8a1L, 0xa81a664bL, 0xc24b8b70L, 0xc76c51a3L,
+    0xd192e819L, 0xd6990624L, 0xf40e3585L, 0x106aa070L,
+    0x19a4c116L, 0x1e376c08L, 0x2748774cL, 0x34b0bcb5L,
+    0x391c0cb3L, 0x4ed8aa4aL, 0x5b9cca4fL, 0x682e6ff3L,
+    0x748f82eeL, 0x78a5636fL, 0x84c87814L, 0x8cc70208L,
+    0x90befffaL, 0xa4506cebL, 0xbef9a3f7L, 0xc67178f2L,    ]]
+
+H256 = [r_uint(h) for h in [
+    0x6a09e667L, 0xbb67ae85L, 0x3c6ef372L, 0xa54ff53aL,
+    0x510e527fL, 0x9b05688cL, 0x1f83d9abL, 0x5be0cd19L,
+    ]]
+
+H224 = [r_uint(h) for h in [
+    0xc1059ed8L, 0x367cd507L, 0x3070dd17L, 0xf70e5939L,
+    0xffc00b31L, 0x68581511L, 0x64f98fa7L, 0xbefa4fa4L,
+    ]]
+
+
+def _rotr(x, n):
+    "Rotate x (32 bit, with the upper bits cleared) right n bits."
+    return ((x >> n) | (x << (32 - n))) & MASK32
+
+def _state2string(H, digest_size):
+    result = []
+    for x in H:
+        result.append(chr((x >> 24) & 0xFF))
+        result.append(chr((x >> 16) & 0xFF))
+        result.append(chr((x >> 8) & 0xFF))
+        result.append(chr(x & 0xFF))
+    return ''.join(result[:digest_size])
+
+def _string2hexstring(s):
+    hx = '0123456789abcdef'
+    result = []
+    for c in s:
+        result.append(hx[(ord(c) >> 4) & 0xF])
+        result.append(hx[ord(c) & 0xF])
+    return ''.join(result)
+
+
+class RSHA256(object):
+    """RPython-level SHA-256 object.
+    """
+    digest_size = 32
+    block_size = 64
+    initial_state = H256
+
+    def __init__(self, initialdata=''):
+        self._init()
+        self.update(initialdata)
+
+    def _init(self):
+        "Initialisation."
+        self.count = r_ulonglong(0)   # total number of bytes
+        self.input = ""   # pending unprocessed data, < 64 bytes
+        self.uintbuffer = [r_uint(0)] * 64
+        self.H = self.initial_state[:]
+
+    def _transform(self, s, start):
+        """Process the 64-byte block s[start:start+64]."""
+        W = self.uintbuffer
+        for t in range(16):
+            p = start + t * 4
+            W[t] = ((r_uint(ord(s[p])) << 24) | (r_uint(ord(s[p+1])) << 16) |
+                    (r_uint(ord(s[p+2])) << 8) | r_uint(ord(s[p+3])))
+        for t in range(16, 64):
+            x = W[t-2]
+            y = W[t-15]
+            W[t] = ((_rotr(x, 17) ^ _rotr(x, 19) ^ (x >> 10)) + W[t-7] +
+                    (_rotr(y, 7) ^ _rotr(y, 18) ^ (y >> 3)) +
+                    W[t-16]) & MASK32
+
+        H = self.H
+        a = H[0]; b = H[1]; c = H[2]; d = H[3]
+        e = H[4]; f = H[5]; g = H[6]; h = H[7]
+        for t in range(64):
+            t1 = (h + (_rotr(e, 6) ^ _rotr(e, 11) ^ _rotr(e, 25)) +
+                  (g ^ (e & (f ^ g))) + K[t] + W[t])
+            t2 = ((_rotr(a, 2) ^ _rotr(a, 13) ^ _rotr(a, 22)) +
+                  ((a & b) | (c & (a | b))))
+            h = g
+            g = f
+            f = e
+            e = (d + t1) & MASK32
+            d = c
+            c = b
+            b = a
+            a = (t1 + t2) & MASK32
+        H[0] = (H[0] + a) & MASK32
+        H[1] = (H[1] + b) & MASK32
+        H[2] = (H[2] + c) & MASK32
+        H[3] = (H[3] + d) & MASK32
+        H[4] = (H[4] + e) & MASK32
+        H[5] = (H[5] + f) & MASK32
+        H[6] = (H[6] + g) & MASK32
+        H[7] = (H[7] + h) & MASK32
+
+    def _transform_many(self, s, start, nblocks):
+        """Process nblocks consecutive blocks of s, starting at start."""
+        if nblocks * 64 >= GIL_RELEASE_MINSIZE:
+            state = lltype.malloc(rffi.UINTP.TO, 8, flavor='raw')
+            try:
+                for i in range(8):
+                    state[i] = rffi.cast(rffi.UINT, self.H[i])
+                with rffi.scoped_nonmovingbuffer(s) as buf:
+                    c_sha256_compress(state, rffi.ptradd(buf, start),
+                                      nblocks)
+                for i in range(8):
+                    self.H[i] = rffi.cast(lltype.Unsigned, state[i])
+            finally:
+                lltype.free(state, flavor='raw')
+        else:
+            for i in range(nblocks):
+                self._transform(s, start + i * 64)
+
+    def _finalize(self):
+        """Add the final padding and return the digest, without changing
+        the state of this object.
+        """
+        count = self.count
+        input = self.input
+        H = self.H[:]
+
+        index = len(input)
+        if index < 56:
+            padLen = 56 - index
+        else:
+            padLen = 120 - index
+        length_in_bits = count << 3
+        lenbytes = [chr(r_uint(length_in_bits >> (56 - 8 * i)) & 0xFF)
+                    for i in range(8)]
+        self.update('\200' + '\000' * (padLen - 1) + ''.join(lenbytes))
+        assert len(self.input) == 0
+        digest = _state2string(self.H, self.digest_size)
+
+        # Restore the saved state in case this instance is still used
+        self.count = count
+        self.input = input
+        self.H = H
+        return digest
+
+
+    # Down from here all methods follow the Python Standard Library
+    # API of the hashlib objects.
+
+    def update(self, inBuf):
+        """Add to the current message.
+
+        Repeated calls are equivalent to a single call with the
+        concatenation of all the arguments.  The hash is immediately
+        calculated for all full blocks.
+        """
+        leninBuf = len(inBuf)
+        self.count += leninBuf
+        index = len(self.input)
+        partLen = 64 - index
+        assert partLen > 0
+
+        if leninBuf >= partLen:
+            if index > 0:
+                self._transform(self.input + inBuf[:partLen], 0)
+                i = partLen
+            else:
+                i = 0
+            nblocks = (leninBuf - i) >> 6
+            if nblocks > 0:
+                self._transform_many(inBuf, i, nblocks)
+                i += nblocks << 6
+            assert i >= 0
+            self.input = inBuf[i:leninBuf]
+        else:
+            self.input = self.input + inBuf
+
+    def digest(self):
+        """Return the digest of the strings passed to the update()
+        method so far, as a string of digest_size bytes.
+        """
+        return self._finalize()
+
+    def hexdigest(self):
+        """Like digest() except the digest is returned as a string of
+        hexadecimal digits.
+        """
+        return _string2hexstring(self._finalize())
+
+    def copy(self):
+        """Return a clone object.
+        """
+        clone = RSHA256()
+        clone._copyfrom(self)
+        return clone
+
+    def _copyfrom(self, other):
+        """Copy all state from 'other' into 'self'.
+        """
+        self.count = other.count
+        self.input = other.input
+        self.H = other.H[:]
+
+
+class RSHA224(RSHA256):
+    """RPython-level SHA-224 object.
+    """
+    digest_size = 28
+    initial_state = H224
+
+    def copy(self):
+        clone = RSHA224()
+        clone._copyfrom(self)
+        return clone
+
+
+# synonyms to build new objects, for compatibility with the
+# CPython _sha256 module interface.
+sha256 = RSHA256
+sha224 = RSHA224
@@ -0,0 +1,249 @@
+"""RPython implementation of SHA-512 and SHA-384 (FIPS PUB 180-4).
+
+See rsha256.py, which uses the same structure.
+"""
+
+from rpython.rlib.rarithmetic import r_uint, r_ulonglong
+from rpython.rlib.rsha256 import eci, GIL_RELEASE_MINSIZE, _string2hexstring
+from rpython.rtyper.lltypesystem import lltype, rffi
+
+
+c_sha512_compress = rffi.llexternal(
+    'pypy_sha512_compress', [rffi.ULONGLONGP, rffi.CCHARP, lltype.Signed],
+    lltype.Void, compilation_info=eci, releasegil=True)
+
+K = [r_ulonglong(k) for k in [
+    0x428a2f98d728ae22L, 0x7137449123ef65cdL, 0xb5c0fbcfec4d3b2fL,
+    0xe9b5dba58189dbbcL, 0x3956c25bf348b538L, 0x59f111f1b605d019L,
+    0x923f82a4af194f9bL, 0xab1c5ed5da6d8118L, 0xd807aa98a3030242L,
+    0x12835b0145706fbeL, 0x243185be4ee4b28cL, 0x550c7dc3d5ffb4e2L,
+    0x72be5d74f27b896fL, 0x80deb1fe3b1696b1L, 0x9bdc06a725c71235L,
+    0xc19bf174cf692694L, 0xe49b69c19ef14ad2L, 0xefbe4786384f25e3L,
+    0x0fc19dc68b8cd5b5L, 0x240ca1cc77ac9c65L, 0x2de92c6f592b0275L,
+    0x4a7484aa6ea6e483L, 0x5cb0a9dcbd41fbd4L, 0x76f988da831153b5L,
+    0x983e5152ee66dfabL, 0xa831c66d2db43210L, 0xb00327c898fb213fL,
+    0xbf597fc7beef0ee4L, 0xc6e00bf33da88fc2L, 0xd5a79147930aa725L,
+    0x06ca6351e003826fL, 0x142929670a0e6e70L, 0x27b70a8546d22ffcL,
+    0x2e1b21385c26c926L, 0x4d2c6dfc5ac42aedL, 0x53380d139d95b3dfL,
+    0x650a73548baf63deL, 0x766a0abb3c77b2a8L, 0x81c2c92e47edaee6L,
+    0x92722c851482353bL, 0xa2bfe8a14cf10364L, 0xa81a664bbc423001L,
+    0xc24b8b70d0f89791L, 0xc76c51a30654be30L, 0xd192e819d6ef5218L,
+    0xd69906245565a910L, 0xf40e35855771202aL, 0x106aa07032bbd1b8L,
+    0x19a4c116b8d2d0c8L, 0x1e376c085141ab53L, 0x2748774cdf8eeb99L,
+    0x34b0bcb5e19b48a8L, 0x391c0cb3c5c95a63L, 0x4ed8aa4ae3418acbL,
+    0x5b9cca4f7763e373L, 0x682e6ff3d6b2b8a3L, 0x748f82ee5defb2fcL,
+    0x78a5636f43172f60L, 0x84c87814a1f0ab72L, 0x8cc702081a6439ecL,
+    0x90befffa23631e28L, 0xa4506cebde82bde9L, 0xbef9a3f7b2c67915L,
+    0xc67178f2e372532bL, 0xca273eceea26619cL, 0xd186b8c721c0c207L,
+    0xeada7dd6cde0eb1eL, 0xf57d4f7fee6ed178L, 0x06f067aa72176fbaL,
+    0x0a637dc5a2c898a6L, 0x113f9804bef90daeL, 0x1b710b35131c471bL,
+    0x28db77f523047d84L, 0x32caab7b40c72493L, 0x3c9ebe0a15c9bebcL,
+    0x431d67c49c100d4cL, 0x4cc5d4becb3e42b6L, 0x597f299cfc657e2aL,
+    0x5fcb6fab3ad6faecL, 0x6c44198c4a475817L,    ]]
+
+H512 = [r_ulonglong(h) for h in [
+    0x6a09e667f3bcc908L, 0xbb67ae8584caa73bL, 0x3c6ef372fe94f82bL,
+    0xa54ff53a5f1d36f1L, 0x510e527fade682d1L, 0x9b05688c2b3e6c1fL,
+    0x1f83d9abfb41bd6bL, 0x5be0cd19137e2179L,
+    ]]
+
+H384 = [r_ulonglong(h) for h in [
+    0xcbbb9d5dc1059ed8L, 0x629a292a367cd507L, 0x9159015a3070dd17L,
+    0x152fecd8f70e5939L, 0x67332667ffc00b31L, 0x8eb44a8768581511L,
+    0xdb0c2e0d64f98fa7L, 0x47b5481dbefa4fa4L,
+    ]]
+
+
+def _rotr(x, n):
+    "Rotate x (64 bit) right n bits."
+    return (x >> n) | (x << (64 - n))
+
+def _state2string(H, digest_size):
+    result = []
+    for x in H:
+        for i in range(8):
+            result.append(chr(r_uint(x >> (56 - 8 * i)) & 0xFF))
+    return ''.join(result[:digest_size])
+
+
+class RSHA512(object):
+    """RPython-level SHA-512 object.
+    """
+    digest_size = 64
+    block_size = 128
+    initial_state = H512
+
+    def __init__(self, initialdata=''):
+        self._init()
+        self.update(initialdata)
+
+    def _init(self):
+        "Initialisation."
+        self.count = r_ulonglong(0)   # total number of bytes
+        self.input = ""   # pending unprocessed data, < 128 bytes
+        self.ulonglongbuffer = [r_ulonglong(0)] * 80
+        self.H = self.initial_state[:]
+
+    def _transform(self, s, start):
+        """Process the 128-byte block s[start:start+128]."""
+        W = self.ulonglongbuffer
+        for t in range(16):
+            p = start + t * 8
+            x = r_ulonglong(0)
+            for j in range(8):
+                x = (x << 8) | r_ulonglong(ord(s[p + j]))
+            W[t] = x
+        for t in range(16, 80):
+            x = W[t-2]
+            y = W[t-15]
+            W[t] = ((_rotr(x, 19) ^ _rotr(x, 61) ^ (x >> 6)) + W[t-7] +
+                    (_rotr(y, 1) ^ _rotr(y, 8) ^ (y >> 7)) + W[t-16])
+
+        H = self.H
+        a = H[0]; b = H[1]; c = H[2]; d = H[3]
+        e = H[4]; f = H[5]; g = H[6]; h = H[7]
+        for t in range(80):
+            t1 = (h + (_rotr(e, 14) ^ _rotr(e, 18) ^ _rotr(e, 41)) +
+                  (g ^ (e & (f ^ g))) + K[t] + W[t])
+            t2 = ((_rotr(a, 28) ^ _rotr(a, 34) ^ _rotr(a, 39)) +
+                  ((a & b) | (c & (a | b))))
+            h = g
+            g = f
+            f = e
+            e = d + t1
+            d = c
+            c = b
+            b = a
+            a = t1 + t2
+        H[0] += a
+        H[1] += b
+        H[2] += c
+        H[3] += d
+        H[4] += e
+        H[5] += f
+        H[6] += g
+        H[7] += h
+
+    def _transform_many(self, s, start, nblocks):
+        """Process nblocks consecutive blocks of s, starting at start."""
+        if nblocks * 128 >= GIL_RELEASE_MINSIZE:
+            state = lltype.malloc(rffi.ULONGLONGP.TO, 8, flavor='raw')
+            try:
+                for i in range(8):
+                    state[i] = rffi.cast(rffi.ULONGLONG, self.H[i])
+                with rffi.scoped_nonmovingbuffer(s) as buf:
+                    c_sha512_compress(state, rffi.ptradd(buf, start),
+                                      nblocks)
+                for i in range(8):
+                    self.H[i] = rffi.cast(lltype.UnsignedLongLong, state[i])
+            finally:
+                lltype.free(state, flavor='raw')
+        else:
+            for i in range(nblocks):
+                self._transform(s, start + i * 128)
+
+    def _finalize(self):
+        """Add the final padding and return the digest, without changing
+        the state of this object.
+        """
+        count = self.count
+        input = self.input
+        H = self.H[:]
+
+        index = len(input)
+        if index < 112:
+            padLen = 112 - index
+        else:
+            padLen = 240 - index
+        # the length is a 128-bit number of bits
+        length_hi = count >> 61
+        length_lo = count << 3
+        lenbytes = ([chr(r_uint(length_hi >> (56 - 8 * i)) & 0xFF)
+                     for i in range(8)] +
+                    [chr(r_uint(length_lo >> (56 - 8 * i)) & 0xFF)
+                     for i in range(8)])
+        self.update('\200' + '\000' * (padLen - 1) + ''.join(lenbytes))
+        assert len(self.input) == 0
+        digest = _state2string(self.H, self.digest_size)
+
+        # Restore the saved state in case this instance is still used
+        self.count = count
+        self.input = input
+        self.H = H
+        return digest
+
+
+    # Down from here all methods follow the Python Standard Library
+    # API of the hashlib objects.
+
+    def update(self, inBuf):
+        """Add to the current message.
+
+        Repeated calls are equivalent to a single call with the
+        concatenation of all the arguments.  The hash is immediately
+        calculated for all full blocks.
+        """
+        leninBuf = len(inBuf)
+        self.count += leninBuf
+        index = len(self.input)
+        partLen = 128 - index
+        assert partLen > 0
+
+        if leninBuf >= partLen:
+            if index > 0:
+                self._transform(self.input + inBuf[:partLen], 0)
+                i = partLen
+            else:
+                i = 0
+            nblocks = (leninBuf - i) >> 7
+            if nblocks > 0:
+                self._transform_many(inBuf, i, nblocks)
+                i += nblocks << 7
+            assert i >= 0
+            self.input = inBuf[i:leninBuf]
+        else:
+            self.input = self.input + inBuf
+
+    def digest(self):
+        """Return the digest of the strings passed to the update()
+        method so far, as a string of digest_size bytes.
+        """
+        return self._finalize()
+
+    def hexdigest(self):
+        """Like digest() except the digest is returned as a string of
+        hexadecimal digits.
+        """
+        return _string2hexstring(self._finalize())
+
+    def copy(self):
+        """Return a clone object.
+        """
+        clone = RSHA512()
+        clone._copyfrom(self)
+        return clone
+
+    def _copyfrom(self, other):
+        """Copy all state from 'other' into 'self'.
+        """
+        self.count = other.count
+        self.input = other.input
+        self.H = other.H[:]
+
+
+class RSHA384(RSHA512):
+    """RPython-level SHA-384 object.
+    """
+    digest_size = 48
+    initial_state = H384
+
+    def copy(self):
+        clone = RSHA384()
+        clone._copyfrom(self)
+        return clone
+
+
+# synonyms to build new objects, for compatibility with the
+# CPython _sha512 module interface.
+sha512 = RSHA512
+sha384 = RSHA384
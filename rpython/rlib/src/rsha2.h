@@ -0,0 +1,17 @@
+#ifndef _PYPY_RSHA2_H
+#define _PYPY_RSHA2_H
+
+#include "src/precommondefs.h"
+
+/* The SHA-256 and SHA-512 compression functions, applied to 'nblocks'
+   consecutive blocks of 'data'.  They are called without the GIL by
+   rpython/rlib/rsha256.py and rsha512.py for long inputs. */
+
+RPY_EXTERN
+void pypy_sha256_compress(unsigned int *state, const char *data,
+                          Signed nblocks);
+RPY_EXTERN
+void pypy_sha512_compress(unsigned long long *state, const char *data,
+                          Signed nblocks);
+
+#endif
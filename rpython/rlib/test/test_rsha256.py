@@ -0,0 +1,66 @@
+import hashlib    # for comparison
+from rpython.rlib import rsha256
+from rpython.translator.c.test.test_genc import compile
+
+
+def test_digest_size():
+    assert rsha256.RSHA256.digest_size == 32
+    assert rsha256.RSHA224.digest_size == 28
+    assert rsha256.RSHA256.block_size == 64
+
+def test_cases():
+    for data in ["", "abc", "a" * 55, "a" * 56, "a" * 64, "a" * 119,
+                 "abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq"]:
+        assert rsha256.sha256(data).hexdigest() == \
+            hashlib.sha256(data).hexdigest()
+        assert rsha256.sha224(data).digest() == hashlib.sha224(data).digest()
+    assert rsha256.sha256("abc").hexdigest() == (
+        "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad")
+
+def test_long():
+    # large enough to use the C version, which releases the GIL
+    data = ''.join([chr(i % 251) for i in range(10000)])
+    assert len(data) >= rsha256.GIL_RELEASE_MINSIZE
+    for start in [0, 1, 63]:
+        d = rsha256.sha256(data[:start])
+        d.update(data[start:])
+        assert d.hexdigest() == hashlib.sha256(data).hexdigest()
+        d = rsha256.sha224(data[:start])
+        d.update(data[start:])
+        assert d.hexdigest() == hashlib.sha224(data).hexdigest()
+
+def test_copy():
+    for repeat in [1, 10, 100]:
+        d1 = rsha256.sha256("abc" * repeat)
+        d2 = d1.copy()
+        d1.update("def" * repeat)
+        d2.update("gh" * repeat)
+        assert d1.digest() == hashlib.sha256("abc" * repeat +
+                                             "def" * repeat).digest()
+        assert d2.digest() == hashlib.sha256("abc" * repeat +
+                                             "gh" * repeat).digest()
+        d3 = rsha256.sha224("abc" * repeat).copy()
+        assert isinstance(d3, rsha256.RSHA224)
+        assert d3.digest() == hashlib.sha224("abc" * repeat).digest()
+
+def test_random():
+    import random
+    for i in range(20):
+        m1 = rsha256.RSHA256()
+        m2 = hashlib.sha256()
+        for j in range(random.randrange(5)):
+            input = ''.join([chr(random.randrange(256))
+                             for i in range(random.randrange(5000))])
+            m1.update(input)
+            m2.update(input)
+            assert m2.hexdigest() == m1.hexdigest()
+
+def test_compiled():
+    def f(n):
+        d = rsha256.RSHA256("x" * n)
+        d.update("y" * n)
+        return d.hexdigest() + rsha256.RSHA224("x" * n).hexdigest()
+    fc = compile(f, [int])
+    for n in [0, 3, 5000]:
+        assert fc(n) == (hashlib.sha256("x" * n + "y" * n).hexdigest() +
+                         hashlib.sha224("x" * n).hexdigest())
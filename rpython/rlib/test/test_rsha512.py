@@ -0,0 +1,67 @@
+import hashlib    # for comparison
+from rpython.rlib import rsha512
+from rpython.translator.c.test.test_genc import compile
+
+
+def test_digest_size():
+    assert rsha512.RSHA512.digest_size == 64
+    assert rsha512.RSHA384.digest_size == 48
+    assert rsha512.RSHA512.block_size == 128
+
+def test_cases():
+    for data in ["", "abc", "a" * 111, "a" * 112, "a" * 128, "a" * 239,
+                 "abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq"]:
+        assert rsha512.sha512(data).hexdigest() == \
+            hashlib.sha512(data).hexdigest()
+        assert rsha512.sha384(data).digest() == hashlib.sha384(data).digest()
+    assert rsha512.sha512("abc").hexdigest() == (
+        "ddaf35a193617abacc417349ae20413112e6fa4e89a97ea20a9eeee64b55d39a"
+        "2192992a274fc1a836ba3c23a3feebbd454d4423643ce80e2a9ac94fa54ca49f")
+
+def test_long():
+    # large enough to use the C version, which releases the GIL
+    data = ''.join([chr(i % 251) for i in range(10000)])
+    assert len(data) >= rsha512.GIL_RELEASE_MINSIZE
+    for start in [0, 1, 127]:
+        d = rsha512.sha512(data[:start])
+        d.update(data[start:])
+        assert d.hexdigest() == hashlib.sha512(data).hexdigest()
+        d = rsha512.sha384(data[:start])
+        d.update(data[start:])
+        assert d.hexdigest() == hashlib.sha384(data).hexdigest()
+
+def test_copy():
+    for repeat in [1, 10, 100]:
+        d1 = rsha512.sha512("abc" * repeat)
+        d2 = d1.copy()
+        d1.update("def" * repeat)
+        d2.update("gh" * repeat)
+        assert d1.digest() == hashlib.sha512("abc" * repeat +
+                                             "def" * repeat).digest()
+        assert d2.digest() == hashlib.sha512("abc" * repeat +
+                                             "gh" * repeat).digest()
+        d3 = rsha512.sha384("abc" * repeat).copy()
+        assert isinstance(d3, rsha512.RSHA384)
+        assert d3.digest() == hashlib.sha384("abc" * repeat).digest()
+
+def test_random():
+    import random
+    for i in range(20):
+        m1 = rsha512.RSHA512()
+        m2 = hashlib.sha512()
+        for j in range(random.randrange(5)):
+            input = ''.join([chr(random.randrange(256))
+                             for i in range(random.randrange(5000))])
+            m1.update(input)
+            m2.update(input)
+            assert m2.hexdigest() == m1.hexdigest()
+
+def test_compiled():
+    def f(n):
+        d = rsha512.RSHA512("x" * n)
+        d.update("y" * n)
+        return d.hexdigest() + rsha512.RSHA384("x" * n).hexdigest()
+    fc = compile(f, [int])
+    for n in [0, 3, 5000]:
+        assert fc(n) == (hashlib.sha512("x" * n + "y" * n).hexdigest() +
+                         hashlib.sha384("x" * n).hexdigest())